@@ -7,7 +7,9 @@ For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
 
+import logging
 import os
+from urllib.parse import parse_qs
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.security.websocket import AllowedHostsOriginValidator
 from django.core.asgi import get_asgi_application
@@ -22,66 +24,43 @@ django_asgi_app = get_asgi_application()
 # Import routing after Django is initialized
 from orders.routing import websocket_urlpatterns
 
-print("=" * 60)
-print("ASGI Application Initialized")
-print(f"DEBUG mode: {settings.DEBUG}")
-print(f"WebSocket URL patterns: {len(websocket_urlpatterns)} patterns")
-for pattern in websocket_urlpatterns:
-    print(f"  - {pattern.pattern}")
-print("=" * 60)
+logger = logging.getLogger(__name__)
+logger.info(
+    "ASGI application initialized",
+    extra={'debug': settings.DEBUG, 'websocket_patterns': [str(pattern.pattern) for pattern in websocket_urlpatterns]},
+)
+
 
-# WebSocket application wrapper for logging
 class WebSocketLogger:
-    """ASGI middleware to log all WebSocket connection attempts."""
+    """ASGI middleware that logs WebSocket connection attempts at DEBUG level."""
     def __init__(self, app):
         self.app = app
     
     async def __call__(self, scope, receive, send):
-        if scope["type"] == "websocket":
-            print("=" * 60)
-            print("ASGI LEVEL: WebSocket connection detected")
-            print(f"Path: {scope.get('path', 'unknown')}")
-            print(f"Query string: {scope.get('query_string', b'').decode('utf-8')[:100]}")
-            print(f"Client: {scope.get('client', 'unknown')}")
-            try:
-                headers = {k.decode(): v.decode() for k, v in scope.get('headers', [])}
-                print(f"Headers: {headers}")
-            except:
-                print(f"Headers: {scope.get('headers', [])}")
-            print("=" * 60)
+        if scope["type"] == "websocket" and logger.isEnabledFor(logging.DEBUG):
+            # The query string carries the access token, so only its parameter names are logged
+            query = parse_qs(scope.get('query_string', b'').decode('utf-8', 'replace'))
+            logger.debug(
+                "WebSocket connection attempt",
+                extra={
+                    'path': scope.get('path', 'unknown'),
+                    'client': scope.get('client'),
+                    'query_params': sorted(query),
+                    'headers': sorted(name.decode('latin-1') for name, _ in scope.get('headers', [])),
+                },
+            )
         return await self.app(scope, receive, send)
 
-# Wrapper to log all ASGI requests
-class ASGIRequestLogger:
-    """Log all ASGI requests before routing."""
-    def __init__(self, app):
-        self.app = app
-    
-    async def __call__(self, scope, receive, send):
-        protocol_type = scope.get("type", "unknown")
-        if protocol_type == "websocket":
-            print("=" * 60)
-            print("ASGI REQUEST LOGGER: WebSocket request received")
-            print(f"  Path: {scope.get('path', 'unknown')}")
-            print(f"  Query: {scope.get('query_string', b'').decode('utf-8')[:50]}")
-            print("=" * 60)
-        return await self.app(scope, receive, send)
 
 # For development, allow all origins for WebSocket
 # In production, use AllowedHostsOriginValidator
 if settings.DEBUG:
     ws_app = WebSocketLogger(URLRouter(websocket_urlpatterns))
-    router = ProtocolTypeRouter({
-        "http": django_asgi_app,
-        "websocket": ws_app,
-    })
-    application = ASGIRequestLogger(router)
 else:
     ws_app = WebSocketLogger(AllowedHostsOriginValidator(
         URLRouter(websocket_urlpatterns)
     ))
-    router = ProtocolTypeRouter({
-        "http": django_asgi_app,
-        "websocket": ws_app,
-    })
-    application = ASGIRequestLogger(router)
+application = ProtocolTypeRouter({
+    "http": django_asgi_app,
+    "websocket": ws_app,
+})
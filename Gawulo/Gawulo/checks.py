@@ -0,0 +1,59 @@
+"""
+System checks for the project settings.
+
+Version stamps (Gawulo.conditional), permission bitmasks (auth_api.models), order
+stats counters (orders.stats) and dashboard generations (orders.dashboard_cache)
+live in the default cache and are only coherent when every worker process shares
+it: with a per-process cache a write only reaches the cache of the worker that
+handled it. The same goes for the token revocations stateless JWT authentication
+relies on (auth_api.tokens).
+"""
+from django.conf import settings
+from django.core import checks
+
+# Cache backends that keep their data inside one process
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Warn when the cache-backed features are disabled because the cache is not shared."""
+    if settings.CACHE_IS_SHARED:
+        return []
+    return [checks.Warning(
+        'The default cache is not shared between worker processes.',
+        hint='Conditional GET (304) responses and the caching of permission masks, order stats and '
+             'dashboards across requests are disabled. Set REDIS_URL to use a shared Redis cache.',
+        id='Gawulo.W001',
+    )]
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache_deploy(app_configs, **kwargs):
+    """Warn when CACHE_IS_SHARED is set for a cache that is local to each process (manage.py check --deploy)."""
+    backend = settings.CACHES['default']['BACKEND']
+    if not settings.CACHE_IS_SHARED or backend not in PROCESS_LOCAL_CACHE_BACKENDS:
+        return []
+    return [checks.Warning(
+        f'CACHE_IS_SHARED is set but the default cache ({backend}) is local to each process.',
+        hint='Run a single worker process, or set REDIS_URL so every worker shares the cache.',
+        id='Gawulo.W002',
+    )]
+
+
+@checks.register(checks.Tags.security)
+def check_stateless_auth(app_configs, **kwargs):
+    """Warn when JWT_STATELESS_AUTH is set but token revocations would not reach every worker."""
+    from auth_api.tokens import get_revocation_set
+
+    if not settings.JWT_STATELESS_AUTH or get_revocation_set().shared:
+        return []
+    return [checks.Warning(
+        'JWT_STATELESS_AUTH is set but token revocations are kept in a per-process store.',
+        hint='Stateless authentication is disabled until revocations are shared: set '
+             'JWT_REVOCATION_REDIS_URL (or REDIS_URL) to a Redis server every worker can reach.',
+        id='Gawulo.W003',
+    )]
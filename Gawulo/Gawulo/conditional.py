@@ -0,0 +1,193 @@
+"""
+Conditional GET support (ETag).
+
+Read-mostly views polled by the mobile app mix in ConditionalGetMixin and name
+the version scopes their response depends on, e.g. 'vendor:12' or 'lookups'.
+Each scope has a version stamp in the Django cache: the time, in nanoseconds, of
+its last committed change. The ETag hashes the stamps with the request path
+and format, so a request carrying a current If-None-Match is answered 304 Not
+Modified after one cache read, before the view queries or serializes anything.
+No Last-Modified is sent: HTTP dates have one-second resolution, and a change
+committed in the same second as the client's copy would still be answered 304.
+
+Stamps are moved forward once the transaction changing the data commits (see
+mark_changed(), called from the vendors and lookups signals). A stamp lost to
+cache eviction is recreated from the clock, which only costs clients one full
+response. Hits (304) and misses (full responses) are counted per view and
+reported by get_conditional_metrics().
+
+Stamps must be shared by every worker process, or workers that did not handle a
+write would keep answering 304 with stale data; unless settings.CACHE_IS_SHARED
+is set (e.g. the Redis cache configured from REDIS_URL) every GET gets a full
+response.
+"""
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .transactions import get_transaction_collector
+
+# Names of the views using ConditionalGetMixin, for the metrics
+CONDITIONAL_VIEWS = []
+
+
+def _stamp_key(scope):
+    return f'conditional:stamp:{scope}'
+
+
+def _metric_key(view_name, outcome):
+    return f'conditional:metrics:{view_name}:{outcome}'
+
+
+def get_stamps(scopes):
+    """Return the version stamps of some scopes, creating missing ones from the clock."""
+    keys = {scope: _stamp_key(scope) for scope in scopes}
+    values = cache.get_many(keys.values())
+    stamps = {}
+    for scope, key in keys.items():
+        stamp = values.get(key)
+        if stamp is None:
+            now = time.time_ns()
+            cache.add(key, now, None)
+            # A cache that stores nothing (DummyCache) just never matches
+            stamp = cache.get(key) or now
+        stamps[scope] = stamp
+    return stamps
+
+
+def touch_stamps(scopes):
+    """Move the version stamps of some scopes to now."""
+    now = time.time_ns()
+    cache.set_many({_stamp_key(scope): now for scope in scopes}, None)
+
+
+class StampToucher:
+    """
+    Collects the scopes changed during one transaction.
+
+    Called from transaction.on_commit to touch each stamp once.
+    """
+
+    def __init__(self):
+        self.scopes = set()
+
+    def __call__(self):
+        touch_stamps(self.scopes)
+
+
+def mark_changed(*scopes):
+    """Touch the version stamps of some scopes once the current transaction commits."""
+    scopes = set(scopes)
+    if not scopes:
+        return
+
+    toucher = get_transaction_collector('stamps', StampToucher)
+    if toucher is None:
+        touch_stamps(scopes)
+        return
+    toucher.scopes |= scopes
+
+
+def _count(view_name, outcome):
+    key = _metric_key(view_name, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+class ConditionalGetMixin:
+    """
+    Answer conditional GETs from version stamps.
+
+    Subclasses implement get_version_scopes(). Must be listed before the DRF
+    view class in the bases.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if issubclass(cls, APIView):
+            CONDITIONAL_VIEWS.append(cls.__name__)
+
+    def get_version_scopes(self):
+        """
+        Return the version scopes the response depends on.
+
+        Return None to skip conditional handling, e.g. when the object does not exist.
+        """
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        if not settings.CACHE_IS_SHARED:
+            return super().get(request, *args, **kwargs)
+        scopes = self.get_version_scopes()
+        if scopes is None:
+            return super().get(request, *args, **kwargs)
+
+        stamps = get_stamps(scopes)
+        # The same stamps give different representations for other paths, query strings, hosts and formats
+        fingerprint = '|'.join([
+            type(self).__name__, request.get_host(), request.get_full_path(),
+            getattr(request, 'accepted_media_type', None) or '',
+            *(f'{scope}={stamps[scope]}' for scope in sorted(stamps)),
+        ])
+        etag = 'W/"%s"' % hashlib.sha1(fingerprint.encode()).hexdigest()
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            _count(type(self).__name__, 'hits')
+            not_modified['ETag'] = etag
+            return not_modified
+
+        _count(type(self).__name__, 'misses')
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+            # Let clients keep the copy but revalidate it on every use
+            patch_cache_control(response, no_cache=True)
+        return response
+
+
+def get_conditional_metrics():
+    """
+    Return the conditional GET hit and miss counts of each view.
+
+    Returns:
+        Dict of view name -> {'hits', 'misses', 'hit_rate'}
+    """
+    keys = [_metric_key(view, outcome) for view in CONDITIONAL_VIEWS for outcome in ('hits', 'misses')]
+    values = cache.get_many(keys)
+    metrics = {}
+    for view in CONDITIONAL_VIEWS:
+        hits = values.get(_metric_key(view, 'hits'), 0)
+        misses = values.get(_metric_key(view, 'misses'), 0)
+        metrics[view] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return metrics
+
+
+def reset_conditional_metrics():
+    """Set the hit and miss counts back to zero."""
+    cache.delete_many([_metric_key(view, outcome) for view in CONDITIONAL_VIEWS for outcome in ('hits', 'misses')])
+
+
+class ConditionalGetMetricsView(APIView):
+    """Conditional GET hit and miss counts of the catalog and lookup views (admin only)."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        """Return the hits (304 responses), misses and hit rate of each view."""
+        return Response(get_conditional_metrics(), status=status.HTTP_200_OK)
+
+    def delete(self, request):
+        """Reset the counts."""
+        reset_conditional_metrics()
+        return Response(status=status.HTTP_204_NO_CONTENT)
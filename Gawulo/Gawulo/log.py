@@ -0,0 +1,148 @@
+"""
+Structured, non-blocking logging.
+
+Log calls on request and WebSocket paths must not wait on stdout or disk.
+BackgroundQueueHandler puts records on a bounded in-memory queue and a
+QueueListener thread formats and writes them; when the queue is full records are
+dropped (and counted) rather than blocking the caller. StructuredFormatter writes
+one logfmt line per record, including any `extra` fields, and SamplingFilter
+caps how often the same debug/info event is written.
+
+Levels are set per module from the LOG_LEVEL and LOG_LEVELS settings (see
+settings.LOGGING); application debug logging is off unless enabled there.
+"""
+import atexit
+import copy
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def _format_value(value):
+    text = str(value)
+    if not text or any(char in text for char in ' ="\n'):
+        return '"' + text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+    return text
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Format records as logfmt lines.
+
+    Example:
+        ts=2024-01-01T12:00:00 level=INFO logger=orders.consumers msg="WebSocket connected" group=vendor_1_orders
+    """
+
+    def format(self, record):
+        fields = {
+            'ts': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                fields[key] = value
+        line = ' '.join(f'{key}={_format_value(value)}' for key, value in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Pass at most `burst` records of the same event per `interval` seconds.
+
+    An event is identified by its logger and message template, so repeated calls
+    with different arguments are sampled together. The first record let through
+    after suppression carries a `suppressed` count. Records at or above
+    `max_level` (WARNING by default) are never sampled.
+    """
+
+    def __init__(self, burst=10, interval=60.0, max_level='WARNING'):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.max_level = logging.getLevelName(max_level) if isinstance(max_level, str) else max_level
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= self.max_level:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window_start, count, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - window_start >= self.interval:
+                window_start, count = now, 0
+            if count >= self.burst:
+                self._windows[key] = (window_start, count, suppressed + 1)
+                return False
+            self._windows[key] = (window_start, count + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class BackgroundQueueHandler(QueueHandler):
+    """
+    Hand records to a background thread that writes them.
+
+    Args:
+        filename: Write to this file instead of stderr
+        queue_size: Maximum number of records waiting to be written
+    """
+
+    def __init__(self, filename=None, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.target = logging.FileHandler(filename) if filename else logging.StreamHandler()
+        self.dropped = 0
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def setFormatter(self, fmt):
+        # Formatting happens on the listener thread
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        """Freeze the message so later changes to the arguments do not leak into the record."""
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+            self.target.close()
+        super().close()
+
+
+def parse_log_levels(value):
+    """
+    Parse per-module levels written as "module=LEVEL,module=LEVEL".
+
+    Returns:
+        Dict of module -> level name
+    """
+    levels = {}
+    for item in (value or '').split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
@@ -0,0 +1,78 @@
+"""
+Model mixins shared across the Gawulo apps.
+"""
+
+
+class ImmutableFieldsMixin:
+    """
+    Keep write-once columns out of UPDATE statements.
+
+    Fields named in ``immutable_fields`` (``created_at`` by default) are written
+    on INSERT as usual but never included in the SET clause of an UPDATE, so an
+    existing row keeps its original value without re-reading it before saving.
+    Works with ``save(update_fields=...)``: protected names are simply skipped.
+
+    Must be listed before ``models.Model`` in the bases, e.g.
+    ``class Order(ImmutableFieldsMixin, models.Model)``.
+    """
+
+    immutable_fields = ('created_at',)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        """Drop immutable fields from the values Django is about to UPDATE."""
+        values = self.get_mutable_values(values)
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+
+    def get_mutable_values(self, values):
+        """Return the ``(field, model, value)`` update values without the immutable fields."""
+        return [value for value in values if value[0].name not in self.immutable_fields]
+
+
+class LoadedFieldsMixin:
+    """
+    Remember the loaded values of some fields so saves can tell what changed.
+
+    Fields named in ``tracked_fields`` (attribute names, e.g. ``vendor_id``) are
+    captured by ``from_db()`` and again after each ``save()``, once post_save
+    receivers have run, so receivers compare the new values against
+    ``get_loaded_values()`` without re-reading the row. Fields deferred when the
+    row was loaded are left out; an instance that was never loaded or saved
+    returns None.
+
+    Must be listed before ``models.Model`` in the bases.
+    """
+
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded values of the tracked fields."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values) if name in cls.tracked_fields
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save receivers have seen the changes; later saves report only their own
+        self.reset_loaded_values(kwargs.get('update_fields'))
+
+    def reset_loaded_values(self, update_fields=None):
+        """
+        Treat the current values of the tracked fields as loaded.
+
+        Called by save(); call it after writing the row some other way (e.g. with
+        ``QuerySet.update()``). With ``update_fields`` only those fields are reset.
+        """
+        loaded = {} if update_fields is None else dict(self.get_loaded_values() or {})
+        for name in self.tracked_fields:
+            field = self._meta.get_field(name)
+            saved = update_fields is None or field.name in update_fields or field.attname in update_fields
+            if saved and name in self.__dict__:
+                loaded[name] = self.__dict__[name]
+        self._loaded_values = loaded
+
+    def get_loaded_values(self):
+        """Return the tracked field values as loaded (or last saved), or None if unknown."""
+        return getattr(self, '_loaded_values', None)
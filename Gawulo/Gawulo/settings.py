@@ -109,6 +109,36 @@ if config('DATABASE_URL', default=None):
     DATABASES['default'] = dj_database_url.parse(config('DATABASE_URL'))
 
 
+# Cache
+# Version stamps, generation counters and cached counters have to be seen by every
+# worker process, so the default cache lives in Redis whenever it is available.
+if config('REDIS_URL', default=None):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('REDIS_URL'),
+            'KEY_PREFIX': 'gawulo',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Whether every process serving requests shares the default cache. A per-process
+# cache only qualifies for a single-process (development) server. When False,
+# features that must agree across processes - conditional GET stamps, permission
+# masks, order stats counters and cached dashboards - fall back to the database
+# (see Gawulo.checks).
+CACHE_IS_SHARED = config(
+    'CACHE_IS_SHARED',
+    default=bool(config('REDIS_URL', default=None)) or DEBUG,
+    cast=bool
+)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -158,49 +188,12 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-# Logging configuration
-LOGGING = {
-    'version': 1,
-    'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': '{levelname} {asctime} {module} {message}',
-            'style': '{',
-        },
-        'simple': {
-            'format': '{levelname} {message}',
-            'style': '{',
-        },
-    },
-    'handlers': {
-        'console': {
-            'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
-        },
-    },
-    'root': {
-        'handlers': ['console'],
-        'level': 'DEBUG' if DEBUG else 'INFO',
-    },
-    'loggers': {
-        'vendors.views': {
-            'handlers': ['console'],
-            'level': 'DEBUG',
-            'propagate': False,
-        },
-        'django': {
-            'handlers': ['console'],
-            'level': 'INFO',
-            'propagate': False,
-        },
-    },
-}
-
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        # Bearer tokens first, so API calls never load a session
+        'auth_api.tokens.StatelessJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
         'rest_framework.authentication.TokenAuthentication',  # Keep for backward compatibility
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -243,8 +236,17 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=720),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
+    'TOKEN_OBTAIN_SERIALIZER': 'auth_api.tokens.TokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'auth_api.tokens.TokenRefreshSerializer',
 }
 
+# Stateless mode signs the user's role, vendor/customer ids and permission bitmask
+# into access tokens, so authenticated API calls do not read the user from the
+# database. It needs a revocation store every worker shares (Redis, or a shared
+# cache) and falls back to database authentication without one.
+JWT_STATELESS_AUTH = config('JWT_STATELESS_AUTH', default=False, cast=bool)
+JWT_REVOCATION_REDIS_URL = config('JWT_REVOCATION_REDIS_URL', default=config('REDIS_URL', default=None))
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', default='http://localhost:3000,http://localhost:3001,http://127.0.0.1:3000,http://127.0.0.1:3001', cast=lambda v: [s.strip() for s in v.split(',')])
 CORS_ALLOW_CREDENTIALS = True
@@ -277,21 +279,46 @@ AUTHENTICATION_BACKENDS = (
 )
 
 # Logging configuration
+# Records are written by a background thread (Gawulo.log.BackgroundQueueHandler),
+# so logging never blocks a request. Application loggers default to INFO in
+# development and WARNING in production; LOG_LEVELS overrides single modules,
+# e.g. LOG_LEVELS="orders.consumers=DEBUG,Gawulo.asgi=DEBUG".
+LOG_LEVEL = config('LOG_LEVEL', default='INFO' if DEBUG else 'WARNING').upper()
+LOG_LEVELS = config('LOG_LEVELS', default='')
+
+from Gawulo.log import parse_log_levels  # noqa: E402
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {
+            '()': 'Gawulo.log.StructuredFormatter',
+        },
+    },
+    'filters': {
+        'sampling': {
+            '()': 'Gawulo.log.SamplingFilter',
+            'burst': config('LOG_SAMPLE_BURST', default=20, cast=int),
+            'interval': config('LOG_SAMPLE_INTERVAL', default=60.0, cast=float),
+        },
+    },
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler',
+            '()': 'Gawulo.log.BackgroundQueueHandler',
+            'formatter': 'structured',
+            'filters': ['sampling'],
         },
         'file': {
-            'class': 'logging.FileHandler',
+            '()': 'Gawulo.log.BackgroundQueueHandler',
             'filename': BASE_DIR / 'logs' / 'django.log',
+            'formatter': 'structured',
+            'level': 'INFO',
         },
     },
     'root': {
         'handlers': ['console'],
-        'level': 'INFO',
+        'level': LOG_LEVEL,
     },
     'loggers': {
         'django': {
@@ -299,6 +326,10 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        **{
+            name: {'level': level}
+            for name, level in parse_log_levels(LOG_LEVELS).items()
+        },
     },
 }
 
@@ -343,3 +374,30 @@ if DEBUG and not config('REDIS_URL', default=None):
             'BACKEND': 'channels.layers.InMemoryChannelLayer',
         },
     }
+
+# Order WebSocket events go through the orders outbox and are sent by the
+# dispatch_order_events worker (the order_events service in docker-compose). The
+# in-memory layer only exists inside the web process, so in that case events are
+# dispatched right after the commit instead.
+ORDER_EVENTS_DISPATCH_INLINE = config(
+    'ORDER_EVENTS_DISPATCH_INLINE',
+    default=CHANNEL_LAYERS['default']['BACKEND'] == 'channels.layers.InMemoryChannelLayer',
+    cast=bool
+)
+ORDER_EVENTS_BATCH_SIZE = config('ORDER_EVENTS_BATCH_SIZE', default=100, cast=int)
+ORDER_EVENTS_MAX_ATTEMPTS = config('ORDER_EVENTS_MAX_ATTEMPTS', default=8, cast=int)
+ORDER_EVENTS_LAG_WARNING_SECONDS = config('ORDER_EVENTS_LAG_WARNING_SECONDS', default=30, cast=int)
+# Dispatched outbox rows are deleted by the dispatcher once they are this old
+ORDER_EVENTS_RETENTION_HOURS = config('ORDER_EVENTS_RETENTION_HOURS', default=24, cast=int)
+
+# Cached per-customer/per-vendor order stats counters are reseeded from the
+# database at least this often
+ORDER_STATS_COUNTER_TIMEOUT = config('ORDER_STATS_COUNTER_TIMEOUT', default=600, cast=int)
+
+# Cached vendor/customer dashboard payloads are dropped whenever the actor's
+# orders, line items, reviews or products change, and expire after this long
+DASHBOARD_CACHE_TIMEOUT = config('DASHBOARD_CACHE_TIMEOUT', default=300, cast=int)
+
+# Product search index: 'fts5' (SQLite FTS5 table), 'database' (index tables,
+# any database), 'auto' (FTS5 on SQLite, tables otherwise) or a backend class path
+PRODUCT_SEARCH_BACKEND = config('PRODUCT_SEARCH_BACKEND', default='auto')
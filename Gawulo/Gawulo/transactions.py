@@ -0,0 +1,61 @@
+"""
+Per-transaction collectors.
+
+Several writes defer work until their transaction commits and want to do it once
+per transaction rather than once per write: outbox events (orders.signals), search
+reindexing (orders.search, vendors.search), dashboard generations
+(orders.dashboard_cache) and version stamps (Gawulo.conditional). Each keeps a
+collector object that gathers the work and is called from transaction.on_commit.
+
+Collectors are kept per savepoint. Work recorded inside an atomic block goes to a
+collector registered while that block's savepoint is active, so when the block
+rolls back Django drops the collector's on_commit callback and the work is never
+done, while the collectors of the enclosing blocks are left untouched.
+"""
+import threading
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+_local = threading.local()
+
+
+def _scope(connection):
+    # The innermost savepoint (None at the outermost level of the transaction)
+    return next((sid for sid in reversed(connection.savepoint_ids) if sid is not None), None)
+
+
+def _is_pending(connection, collector):
+    # Django forgets the callbacks of a transaction or savepoint once it commits or rolls back
+    return any(callback[1] is collector for callback in connection.run_on_commit)
+
+
+def get_transaction_collector(name, factory, using=None):
+    """
+    Return the collector named ``name`` of the current transaction and savepoint.
+
+    The first call within a transaction (or savepoint) creates the collector with
+    ``factory()`` and registers it with transaction.on_commit; later calls in the
+    same scope return it. Returns None outside of a transaction, where callers do
+    their work straight away.
+    """
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        return None
+
+    collectors = getattr(_local, 'collectors', None)
+    if collectors is None:
+        collectors = _local.collectors = {}
+    alias = using or DEFAULT_DB_ALIAS
+    key = (alias, name, _scope(connection))
+    collector = collectors.get(key)
+    if collector is not None and _is_pending(connection, collector):
+        return collector
+
+    # First use in this scope, or the collector found belongs to a finished transaction
+    for stale_key in [
+        other_key for other_key, other in collectors.items()
+        if other_key[0] == alias and not _is_pending(connection, other)
+    ]:
+        del collectors[stale_key]
+    collector = collectors[key] = factory()
+    transaction.on_commit(collector, using=using)
+    return collector
@@ -20,6 +20,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework import routers
 from auth_api.views import ProfileUpdateView, ProfilePictureUploadView
+from Gawulo.conditional import ConditionalGetMetricsView
 
 # Create a router and register our viewsets with it
 router = routers.DefaultRouter()
@@ -36,6 +37,7 @@ urlpatterns = [
     path('api/sync/', include('sync.urls')),
     path('api/tracking/', include('tracking.urls')),
     path('api/lookups/', include('lookups.urls')),
+    path('api/metrics/conditional-get/', ConditionalGetMetricsView.as_view(), name='conditional-get-metrics'),
 ]
 
 # Serve static and media files during development
@@ -7,15 +7,18 @@ Defines models for tracking all system changes and events for data governance.
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
+from Gawulo.mixins import ImmutableFieldsMixin
 
 
-class AuditLog(models.Model):
+class AuditLog(ImmutableFieldsMixin, models.Model):
     """
     Audit log model for tracking all system changes and events.
     
     Records who did what, when, and with what data for compliance and debugging.
     """
     
+    immutable_fields = ('event_time',)
+    
     id = models.BigAutoField(primary_key=True)
     event_time = models.DateTimeField(auto_now_add=True, editable=False)
     user = models.ForeignKey(
@@ -79,11 +82,3 @@ class AuditLog(models.Model):
             source_ip=source_ip,
             success=success
         )
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of event_time on existing records."""
-        if self.pk:
-            # Preserve original event_time when updating
-            original = AuditLog.objects.get(pk=self.pk)
-            self.event_time = original.event_time
-        super().save(*args, **kwargs)
@@ -0,0 +1,135 @@
+"""
+Request-scoped resolution of the caller's identity.
+
+Views used to find out who the caller is by trying user.vendor_profile, then
+Vendor.objects.get(user=...), then Customer.objects.get(user=...) on every request,
+sometimes more than once. get_actor() resolves the role, vendor id and customer id
+once per request, backed by a short-lived cache keyed by user id that is
+invalidated whenever a vendor or customer profile is created or deleted. The
+cache is only used when every worker shares it (settings.CACHE_IS_SHARED): a
+per-process cache would miss invalidations made by the other workers.
+"""
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+ACTOR_CACHE_TIMEOUT = 300  # seconds
+
+
+class Actor:
+    """
+    Identity of the user behind a request.
+    
+    Only carries ids, so reading it never touches the database.
+    """
+    
+    __slots__ = ('user_id', 'vendor_id', 'customer_id', 'is_staff')
+    
+    def __init__(self, user_id=None, vendor_id=None, customer_id=None, is_staff=False):
+        self.user_id = user_id
+        self.vendor_id = vendor_id
+        self.customer_id = customer_id
+        self.is_staff = is_staff
+    
+    def __repr__(self):
+        return f"Actor(user={self.user_id}, vendor={self.vendor_id}, customer={self.customer_id}, staff={self.is_staff})"
+    
+    @property
+    def is_authenticated(self):
+        return self.user_id is not None
+    
+    @property
+    def is_vendor(self):
+        return self.vendor_id is not None
+    
+    @property
+    def is_customer(self):
+        return self.customer_id is not None
+    
+    @property
+    def role(self):
+        """Return 'admin', 'vendor', 'customer' or None, in that order of precedence."""
+        if self.is_staff:
+            return 'admin'
+        if self.is_vendor:
+            return 'vendor'
+        if self.is_customer:
+            return 'customer'
+        return None
+
+
+ANONYMOUS_ACTOR = Actor()
+
+
+def _cache_key(user_id):
+    return f'auth_api:actor:{user_id}'
+
+
+def resolve_actor(user):
+    """
+    Return the Actor for a user, reading profile ids from the cache when possible.
+    
+    A cache miss (or any lookup without a shared cache) costs one query: both
+    profiles are LEFT JOINed on the user row. Users built from stateless token
+    claims may already carry their actor.
+    """
+    if user is None or not user.is_authenticated:
+        return ANONYMOUS_ACTOR
+    
+    # Users authenticated from stateless token claims carry their identity
+    actor = user.__dict__.get('_actor')
+    if actor is not None:
+        return actor
+    
+    key = _cache_key(user.pk)
+    profile_ids = cache.get(key) if settings.CACHE_IS_SHARED else None
+    if profile_ids is None:
+        profile_ids = User.objects.filter(pk=user.pk).values_list(
+            'vendor_profile__id', 'customer_profile__id'
+        ).first() or (None, None)
+        if settings.CACHE_IS_SHARED:
+            cache.set(key, profile_ids, ACTOR_CACHE_TIMEOUT)
+    
+    vendor_id, customer_id = profile_ids
+    return Actor(user.pk, vendor_id, customer_id, user.is_staff)
+
+
+def get_actor(request):
+    """
+    Return the Actor for the request's authenticated user, resolved once per request.
+    
+    Works with both DRF and plain Django requests; call it after authentication
+    (i.e. from a view), since DRF authenticates token users inside the view.
+    """
+    http_request = getattr(request, '_request', request)
+    user = getattr(request, 'user', None)
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    
+    actor = getattr(http_request, '_actor', None)
+    if actor is None or actor.user_id != user_id:
+        actor = resolve_actor(user)
+        http_request._actor = actor
+    return actor
+
+
+def invalidate_actor(user_id):
+    """Drop the cached identity of a user (call when a profile is added or removed)."""
+    cache.delete(_cache_key(user_id))
+
+
+@receiver(post_save, sender='vendors.Vendor')
+@receiver(post_save, sender='auth_api.Customer')
+def profile_saved(sender, instance, created, **kwargs):
+    """Invalidate the cached identity when a vendor or customer profile is created."""
+    if created:
+        invalidate_actor(instance.user_id)
+
+
+@receiver(post_delete, sender='vendors.Vendor')
+@receiver(post_delete, sender='auth_api.Customer')
+def profile_deleted(sender, instance, **kwargs):
+    """Invalidate the cached identity when a vendor or customer profile is deleted."""
+    invalidate_actor(instance.user_id)
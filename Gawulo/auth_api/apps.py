@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AuthApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'auth_api'
+    
+    def ready(self):
+        """Connect the identity cache and token revocation signals and register the project checks."""
+        import auth_api.actors  # noqa
+        import auth_api.tokens  # noqa
+        import Gawulo.checks  # noqa
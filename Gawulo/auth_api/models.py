@@ -5,14 +5,17 @@ Defines models for user authentication, password reset, customer profiles,
 addresses, and user documents.
 """
 
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.utils import timezone
+from Gawulo.mixins import ImmutableFieldsMixin, LoadedFieldsMixin
 import hashlib
 import secrets
 
 
-class PasswordResetToken(models.Model):
+class PasswordResetToken(ImmutableFieldsMixin, models.Model):
     """
     Password reset token model for secure password reset functionality.
     
@@ -54,14 +57,6 @@ class PasswordResetToken(models.Model):
         """Mark the token as used."""
         self.is_used = True
         self.save()
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            # Preserve original created_at when updating
-            original = PasswordResetToken.objects.get(pk=self.pk)
-            self.created_at = original.created_at
-        super().save(*args, **kwargs)
 
 
 class OTPVerification(models.Model):
@@ -152,7 +147,7 @@ class OAuthAccount(models.Model):
         return f"{self.provider} account for {self.email}"
 
 
-class Customer(models.Model):
+class Customer(LoadedFieldsMixin, ImmutableFieldsMixin, models.Model):
     """
     Customer profile model extending Django User.
     
@@ -171,6 +166,9 @@ class Customer(models.Model):
         verbose_name_plural = 'Customers'
         ordering = ['-created_at']
     
+    # Compared on save to reindex the customer's orders
+    tracked_fields = ('display_name',)
+    
     def __str__(self):
         return f"{self.display_name} ({self.user.email})"
     
@@ -190,14 +188,6 @@ class Customer(models.Model):
     def is_deleted(self):
         """Check if customer is soft-deleted."""
         return self.deleted_at is not None
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            # Preserve original created_at when updating
-            original = Customer.objects.get(pk=self.pk)
-            self.created_at = original.created_at
-        super().save(*args, **kwargs)
 
 
 class UserProfile(models.Model):
@@ -289,7 +279,7 @@ class UserProfile(models.Model):
         return profile
 
 
-class Address(models.Model):
+class Address(ImmutableFieldsMixin, models.Model):
     """
     Polymorphic address model for any entity type.
     
@@ -355,17 +345,9 @@ class Address(models.Model):
         country_name = self.country.name if self.country else ''
         parts.extend([self.city, self.state_province, self.postal_code, country_name])
         return ', '.join(filter(None, parts))
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            # Preserve original created_at when updating
-            original = Address.objects.get(pk=self.pk)
-            self.created_at = original.created_at
-        super().save(*args, **kwargs)
 
 
-class UserDocument(models.Model):
+class UserDocument(ImmutableFieldsMixin, models.Model):
     """
     Document storage model for user-related documents.
     
@@ -407,14 +389,9 @@ class UserDocument(models.Model):
     
     def __str__(self):
         return f"{self.file_name} - {self.user.email}"
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            # Preserve original created_at when updating
-            original = UserDocument.objects.get(pk=self.pk)
-            self.created_at = original.created_at
-        super().save(*args, **kwargs)
+
+
+PERMISSION_MASK_CACHE_TIMEOUT = 300  # seconds
 
 
 class UserPermissions(models.Model):
@@ -423,6 +400,12 @@ class UserPermissions(models.Model):
     
     One-to-one relationship with User. Each user has a single permissions record
     with boolean flags for each granular permission.
+    
+    For checks, the flags are compiled into an integer bitmask (one bit per can_*
+    field, in declaration order). The mask is cached per user and memoized on the
+    user instance, so a permission check is a bit test in the steady state. The
+    cached mask is dropped on save() and delete(); QuerySet.update() bypasses both,
+    so call invalidate_permission_mask() after bulk updates.
     """
     
     user = models.OneToOneField(
@@ -508,6 +491,119 @@ class UserPermissions(models.Model):
         permissions, created = cls.objects.get_or_create(user=user)
         return permissions
     
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.invalidate_permission_mask(self.user_id)
+        if UserPermissions.user.is_cached(self):
+            self.user.__dict__.pop('_permission_mask', None)
+    
+    def delete(self, *args, **kwargs):
+        user_id = self.user_id
+        result = super().delete(*args, **kwargs)
+        self.invalidate_permission_mask(user_id)
+        return result
+    
+    @classmethod
+    def get_permission_bits(cls):
+        """
+        Return a dict mapping each permission field name to its bit.
+        
+        Built once from the model's can_* boolean fields.
+        """
+        bits = cls.__dict__.get('_permission_bits')
+        if bits is None:
+            names = [
+                field.name for field in cls._meta.concrete_fields
+                if field.name.startswith('can_') and isinstance(field, models.BooleanField)
+            ]
+            bits = {name: 1 << index for index, name in enumerate(names)}
+            cls._permission_bits = bits
+            # Masks cached under a different field layout must not be reused
+            cls._permission_layout = hashlib.sha1(','.join(names).encode('utf-8')).hexdigest()[:8]
+        return bits
+    
+    @classmethod
+    def get_permission_layout(cls):
+        """Return a short digest of the bit layout, to tell masks built under another layout apart."""
+        cls.get_permission_bits()
+        return cls._permission_layout
+    
+    @classmethod
+    def _mask_cache_key(cls, user_id):
+        return f'auth_api:permission_mask:{cls.get_permission_layout()}:{user_id}'
+    
+    @classmethod
+    def get_mask_for(cls, permission_field_names):
+        """
+        Return the bitmask of the given permission names.
+        
+        Returns:
+            tuple: (mask, all_known) where all_known is False if any name is not a permission
+        """
+        bits = cls.get_permission_bits()
+        mask = 0
+        all_known = True
+        for name in permission_field_names:
+            bit = bits.get(name)
+            if bit is None:
+                all_known = False
+            else:
+                mask |= bit
+        return mask, all_known
+    
+    def to_mask(self):
+        """Return this record's granted permissions as a bitmask."""
+        mask = 0
+        for name, bit in self.get_permission_bits().items():
+            if getattr(self, name):
+                mask |= bit
+        return mask
+    
+    @classmethod
+    def get_user_mask(cls, user):
+        """
+        Return the permission bitmask of a user.
+        
+        Memoized on the user instance (i.e. for the request) and, when every
+        worker shares the cache (settings.CACHE_IS_SHARED), cached across
+        requests; with a per-process cache a revoked permission would stay cached
+        in the other workers, so the record is read on every request instead.
+        Superusers get every bit; users without a record get 0.
+        
+        Args:
+            user: User instance
+        
+        Returns:
+            int: Bitmask of granted permissions
+        """
+        if not user or not user.is_authenticated:
+            return 0
+        
+        mask = user.__dict__.get('_permission_mask')
+        if mask is not None:
+            return mask
+        
+        if user.is_superuser:
+            mask = sum(cls.get_permission_bits().values())
+        else:
+            key = cls._mask_cache_key(user.pk)
+            mask = cache.get(key) if settings.CACHE_IS_SHARED else None
+            if mask is None:
+                try:
+                    mask = cls.objects.get(user_id=user.pk).to_mask()
+                except cls.DoesNotExist:
+                    mask = 0
+                if settings.CACHE_IS_SHARED:
+                    cache.set(key, mask, PERMISSION_MASK_CACHE_TIMEOUT)
+        
+        user.__dict__['_permission_mask'] = mask
+        return mask
+    
+    @classmethod
+    def invalidate_permission_mask(cls, user_id):
+        """Drop the cached permission bitmask of a user."""
+        cache.delete(cls._mask_cache_key(user_id))
+    
     def has_permission(self, permission_field_name):
         """
         Check if user has a specific permission by field name.
@@ -518,9 +614,8 @@ class UserPermissions(models.Model):
         Returns:
             bool: True if user has the permission, False otherwise
         """
-        if not hasattr(self, permission_field_name):
-            return False
-        return getattr(self, permission_field_name, False)
+        bit = self.get_permission_bits().get(permission_field_name)
+        return bit is not None and bool(getattr(self, permission_field_name))
     
     @classmethod
     def user_has_permission(cls, user, permission_field_name):
@@ -541,11 +636,10 @@ class UserPermissions(models.Model):
         if user.is_superuser:
             return True
         
-        try:
-            permissions = cls.objects.get(user=user)
-            return permissions.has_permission(permission_field_name)
-        except cls.DoesNotExist:
+        bit = cls.get_permission_bits().get(permission_field_name)
+        if bit is None:
             return False
+        return bool(cls.get_user_mask(user) & bit)
     
     @classmethod
     def user_has_any_permission(cls, user, permission_field_names):
@@ -562,14 +656,12 @@ class UserPermissions(models.Model):
         if not user or not user.is_authenticated:
             return False
         
+        # Superusers have all permissions
         if user.is_superuser:
             return True
         
-        try:
-            permissions = cls.objects.get(user=user)
-            return any(permissions.has_permission(name) for name in permission_field_names)
-        except cls.DoesNotExist:
-            return False
+        required, _ = cls.get_mask_for(permission_field_names)
+        return bool(cls.get_user_mask(user) & required)
     
     @classmethod
     def user_has_all_permissions(cls, user, permission_field_names):
@@ -586,17 +678,17 @@ class UserPermissions(models.Model):
         if not user or not user.is_authenticated:
             return False
         
+        # Superusers have all permissions
         if user.is_superuser:
             return True
         
-        try:
-            permissions = cls.objects.get(user=user)
-            return all(permissions.has_permission(name) for name in permission_field_names)
-        except cls.DoesNotExist:
+        required, all_known = cls.get_mask_for(permission_field_names)
+        if not all_known:
             return False
+        return cls.get_user_mask(user) & required == required
 
 
-class FavoriteVendor(models.Model):
+class FavoriteVendor(ImmutableFieldsMixin, models.Model):
     """
     Favorite vendor model for customers.
     
@@ -627,16 +719,9 @@ class FavoriteVendor(models.Model):
     
     def __str__(self):
         return f"{self.customer.display_name} favorites {self.vendor.name}"
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            original = FavoriteVendor.objects.get(pk=self.pk)
-            self.created_at = original.created_at
-        super().save(*args, **kwargs)
 
 
-class FavoriteProductService(models.Model):
+class FavoriteProductService(ImmutableFieldsMixin, models.Model):
     """
     Favorite product/service model for customers.
     
@@ -667,10 +752,21 @@ class FavoriteProductService(models.Model):
     
     def __str__(self):
         return f"{self.customer.display_name} favorites {self.product_service.name}"
+
+class ClaimsUser(User):
+    """
+    User built from the identity claims of a stateless access token.
+    
+    Only the claimed fields are set and they are as old as the token, so the
+    instance is read-only: saving it would write the claims back over the row.
+    Load the user from the database to change it.
+    """
+    
+    class Meta:
+        proxy = True
     
     def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            original = FavoriteProductService.objects.get(pk=self.pk)
-            self.created_at = original.created_at
-        super().save(*args, **kwargs)
\ No newline at end of file
+        raise TypeError("A user built from token claims is read-only; load it from the database to save it.")
+    
+    def delete(self, *args, **kwargs):
+        raise TypeError("A user built from token claims is read-only; load it from the database to delete it.")
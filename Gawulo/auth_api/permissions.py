@@ -3,6 +3,10 @@ Django REST Framework permission classes for granular permissions.
 
 Provides permission classes that can be used to protect API views
 based on granular permissions stored in the UserPermissions model.
+
+Checks test the user's cached permission bitmask (see UserPermissions.get_user_mask)
+against a mask built once per permission class instance, so they run no queries
+once the user's mask is cached.
 """
 
 from rest_framework import permissions
@@ -25,6 +29,7 @@ class HasGranularPermission(permissions.BasePermission):
             permission_field_name: The permission field name to check (e.g., 'can_view_own_vendor_profile')
         """
         self.permission_field_name = permission_field_name
+        self.required_mask = None
     
     def has_permission(self, request, view):
         """
@@ -40,7 +45,12 @@ class HasGranularPermission(permissions.BasePermission):
         if not request.user or not request.user.is_authenticated:
             return False
         
-        return UserPermissions.user_has_permission(request.user, self.permission_field_name)
+        if request.user.is_superuser:
+            return True
+        
+        if self.required_mask is None:
+            self.required_mask, _ = UserPermissions.get_mask_for([self.permission_field_name])
+        return bool(self.required_mask and UserPermissions.get_user_mask(request.user) & self.required_mask)
 
 
 class HasAnyGranularPermission(permissions.BasePermission):
@@ -59,6 +69,7 @@ class HasAnyGranularPermission(permissions.BasePermission):
             permission_field_names: List of permission field names to check
         """
         self.permission_field_names = permission_field_names
+        self.required_mask = None
     
     def has_permission(self, request, view):
         """
@@ -74,7 +85,12 @@ class HasAnyGranularPermission(permissions.BasePermission):
         if not request.user or not request.user.is_authenticated:
             return False
         
-        return UserPermissions.user_has_any_permission(request.user, self.permission_field_names)
+        if request.user.is_superuser:
+            return True
+        
+        if self.required_mask is None:
+            self.required_mask, _ = UserPermissions.get_mask_for(self.permission_field_names)
+        return bool(UserPermissions.get_user_mask(request.user) & self.required_mask)
 
 
 class HasAllGranularPermissions(permissions.BasePermission):
@@ -93,6 +109,8 @@ class HasAllGranularPermissions(permissions.BasePermission):
             permission_field_names: List of permission field names to check
         """
         self.permission_field_names = permission_field_names
+        self.required_mask = None
+        self.all_known = True
     
     def has_permission(self, request, view):
         """
@@ -108,7 +126,14 @@ class HasAllGranularPermissions(permissions.BasePermission):
         if not request.user or not request.user.is_authenticated:
             return False
         
-        return UserPermissions.user_has_all_permissions(request.user, self.permission_field_names)
+        if request.user.is_superuser:
+            return True
+        
+        if self.required_mask is None:
+            self.required_mask, self.all_known = UserPermissions.get_mask_for(self.permission_field_names)
+        if not self.all_known:
+            return False
+        return UserPermissions.get_user_mask(request.user) & self.required_mask == self.required_mask
 
 
 class IsOwnerOrHasPermission(permissions.BasePermission):
@@ -1,3 +1,283 @@
-from django.test import TestCase
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+from . import tokens
+from .actors import resolve_actor
+from .models import ClaimsUser, Customer, UserPermissions
+from .permissions import HasAllGranularPermissions, HasAnyGranularPermission, HasGranularPermission
 
-# Create your tests here.
+
+class ImmutableFieldsTests(TestCase):
+    """Saving an existing row is a single UPDATE that leaves the write-once columns alone."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cls.customer = Customer.objects.create(user=user, display_name='Test Customer')
+
+    def assertSingleUpdate(self, save, **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            save(**kwargs)
+        self.assertEqual(len(queries), 1, [query['sql'] for query in queries])
+        sql = queries[0]['sql']
+        self.assertTrue(sql.startswith('UPDATE'), sql)
+        self.assertNotIn('"created_at"', sql.split(' WHERE ')[0])
+
+    def test_save_issues_one_update_without_created_at(self):
+        customer = Customer.objects.get(pk=self.customer.pk)
+        created_at = customer.created_at
+        customer.deleted_at = timezone.now()
+        customer.created_at = created_at - timedelta(days=1)
+        self.assertSingleUpdate(customer.save)
+
+        customer.refresh_from_db()
+        self.assertIsNotNone(customer.deleted_at)
+        self.assertEqual(customer.created_at, created_at)
+
+    def test_save_with_update_fields_skips_created_at(self):
+        customer = Customer.objects.get(pk=self.customer.pk)
+        created_at = customer.created_at
+        customer.deleted_at = timezone.now()
+        customer.created_at = created_at + timedelta(days=1)
+        self.assertSingleUpdate(customer.save, update_fields=['deleted_at', 'created_at'])
+
+        customer.refresh_from_db()
+        self.assertIsNotNone(customer.deleted_at)
+        self.assertEqual(customer.created_at, created_at)
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class PermissionMaskTests(TestCase):
+    """Bitmask permission checks agree with the boolean fields they are built from."""
+
+    GRANTED = ('can_view_own_vendor_orders', 'can_update_order_status', 'can_view_offline_orders')
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('vendor', 'vendor@example.com', 'password')
+        self.permissions = UserPermissions.objects.create(user=self.user, **{name: True for name in self.GRANTED})
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_every_permission_field_has_its_own_bit(self):
+        bits = UserPermissions.get_permission_bits()
+        names = [field.name for field in UserPermissions._meta.get_fields() if field.name.startswith('can_')]
+
+        self.assertEqual(sorted(bits), sorted(names))
+        self.assertEqual(len(set(bits.values())), len(names))
+        self.assertTrue(all(bit & (bit - 1) == 0 for bit in bits.values()))
+
+    def test_checks_match_the_fields(self):
+        user = self.fresh_user()
+        for name in UserPermissions.get_permission_bits():
+            with self.subTest(permission=name):
+                self.assertEqual(UserPermissions.user_has_permission(user, name), getattr(self.permissions, name))
+                self.assertEqual(self.permissions.has_permission(name), getattr(self.permissions, name))
+
+        self.assertTrue(UserPermissions.user_has_any_permission(user, ['can_manage_vendors', self.GRANTED[0]]))
+        self.assertFalse(UserPermissions.user_has_any_permission(user, ['can_manage_vendors', 'can_make_payments']))
+        self.assertTrue(UserPermissions.user_has_all_permissions(user, self.GRANTED))
+        self.assertFalse(UserPermissions.user_has_all_permissions(user, [*self.GRANTED, 'can_manage_vendors']))
+        # Unknown names never grant anything
+        self.assertFalse(UserPermissions.user_has_permission(user, 'can_do_anything'))
+        self.assertFalse(UserPermissions.user_has_all_permissions(user, [*self.GRANTED, 'can_do_anything']))
+
+    def test_permission_classes_test_the_mask(self):
+        request = APIRequestFactory().get('/')
+        request.user = self.fresh_user()
+
+        self.assertTrue(HasGranularPermission(self.GRANTED[1]).has_permission(request, None))
+        self.assertFalse(HasGranularPermission('can_manage_vendors').has_permission(request, None))
+        self.assertTrue(HasAnyGranularPermission(['can_manage_vendors', self.GRANTED[2]]).has_permission(request, None))
+        self.assertTrue(HasAllGranularPermissions(list(self.GRANTED)).has_permission(request, None))
+        self.assertFalse(HasAllGranularPermissions([*self.GRANTED, 'can_do_anything']).has_permission(request, None))
+
+    def test_superuser_has_every_bit(self):
+        superuser = User.objects.create_user('admin', 'admin@example.com', 'password', is_superuser=True)
+        self.assertEqual(UserPermissions.get_user_mask(superuser), sum(UserPermissions.get_permission_bits().values()))
+
+    def test_mask_is_cached_until_the_record_changes(self):
+        UserPermissions.get_user_mask(self.fresh_user())
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(UserPermissions.user_has_permission(user, self.GRANTED[0]))
+
+        self.permissions.can_view_own_vendor_orders = False
+        self.permissions.save()
+
+        self.assertFalse(UserPermissions.user_has_permission(self.fresh_user(), self.GRANTED[0]))
+
+    def test_deleted_record_grants_nothing(self):
+        UserPermissions.get_user_mask(self.fresh_user())
+        self.permissions.delete()
+
+        self.assertEqual(UserPermissions.get_user_mask(self.fresh_user()), 0)
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_mask_is_read_per_request_without_a_shared_cache(self):
+        UserPermissions.get_user_mask(self.fresh_user())
+        UserPermissions.objects.filter(pk=self.user.pk).update(can_view_own_vendor_orders=False)
+
+        user = self.fresh_user()
+        with self.assertNumQueries(1):
+            self.assertFalse(UserPermissions.user_has_permission(user, self.GRANTED[0]))
+            # Memoized on the user for the rest of the request
+            self.assertTrue(UserPermissions.user_has_permission(user, self.GRANTED[1]))
+
+
+@override_settings(JWT_STATELESS_AUTH=True, CACHE_IS_SHARED=True, JWT_REVOCATION_REDIS_URL=None)
+class StatelessTokenTests(TestCase):
+    """Stateless access tokens never outlive the privileges they claim."""
+
+    def setUp(self):
+        cache.clear()
+        tokens._revocation_set = None
+        self.addCleanup(setattr, tokens, '_revocation_set', None)
+        self.admin = User.objects.create_user(
+            'admin', 'admin@example.com', 'password', is_staff=True, is_superuser=True
+        )
+        self.client = APIClient()
+
+    def authenticate(self, user):
+        pair = tokens.get_tokens_for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {pair['access']}")
+        return pair
+
+    def test_token_carries_identity_claims(self):
+        access = AccessToken(self.authenticate(self.admin)['access'])
+        self.assertTrue(tokens.is_stateless_token(access))
+        user = tokens.user_from_claims(access)
+        self.assertIsInstance(user, ClaimsUser)
+        self.assertTrue(user.is_staff)
+        self.assertNotIn('is_active', user.__dict__)
+
+    def test_claims_user_is_read_only(self):
+        user = tokens.user_from_claims(AccessToken(self.authenticate(self.admin)['access']))
+        with self.assertRaises(TypeError):
+            user.save()
+
+    def test_write_does_not_restore_claimed_privileges(self):
+        self.authenticate(self.admin)
+        # A change that bypasses the signals leaves the token valid
+        User.objects.filter(pk=self.admin.pk).update(is_staff=False, is_superuser=False)
+
+        response = self.client.patch('/api/users/profile/update/', {'first_name': 'Ada'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.admin.refresh_from_db()
+        self.assertEqual(self.admin.first_name, 'Ada')
+        self.assertFalse(self.admin.is_staff)
+        self.assertFalse(self.admin.is_superuser)
+
+    def test_demoted_user_tokens_are_revoked(self):
+        self.authenticate(self.admin)
+        admin = User.objects.get(pk=self.admin.pk)
+        admin.is_staff = admin.is_superuser = False
+        admin.save()
+
+        response = self.client.patch('/api/users/profile/update/', {'first_name': 'Ada'}, format='json')
+
+        self.assertEqual(response.status_code, 401)
+        admin.refresh_from_db()
+        self.assertEqual(admin.first_name, '')
+        self.assertFalse(admin.is_staff)
+
+    def test_deactivated_user_tokens_are_revoked(self):
+        pair = self.authenticate(self.admin)
+        self.assertEqual(self.client.get('/api/auth/user/').status_code, 200)
+
+        admin = User.objects.get(pk=self.admin.pk)
+        admin.is_active = False
+        admin.save()
+
+        self.assertEqual(self.client.get('/api/auth/user/').status_code, 401)
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': pair['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_permission_change_revokes_tokens(self):
+        permissions = UserPermissions.objects.create(user=self.admin)
+        self.authenticate(self.admin)
+        permissions.can_view_own_vendor_profile = True
+        permissions.save()
+
+        self.assertEqual(self.client.get('/api/auth/user/').status_code, 401)
+
+    def test_stateless_token_is_authenticated_without_queries(self):
+        UserPermissions.objects.create(user=self.admin, can_view_audit_logs=True)
+        self.admin.is_superuser = False
+        self.admin.save()
+        access = self.authenticate(User.objects.get(pk=self.admin.pk))['access']
+
+        with self.assertNumQueries(0):
+            user = tokens.authenticate_access_token(access)
+            self.assertTrue(UserPermissions.user_has_permission(user, 'can_view_audit_logs'))
+            self.assertFalse(UserPermissions.user_has_permission(user, 'can_manage_vendors'))
+
+    def test_mask_of_another_permission_layout_is_not_trusted(self):
+        access = AccessToken(self.authenticate(self.admin)['access'])
+        access['perm_layout'] = 'stale'
+
+        self.assertNotIn('_permission_mask', tokens.user_from_claims(access).__dict__)
+
+    def test_password_change_revokes_tokens(self):
+        self.authenticate(self.admin)
+        admin = User.objects.get(pk=self.admin.pk)
+        admin.set_password('changed')
+        admin.save(update_fields=['password'])
+
+        self.assertEqual(self.client.get('/api/auth/user/').status_code, 401)
+
+    def test_unrelated_change_keeps_tokens_valid(self):
+        self.authenticate(self.admin)
+        admin = User.objects.get(pk=self.admin.pk)
+        admin.first_name = 'Ada'
+        admin.save()
+
+        self.assertEqual(self.client.get('/api/auth/user/').status_code, 200)
+
+    def test_tokens_issued_after_a_revocation_are_valid(self):
+        tokens.revoke_user_tokens(self.admin.pk)
+        self.authenticate(self.admin)
+
+        self.assertEqual(self.client.get('/api/auth/user/').status_code, 200)
+
+    def test_logout_revokes_the_token(self):
+        pair = self.authenticate(self.admin)
+        response = self.client.post('/api/auth/logout/', {'refresh': pair['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.client.get('/api/auth/user/').status_code, 401)
+        response = self.client.post('/api/auth/token/refresh/', {'refresh': pair['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_missing_profile_id_is_looked_up(self):
+        access = AccessToken(self.authenticate(self.admin)['access'])
+        self.assertIsNone(access['customer_id'])
+        customer = Customer.objects.create(user=self.admin, display_name='Admin')
+
+        self.assertEqual(resolve_actor(tokens.user_from_claims(access)).customer_id, customer.pk)
+
+    @override_settings(JWT_STATELESS_AUTH=False)
+    def test_claims_ignored_when_stateless_auth_is_disabled(self):
+        with override_settings(JWT_STATELESS_AUTH=True):
+            access = AccessToken(self.authenticate(self.admin)['access'])
+        User.objects.filter(pk=self.admin.pk).update(is_staff=False)
+
+        self.assertFalse(tokens.is_stateless_token(access))
+        user = tokens.authenticate_access_token(str(access))
+        self.assertNotIsInstance(user, ClaimsUser)
+        self.assertFalse(user.is_staff)
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_stateless_auth_refused_without_a_shared_revocation_store(self):
+        access = AccessToken(self.authenticate(self.admin)['access'])
+
+        self.assertFalse(tokens.stateless_auth_enabled())
+        self.assertNotIn('perm_mask', access.payload)
@@ -0,0 +1,336 @@
+"""
+JWT issuing, stateless authentication and token revocation.
+
+With JWT_STATELESS_AUTH enabled, access tokens issued by the login views carry the
+caller's identity: username, staff/superuser flags, vendor id, customer id and the
+granular permission bitmask. StatelessJWTAuthentication then builds request.user
+(a read-only ClaimsUser) from those claims without reading the database; any other
+User field is deferred and only loaded if a view actually reads it. A token issued
+before the user had a vendor or customer profile (customer profiles are created on
+the first order) has no id to trust, so the profile ids of such a token are looked
+up as for any other token.
+
+Claims must not outlive the privileges they grant: deactivating a user, changing
+their staff/superuser flags, password or permissions revokes every token issued to
+them until then, by moving a per-user generation counter that tokens carry from the
+time they are issued. Revocations (those of logout included) are kept until the
+tokens expire, in Redis when JWT_REVOCATION_REDIS_URL is set, or in the default
+cache otherwise. Stateless mode is only used when that store is shared
+by every worker (Redis, or a cache with settings.CACHE_IS_SHARED); with a
+per-process store a revocation would only reach one worker, so tokens are then
+authenticated against the database.
+"""
+
+import time
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer as BaseTokenObtainPairSerializer,
+    TokenRefreshSerializer as BaseTokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from .actors import Actor, resolve_actor
+from .models import ClaimsUser, UserPermissions
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - redis is optional
+    redis = None
+
+# Claims written into stateless access tokens
+IDENTITY_CLAIMS = ('username', 'is_staff', 'is_superuser', 'vendor_id', 'customer_id', 'perm_mask', 'perm_layout')
+
+# Claim holding the user's token generation when the token was issued
+GENERATION_CLAIM = 'token_gen'
+
+# User fields whose change revokes the user's tokens
+PRIVILEGE_FIELDS = ('is_active', 'is_staff', 'is_superuser', 'password')
+
+
+def stateless_auth_enabled():
+    """Return True if access tokens carry (and are authenticated from) identity claims."""
+    return settings.JWT_STATELESS_AUTH and get_revocation_set().shared
+
+
+def add_identity_claims(token, user):
+    """Sign the user's identity and permission bitmask into an access token."""
+    actor = resolve_actor(user)
+    token['username'] = user.get_username()
+    token['is_staff'] = user.is_staff
+    token['is_superuser'] = user.is_superuser
+    token['vendor_id'] = actor.vendor_id
+    token['customer_id'] = actor.customer_id
+    token['perm_mask'] = UserPermissions.get_user_mask(user)
+    token['perm_layout'] = UserPermissions.get_permission_layout()
+    return token
+
+
+def refresh_token_for_user(user):
+    """Return a new refresh token stamped with the user's token generation (access tokens inherit it)."""
+    refresh = RefreshToken.for_user(user)
+    refresh[GENERATION_CLAIM] = get_revocation_set().get_generation(user.pk)
+    return refresh
+
+
+def get_tokens_for_user(user):
+    """
+    Issue a refresh/access token pair for a user.
+
+    Returns:
+        dict: {'access': str, 'refresh': str}
+    """
+    refresh = refresh_token_for_user(user)
+    access = refresh.access_token
+    if stateless_auth_enabled():
+        add_identity_claims(access, user)
+    return {'access': str(access), 'refresh': str(refresh)}
+
+
+def user_from_claims(token):
+    """
+    Build a read-only ClaimsUser from a stateless access token without touching the database.
+
+    The instance behaves like a loaded row: fields not carried by the token are
+    deferred and fetched on first access, and its permission bitmask and (when the
+    token carries both profile ids) its actor are pre-populated so permission
+    checks and get_actor() do not query either. It cannot be saved.
+    """
+    user_id = token[api_settings.USER_ID_CLAIM]
+    values = {
+        'id': user_id,
+        'username': token['username'],
+        'is_staff': token['is_staff'],
+        'is_superuser': token['is_superuser'],
+    }
+    # from_db() expects the loaded values in model field order
+    field_names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+    user = ClaimsUser.from_db(DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names])
+    vendor_id, customer_id = token.get('vendor_id'), token.get('customer_id')
+    if vendor_id is not None and customer_id is not None:
+        user._actor = Actor(user_id, vendor_id, customer_id, user.is_staff)
+    if token.get('perm_layout') == UserPermissions.get_permission_layout():
+        user._permission_mask = token['perm_mask']
+    return user
+
+
+def is_stateless_token(token):
+    """Return True if stateless authentication is enabled and the token carries identity claims."""
+    return stateless_auth_enabled() and all(claim in token for claim in IDENTITY_CLAIMS)
+
+
+def _revocation_timeout():
+    # A user's token generation must outlive every token issued before it moved
+    lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+    return int(lifetime.total_seconds()) + 1
+
+
+class CacheRevocationSet:
+    """
+    Revocations held in the default cache until the tokens expire.
+
+    Shared by every worker only when the cache is (settings.CACHE_IS_SHARED).
+    """
+
+    token_prefix = 'auth_api:revoked_token:'
+    user_prefix = 'auth_api:token_generation:'
+
+    @property
+    def shared(self):
+        return settings.CACHE_IS_SHARED
+
+    def add(self, jti, expires_at):
+        cache.set(self.token_prefix + jti, True, max(1, int(expires_at - time.time()) + 1))
+
+    def get_generation(self, user_id):
+        return cache.get(self.user_prefix + str(user_id), 0)
+
+    def revoke_user(self, user_id):
+        key, timeout = self.user_prefix + str(user_id), _revocation_timeout()
+        cache.add(key, 0, timeout)
+        cache.incr(key)
+        cache.touch(key, timeout)
+
+    def is_revoked(self, jti, user_id, generation):
+        token_key, user_key = self.token_prefix + str(jti), self.user_prefix + str(user_id)
+        values = cache.get_many([token_key, user_key])
+        return token_key in values or generation < values.get(user_key, 0)
+
+
+class RedisRevocationSet:
+    """
+    Revocations held in Redis until the tokens expire.
+
+    Revoked token ids live in a sorted set scored by expiry time; expired ids are
+    trimmed whenever a token is revoked, so the set only holds tokens that could
+    still be presented. Token generations are keys that expire once every token
+    issued before their last increment has.
+    """
+
+    key = 'auth_api:revoked_tokens'
+    user_prefix = 'auth_api:token_generation:'
+    shared = True
+
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(url)
+
+    def add(self, jti, expires_at):
+        pipeline = self.client.pipeline()
+        pipeline.zadd(self.key, {jti: expires_at})
+        pipeline.zremrangebyscore(self.key, '-inf', time.time())
+        pipeline.execute()
+
+    def get_generation(self, user_id):
+        return int(self.client.get(self.user_prefix + str(user_id)) or 0)
+
+    def revoke_user(self, user_id):
+        pipeline = self.client.pipeline()
+        pipeline.incr(self.user_prefix + str(user_id))
+        pipeline.expire(self.user_prefix + str(user_id), _revocation_timeout())
+        pipeline.execute()
+
+    def is_revoked(self, jti, user_id, generation):
+        pipeline = self.client.pipeline()
+        pipeline.zscore(self.key, jti)
+        pipeline.get(self.user_prefix + str(user_id))
+        expires_at, current = pipeline.execute()
+        if expires_at is not None and expires_at > time.time():
+            return True
+        return generation < int(current or 0)
+
+
+_revocation_set = None
+
+
+def get_revocation_set():
+    """Return the configured revocation set (built on first use)."""
+    global _revocation_set
+    if _revocation_set is None:
+        url = settings.JWT_REVOCATION_REDIS_URL
+        if url and redis is not None:
+            _revocation_set = RedisRevocationSet(url)
+        else:
+            _revocation_set = CacheRevocationSet()
+    return _revocation_set
+
+
+def revoke_token(token):
+    """Reject a token from now until it expires."""
+    get_revocation_set().add(token[api_settings.JTI_CLAIM], token['exp'])
+
+
+def revoke_user_tokens(user_id):
+    """Reject every token issued to a user until now (call when their privileges change)."""
+    get_revocation_set().revoke_user(user_id)
+
+
+def is_token_revoked(token):
+    """Return True if the token was revoked, or was issued before its user's tokens were."""
+    return get_revocation_set().is_revoked(
+        token.get(api_settings.JTI_CLAIM), token.get(api_settings.USER_ID_CLAIM), token.get(GENERATION_CLAIM, 0)
+    )
+
+
+def authenticate_access_token(raw_token):
+    """
+    Validate a raw access token and return its user.
+
+    Used by the WebSocket consumers, which authenticate outside of DRF.
+
+    Raises:
+        TokenError: If the token is invalid or expired
+        InvalidToken: If the token was revoked
+        User.DoesNotExist: If a non-stateless token names a missing or inactive user
+    """
+    token = AccessToken(raw_token)
+    if is_token_revoked(token):
+        raise InvalidToken('Token has been revoked')
+    if is_stateless_token(token):
+        return user_from_claims(token)
+    return User.objects.get(pk=token[api_settings.USER_ID_CLAIM], is_active=True)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that rejects revoked tokens and trusts identity claims.
+
+    Tokens carrying identity claims are authenticated without a database read;
+    other tokens load the user as JWTAuthentication does.
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if is_token_revoked(validated_token):
+            raise InvalidToken({'detail': 'Token has been revoked', 'code': 'token_revoked'})
+        return validated_token
+
+    def get_user(self, validated_token):
+        if is_stateless_token(validated_token):
+            return user_from_claims(validated_token)
+        return super().get_user(validated_token)
+
+
+class TokenObtainPairSerializer(BaseTokenObtainPairSerializer):
+    """Token obtain serializer that stamps the token generation and issues stateless access tokens when enabled."""
+
+    @classmethod
+    def get_token(cls, user):
+        return refresh_token_for_user(user)
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        if stateless_auth_enabled():
+            data.update(get_tokens_for_user(self.user))
+        return data
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    """
+    Token refresh serializer that rejects revoked refresh tokens and inactive users.
+
+    In stateless mode the new access token gets fresh identity claims, so role and
+    permission changes are picked up on refresh.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if is_token_revoked(refresh):
+            raise InvalidToken('Token has been revoked')
+        user = User.objects.filter(pk=refresh[api_settings.USER_ID_CLAIM], is_active=True).first()
+        if user is None:
+            raise InvalidToken('User not found')
+        data = super().validate(attrs)
+        if stateless_auth_enabled():
+            data['access'] = str(add_identity_claims(AccessToken(data['access']), user))
+        return data
+
+
+@receiver(post_init, sender=User)
+def remember_privilege_fields(sender, instance, **kwargs):
+    """Remember the privilege fields as loaded so post_save can tell whether they changed."""
+    instance._privilege_fields = tuple(instance.__dict__.get(name) for name in PRIVILEGE_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def user_privileges_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Revoke a user's tokens when they are deactivated or their flags or password change."""
+    privilege_fields = tuple(instance.__dict__.get(name) for name in PRIVILEGE_FIELDS)
+    loaded_fields, instance._privilege_fields = getattr(instance, '_privilege_fields', None), privilege_fields
+    if created or (update_fields is not None and not set(update_fields) & set(PRIVILEGE_FIELDS)):
+        return
+    if loaded_fields != privilege_fields:
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(post_save, sender=UserPermissions)
+@receiver(post_delete, sender=UserPermissions)
+def user_permissions_changed(sender, instance, created=False, **kwargs):
+    """Revoke a user's tokens, which carry their permission bitmask, when their permissions change."""
+    if not created:
+        revoke_user_tokens(instance.user_id)
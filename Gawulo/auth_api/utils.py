@@ -6,9 +6,12 @@ from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
+import logging
 import secrets
 from .models import UserPermissions, OTPVerification
 
+logger = logging.getLogger(__name__)
+
 
 def set_default_customer_permissions(user):
     """
@@ -108,8 +111,7 @@ Gawulo Team
             fail_silently=False,
         )
         return True
-    except Exception as e:
-        # Log error in production
-        print(f"Error sending OTP email: {e}")
+    except Exception:
+        logger.exception("Error sending OTP email")
         return False
 
@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from django.contrib.auth import authenticate, login, logout
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
 from django.contrib.auth.models import User
 from .serializers import (
@@ -13,8 +14,12 @@ from .serializers import (
     AddressSerializer, FavoriteVendorSerializer, FavoriteProductServiceSerializer
 )
 from .utils import generate_otp_for_user, send_otp_email
+from .tokens import get_tokens_for_user, revoke_token
 from .models import OTPVerification, UserProfile, OAuthAccount, Address, FavoriteVendor, FavoriteProductService, Customer
 from rest_framework import generics
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class LoginView(APIView):
@@ -61,7 +66,7 @@ class LoginView(APIView):
         else:
             # Normal login without 2FA
             login(request, user)
-            refresh = RefreshToken.for_user(user)
+            tokens = get_tokens_for_user(user)
             
             # Prefetch related objects for user data
             user = User.objects.prefetch_related(
@@ -73,8 +78,8 @@ class LoginView(APIView):
             
             return Response({
                 'user': UserSerializer(user, context={'request': request}).data,
-                'access': str(refresh.access_token),
-                'refresh': str(refresh),
+                'access': tokens['access'],
+                'refresh': tokens['refresh'],
                 'requires_2fa': False
             })
 
@@ -83,14 +88,15 @@ class LogoutView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
+        # Revoke the access token used for this request and the refresh token if provided
+        if request.auth is not None and hasattr(request.auth, 'payload'):
+            revoke_token(request.auth)
         try:
-            # Try to blacklist the refresh token if provided
             refresh_token = request.data.get('refresh')
             if refresh_token:
-                token = RefreshToken(refresh_token)
-                token.blacklist()
-        except Exception:
-            # If blacklist fails, just continue (token will expire naturally)
+                revoke_token(RefreshToken(refresh_token))
+        except TokenError:
+            # Invalid or expired refresh token, nothing to revoke
             pass
         
         logout(request)
@@ -107,12 +113,12 @@ class RegisterView(APIView):
             user = serializer.save()
             
             # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
+            tokens = get_tokens_for_user(user)
             
             return Response({
                 'user': UserSerializer(user).data,
-                'access': str(refresh.access_token),
-                'refresh': str(refresh)
+                'access': tokens['access'],
+                'refresh': tokens['refresh']
             }, status=status.HTTP_201_CREATED)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -157,7 +163,7 @@ class VerifyOTPView(APIView):
         # Complete login
         user = otp_verification.user
         login(request, user, backend='auth_api.backends.EmailAuthenticationBackend')
-        refresh = RefreshToken.for_user(user)
+        tokens = get_tokens_for_user(user)
         
         # Prefetch related objects for user data
         user = User.objects.prefetch_related(
@@ -169,8 +175,8 @@ class VerifyOTPView(APIView):
         
         return Response({
             'user': UserSerializer(user, context={'request': request}).data,
-            'access': str(refresh.access_token),
-            'refresh': str(refresh)
+            'access': tokens['access'],
+            'refresh': tokens['refresh']
         })
 
 
@@ -236,16 +242,8 @@ class OAuthCallbackView(APIView):
         """
         Handle OAuth callback from provider.
         """
-        import logging
-        logger = logging.getLogger(__name__)
-        
-        # Debug: Log all GET parameters
-        logger.info(f"OAuth callback received. GET params: {dict(request.GET)}")
-        
-        # Print to console for immediate visibility
-        print("=" * 80)
-        print("OAUTH CALLBACK - GET params:", dict(request.GET))
-        print("=" * 80)
+        # The authorization code is a credential, so only parameter names are logged
+        logger.debug("OAuth callback received", extra={'params': sorted(request.GET)})
         
         # Django QueryDict can return lists, so use getlist
         code = request.GET.get('code')
@@ -253,10 +251,10 @@ class OAuthCallbackView(APIView):
         state = state_list[0] if state_list else request.GET.get('state', '')
         error = request.GET.get('error')
         
-        print(f"Code: {bool(code)}, State list: {state_list}, State: '{state}', Error: {error}")
-        
-        # Debug logging
-        logger.info(f"OAuth callback - code: {bool(code)}, state_list: {state_list}, state: '{state}', error: {error}")
+        logger.debug(
+            "OAuth callback parameters",
+            extra={'has_code': bool(code), 'state_list': state_list, 'state': state, 'oauth_error': error},
+        )
         
         if error:
             return Response(
@@ -278,7 +276,6 @@ class OAuthCallbackView(APIView):
             )
         
         provider = str(state).strip().lower()
-        print(f"Normalized provider: '{provider}' (from state: '{state}')")
         
         # Debug: Return detailed info in error message
         if provider not in ['google', 'facebook']:
@@ -293,12 +290,9 @@ class OAuthCallbackView(APIView):
                 'all_get_params': dict(request.GET),
                 'supported_providers': ['google', 'facebook']
             }
-            print(f"INVALID PROVIDER DEBUG: {debug_info}")
-            logger.error(f"Invalid provider: {debug_info}")
+            logger.warning("OAuth callback with invalid provider", extra={'state': repr(state), 'provider': provider})
             return Response(debug_info, status=status.HTTP_400_BAD_REQUEST)
         
-        print(f"Provider validated successfully: {provider}")
-        
         # Exchange code for access token and get user info
         try:
             user_email, provider_user_id, picture_url = self._get_user_info_from_provider(provider, code, request)
@@ -394,7 +388,7 @@ class OAuthCallbackView(APIView):
         # Generate JWT tokens
         # Specify backend when multiple backends are configured
         login(request, user, backend='auth_api.backends.EmailAuthenticationBackend')
-        refresh = RefreshToken.for_user(user)
+        tokens = get_tokens_for_user(user)
         
         # Prefetch related objects for user data
         user = User.objects.prefetch_related(
@@ -415,8 +409,8 @@ class OAuthCallbackView(APIView):
         
         # Create token data
         token_data = {
-            'access': str(refresh.access_token),
-            'refresh': str(refresh),
+            'access': tokens['access'],
+            'refresh': tokens['refresh'],
             'user': UserSerializer(user, context={'request': request}).data
         }
         
@@ -437,10 +431,8 @@ class OAuthCallbackView(APIView):
         Returns (email, provider_user_id, picture_url)
         """
         import requests
-        import logging
         from django.conf import settings
         
-        logger = logging.getLogger(__name__)
         redirect_uri = request.build_absolute_uri('/api/auth/oauth/callback/')
         
         if provider == 'google':
@@ -562,7 +554,9 @@ class ProfileUpdateView(APIView):
             )
         
         try:
-            updated_user = serializer.update(request.user, serializer.validated_data)
+            # request.user may be built from token claims; write to the stored row
+            user = User.objects.get(pk=request.user.pk)
+            updated_user = serializer.update(user, serializer.validated_data)
             # Refresh user with prefetched relationships to include updated profile data
             from django.db.models import Prefetch
             from .models import UserProfile, Customer
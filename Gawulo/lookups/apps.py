@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class LookupsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'lookups'
+    
+    def ready(self):
+        """Import signals when app is ready."""
+        import lookups.signals  # noqa
@@ -7,9 +7,10 @@ and other lookup tables used throughout the application.
 
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+from Gawulo.mixins import ImmutableFieldsMixin
 
 
-class Country(models.Model):
+class Country(ImmutableFieldsMixin, models.Model):
     """
     Country lookup model for storing comprehensive country information.
     
@@ -78,21 +79,9 @@ class Country(models.Model):
     
     def __str__(self):
         return f"{self.country_name} ({self.iso_alpha2})"
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            # Only preserve created_at if the record already exists in the database
-            try:
-                original = Country.objects.get(pk=self.pk)
-                self.created_at = original.created_at
-            except Country.DoesNotExist:
-                # New record, let created_at be set by auto_now_add
-                pass
-        super().save(*args, **kwargs)
 
 
-class CountryCodes(models.Model):
+class CountryCodes(ImmutableFieldsMixin, models.Model):
     """
     Country codes model for communication and finance codes.
     
@@ -134,21 +123,9 @@ class CountryCodes(models.Model):
     
     def __str__(self):
         return f"{self.country.country_name} - {self.calling_code}, {self.tld}, {self.currency_code}"
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            # Only preserve created_at if the record already exists in the database
-            try:
-                original = CountryCodes.objects.get(pk=self.pk)
-                self.created_at = original.created_at
-            except CountryCodes.DoesNotExist:
-                # New record, let created_at be set by auto_now_add
-                pass
-        super().save(*args, **kwargs)
 
 
-class CountryFlags(models.Model):
+class CountryFlags(ImmutableFieldsMixin, models.Model):
     """
     Country flags model for visual assets.
     
@@ -192,21 +169,9 @@ class CountryFlags(models.Model):
     
     def __str__(self):
         return f"{self.country.country_name} Flag"
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            # Only preserve created_at if the record already exists in the database
-            try:
-                original = CountryFlags.objects.get(pk=self.pk)
-                self.created_at = original.created_at
-            except CountryFlags.DoesNotExist:
-                # New record, let created_at be set by auto_now_add
-                pass
-        super().save(*args, **kwargs)
 
 
-class Language(models.Model):
+class Language(ImmutableFieldsMixin, models.Model):
     """
     Language lookup model for storing comprehensive language information.
     
@@ -261,21 +226,9 @@ class Language(models.Model):
     
     def __str__(self):
         return f"{self.language_name_en} ({self.iso_639_1})"
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            # Only preserve created_at if the record already exists in the database
-            try:
-                original = Language.objects.get(pk=self.pk)
-                self.created_at = original.created_at
-            except Language.DoesNotExist:
-                # New record, let created_at be set by auto_now_add
-                pass
-        super().save(*args, **kwargs)
 
 
-class LanguageScripts(models.Model):
+class LanguageScripts(ImmutableFieldsMixin, models.Model):
     """
     Language scripts model for writing systems.
     
@@ -317,21 +270,9 @@ class LanguageScripts(models.Model):
     
     def __str__(self):
         return f"{self.language.language_name_en} - {self.script_name} ({self.script_code})"
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            # Only preserve created_at if the record already exists in the database
-            try:
-                original = LanguageScripts.objects.get(pk=self.pk)
-                self.created_at = original.created_at
-            except LanguageScripts.DoesNotExist:
-                # New record, let created_at be set by auto_now_add
-                pass
-        super().save(*args, **kwargs)
 
 
-class CountryLanguages(models.Model):
+class CountryLanguages(ImmutableFieldsMixin, models.Model):
     """
     Country languages junction model for usage and demographics.
     
@@ -399,21 +340,9 @@ class CountryLanguages(models.Model):
     
     def __str__(self):
         return f"{self.country.country_name} - {self.language.language_name_en}"
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            # Only preserve created_at if the record already exists in the database
-            try:
-                original = CountryLanguages.objects.get(pk=self.pk)
-                self.created_at = original.created_at
-            except CountryLanguages.DoesNotExist:
-                # New record, let created_at be set by auto_now_add
-                pass
-        super().save(*args, **kwargs)
 
 
-class Currency(models.Model):
+class Currency(ImmutableFieldsMixin, models.Model):
     """
     Currency lookup model for storing currency information.
     
@@ -442,21 +371,9 @@ class Currency(models.Model):
     def __str__(self):
         symbol_str = f" {self.symbol}" if self.symbol else ""
         return f"{self.name} ({self.code}){symbol_str}"
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            # Only preserve created_at if the record already exists in the database
-            try:
-                original = Currency.objects.get(pk=self.pk)
-                self.created_at = original.created_at
-            except Currency.DoesNotExist:
-                # New record, let created_at be set by auto_now_add
-                pass
-        super().save(*args, **kwargs)
 
 
-class TimeZone(models.Model):
+class TimeZone(ImmutableFieldsMixin, models.Model):
     """
     Timezone lookup model for storing timezone information.
     
@@ -486,15 +403,3 @@ class TimeZone(models.Model):
         if self.offset_minutes:
             offset_str += f":{self.offset_minutes:02d}"
         return f"{self.display_name} (UTC{offset_str})"
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            # Only preserve created_at if the record already exists in the database
-            try:
-                original = TimeZone.objects.get(pk=self.pk)
-                self.created_at = original.created_at
-            except TimeZone.DoesNotExist:
-                # New record, let created_at be set by auto_now_add
-                pass
-        super().save(*args, **kwargs)
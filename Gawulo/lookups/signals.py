@@ -0,0 +1,24 @@
+"""
+Django signals keeping the lookup responses' conditional GET stamp current.
+
+All lookup views share the 'lookups' version scope, moved after any lookup change commits.
+"""
+from django.db.models.signals import post_delete, post_save
+from Gawulo.conditional import mark_changed
+from .models import (
+    Country, CountryCodes, CountryFlags,
+    Language, LanguageScripts, CountryLanguages,
+    Currency, TimeZone
+)
+
+LOOKUP_MODELS = (Country, CountryCodes, CountryFlags, Language, LanguageScripts, CountryLanguages, Currency, TimeZone)
+
+
+def lookup_changed(sender, instance, **kwargs):
+    """Invalidate the cached lookup responses after commit."""
+    mark_changed('lookups')
+
+
+for model in LOOKUP_MODELS:
+    post_save.connect(lookup_changed, sender=model, dispatch_uid=f'lookup_changed_save_{model.__name__}')
+    post_delete.connect(lookup_changed, sender=model, dispatch_uid=f'lookup_changed_delete_{model.__name__}')
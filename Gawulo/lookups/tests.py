@@ -1,3 +1,62 @@
-from django.test import TestCase
+from unittest import mock
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+from Gawulo import conditional
+from Gawulo.conditional import get_conditional_metrics
+from .models import Currency
 
-# Create your tests here.
+
+@override_settings(CACHE_IS_SHARED=True)
+class LookupConditionalGetTests(TransactionTestCase):
+    """
+    Lookup responses are answered 304 only while no lookup change has committed.
+
+    A TransactionTestCase, so each write commits and moves the stamp as in production.
+    """
+
+    URL = '/api/lookups/currencies/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.currency = Currency.objects.create(name='South African Rand', code='ZAR', symbol='R')
+
+    def test_current_etag_is_answered_304(self):
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get(self.URL, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified['ETag'], response['ETag'])
+        self.assertEqual(get_conditional_metrics()['CurrencyListView'], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_change_gives_a_full_response(self):
+        etag = self.client.get(self.URL)['ETag']
+        self.currency.symbol = 'ZAR'
+        self.currency.save()
+
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['symbol'], 'ZAR')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.URL, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_change_in_the_same_second_gives_a_full_response(self):
+        second = 1_700_000_000 * 10 ** 9
+        with mock.patch.object(conditional.time, 'time_ns', side_effect=[second + 1000, second + 2000]):
+            conditional.touch_stamps(['lookups'])
+            response = self.client.get(self.URL)
+            Currency.objects.create(name='Euro', code='EUR', symbol='€')
+
+        for headers in ({'HTTP_IF_NONE_MATCH': response['ETag']}, {'HTTP_IF_MODIFIED_SINCE': http_date(second // 10 ** 9)}):
+            with self.subTest(headers=headers):
+                self.assertEqual(self.client.get(self.URL, **headers).status_code, 200)
+
+    def test_paths_and_formats_have_their_own_etags(self):
+        etag = self.client.get(self.URL)['ETag']
+        self.assertEqual(self.client.get(f'{self.URL}?search=rand', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(f'{self.URL}ZAR/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -5,6 +5,7 @@ API views for lookup data models.
 from rest_framework import generics, permissions
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from Gawulo.conditional import ConditionalGetMixin
 from .models import (
     Country, CountryCodes, CountryFlags,
     Language, LanguageScripts, CountryLanguages,
@@ -17,8 +18,15 @@ from .serializers import (
 )
 
 
+class LookupConditionalGetMixin(ConditionalGetMixin):
+    """Lookup responses share one version scope; lookup data rarely changes."""
+    
+    def get_version_scopes(self):
+        return ['lookups']
+
+
 # Country Views
-class CountryListView(generics.ListAPIView):
+class CountryListView(LookupConditionalGetMixin, generics.ListAPIView):
     """List all active countries."""
     queryset = Country.objects.filter(is_active=True)
     serializer_class = CountrySerializer
@@ -30,7 +38,7 @@ class CountryListView(generics.ListAPIView):
     ordering = ['country_name']
 
 
-class CountryDetailView(generics.RetrieveAPIView):
+class CountryDetailView(LookupConditionalGetMixin, generics.RetrieveAPIView):
     """Get detailed information about a specific country."""
     queryset = Country.objects.all()
     serializer_class = CountrySerializer
@@ -39,7 +47,7 @@ class CountryDetailView(generics.RetrieveAPIView):
 
 
 # Language Views
-class LanguageListView(generics.ListAPIView):
+class LanguageListView(LookupConditionalGetMixin, generics.ListAPIView):
     """List all active languages."""
     queryset = Language.objects.filter(is_active=True)
     serializer_class = LanguageSerializer
@@ -51,7 +59,7 @@ class LanguageListView(generics.ListAPIView):
     ordering = ['language_name_en']
 
 
-class LanguageDetailView(generics.RetrieveAPIView):
+class LanguageDetailView(LookupConditionalGetMixin, generics.RetrieveAPIView):
     """Get detailed information about a specific language."""
     queryset = Language.objects.all()
     serializer_class = LanguageSerializer
@@ -60,7 +68,7 @@ class LanguageDetailView(generics.RetrieveAPIView):
 
 
 # Currency Views
-class CurrencyListView(generics.ListAPIView):
+class CurrencyListView(LookupConditionalGetMixin, generics.ListAPIView):
     """List all active currencies."""
     queryset = Currency.objects.filter(is_active=True)
     serializer_class = CurrencySerializer
@@ -72,7 +80,7 @@ class CurrencyListView(generics.ListAPIView):
     ordering = ['code']
 
 
-class CurrencyDetailView(generics.RetrieveAPIView):
+class CurrencyDetailView(LookupConditionalGetMixin, generics.RetrieveAPIView):
     """Get detailed information about a specific currency."""
     queryset = Currency.objects.all()
     serializer_class = CurrencySerializer
@@ -81,7 +89,7 @@ class CurrencyDetailView(generics.RetrieveAPIView):
 
 
 # TimeZone Views
-class TimeZoneListView(generics.ListAPIView):
+class TimeZoneListView(LookupConditionalGetMixin, generics.ListAPIView):
     """List all active timezones."""
     queryset = TimeZone.objects.filter(is_active=True)
     serializer_class = TimeZoneSerializer
@@ -93,7 +101,7 @@ class TimeZoneListView(generics.ListAPIView):
     ordering = ['offset_hours', 'offset_minutes', 'name']
 
 
-class TimeZoneDetailView(generics.RetrieveAPIView):
+class TimeZoneDetailView(LookupConditionalGetMixin, generics.RetrieveAPIView):
     """Get detailed information about a specific timezone."""
     queryset = TimeZone.objects.all()
     serializer_class = TimeZoneSerializer
@@ -101,7 +109,7 @@ class TimeZoneDetailView(generics.RetrieveAPIView):
 
 
 # Country Languages View
-class CountryLanguagesListView(generics.ListAPIView):
+class CountryLanguagesListView(LookupConditionalGetMixin, generics.ListAPIView):
     """List country-language relationships."""
     queryset = CountryLanguages.objects.all()
     serializer_class = CountryLanguagesSerializer
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Order, OrderLineItem, OrderStatusHistory, Review
+from .models import (
+    Order, OrderLineItem, OrderStatusHistory, OrderEventOutbox, Review, VendorDailySales, VendorProductDailySales,
+    OrderSearchToken,
+)
 
 
 class OrderLineItemInline(admin.TabularInline):
@@ -51,6 +54,38 @@ class OrderStatusHistoryAdmin(admin.ModelAdmin):
     readonly_fields = ['timestamp']
 
 
+@admin.register(OrderEventOutbox)
+class OrderEventOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'order', 'event_type', 'status', 'attempts', 'created_at', 'dispatched_at']
+    list_filter = ['status', 'event_type', 'created_at']
+    search_fields = ['order__order_uid', 'last_error']
+    readonly_fields = ['created_at', 'dispatched_at']
+
+
+@admin.register(VendorDailySales)
+class VendorDailySalesAdmin(admin.ModelAdmin):
+    list_display = ['vendor', 'date', 'delivery_type', 'status_bucket', 'order_count', 'revenue', 'item_count', 'updated_at']
+    list_filter = ['status_bucket', 'delivery_type', 'date']
+    search_fields = ['vendor__name']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(VendorProductDailySales)
+class VendorProductDailySalesAdmin(admin.ModelAdmin):
+    list_display = ['vendor', 'product_service', 'date', 'status_bucket', 'order_count', 'quantity', 'revenue', 'updated_at']
+    list_filter = ['status_bucket', 'date']
+    search_fields = ['vendor__name', 'product_service__name']
+    readonly_fields = ['updated_at']
+
+
+@admin.register(OrderSearchToken)
+class OrderSearchTokenAdmin(admin.ModelAdmin):
+    list_display = ['order', 'field', 'token', 'weight', 'vendor', 'customer']
+    list_filter = ['field']
+    search_fields = ['token', 'order__order_uid']
+    raw_id_fields = ['order', 'vendor', 'customer']
+
+
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ['order', 'vendor', 'customer', 'rating', 'created_at']
@@ -2,18 +2,18 @@
 WebSocket consumers for real-time order updates.
 """
 import json
+import logging
 import urllib.parse
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import User
-from rest_framework_simplejwt.tokens import UntypedToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from jwt import decode as jwt_decode
-from django.conf import settings
 from .models import Order
 from .serializers import OrderSerializer
-from vendors.models import Vendor
-from auth_api.models import Customer
+from auth_api.actors import resolve_actor
+from auth_api.tokens import authenticate_access_token
+
+logger = logging.getLogger(__name__)
 
 
 class OrderConsumer(AsyncWebsocketConsumer):
@@ -25,12 +25,10 @@ class OrderConsumer(AsyncWebsocketConsumer):
             client_info = self.scope.get('client', ['unknown'])
             query_string_raw = self.scope.get('query_string', b'')
             query_string = query_string_raw.decode('utf-8') if query_string_raw else ''
-            print("=" * 60)
-            print(f"WebSocket connection attempt from {client_info}")
-            print(f"Full query string: {query_string}")
-            print(f"Scope keys: {list(self.scope.keys())}")
-            print(f"Path: {self.scope.get('path', 'unknown')}")
-            print("=" * 60)
+            logger.debug(
+                "WebSocket connection attempt",
+                extra={'client': client_info, 'path': self.scope.get('path', 'unknown')},
+            )
             
             # Get token from query string
             token = None
@@ -46,83 +44,50 @@ class OrderConsumer(AsyncWebsocketConsumer):
                         break
             
             if not token:
-                print("✗ WebSocket connection rejected: No token provided")
-                print("=" * 60)
+                logger.info("WebSocket connection rejected: no token provided", extra={'client': client_info})
                 await self.close(code=4001)
                 return
             
             # Authenticate user
             try:
-                print(f"Authenticating token (length: {len(token)})...")
                 user = await self.authenticate_token(token)
                 if not user:
-                    print("✗ WebSocket connection rejected: Authentication failed")
-                    print("=" * 60)
+                    logger.info("WebSocket connection rejected: authentication failed", extra={'client': client_info})
                     await self.close(code=4003)
                     return
-                print(f"✓ Authentication successful for user: {user.username} (ID: {user.id})")
-            except Exception as e:
-                print(f"✗ WebSocket authentication error: {e}")
-                import traceback
-                traceback.print_exc()
-                print("=" * 60)
+            except Exception:
+                logger.exception("WebSocket authentication error", extra={'client': client_info})
                 await self.close(code=4003)
                 return
             
             self.user = user
             self.user_id = user.id
             
-            # Determine if user is vendor or customer
+            # Resolve vendor/customer identity once for the lifetime of the socket
             try:
-                self.is_vendor = await self.is_user_vendor(user)
-                self.is_customer = await self.is_user_customer(user)
-            except Exception as e:
-                print(f"Error checking user type: {e}")
-                import traceback
-                traceback.print_exc()
+                actor = await self.get_actor(user)
+            except Exception:
+                logger.exception("Error checking user type", extra={'user_id': user.id})
                 await self.close(code=4004)
                 return
             
+            self.is_vendor = actor.is_vendor
+            self.is_customer = actor.is_customer
             if not (self.is_vendor or self.is_customer):
-                print(f"User {user.username} is neither vendor nor customer")
+                logger.info("WebSocket connection rejected: user is neither vendor nor customer", extra={'user_id': user.id})
                 await self.close(code=4004)
                 return
             
-            # Get vendor or customer ID
-            try:
-                if self.is_vendor:
-                    vendor = await self.get_vendor(user)
-                    if vendor:
-                        self.vendor_id = vendor.id
-                        self.group_name = f'vendor_{self.vendor_id}_orders'
-                    else:
-                        print(f"Vendor profile not found for user {user.username}")
-                        await self.close(code=4005)
-                        return
-                else:
-                    customer = await self.get_customer(user)
-                    if customer:
-                        self.customer_id = customer.id
-                        self.group_name = f'customer_{self.customer_id}_orders'
-                    else:
-                        print(f"Customer profile not found for user {user.username}")
-                        await self.close(code=4006)
-                        return
-            except Exception as e:
-                print(f"Error getting vendor/customer: {e}")
-                import traceback
-                traceback.print_exc()
-                await self.close(code=4007)
-                return
+            if self.is_vendor:
+                self.vendor_id = actor.vendor_id
+                self.group_name = f'vendor_{self.vendor_id}_orders'
+            else:
+                self.customer_id = actor.customer_id
+                self.group_name = f'customer_{self.customer_id}_orders'
         
             # Join group
-            print(f"Attempting to join group: {self.group_name}")
-            print(f"Channel name: {self.channel_name}")
-            print(f"Channel layer: {self.channel_layer}")
-            
             if not self.channel_layer:
-                print("✗ ERROR: Channel layer is None!")
-                print("=" * 60)
+                logger.error("WebSocket connection rejected: channel layer is not configured")
                 await self.close(code=4008)
                 return
             
@@ -130,16 +95,14 @@ class OrderConsumer(AsyncWebsocketConsumer):
                 self.group_name,
                 self.channel_name
             )
-            print(f"✓ Successfully joined group: {self.group_name}")
             
             await self.accept()
-            print(f"✓ WebSocket connected: {self.group_name} for user {self.user.username} (ID: {self.user.id})")
-            print("=" * 60)
-        except Exception as e:
-            print(f"✗ Unexpected error in connect(): {e}")
-            import traceback
-            traceback.print_exc()
-            print("=" * 60)
+            logger.debug(
+                "WebSocket connected",
+                extra={'group': self.group_name, 'channel': self.channel_name, 'user_id': self.user.id},
+            )
+        except Exception:
+            logger.exception("Unexpected error in WebSocket connect()")
             try:
                 await self.close(code=4000)
             except:
@@ -163,101 +126,98 @@ class OrderConsumer(AsyncWebsocketConsumer):
                 await self.send(text_data=json.dumps({
                     'type': 'pong'
                 }))
+            elif message_type == 'snapshot':
+                await self.send_snapshot(data.get('order_id'), data.get('version'))
         except json.JSONDecodeError:
             pass
     
+    async def send_snapshot(self, order_id, version=None):
+        """
+        Send the full order to a client whose cached copy is stale.
+        
+        Clients apply delta events when their cached version is at least the event's
+        base_version; otherwise they send {"type": "snapshot", "order_id": ..., "version": ...}.
+        If the cached version is already current only the version is echoed back.
+        """
+        try:
+            order_id = int(order_id)
+        except (TypeError, ValueError):
+            await self.send(text_data=json.dumps({'type': 'error', 'error': 'order_id is required'}))
+            return
+        
+        snapshot = await self.get_order_snapshot(order_id, version)
+        if snapshot is None:
+            await self.send(text_data=json.dumps({
+                'type': 'error',
+                'order_id': order_id,
+                'error': 'Order not found'
+            }))
+            return
+        await self.send(text_data=json.dumps(snapshot))
+    
     async def order_update(self, event):
         """Send order update to WebSocket."""
-        await self.send(text_data=json.dumps({
-            'type': 'order_update',
-            'order': event['order'],
-            'timestamp': event['timestamp']
-        }))
+        await self.send(text_data=json.dumps(self.order_event_payload(event)))
     
     async def new_order(self, event):
         """Send new order notification to WebSocket."""
-        await self.send(text_data=json.dumps({
-            'type': 'new_order',
-            'order': event['order'],
+        await self.send(text_data=json.dumps(self.order_event_payload(event)))
+    
+    @staticmethod
+    def order_event_payload(event):
+        """Return the client-facing part of an order delta event."""
+        return {
+            'type': event['type'],
+            'order_id': event['order_id'],
+            'version': event['version'],
+            'base_version': event['base_version'],
+            'changes': event['changes'],
             'timestamp': event['timestamp']
-        }))
+        }
     
     @database_sync_to_async
-    def authenticate_token(self, token):
-        """Authenticate JWT token and return user."""
-        try:
-            # Validate token
-            UntypedToken(token)
-        except (InvalidToken, TokenError) as e:
-            print(f"Token validation error: {e}")
+    def get_order_snapshot(self, order_id, version=None):
+        """Return a snapshot message for an order visible on this socket, or None."""
+        if getattr(self, 'vendor_id', None):
+            orders = Order.objects.filter(vendor_id=self.vendor_id)
+        elif getattr(self, 'customer_id', None):
+            orders = Order.objects.filter(customer_id=self.customer_id)
+        else:
             return None
         
-        try:
-            # Decode token
-            decoded_data = jwt_decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-            user_id = decoded_data.get('user_id')
-            if not user_id:
-                print("No user_id in token")
-                return None
-            
-            # Get user
-            try:
-                user = User.objects.get(id=user_id)
-                return user
-            except User.DoesNotExist:
-                print(f"User {user_id} does not exist")
-                return None
-        except Exception as e:
-            print(f"Token decode error: {e}")
-            import traceback
-            traceback.print_exc()
+        current_version = orders.filter(pk=order_id).values_list('version', flat=True).first()
+        if current_version is None:
             return None
+        if version is not None and str(version) == str(current_version):
+            return {'type': 'order_current', 'order_id': order_id, 'version': current_version}
+        
+        order = OrderSerializer.setup_eager_loading(orders.filter(pk=order_id)).first()
+        if order is None:
+            return None
+        return {
+            'type': 'order_snapshot',
+            'order_id': order_id,
+            'version': order.version,
+            'order': OrderSerializer(order).data
+        }
     
     @database_sync_to_async
-    def is_user_vendor(self, user):
-        """Check if user is a vendor."""
-        try:
-            return hasattr(user, 'vendor_profile') and user.vendor_profile is not None
-        except:
-            # Try alternative method
-            try:
-                Vendor.objects.get(user=user)
-                return True
-            except Vendor.DoesNotExist:
-                return False
-    
-    @database_sync_to_async
-    def is_user_customer(self, user):
-        """Check if user is a customer."""
-        try:
-            return hasattr(user, 'customer_profile') and user.customer_profile is not None
-        except:
-            # Try alternative method
-            try:
-                Customer.objects.get(user=user)
-                return True
-            except Customer.DoesNotExist:
-                return False
-    
-    @database_sync_to_async
-    def get_vendor(self, user):
-        """Get vendor for user."""
+    def authenticate_token(self, token):
+        """Authenticate JWT token and return user."""
         try:
-            if hasattr(user, 'vendor_profile'):
-                return user.vendor_profile
-            return Vendor.objects.get(user=user)
-        except:
+            # Stateless tokens are resolved from their claims without a query
+            return authenticate_access_token(token)
+        except (InvalidToken, TokenError) as e:
+            logger.info("WebSocket token validation error: %s", e)
+            return None
+        except User.DoesNotExist:
+            logger.info("WebSocket token names a missing or inactive user")
             return None
     
     @database_sync_to_async
-    def get_customer(self, user):
-        """Get customer for user."""
-        try:
-            if hasattr(user, 'customer_profile'):
-                return user.customer_profile
-            return Customer.objects.get(user=user)
-        except:
-            return None
+    def get_actor(self, user):
+        """Resolve the user's vendor/customer identity."""
+        return resolve_actor(user)
 
 
 class VendorOrderConsumer(OrderConsumer):
@@ -0,0 +1,144 @@
+"""
+Cached dashboard payloads.
+
+VendorStatsView and OrderStatsView store their computed payloads per vendor or
+customer under a generation number. Any committed change to that actor's orders,
+line items, reviews or products bumps the generation, so the next read misses
+and recomputes while reads in between are served from the cache. Payloads also
+expire after DASHBOARD_CACHE_TIMEOUT seconds, which bounds how long
+time-windowed figures ("today", the last 7 days) can lag the clock.
+
+Generations start from the clock, so a counter lost to cache eviction never
+reuses the number of an older payload. Hits and misses are counted per dashboard
+and reported by get_cache_metrics().
+
+A bump only reaches the other workers through a shared cache, so payloads are
+only cached when settings.CACHE_IS_SHARED is set; otherwise every read computes.
+"""
+import time
+from django.conf import settings
+from django.core.cache import cache
+from Gawulo.transactions import get_transaction_collector
+
+# Dashboards whose payloads are cached
+DASHBOARDS = ('vendor_stats', 'order_stats')
+
+
+def _generation_key(role, actor_id):
+    return f'dashboard:generation:{role}:{actor_id}'
+
+
+def _metric_key(dashboard, outcome):
+    return f'dashboard:metrics:{dashboard}:{outcome}'
+
+
+def get_generation(role, actor_id):
+    """Return the current payload generation of a vendor or customer."""
+    key = _generation_key(role, actor_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(role, actor_id):
+    """Make the cached payloads of a vendor or customer stale."""
+    key = _generation_key(role, actor_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Not cached (or evicted); any new generation is newer than the old ones
+        cache.add(key, time.time_ns(), None)
+
+
+def _count(dashboard, outcome):
+    key = _metric_key(dashboard, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_cached_payload(dashboard, role, actor_id, compute, variant=''):
+    """
+    Return a dashboard payload from the cache, computing and storing it on a miss.
+
+    Args:
+        dashboard: Dashboard name (one of DASHBOARDS)
+        role: 'vendor' or 'customer'
+        actor_id: Vendor or customer id
+        compute: Callable building the payload
+        variant: Extra key part for payloads that also depend on e.g. the date
+
+    Returns:
+        The payload
+    """
+    if not settings.CACHE_IS_SHARED:
+        return compute()
+    key = f'dashboard:{dashboard}:{role}:{actor_id}:{get_generation(role, actor_id)}:{variant}'
+    payload = cache.get(key)
+    if payload is not None:
+        _count(dashboard, 'hits')
+        return payload
+
+    _count(dashboard, 'misses')
+    payload = compute()
+    cache.set(key, payload, settings.DASHBOARD_CACHE_TIMEOUT)
+    return payload
+
+
+def get_cache_metrics():
+    """
+    Return the hit and miss counts of each dashboard.
+
+    Returns:
+        Dict of dashboard -> {'hits', 'misses', 'hit_rate'}
+    """
+    keys = [_metric_key(dashboard, outcome) for dashboard in DASHBOARDS for outcome in ('hits', 'misses')]
+    values = cache.get_many(keys)
+    metrics = {}
+    for dashboard in DASHBOARDS:
+        hits = values.get(_metric_key(dashboard, 'hits'), 0)
+        misses = values.get(_metric_key(dashboard, 'misses'), 0)
+        metrics[dashboard] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return metrics
+
+
+def reset_cache_metrics():
+    """Set the hit and miss counts back to zero."""
+    cache.delete_many([_metric_key(dashboard, outcome) for dashboard in DASHBOARDS for outcome in ('hits', 'misses')])
+
+
+class DashboardInvalidator:
+    """
+    Collects the vendors and customers whose data changed during one transaction.
+
+    Called from transaction.on_commit to bump each generation once.
+    """
+
+    def __init__(self):
+        self.actors = set()
+
+    def __call__(self):
+        for role, actor_id in self.actors:
+            bump_generation(role, actor_id)
+
+
+def invalidate_dashboards(vendor_id=None, customer_id=None):
+    """Bump the payload generations of a vendor and/or customer once the current transaction commits."""
+    actors = {(role, actor_id) for role, actor_id in (('vendor', vendor_id), ('customer', customer_id)) if actor_id}
+    if not actors or not settings.CACHE_IS_SHARED:
+        return
+
+    invalidator = get_transaction_collector('dashboards', DashboardInvalidator)
+    if invalidator is None:
+        for role, actor_id in actors:
+            bump_generation(role, actor_id)
+        return
+    invalidator.actors |= actors
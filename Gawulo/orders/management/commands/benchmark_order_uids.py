@@ -0,0 +1,156 @@
+"""
+Django management command that benchmarks order creation against the daily order volume.
+
+For each volume, fills today with that many orders inside a transaction that is
+always rolled back, then times orders created through OrderCreateSerializer (the
+create path of the order API) with order_uids allocated by each allocator:
+
+- counter: OrderSequence, one per-day counter row incremented in place
+- scan: the allocator it replaced, which loaded today's orders to find the
+  highest sequence number
+
+For each it reports the p50/p95 latency and the queries per order. The
+transaction never commits, so work deferred to commit is not included.
+"""
+
+import time
+from contextlib import nullcontext
+from decimal import Decimal
+from unittest import mock
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from auth_api.models import Customer
+from orders.models import Order, OrderSequence
+from orders.serializers import OrderCreateSerializer
+from vendors.models import Vendor, ProductService
+
+
+class Rollback(Exception):
+    """Raised to discard the generated data."""
+
+
+def scan_order_uids(count):
+    """Allocate order uids as before OrderSequence: one past the highest sequence number of today's orders."""
+    date_str = timezone.now().date().strftime('%Y%m%d')
+    max_seq = 0
+    for order in Order.objects.filter(order_uid__startswith=date_str):
+        try:
+            max_seq = max(max_seq, int(order.order_uid.split('-')[1]))
+        except (ValueError, IndexError):
+            pass
+    return [f"{date_str}-{sequence}" for sequence in range(max_seq + 1, max_seq + count + 1)]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark order creation latency per daily order volume, per order_uid allocator'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--volumes',
+            type=str,
+            default='10,100,1000,10000,100000',
+            help='Comma-separated numbers of orders already placed today to time against',
+        )
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=20,
+            help='Orders created per volume and allocator',
+        )
+        parser.add_argument(
+            '--line-items',
+            type=int,
+            default=3,
+            help='Line items per created order',
+        )
+
+    def handle(self, *args, **options):
+        volumes = sorted(int(volume) for volume in options['volumes'].split(','))
+        self.stdout.write(f'Database: {connection.vendor}')
+        try:
+            with transaction.atomic():
+                self._setup(options['line_items'])
+                self.stdout.write(
+                    f"{'orders/day':>10}  {'allocator':>9}  {'p50 ms':>7}  {'p95 ms':>7}  {'queries':>7}"
+                )
+                for volume in volumes:
+                    self._fill_day(volume)
+                    for allocator in ('counter', 'scan'):
+                        self._run(volume, allocator, options['samples'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Generated data rolled back')
+
+    def _setup(self, line_items):
+        suffix = f'{int(time.time())}'
+        vendor_user = User.objects.create_user(f'bench_vendor_{suffix}', f'bench_vendor_{suffix}@example.com')
+        self.vendor = Vendor.objects.create(user=vendor_user, name='Benchmark Vendor', category='food')
+        self.products = [
+            ProductService.objects.create(vendor=self.vendor, name=f'Product {i}', current_price=Decimal('25.00'))
+            for i in range(line_items)
+        ]
+        self.user = User.objects.create_user(f'bench_customer_{suffix}', f'bench_customer_{suffix}@example.com')
+        self.customer = Customer.objects.create(user=self.user, display_name='Benchmark Customer')
+        self.today = timezone.now().date()
+
+    def _placed_today(self):
+        """Return the highest sequence number of today's orders."""
+        date_str = self.today.strftime('%Y%m%d')
+        return max(
+            (int(uid.split('-')[1]) for uid in Order.objects.filter(
+                order_uid__startswith=f'{date_str}-'
+            ).values_list('order_uid', flat=True).iterator() if uid.split('-')[1].isdigit()),
+            default=0,
+        )
+
+    def _fill_day(self, volume):
+        """Bring today's orders up to volume (bulk inserts, without signals) and sync the counter row."""
+        date_str = self.today.strftime('%Y%m%d')
+        placed = self._placed_today()
+        batch_size = 5000
+        for start in range(placed + 1, volume + 1, batch_size):
+            Order.objects.bulk_create([
+                Order(
+                    order_uid=f'{date_str}-{sequence}', vendor=self.vendor, customer=self.customer,
+                    total_amount=Decimal('75.00'), is_completed=False,
+                )
+                for sequence in range(start, min(start + batch_size, volume + 1))
+            ])
+        OrderSequence.objects.update_or_create(day=self.today, defaults={'last_value': self._placed_today()})
+
+    def _create_order(self):
+        request = APIRequestFactory().post('/api/orders/create/')
+        request.user = self.user
+        serializer = OrderCreateSerializer(
+            data={'line_items': [{'product_service_id': product.pk, 'quantity': 2} for product in self.products]},
+            context={'request': request},
+        )
+        serializer.is_valid(raise_exception=True)
+        return serializer.save(customer=self.customer)
+
+    def _run(self, volume, allocator, samples):
+        timings, query_counts = [], []
+        if allocator == 'scan':
+            patch = mock.patch.object(OrderSequence, 'next_order_uids', staticmethod(scan_order_uids))
+        else:
+            patch = nullcontext()
+        with patch:
+            for _ in range(samples):
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    self._create_order()
+                    timings.append((time.perf_counter() - started) * 1000)
+                query_counts.append(len(queries))
+        # The scan allocator does not move the counter row
+        OrderSequence.objects.filter(day=self.today).update(last_value=self._placed_today())
+
+        p50, p95 = np.percentile(timings, [50, 95])
+        self.stdout.write(
+            f'{volume:>10}  {allocator:>9}  {p50:>7.2f}  {p95:>7.2f}  {int(np.median(query_counts)):>7}'
+        )
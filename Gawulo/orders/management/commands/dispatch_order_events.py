@@ -0,0 +1,78 @@
+"""
+Django management command that drains the order event outbox.
+
+Sends pending OrderEventOutbox rows to the channel layer in batches, retrying
+failed sends with backoff, and reports how far behind the outbox is. Dispatched
+rows older than ORDER_EVENTS_RETENTION_HOURS are deleted on start and then every
+PRUNE_INTERVAL_SECONDS.
+"""
+
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.models import OrderEventOutbox
+from orders.outbox import dispatch_pending_events, prune_dispatched_events
+
+PRUNE_INTERVAL_SECONDS = 600
+
+
+class Command(BaseCommand):
+    help = 'Dispatch pending order WebSocket events from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.ORDER_EVENTS_BATCH_SIZE,
+            help='Maximum number of events to send per batch',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait between polls when the outbox is drained',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the outbox once and exit',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        interval = options['interval']
+        lag_warning = settings.ORDER_EVENTS_LAG_WARNING_SECONDS
+
+        self.stdout.write(f'Dispatching order events (batch size {batch_size})')
+        next_prune = 0
+        try:
+            while True:
+                if time.monotonic() >= next_prune:
+                    pruned = prune_dispatched_events()
+                    if pruned:
+                        self.stdout.write(f'Pruned {pruned} dispatched event(s)')
+                    next_prune = time.monotonic() + PRUNE_INTERVAL_SECONDS
+
+                stats = dispatch_pending_events(batch_size=batch_size)
+                lag = OrderEventOutbox.lag_seconds()
+
+                if stats['claimed']:
+                    self.stdout.write(
+                        f"dispatched={stats['dispatched']} retried={stats['retried']} "
+                        f"failed={stats['failed']} lag={lag:.1f}s"
+                    )
+                if stats['failed']:
+                    self.stdout.write(self.style.ERROR(
+                        f"{stats['failed']} event(s) exceeded {settings.ORDER_EVENTS_MAX_ATTEMPTS} attempts"
+                    ))
+                if lag > lag_warning:
+                    self.stdout.write(self.style.WARNING(f'Outbox lag is {lag:.1f}s'))
+
+                # Keep going while batches come back full; otherwise wait for new events
+                if stats['claimed'] < batch_size:
+                    if options['once']:
+                        break
+                    time.sleep(interval)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping dispatcher')
@@ -0,0 +1,50 @@
+"""
+Django management command that rebuilds the order search index.
+
+Reindexes orders in batches of increasing id. The migration adding the
+OrderSearchToken table indexes the existing orders and the index is maintained
+as orders change; run it to repair the index.
+"""
+
+from django.core.management.base import BaseCommand
+
+from orders.models import Order
+from orders.search import reindex_orders
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the order search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of orders reindexed per batch',
+        )
+        parser.add_argument(
+            '--vendor',
+            type=int,
+            action='append',
+            dest='vendors',
+            help='Only reindex this vendor\'s orders (can be repeated)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        orders = Order.objects.order_by('pk')
+        if options['vendors']:
+            orders = orders.filter(vendor_id__in=options['vendors'])
+
+        total = 0
+        last_id = 0
+        while True:
+            batch = list(orders.filter(pk__gt=last_id).values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                break
+            reindex_orders(batch)
+            total += len(batch)
+            last_id = batch[-1]
+            self.stdout.write(f'Reindexed {total} order(s)')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the search index for {total} order(s)'))
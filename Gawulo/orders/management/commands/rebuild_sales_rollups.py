@@ -0,0 +1,103 @@
+"""
+Django management command that rebuilds the vendor sales rollups.
+
+Recomputes VendorDailySales and VendorProductDailySales from the orders, splitting
+the date range into chunks that are rebuilt in parallel worker threads. The
+migration adding the rollup tables fills them from the existing orders; run it
+whenever rows need repairing.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Min
+from django.utils import timezone
+
+from orders.models import Order
+from orders.rollups import rebuild_rollups, rollup_date
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the vendor daily sales rollups from the orders'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=date.fromisoformat,
+            help='First day to rebuild (YYYY-MM-DD, UTC); defaults to the day of the first order',
+        )
+        parser.add_argument(
+            '--until',
+            type=date.fromisoformat,
+            help='Last day to rebuild (YYYY-MM-DD, UTC); defaults to today',
+        )
+        parser.add_argument(
+            '--vendor',
+            type=int,
+            action='append',
+            dest='vendors',
+            help='Only rebuild this vendor (can be repeated)',
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=30,
+            help='Number of days rebuilt per chunk',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of chunks rebuilt in parallel',
+        )
+
+    def handle(self, *args, **options):
+        since, until = options['since'], options['until'] or rollup_date(timezone.now())
+        if since is None:
+            first_order = Order.objects.aggregate(first=Min('created_at'))['first']
+            if first_order is None:
+                self.stdout.write('No orders to roll up')
+                return
+            since = rollup_date(first_order)
+        if since > until:
+            raise CommandError('--since must not be after --until')
+        if options['chunk_days'] < 1 or options['workers'] < 1:
+            raise CommandError('--chunk-days and --workers must be at least 1')
+
+        chunks = []
+        start = since
+        while start <= until:
+            end = min(start + timedelta(days=options['chunk_days'] - 1), until)
+            chunks.append((start, end))
+            start = end + timedelta(days=1)
+
+        workers = options['workers']
+        if connection.vendor == 'sqlite' and workers > 1:
+            # SQLite allows a single writer; parallel chunks would only fail with "database is locked"
+            self.stdout.write(self.style.WARNING('SQLite does not support parallel writers; using 1 worker'))
+            workers = 1
+
+        self.stdout.write(f'Rebuilding sales rollups from {since} to {until} in {len(chunks)} chunk(s)')
+        vendor_ids = options['vendors']
+
+        def rebuild(chunk):
+            try:
+                return rebuild_rollups(*chunk, vendor_ids=vendor_ids)
+            finally:
+                # Each worker thread opens its own connection
+                connection.close()
+
+        daily_total = product_total = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(rebuild, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                start, end = futures[future]
+                daily_rows, product_rows = future.result()
+                daily_total += daily_rows
+                product_total += product_rows
+                self.stdout.write(f'{start} - {end}: {daily_rows} daily row(s), {product_rows} product row(s)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {daily_total} daily row(s) and {product_total} product row(s)'
+        ))
@@ -1,19 +1,23 @@
 """
 WebSocket middleware for logging connection attempts.
 """
+import logging
+from urllib.parse import parse_qs
 from channels.middleware import BaseMiddleware
 
+logger = logging.getLogger(__name__)
+
 
 class WebSocketLoggingMiddleware(BaseMiddleware):
-    """Middleware to log all WebSocket connection attempts."""
+    """Middleware to log all WebSocket connection attempts (DEBUG level)."""
     
     async def __call__(self, scope, receive, send):
-        if scope["type"] == "websocket":
-            print("=" * 60)
-            print("WebSocket middleware: Connection attempt detected")
-            print(f"Path: {scope.get('path', 'unknown')}")
-            print(f"Query string: {scope.get('query_string', b'').decode('utf-8')[:100]}")
-            print("=" * 60)
+        if scope["type"] == "websocket" and logger.isEnabledFor(logging.DEBUG):
+            # The query string carries the access token, so only its parameter names are logged
+            query = parse_qs(scope.get('query_string', b'').decode('utf-8', 'replace'))
+            logger.debug(
+                "WebSocket connection attempt",
+                extra={'path': scope.get('path', 'unknown'), 'query_params': sorted(query)},
+            )
         
         return await super().__call__(scope, receive, send)
-
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.20 on 2026-10-16 19:50
+
+from datetime import datetime
+from django.db import migrations, models
+
+
+def seed_order_sequences(apps, schema_editor):
+    """Start each day's counter at the highest sequence already used in order_uid."""
+    Order = apps.get_model('orders', 'Order')
+    OrderSequence = apps.get_model('orders', 'OrderSequence')
+    
+    last_values = {}
+    for order_uid in Order.objects.values_list('order_uid', flat=True).iterator():
+        try:
+            date_str, seq = order_uid.split('-', 1)
+            day = datetime.strptime(date_str, '%Y%m%d').date()
+            seq = int(seq)
+        except (ValueError, AttributeError):
+            continue
+        last_values[day] = max(last_values.get(day, 0), seq)
+    
+    OrderSequence.objects.bulk_create(
+        [OrderSequence(day=day, last_value=value) for day, value in last_values.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_alter_review_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSequence',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Order Sequence',
+                'verbose_name_plural': 'Order Sequences',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='order_uid',
+            field=models.CharField(editable=False, max_length=20, unique=True),
+        ),
+        migrations.RunPython(seed_order_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.20 on 2026-10-16 20:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_ordereventoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Incremented on every save; carried by WebSocket events'),
+        ),
+        migrations.AddField(
+            model_name='ordereventoutbox',
+            name='base_version',
+            field=models.PositiveIntegerField(default=0, help_text='Order version the changes apply to'),
+        ),
+        migrations.AddField(
+            model_name='ordereventoutbox',
+            name='changes',
+            field=models.JSONField(default=dict, help_text='Changed order fields, as serialized by the API'),
+        ),
+        migrations.AddField(
+            model_name='ordereventoutbox',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Order version after the change'),
+            preserve_default=False,
+        ),
+    ]
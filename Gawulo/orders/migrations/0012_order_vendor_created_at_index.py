@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-16 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_order_version_event_deltas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['vendor', 'created_at'], name='orders_orde_vendor__d3be3d_idx'),
+        ),
+    ]
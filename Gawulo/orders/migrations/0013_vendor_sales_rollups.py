@@ -0,0 +1,137 @@
+# Generated by Django 4.2.20 on 2026-10-16 20:22
+
+from datetime import timezone
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Status bucket of each order status (see orders.rollups); other statuses are 'open'
+STATUS_BUCKETS = {
+    'Delivered': 'completed',
+    'PickedUp': 'completed',
+    'Cancelled': 'cancelled',
+    'Refunded': 'refunded',
+}
+
+
+def backfill_rollups(apps, schema_editor):
+    """Build the rollup rows of the existing orders, as the rebuild_sales_rollups command does."""
+    Order = apps.get_model('orders', 'Order')
+    OrderLineItem = apps.get_model('orders', 'OrderLineItem')
+    VendorDailySales = apps.get_model('orders', 'VendorDailySales')
+    VendorProductDailySales = apps.get_model('orders', 'VendorProductDailySales')
+
+    def bucket(status):
+        return STATUS_BUCKETS.get(status, 'open')
+
+    # (vendor_id, date, delivery_type, status_bucket) -> [order_count, revenue, item_count]
+    daily = {}
+    for vendor_id, created_at, delivery_type, status, total_amount in Order.objects.values_list(
+        'vendor_id', 'created_at', 'delivery_type', 'current_status', 'total_amount'
+    ).iterator():
+        row = daily.setdefault(
+            (vendor_id, created_at.astimezone(timezone.utc).date(), delivery_type, bucket(status)),
+            [0, Decimal('0'), 0],
+        )
+        row[0] += 1
+        row[1] += total_amount or 0
+
+    # (vendor_id, date, product_service_id, status_bucket) -> [order_count, quantity, revenue]
+    products = {}
+    order_products = (None, set())
+    for order_id, vendor_id, created_at, delivery_type, status, product_service_id, quantity, line_total in (
+        OrderLineItem.objects.order_by('order_id').values_list(
+            'order_id', 'order__vendor_id', 'order__created_at', 'order__delivery_type', 'order__current_status',
+            'product_service_id', 'quantity', 'line_total',
+        ).iterator()
+    ):
+        day = created_at.astimezone(timezone.utc).date()
+        daily[(vendor_id, day, delivery_type, bucket(status))][2] += quantity
+        if product_service_id is None:
+            continue
+        if order_products[0] != order_id:
+            order_products = (order_id, set())
+        row = products.setdefault((vendor_id, day, product_service_id, bucket(status)), [0, 0, Decimal('0')])
+        row[0] += product_service_id not in order_products[1]
+        row[1] += quantity
+        row[2] += line_total or 0
+        order_products[1].add(product_service_id)
+
+    VendorDailySales.objects.bulk_create(
+        [
+            VendorDailySales(
+                vendor_id=vendor_id, date=day, delivery_type=delivery_type, status_bucket=status_bucket,
+                order_count=order_count, revenue=revenue, item_count=item_count,
+            )
+            for (vendor_id, day, delivery_type, status_bucket), (order_count, revenue, item_count) in daily.items()
+        ],
+        batch_size=1000,
+    )
+    VendorProductDailySales.objects.bulk_create(
+        [
+            VendorProductDailySales(
+                vendor_id=vendor_id, date=day, product_service_id=product_service_id, status_bucket=status_bucket,
+                order_count=order_count, quantity=quantity, revenue=revenue,
+            )
+            for (vendor_id, day, product_service_id, status_bucket), (order_count, quantity, revenue) in products.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0004_productservice_available_for_and_more'),
+        ('orders', '0012_order_vendor_created_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorProductDailySales',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('status_bucket', models.CharField(choices=[('open', 'Open'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], max_length=20)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='Sum of line totals', max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product_service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='vendors.productservice')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_daily_sales', to='vendors.vendor')),
+            ],
+            options={
+                'verbose_name': 'Vendor Product Daily Sales',
+                'verbose_name_plural': 'Vendor Product Daily Sales',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='VendorDailySales',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('delivery_type', models.CharField(choices=[('delivery', 'Delivery'), ('pickup', 'Pickup')], max_length=20)),
+                ('status_bucket', models.CharField(choices=[('open', 'Open'), ('completed', 'Completed'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], max_length=20)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, help_text='Sum of order totals', max_digits=14)),
+                ('item_count', models.PositiveIntegerField(default=0, help_text='Sum of line item quantities')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='vendors.vendor')),
+            ],
+            options={
+                'verbose_name': 'Vendor Daily Sales',
+                'verbose_name_plural': 'Vendor Daily Sales',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='vendorproductdailysales',
+            constraint=models.UniqueConstraint(fields=('vendor', 'date', 'product_service', 'status_bucket'), name='unique_vendor_product_daily_sales'),
+        ),
+        migrations.AddConstraint(
+            model_name='vendordailysales',
+            constraint=models.UniqueConstraint(fields=('vendor', 'date', 'delivery_type', 'status_bucket'), name='unique_vendor_daily_sales'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
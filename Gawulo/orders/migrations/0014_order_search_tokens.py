@@ -0,0 +1,79 @@
+# Generated by Django 4.2.20 on 2026-10-16 20:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 500
+
+
+def backfill_order_search_tokens(apps, schema_editor):
+    """Index the existing orders, as orders.search.reindex_orders does."""
+    from orders.search import FIELD_WEIGHTS, tokenize
+
+    Order = apps.get_model('orders', 'Order')
+    OrderLineItem = apps.get_model('orders', 'OrderLineItem')
+    OrderSearchToken = apps.get_model('orders', 'OrderSearchToken')
+
+    orders = Order.objects.order_by('pk').values(
+        'id', 'vendor_id', 'customer_id', 'created_at', 'order_uid', 'customer__display_name'
+    )
+    last_id = 0
+    while True:
+        batch = list(orders.filter(pk__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1]['id']
+        product_names = {}
+        for order_id, name in OrderLineItem.objects.filter(
+            order_id__in=[order['id'] for order in batch], product_service__isnull=False
+        ).values_list('order_id', 'product_service__name'):
+            product_names.setdefault(order_id, []).append(name)
+
+        tokens = []
+        for order in batch:
+            texts = {
+                'uid': order['order_uid'],
+                'customer': order['customer__display_name'],
+                'product': ' '.join(product_names.get(order['id'], [])),
+            }
+            for field, text in texts.items():
+                tokens.extend(
+                    OrderSearchToken(
+                        order_id=order['id'], vendor_id=order['vendor_id'], customer_id=order['customer_id'],
+                        order_created_at=order['created_at'], field=field, token=token,
+                        weight=FIELD_WEIGHTS[field],
+                    )
+                    for token in tokenize(text)
+                )
+        OrderSearchToken.objects.bulk_create(tokens, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_api', '0009_favoriteproductservice'),
+        ('vendors', '0004_productservice_available_for_and_more'),
+        ('orders', '0013_vendor_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSearchToken',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('order_created_at', models.DateTimeField()),
+                ('field', models.CharField(choices=[('uid', 'Order UID'), ('customer', 'Customer name'), ('product', 'Product name')], max_length=10)),
+                ('token', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(help_text='Rank weight of a match on this field')),
+                ('customer', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='auth_api.customer')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='orders.order')),
+                ('vendor', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='vendors.vendor')),
+            ],
+            options={
+                'verbose_name': 'Order Search Token',
+                'verbose_name_plural': 'Order Search Tokens',
+                'indexes': [models.Index(fields=['vendor', 'token'], name='orders_orde_vendor__1c8562_idx'), models.Index(fields=['customer', 'token'], name='orders_orde_custome_45eab5_idx'), models.Index(fields=['token'], name='orders_orde_token_c8cf7a_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_order_search_tokens, migrations.RunPython.noop),
+    ]
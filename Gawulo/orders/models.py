@@ -4,14 +4,17 @@ Order models for the Gawulo platform.
 Defines models for orders, order line items, order status history, and reviews.
 """
 
-from django.db import models
+from django.db import models, connection, connections, transaction
+from django.db.models import sql
+from django.db.models import F
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
+from Gawulo.mixins import ImmutableFieldsMixin, LoadedFieldsMixin
 import uuid
 
 
-class Order(models.Model):
+class Order(LoadedFieldsMixin, ImmutableFieldsMixin, models.Model):
     """
     Order model for customer orders.
     
@@ -35,8 +38,18 @@ class Order(models.Model):
         ('pickup', 'Pickup'),
     )
     
+    # Orders are completed when they are Delivered, PickedUp, or Refunded
+    COMPLETED_STATUSES = ('Delivered', 'PickedUp', 'Refunded')
+    
+    # Fields carried as deltas in order WebSocket events
+    EVENT_FIELDS = (
+        'current_status', 'is_completed', 'total_amount', 'delivery_type',
+        'delivery_address', 'delivery_instructions', 'estimated_ready_time', 'updated_at',
+    )
+    tracked_fields = EVENT_FIELDS
+    
     id = models.AutoField(primary_key=True)
-    order_uid = models.CharField(max_length=10, unique=True, editable=False)
+    order_uid = models.CharField(max_length=20, unique=True, editable=False)
     vendor = models.ForeignKey('vendors.Vendor', on_delete=models.CASCADE, related_name='orders')
     customer = models.ForeignKey('auth_api.Customer', on_delete=models.CASCADE, related_name='orders')
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
@@ -50,6 +63,7 @@ class Order(models.Model):
         help_text='Estimated time when order will be ready for pickup/delivery'
     )
     is_completed = models.BooleanField(default=False)
+    version = models.PositiveIntegerField(default=1, help_text='Incremented on every save; carried by WebSocket events')
     created_at = models.DateTimeField(auto_now_add=True, editable=False)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
     
@@ -61,52 +75,75 @@ class Order(models.Model):
             models.Index(fields=['order_uid']),
             models.Index(fields=['vendor', 'current_status']),
             models.Index(fields=['customer', 'created_at']),
+            models.Index(fields=['vendor', 'created_at']),
         ]
     
     def __str__(self):
         return f"Order {self.order_uid} - {self.customer.display_name}"
     
+    def get_changed_event_fields(self):
+        """Return the event fields whose value differs from when the order was loaded."""
+        loaded = self.get_loaded_values()
+        if loaded is None:
+            return list(self.EVENT_FIELDS)
+        return [
+            name for name in self.EVENT_FIELDS
+            if name not in loaded or loaded[name] != getattr(self, name)
+        ]
+    
     def save(self, *args, **kwargs):
-        """Ensure order_uid is set if not provided and prevent modification of created_at."""
+        """Ensure order_uid is set and keep is_completed in sync with the status (the UPDATE bumps the version)."""
         if not self.order_uid:
-            # Generate date-based order ID: YYYYMMDD-N format
-            today = timezone.now().date()
-            date_str = today.strftime('%Y%m%d')
-            
-            # Get the highest sequence number for today
-            today_orders = Order.objects.filter(
-                order_uid__startswith=date_str
-            ).exclude(pk=self.pk if self.pk else None)
-            
-            if today_orders.exists():
-                # Extract sequence numbers and find max
-                max_seq = 0
-                for order in today_orders:
-                    try:
-                        seq = int(order.order_uid.split('-')[1])
-                        max_seq = max(max_seq, seq)
-                    except (ValueError, IndexError):
-                        pass
-                sequence = max_seq + 1
-            else:
-                sequence = 1
-            
-            # Format: YYYYMMDD-N (e.g., 20250112-1)
-            self.order_uid = f"{date_str}-{sequence}"
+            # Generate date-based order ID: YYYYMMDD-N format (e.g., 20250112-1)
+            self.order_uid = OrderSequence.next_order_uid()
         
         # Automatically set is_completed based on status
         # Orders are completed when they are Delivered, PickedUp, or Refunded
-        if self.current_status in ['Delivered', 'PickedUp', 'Refunded']:
-            self.is_completed = True
-        else:
-            self.is_completed = False
-        
-        if self.pk:
-            # Preserve original created_at when updating
-            original = Order.objects.get(pk=self.pk)
-            self.created_at = original.created_at
+        self.is_completed = self.current_status in self.COMPLETED_STATUSES
         super().save(*args, **kwargs)
     
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        """
+        Increment the version in the UPDATE and set it on the order before post_save builds the event.
+        
+        Where the database supports UPDATE ... RETURNING the statement returns the new
+        version. Elsewhere the UPDATE writes the loaded version + 1 and only matches
+        while the row still has the loaded version; the row is locked and its version
+        read only when a concurrent save got there first.
+        """
+        version_field = self._meta.get_field('version')
+        values = [value for value in values if value[0] is not version_field]
+        connection = connections[using]
+        if connection.features.can_return_columns_from_insert:
+            values = self.get_mutable_values(values) + [(version_field, None, F('version') + 1)]
+            query = base_qs.filter(pk=pk_val).query.chain(sql.UpdateQuery)
+            query.add_update_fields(values)
+            update_sql, params = query.get_compiler(using).as_sql()
+            with transaction.mark_for_rollback_on_error(using=using), connection.cursor() as cursor:
+                cursor.execute(f'{update_sql} RETURNING {connection.ops.quote_name(version_field.column)}', params)
+                row = cursor.fetchone()
+            if row is None:
+                return False
+            self.version = row[0]
+            return True
+        
+        loaded_version = self.__dict__.get('version')
+        if loaded_version is not None and super()._do_update(
+            base_qs.filter(version=loaded_version), using, pk_val,
+            values + [(version_field, None, loaded_version + 1)], update_fields, forced_update
+        ):
+            self.version = loaded_version + 1
+            return True
+        with transaction.atomic(using=using, savepoint=False):
+            current = base_qs.select_for_update().filter(pk=pk_val).values_list('version', flat=True).first()
+            if current is None:
+                return False
+            super()._do_update(
+                base_qs, using, pk_val, values + [(version_field, None, current + 1)], update_fields, forced_update
+            )
+        self.version = current + 1
+        return True
+    
     def mark_completed(self):
         """Mark order as completed. Status should already be set to Delivered, PickedUp, or Refunded."""
         # Don't change the status - it should already be correct
@@ -117,13 +154,82 @@ class Order(models.Model):
         self.save()
 
 
-class OrderLineItem(models.Model):
+class OrderSequence(models.Model):
+    """
+    Per-day counter backing the YYYYMMDD-N order_uid format.
+    
+    Holds one row per calendar day with the last sequence number handed out,
+    so allocating the next uid is a single atomic statement no matter how
+    many orders were already placed that day.
+    """
+    
+    day = models.DateField(primary_key=True)
+    last_value = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Order Sequence'
+        verbose_name_plural = 'Order Sequences'
+        ordering = ['-day']
+    
+    def __str__(self):
+        return f"{self.day:%Y%m%d} - {self.last_value}"
+    
+    @classmethod
+    def next_value(cls, day, count=1):
+        """
+        Atomically allocate the next sequence number(s) for a day.
+        
+        Args:
+            day: date the sequence belongs to
+            count: how many consecutive numbers to reserve
+        
+        Returns:
+            int: The last allocated sequence number; the reserved block is
+            (result - count + 1) .. result
+        """
+        if connection.vendor in ('postgresql', 'sqlite') and connection.features.can_return_columns_from_insert:
+            # Upsert and read back the counter in one round trip; the row lock
+            # taken by the conflict update serializes concurrent allocations.
+            table = connection.ops.quote_name(cls._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} (day, last_value) VALUES (%s, %s) "
+                    f"ON CONFLICT (day) DO UPDATE SET last_value = {table}.last_value + %s "
+                    f"RETURNING last_value",
+                    [connection.ops.adapt_datefield_value(day), count, count]
+                )
+                return cursor.fetchone()[0]
+        
+        # Fallback for backends without INSERT ... RETURNING upserts (e.g. MySQL)
+        with transaction.atomic():
+            cls.objects.get_or_create(day=day)
+            cls.objects.filter(day=day).update(last_value=F('last_value') + count)
+            return cls.objects.filter(day=day).values_list('last_value', flat=True).get()
+    
+    @classmethod
+    def next_order_uids(cls, count):
+        """Return a block of fresh YYYYMMDD-N order uids for today."""
+        today = timezone.now().date()
+        date_str = today.strftime('%Y%m%d')
+        last_value = cls.next_value(today, count)
+        return [f"{date_str}-{sequence}" for sequence in range(last_value - count + 1, last_value + 1)]
+    
+    @classmethod
+    def next_order_uid(cls):
+        """Return a fresh YYYYMMDD-N order uid for today."""
+        return cls.next_order_uids(1)[0]
+
+
+class OrderLineItem(LoadedFieldsMixin, ImmutableFieldsMixin, models.Model):
     """
     Individual line items within an order.
     
     Stores product/service information with price snapshots for financial integrity.
     """
     
+    # Fields whose changes are applied to the vendor sales rollups
+    tracked_fields = ('product_service_id', 'quantity', 'line_total')
+    
     id = models.AutoField(primary_key=True)
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='line_items')
     product_service = models.ForeignKey(
@@ -154,14 +260,10 @@ class OrderLineItem(models.Model):
         return f"{self.quantity}x {product_name} - Order {self.order.order_uid}"
     
     def save(self, *args, **kwargs):
-        """Calculate line_total if not set and prevent modification of created_at."""
+        """Calculate line_total if not set."""
         if not self.line_total:
             base_total = self.quantity * self.unit_price_snapshot
             self.line_total = base_total - self.discount_applied
-        if self.pk:
-            # Preserve original created_at when updating
-            original = OrderLineItem.objects.get(pk=self.pk)
-            self.created_at = original.created_at
         super().save(*args, **kwargs)
     
     @property
@@ -174,7 +276,7 @@ class OrderLineItem(models.Model):
         return self.quantity_fulfilled >= self.quantity
 
 
-class OrderStatusHistory(models.Model):
+class OrderStatusHistory(ImmutableFieldsMixin, models.Model):
     """
     Track order status changes for audit and customer communication.
     
@@ -182,6 +284,8 @@ class OrderStatusHistory(models.Model):
     Note: confirmed_by_user is required per schema. Use a system user for automated actions.
     """
     
+    immutable_fields = ('timestamp',)
+    
     id = models.AutoField(primary_key=True)
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_history')
     status = models.CharField(max_length=50)
@@ -200,17 +304,178 @@ class OrderStatusHistory(models.Model):
     def __str__(self):
         user_name = self.confirmed_by_user.username if self.confirmed_by_user else "System"
         return f"Order {self.order.order_uid} - {self.status} by {user_name} at {self.timestamp}"
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of timestamp on existing records."""
-        if self.pk:
-            # Preserve original timestamp when updating
-            original = OrderStatusHistory.objects.get(pk=self.pk)
-            self.timestamp = original.timestamp
-        super().save(*args, **kwargs)
 
 
-class RefundRequest(models.Model):
+class OrderEventOutbox(models.Model):
+    """
+    Transactional outbox for order WebSocket events.
+
+    Rows are written in the same transaction as the order change and drained by the
+    dispatch_order_events worker, which sends them to the channel layer. A failed
+    send is retried with backoff until max attempts is reached. Dispatched rows are
+    deleted once older than ORDER_EVENTS_RETENTION_HOURS.
+    """
+
+    EVENT_TYPES = (
+        ('new_order', 'New Order'),
+        ('order_update', 'Order Update'),
+    )
+
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('dispatched', 'Dispatched'),
+        ('failed', 'Failed'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='outbox_events')
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPES)
+    version = models.PositiveIntegerField(help_text='Order version after the change')
+    base_version = models.PositiveIntegerField(default=0, help_text='Order version the changes apply to')
+    changes = models.JSONField(default=dict, help_text='Changed order fields, as serialized by the API')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now, help_text='Earliest time the next attempt may run')
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Order Event'
+        verbose_name_plural = 'Order Event Outbox'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} for order {self.order_id} ({self.status})"
+
+    @classmethod
+    def lag_seconds(cls):
+        """Return the age in seconds of the oldest pending event, or 0 if none."""
+        oldest = cls.objects.filter(status='pending').order_by('id').values_list('created_at', flat=True).first()
+        if oldest is None:
+            return 0.0
+        return max((timezone.now() - oldest).total_seconds(), 0.0)
+
+
+class VendorDailySales(models.Model):
+    """
+    Daily sales rollup per vendor, delivery type and status bucket.
+
+    One row holds the orders a vendor received on a (UTC) day with the given
+    delivery type whose status falls in the bucket. Rows are kept up to date from
+    order changes by orders.rollups and rebuilt from history with the
+    rebuild_sales_rollups command.
+    """
+
+    STATUS_BUCKETS = (
+        ('open', 'Open'),
+        ('completed', 'Completed'),
+        ('cancelled', 'Cancelled'),
+        ('refunded', 'Refunded'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    vendor = models.ForeignKey('vendors.Vendor', on_delete=models.CASCADE, related_name='daily_sales')
+    date = models.DateField()
+    delivery_type = models.CharField(max_length=20, choices=Order.DELIVERY_TYPE)
+    status_bucket = models.CharField(max_length=20, choices=STATUS_BUCKETS)
+    order_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text='Sum of order totals')
+    item_count = models.PositiveIntegerField(default=0, help_text='Sum of line item quantities')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Vendor Daily Sales'
+        verbose_name_plural = 'Vendor Daily Sales'
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['vendor', 'date', 'delivery_type', 'status_bucket'],
+                name='unique_vendor_daily_sales'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.vendor_id} {self.date} {self.delivery_type}/{self.status_bucket}: {self.order_count} orders"
+
+
+class VendorProductDailySales(models.Model):
+    """
+    Daily sales rollup per vendor product and status bucket.
+
+    order_count is the number of distinct orders containing the product.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    vendor = models.ForeignKey('vendors.Vendor', on_delete=models.CASCADE, related_name='product_daily_sales')
+    product_service = models.ForeignKey(
+        'vendors.ProductService', on_delete=models.CASCADE, related_name='daily_sales'
+    )
+    date = models.DateField()
+    status_bucket = models.CharField(max_length=20, choices=VendorDailySales.STATUS_BUCKETS)
+    order_count = models.PositiveIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text='Sum of line totals')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Vendor Product Daily Sales'
+        verbose_name_plural = 'Vendor Product Daily Sales'
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['vendor', 'date', 'product_service', 'status_bucket'],
+                name='unique_vendor_product_daily_sales'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.product_service_id} {self.date} {self.status_bucket}: {self.quantity}"
+
+
+class OrderSearchToken(models.Model):
+    """
+    Search index over orders.
+
+    One row per distinct word of an order's uid, customer display name and
+    product names, with the order's vendor, customer and creation time copied in
+    so a vendor's or customer's search is a range scan on (vendor, token) or
+    (customer, token). Maintained by orders.search and rebuilt with the
+    rebuild_order_search_index command.
+    """
+
+    FIELD_CHOICES = (
+        ('uid', 'Order UID'),
+        ('customer', 'Customer name'),
+        ('product', 'Product name'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='search_tokens')
+    vendor = models.ForeignKey('vendors.Vendor', on_delete=models.CASCADE, related_name='+', db_index=False)
+    customer = models.ForeignKey('auth_api.Customer', on_delete=models.CASCADE, related_name='+', db_index=False)
+    order_created_at = models.DateTimeField()
+    field = models.CharField(max_length=10, choices=FIELD_CHOICES)
+    token = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(help_text='Rank weight of a match on this field')
+
+    class Meta:
+        verbose_name = 'Order Search Token'
+        verbose_name_plural = 'Order Search Tokens'
+        indexes = [
+            models.Index(fields=['vendor', 'token']),
+            models.Index(fields=['customer', 'token']),
+            models.Index(fields=['token']),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id} {self.field}: {self.token}"
+
+
+class RefundRequest(ImmutableFieldsMixin, models.Model):
     """
     Refund request model for order refunds.
     
@@ -253,16 +518,9 @@ class RefundRequest(models.Model):
     
     def __str__(self):
         return f"Refund Request for Order {self.order.order_uid} - {self.get_status_display()}"
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            original = RefundRequest.objects.get(pk=self.pk)
-            self.created_at = original.created_at
-        super().save(*args, **kwargs)
 
 
-class Review(models.Model):
+class Review(ImmutableFieldsMixin, models.Model):
     """
     Customer reviews for completed orders.
     
@@ -290,11 +548,7 @@ class Review(models.Model):
         return f"Review for Order {self.order.order_uid} - {self.rating} stars"
     
     def save(self, *args, **kwargs):
-        """Update vendor rating statistics when review is saved and prevent modification of created_at."""
-        if self.pk:
-            # Preserve original created_at when updating
-            original = Review.objects.get(pk=self.pk)
-            self.created_at = original.created_at
+        """Update vendor rating statistics when review is saved."""
         super().save(*args, **kwargs)
         self._update_vendor_rating()
     
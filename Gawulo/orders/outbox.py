@@ -0,0 +1,208 @@
+"""
+Order event outbox: event payloads and the dispatcher.
+
+Order events are compact deltas: the order id, the order version after the change,
+the version the change applies to and only the fields that changed, rendered the
+same way as the REST API. A client whose cached copy is older than base_version
+asks for a full snapshot over the socket instead (see OrderConsumer).
+
+Pending OrderEventOutbox rows are drained in batches and sent to the channel layer
+by the dispatch_order_events worker, or right after the writing transaction
+commits when ORDER_EVENTS_DISPATCH_INLINE is enabled (the in-memory channel layer
+used in development only exists inside the web process). Dispatched rows are
+deleted once they are older than ORDER_EVENTS_RETENTION_HOURS.
+"""
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from channels.layers import get_channel_layer
+from asgiref.sync import async_to_sync
+from .models import Order, OrderEventOutbox
+from .serializers import OrderSerializer
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY_SECONDS = 300
+# How long a claimed event is hidden from other workers while it is being sent
+CLAIM_TIMEOUT_SECONDS = 60
+PRUNE_BATCH_SIZE = 1000
+
+# Extra fields announced with a new order on top of Order.EVENT_FIELDS
+NEW_ORDER_FIELDS = ('order_uid', 'customer', 'customer_name', 'created_at')
+
+_order_fields = None
+
+
+def _get_order_fields():
+    """Return the OrderSerializer fields used to render event values (built once)."""
+    global _order_fields
+    if _order_fields is None:
+        _order_fields = OrderSerializer().fields
+    return _order_fields
+
+
+def build_order_event(order, message_type):
+    """
+    Build an unsaved outbox row for an order that has just been saved.
+
+    New orders carry their summary fields; updates carry only the fields that
+    changed since the order was loaded.
+    """
+    fields = _get_order_fields()
+    if message_type == 'new_order':
+        names = [*NEW_ORDER_FIELDS, *Order.EVENT_FIELDS]
+        if not Order.customer.is_cached(order):
+            # Avoid a query per order; clients resolve the name from the snapshot
+            names.remove('customer_name')
+        base_version = 0
+    else:
+        names = order.get_changed_event_fields()
+        base_version = order.version - 1
+
+    changes = {}
+    for name in names:
+        field = fields[name]
+        value = field.get_attribute(order)
+        changes[name] = None if value is None else field.to_representation(value)
+
+    return OrderEventOutbox(
+        order_id=order.pk,
+        event_type=message_type,
+        version=order.version,
+        base_version=base_version,
+        changes=changes,
+    )
+
+
+def build_order_message(events):
+    """Merge the pending events of one order, oldest first, into a single message."""
+    changes = {}
+    for event in events:
+        changes.update(event.changes)
+    return {
+        'type': 'new_order' if any(event.event_type == 'new_order' for event in events) else 'order_update',
+        'order_id': events[0].order_id,
+        'version': events[-1].version,
+        'base_version': events[0].base_version,
+        'changes': changes,
+        'timestamp': timezone.now().isoformat(),
+    }
+
+
+def send_order_message(channel_layer, vendor_id, customer_id, message):
+    """Send an order event to the vendor and customer channel groups."""
+    # Broadcast to vendor channel
+    async_to_sync(channel_layer.group_send)(f'vendor_{vendor_id}_orders', message)
+
+    # Broadcast to customer channel
+    async_to_sync(channel_layer.group_send)(f'customer_{customer_id}_orders', message)
+
+
+def dispatch_pending_events(batch_size=None, order_ids=None):
+    """
+    Send one batch of due outbox events to the channel layer.
+
+    Events are claimed in a short transaction that leases them for
+    CLAIM_TIMEOUT_SECONDS, then sent with no row locks held. Events for the same
+    order are merged into one message. A failed send is rescheduled with
+    exponential backoff and marked failed once ORDER_EVENTS_MAX_ATTEMPTS is
+    reached; events of a worker that dies mid-batch are sent again once their
+    lease runs out.
+
+    Args:
+        batch_size: Maximum number of events to claim (defaults to ORDER_EVENTS_BATCH_SIZE)
+        order_ids: Optionally restrict the batch to these orders
+
+    Returns:
+        Dict with the number of events claimed, dispatched, retried and failed
+    """
+    batch_size = batch_size or settings.ORDER_EVENTS_BATCH_SIZE
+    max_attempts = settings.ORDER_EVENTS_MAX_ATTEMPTS
+    stats = {'claimed': 0, 'dispatched': 0, 'retried': 0, 'failed': 0}
+
+    with transaction.atomic():
+        now = timezone.now()
+        events = OrderEventOutbox.objects.filter(status='pending', available_at__lte=now)
+        if order_ids is not None:
+            events = events.filter(order_id__in=order_ids)
+        if connection.features.has_select_for_update_skip_locked:
+            # Lets several workers claim from the outbox without claiming an event twice
+            events = events.select_for_update(skip_locked=True)
+        events = list(events.order_by('id')[:batch_size])
+        if not events:
+            return stats
+        OrderEventOutbox.objects.filter(pk__in=[event.pk for event in events]).update(
+            available_at=now + timedelta(seconds=CLAIM_TIMEOUT_SECONDS)
+        )
+    stats['claimed'] = len(events)
+
+    by_order = {}
+    for event in events:
+        by_order.setdefault(event.order_id, []).append(event)
+
+    recipients = {
+        order_id: (vendor_id, customer_id)
+        for order_id, vendor_id, customer_id in Order.objects.filter(
+            pk__in=by_order
+        ).values_list('pk', 'vendor_id', 'customer_id')
+    }
+    channel_layer = get_channel_layer()
+
+    for order_id, order_events in by_order.items():
+        error = None
+        if order_id in recipients and channel_layer:
+            try:
+                send_order_message(channel_layer, *recipients[order_id], build_order_message(order_events))
+            except Exception as exc:
+                logger.warning("Failed to dispatch events for order %s: %s", order_id, exc)
+                error = str(exc) or exc.__class__.__name__
+
+        now = timezone.now()
+        for event in order_events:
+            if error is None:
+                event.status = 'dispatched'
+                event.dispatched_at = now
+                stats['dispatched'] += 1
+                continue
+            event.attempts += 1
+            event.last_error = error
+            if event.attempts >= max_attempts:
+                event.status = 'failed'
+                stats['failed'] += 1
+            else:
+                delay = min(2 ** event.attempts, MAX_RETRY_DELAY_SECONDS)
+                event.available_at = now + timedelta(seconds=delay)
+                stats['retried'] += 1
+
+    OrderEventOutbox.objects.bulk_update(
+        events, ['status', 'attempts', 'last_error', 'available_at', 'dispatched_at']
+    )
+
+    return stats
+
+
+def prune_dispatched_events(retention=None):
+    """
+    Delete dispatched events older than the retention period.
+
+    Failed events are kept for inspection.
+
+    Args:
+        retention: timedelta to keep dispatched events for (defaults to ORDER_EVENTS_RETENTION_HOURS)
+
+    Returns:
+        Number of events deleted
+    """
+    if retention is None:
+        retention = timedelta(hours=settings.ORDER_EVENTS_RETENTION_HOURS)
+    cutoff = timezone.now() - retention
+    deleted = 0
+    while True:
+        ids = list(OrderEventOutbox.objects.filter(
+            status='dispatched', dispatched_at__lt=cutoff
+        ).values_list('pk', flat=True)[:PRUNE_BATCH_SIZE])
+        if not ids:
+            return deleted
+        deleted += OrderEventOutbox.objects.filter(pk__in=ids).delete()[0]
@@ -0,0 +1,143 @@
+"""
+Keyset pagination for order lists.
+
+Pages are addressed by an opaque cursor holding the (created_at, id) of the row at
+the page boundary, so fetching any page is an index range scan of page_size + 1
+rows on the (customer, created_at) / (vendor, created_at) indexes, with no COUNT(*)
+and no OFFSET. Deep pages cost the same as the first one.
+"""
+import base64
+import json
+from collections import OrderedDict
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class OrderCursorPagination(BasePagination):
+    """
+    Cursor pagination keyed on (created_at, id).
+
+    Only orderings backed by an index are accepted through the ``ordering`` query
+    parameter; id breaks ties between orders created in the same instant.
+    """
+
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    default_ordering = '-created_at'
+    allowed_orderings = ('-created_at', 'created_at')
+
+    def get_ordering(self, request):
+        """Return the requested ordering, rejecting anything outside the allow-list."""
+        ordering = request.query_params.get(self.ordering_query_param) or self.default_ordering
+        if ordering not in self.allowed_orderings:
+            raise ValidationError({
+                self.ordering_query_param: f"Unsupported ordering '{ordering}'. "
+                                           f"Allowed values: {', '.join(self.allowed_orderings)}."
+            })
+        return ordering
+
+    def get_page_size(self, request):
+        """Return the page size, honouring page_size up to max_page_size."""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        """
+        Return (created_at, id, reverse) from the cursor parameter, or None.
+
+        Raises:
+            NotFound: If the cursor is malformed
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            created_at = parse_datetime(data['c'])
+            if created_at is None:
+                raise ValueError(data['c'])
+            return created_at, int(data['i']), bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound('Invalid cursor')
+
+    def encode_cursor(self, order, reverse=False):
+        """Return the URL for a page starting after (or, reversed, before) the given order."""
+        data = {'c': order.created_at.isoformat(), 'i': order.pk}
+        if reverse:
+            data['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return one page of orders after (or before) the cursor position."""
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        descending = self.get_ordering(request).startswith('-')
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[2])
+
+        # Walking back towards previous pages scans the index the other way
+        scan_descending = descending != reverse
+        if cursor:
+            created_at, pk, _ = cursor
+            lookup = 'lt' if scan_descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'created_at__{lookup}': created_at}) |
+                Q(created_at=created_at, **{f'id__{lookup}': pk})
+            )
+        if scan_descending:
+            queryset = queryset.order_by('-created_at', '-id')
+        else:
+            queryset = queryset.order_by('created_at', 'id')
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = results
+        return results
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
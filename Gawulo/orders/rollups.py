@@ -0,0 +1,468 @@
+"""
+Vendor sales rollups.
+
+VendorDailySales and VendorProductDailySales hold pre-aggregated sales per vendor
+and UTC day so dashboards read a few rows per day instead of rescanning orders.
+
+Rollups are maintained incrementally: each change to an order or its line items
+is turned into deltas on the rows it affects (a new order adds to its bucket, a
+status change moves the order and its line items from the old bucket to the new
+one, a line item edit adjusts quantities and revenue). The deltas of each change
+are summed per row and applied as F() increments in the transaction making the
+change, so the rollups commit or roll back (savepoints included) together with
+the orders, and the cost of a write does not depend on how many orders the
+vendor already has that day. rebuild_rollups() recomputes whole date ranges from
+the orders for the backfill and repair command.
+"""
+import logging
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from Gawulo.transactions import get_transaction_collector
+from .models import Order, OrderLineItem, VendorDailySales, VendorProductDailySales
+from .dashboard_cache import invalidate_dashboards
+
+logger = logging.getLogger(__name__)
+
+# Status bucket of each order status
+STATUS_BUCKETS = {
+    'Delivered': 'completed',
+    'PickedUp': 'completed',
+    'Cancelled': 'cancelled',
+    'Refunded': 'refunded',
+}
+DEFAULT_STATUS_BUCKET = 'open'
+
+
+def status_bucket_expression(prefix=''):
+    """Return a Case expression mapping the order status to its bucket."""
+    whens = {}
+    for status, bucket in STATUS_BUCKETS.items():
+        whens.setdefault(bucket, []).append(status)
+    return Case(
+        *(When(**{f'{prefix}current_status__in': statuses}, then=Value(bucket)) for bucket, statuses in whens.items()),
+        default=Value(DEFAULT_STATUS_BUCKET),
+    )
+
+
+def rollup_date(moment):
+    """Return the rollup day (UTC date) of a datetime."""
+    return moment.astimezone(dt_timezone.utc).date()
+
+
+def _day_start(day):
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def rebuild_rollups(start_date, end_date, vendor_ids=None):
+    """
+    Recompute the rollup rows for a range of days from the orders.
+
+    Args:
+        start_date: First day to rebuild
+        end_date: Last day to rebuild (inclusive)
+        vendor_ids: Optionally restrict the rebuild to these vendors
+
+    Returns:
+        Tuple of (daily rows, product rows) written
+    """
+    start, end = _day_start(start_date), _day_start(end_date + timedelta(days=1))
+    orders = Order.objects.filter(created_at__gte=start, created_at__lt=end)
+    line_items = OrderLineItem.objects.filter(order__created_at__gte=start, order__created_at__lt=end)
+    daily_rows = VendorDailySales.objects.filter(date__gte=start_date, date__lte=end_date)
+    product_rows = VendorProductDailySales.objects.filter(date__gte=start_date, date__lte=end_date)
+    if vendor_ids is not None:
+        orders = orders.filter(vendor_id__in=vendor_ids)
+        line_items = line_items.filter(order__vendor_id__in=vendor_ids)
+        daily_rows = daily_rows.filter(vendor_id__in=vendor_ids)
+        product_rows = product_rows.filter(vendor_id__in=vendor_ids)
+
+    day = TruncDate('created_at', tzinfo=dt_timezone.utc)
+    order_day = TruncDate('order__created_at', tzinfo=dt_timezone.utc)
+
+    with transaction.atomic():
+        daily = {}
+        for row in orders.annotate(
+            day=day, bucket=status_bucket_expression()
+        ).values('vendor_id', 'day', 'delivery_type', 'bucket').annotate(
+            order_count=Count('id'), revenue=Sum('total_amount')
+        ).order_by():
+            key = (row['vendor_id'], row['day'], row['delivery_type'], row['bucket'])
+            daily[key] = VendorDailySales(
+                vendor_id=row['vendor_id'], date=row['day'], delivery_type=row['delivery_type'],
+                status_bucket=row['bucket'], order_count=row['order_count'], revenue=row['revenue'] or Decimal('0'),
+            )
+
+        products = []
+        item_rows = line_items.annotate(
+            day=order_day, bucket=status_bucket_expression('order__')
+        ).values('order__vendor_id', 'day', 'order__delivery_type', 'bucket', 'product_service_id').annotate(
+            order_count=Count('order', distinct=True), quantity=Sum('quantity'), revenue=Sum('line_total')
+        ).order_by()
+        for row in item_rows:
+            key = (row['order__vendor_id'], row['day'], row['order__delivery_type'], row['bucket'])
+            if key in daily:
+                daily[key].item_count += row['quantity'] or 0
+            if row['product_service_id'] is not None:
+                products.append(row)
+
+        # Rows from different delivery types fold into one product row
+        product_objects = {}
+        for row in products:
+            key = (row['order__vendor_id'], row['day'], row['product_service_id'], row['bucket'])
+            existing = product_objects.get(key)
+            if existing is None:
+                product_objects[key] = VendorProductDailySales(
+                    vendor_id=row['order__vendor_id'], product_service_id=row['product_service_id'], date=row['day'],
+                    status_bucket=row['bucket'], order_count=row['order_count'], quantity=row['quantity'] or 0,
+                    revenue=row['revenue'] or Decimal('0'),
+                )
+            else:
+                existing.order_count += row['order_count']
+                existing.quantity += row['quantity'] or 0
+                existing.revenue += row['revenue'] or Decimal('0')
+
+        daily_rows.delete()
+        product_rows.delete()
+        VendorDailySales.objects.bulk_create(daily.values(), batch_size=1000)
+        VendorProductDailySales.objects.bulk_create(product_objects.values(), batch_size=1000)
+    return len(daily), len(product_objects)
+
+
+class RollupDeltas:
+    """
+    Collects the rollup changes of one write.
+
+    Changes are summed per rollup row and applied by apply() as F() increments,
+    inserting rows that do not exist yet. Product rows of the same vendor, day and
+    bucket that only grow (a new order) share one UPDATE.
+    """
+
+    def __init__(self):
+        # (vendor_id, date, delivery_type, status_bucket) -> [order_count, revenue, item_count]
+        self.daily = {}
+        # (vendor_id, date, product_service_id, status_bucket) -> [order_count, quantity, revenue]
+        self.products = {}
+
+    def add_daily(self, key, orders=0, revenue=0, items=0):
+        row = self.daily.setdefault(key, [0, Decimal('0'), 0])
+        row[0] += orders
+        row[1] += revenue or 0
+        row[2] += items
+
+    def add_product(self, key, orders=0, quantity=0, revenue=0):
+        row = self.products.setdefault(key, [0, 0, Decimal('0')])
+        row[0] += orders
+        row[1] += quantity
+        row[2] += revenue or 0
+
+    def apply(self):
+        """Write the deltas as part of the current transaction (or in one of their own)."""
+        with transaction.atomic(savepoint=False):
+            # Sorted so concurrent writes lock the rows in the same order
+            for key, (orders, revenue, items) in sorted(self.daily.items()):
+                vendor_id, day, delivery_type, bucket = key
+                _apply_delta(
+                    VendorDailySales,
+                    dict(vendor_id=vendor_id, date=day, delivery_type=delivery_type, status_bucket=bucket),
+                    dict(order_count=orders, revenue=revenue, item_count=items),
+                )
+            products = {}
+            for (vendor_id, day, product_service_id, bucket), row in self.products.items():
+                products.setdefault((vendor_id, day, bucket), {})[product_service_id] = row
+            for (vendor_id, day, bucket), rows in sorted(products.items()):
+                lookup = dict(vendor_id=vendor_id, date=day, status_bucket=bucket)
+                if all(delta >= 0 for row in rows.values() for delta in row):
+                    _add_product_deltas(lookup, rows)
+                    continue
+                for product_service_id, (orders, quantity, revenue) in sorted(rows.items()):
+                    _apply_delta(
+                        VendorProductDailySales,
+                        dict(lookup, product_service_id=product_service_id),
+                        dict(order_count=orders, quantity=quantity, revenue=revenue),
+                    )
+        # Cached dashboard payloads were built from the old rollup rows
+        for vendor_id in {key[0] for key in (*self.daily, *self.products)}:
+            invalidate_dashboards(vendor_id=vendor_id)
+
+
+def _apply_delta(model, lookup, deltas):
+    """Add deltas to one rollup row, creating it if needed and dropping it once it counts no orders."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    increments = {name: F(name) + delta for name, delta in deltas.items()}
+    now = timezone.now()
+    if model.objects.filter(**lookup).update(**increments, updated_at=now):
+        if deltas.get('order_count', 0) < 0:
+            model.objects.filter(**lookup, order_count=0).delete()
+        return
+
+    if any(delta < 0 for delta in deltas.values()):
+        from vendors.models import Vendor
+
+        # Rows of a deleted vendor are deleted with it
+        if Vendor.objects.filter(pk=lookup['vendor_id']).exists():
+            logger.warning("Missing %s row for %s; run rebuild_sales_rollups", model.__name__, lookup)
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Created by a concurrent write in the meantime
+        model.objects.filter(**lookup).update(**increments, updated_at=now)
+
+
+def _add_product_deltas(lookup, rows):
+    """
+    Add non-negative deltas to the product rows of one vendor, day and bucket in two queries.
+
+    Missing rows are inserted empty (rows a concurrent write inserted first are
+    skipped), then a single UPDATE adds each product's deltas, so a new order
+    costs the same however many products it contains.
+
+    Args:
+        lookup: vendor_id, date and status_bucket of the rows
+        rows: {product_service_id: [order_count, quantity, revenue]}
+    """
+    rows = {product_service_id: row for product_service_id, row in rows.items() if any(row)}
+    if not rows:
+        return
+    VendorProductDailySales.objects.bulk_create(
+        [VendorProductDailySales(**lookup, product_service_id=product_service_id) for product_service_id in rows],
+        ignore_conflicts=True,
+    )
+    increments = {}
+    for index, name in enumerate(('order_count', 'quantity', 'revenue')):
+        field = VendorProductDailySales._meta.get_field(name)
+        increments[name] = F(name) + Case(
+            *(When(product_service_id=product_service_id, then=Value(row[index], output_field=field))
+              for product_service_id, row in rows.items()),
+            default=Value(0, output_field=field), output_field=field,
+        )
+    updated = VendorProductDailySales.objects.filter(**lookup, product_service_id__in=rows).update(
+        **increments, updated_at=timezone.now()
+    )
+    if updated != len(rows):
+        # A concurrent write dropped a row between the two queries
+        logger.warning("Missing VendorProductDailySales rows for %s; run rebuild_sales_rollups", lookup)
+
+
+class RemovedProducts(set):
+    """
+    The (order_id, product_service_id) pairs a transaction took out of a product row's order_count.
+
+    Kept per savepoint by get_transaction_collector, so pairs removed in a rolled-back
+    block are forgotten; nothing is left to do when the transaction commits.
+    """
+
+    def __call__(self):
+        pass
+
+
+def _record(change):
+    """Run change(deltas) against a new RollupDeltas and apply it in the current transaction."""
+    deltas = RollupDeltas()
+    change(deltas)
+    deltas.apply()
+
+
+def _daily_key(order, status=None, delivery_type=None):
+    return (
+        order.vendor_id, rollup_date(order.created_at),
+        delivery_type or order.delivery_type,
+        STATUS_BUCKETS.get(status or order.current_status, DEFAULT_STATUS_BUCKET),
+    )
+
+
+def _order_item_totals(order_ids):
+    """Return {order_id: [(product_service_id, quantity, revenue), ...]} of the orders' line items."""
+    totals = {}
+    rows = OrderLineItem.objects.filter(order_id__in=order_ids).values('order_id', 'product_service_id').annotate(
+        quantity=Sum('quantity'), revenue=Sum('line_total')
+    ).order_by()
+    for row in rows:
+        totals.setdefault(row['order_id'], []).append(
+            (row['product_service_id'], row['quantity'] or 0, row['revenue'] or Decimal('0'))
+        )
+    return totals
+
+
+def _add_order(deltas, key, amount, items, sign=1):
+    """Add (or with sign=-1 remove) an order of some total and its line items to the rows of a daily key."""
+    deltas.add_daily(key, orders=sign, revenue=sign * amount, items=sign * sum(quantity for _, quantity, _ in items))
+    vendor_id, day, _, bucket = key
+    for product_service_id, quantity, revenue in items:
+        if product_service_id is not None:
+            deltas.add_product((vendor_id, day, product_service_id, bucket), sign, sign * quantity, sign * revenue)
+
+
+def rollup_order_created(order):
+    """Count a new order (without line items) in its vendor's rollup."""
+    if order.vendor_id is None or order.created_at is None:
+        return
+    _record(lambda deltas: _add_order(deltas, _daily_key(order), order.total_amount, []))
+
+
+def rollup_orders_created(orders):
+    """Count orders inserted with bulk_create, together with their line items (one query)."""
+    orders = [order for order in orders if order.vendor_id is not None and order.created_at is not None]
+    if not orders:
+        return
+    items = _order_item_totals([order.pk for order in orders])
+
+    def change(deltas):
+        for order in orders:
+            _add_order(deltas, _daily_key(order), order.total_amount, items.get(order.pk, []))
+
+    _record(change)
+
+
+def rollup_order_changed(order, old_status, old_delivery_type, old_amount):
+    """
+    Move an updated order between rollup rows.
+
+    Only a change of status bucket or delivery type moves the order (and, for a
+    status bucket change, its line items); a total change adjusts the revenue.
+    """
+    if order.vendor_id is None or order.created_at is None:
+        return
+    old_key = _daily_key(order, old_status, old_delivery_type)
+    new_key = _daily_key(order)
+    if old_key == new_key:
+        if old_amount != order.total_amount:
+            _record(lambda deltas: deltas.add_daily(new_key, revenue=order.total_amount - old_amount))
+        return
+
+    items = _order_item_totals([order.pk]).get(order.pk, [])
+
+    def change(deltas):
+        _add_order(deltas, old_key, old_amount, items, sign=-1)
+        _add_order(deltas, new_key, order.total_amount, items)
+
+    _record(change)
+
+
+def rollup_order_deleted(order, status=None, delivery_type=None, amount=None):
+    """
+    Remove a deleted order from its rollup row.
+
+    Its line items are removed by their own deletions, which run first.
+    """
+    if order.vendor_id is None or order.created_at is None:
+        return
+    key = _daily_key(order, status, delivery_type)
+    amount = order.total_amount if amount is None else amount
+    _record(lambda deltas: deltas.add_daily(key, orders=-1, revenue=-amount))
+
+
+def rollup_line_item_changed(order, product_service_id, quantity=0, revenue=0, order_count=0):
+    """
+    Apply a line item change to its order's rollup rows.
+
+    Args:
+        order: The line item's order (vendor_id, created_at, delivery_type and current_status are read)
+        product_service_id: Product of the line item (None for items whose product was deleted)
+        quantity: Change in quantity
+        revenue: Change in line total
+        order_count: +1 when the order now contains the product and did not before, -1 for the opposite
+    """
+    if order.vendor_id is None or order.created_at is None:
+        return
+    key = _daily_key(order)
+    vendor_id, day, _, bucket = key
+
+    def change(deltas):
+        deltas.add_daily(key, items=quantity)
+        if product_service_id is None:
+            return
+        removed = (order.pk, product_service_id)
+        removed_products = get_transaction_collector('rollup_removed_products', RemovedProducts)
+        removed_products = set() if removed_products is None else removed_products
+        count = order_count
+        if count < 0:
+            if removed in removed_products:
+                # Deleting an order removes all its items at once; count it out of the product row once
+                count = 0
+            removed_products.add(removed)
+        elif count > 0:
+            removed_products.discard(removed)
+        deltas.add_product((vendor_id, day, product_service_id, bucket), count, quantity, revenue)
+
+    _record(change)
+
+
+def rollup_line_items_created(line_items):
+    """
+    Count line items inserted with bulk_create into newly created orders.
+
+    Args:
+        line_items: OrderLineItem instances with their order set
+    """
+    seen = set()
+
+    def change(deltas):
+        for line_item in line_items:
+            order = line_item.order
+            if order.vendor_id is None or order.created_at is None:
+                continue
+            key = _daily_key(order)
+            vendor_id, day, _, bucket = key
+            deltas.add_daily(key, items=line_item.quantity)
+            if line_item.product_service_id is None:
+                continue
+            first = (order.pk, line_item.product_service_id) not in seen
+            seen.add((order.pk, line_item.product_service_id))
+            deltas.add_product(
+                (vendor_id, day, line_item.product_service_id, bucket),
+                1 if first else 0, line_item.quantity, line_item.line_total,
+            )
+
+    _record(change)
+
+
+def get_daily_sales(vendor_id, start_date, end_date, delivery_type=None, status_buckets=None):
+    """
+    Return per-day sales totals of a vendor over a date range.
+
+    Args:
+        vendor_id: Vendor to report on
+        start_date: First day (inclusive)
+        end_date: Last day (inclusive)
+        delivery_type: Optionally only count 'delivery' or 'pickup' orders
+        status_buckets: Optionally only count these status buckets
+
+    Returns:
+        List of dicts with date, order_count, revenue and item_count, one per day with sales
+    """
+    rows = VendorDailySales.objects.filter(vendor_id=vendor_id, date__gte=start_date, date__lte=end_date)
+    if delivery_type:
+        rows = rows.filter(delivery_type=delivery_type)
+    if status_buckets:
+        rows = rows.filter(status_bucket__in=status_buckets)
+    return list(rows.values('date').annotate(
+        order_count=Sum('order_count'), revenue=Sum('revenue'), item_count=Sum('item_count')
+    ).order_by('date'))
+
+
+def get_product_sales(vendor_id, start_date=None, end_date=None, status_buckets=None, order_by='-revenue', limit=None):
+    """
+    Return per-product sales totals of a vendor over a date range.
+
+    Returns:
+        List of dicts with product_service_id, product_service__name, order_count, quantity and revenue
+    """
+    rows = VendorProductDailySales.objects.filter(vendor_id=vendor_id)
+    if start_date is not None:
+        rows = rows.filter(date__gte=start_date)
+    if end_date is not None:
+        rows = rows.filter(date__lte=end_date)
+    if status_buckets:
+        rows = rows.filter(status_bucket__in=status_buckets)
+    rows = rows.values('product_service_id', 'product_service__name').annotate(
+        order_count=Sum('order_count'), quantity=Sum('quantity'), revenue=Sum('revenue')
+    ).order_by(order_by, 'product_service_id')
+    return list(rows[:limit] if limit else rows)
@@ -0,0 +1,239 @@
+"""
+Indexed order search.
+
+Orders are indexed in OrderSearchToken: the words of the order uid, the customer's
+display name and the names of the ordered products, lowercased. A search term
+matches a token it is a prefix of, so each term is an index range scan
+(token >= term AND token < term's successor) within the caller's vendor or
+customer, and no order or customer row is read until the matches are known. This
+works the same on every database backend, unlike SQLite FTS5 or PostgreSQL
+trigram indexes.
+
+Every term must match. A search starts from the query's rarest term, so its cost
+follows the number of orders matching that term rather than the number of orders.
+Results are ranked by the sum over terms of the best matching field weight (uid
+above customer name above product name), doubled for an exact word match, then
+by creation time.
+
+The index is refreshed per order once the transaction changing the order, its
+line items, its customer's name or a product's name commits.
+"""
+import logging
+import re
+from django.db import transaction
+from django.db.models import Case, Exists, F, IntegerField, Max, OuterRef, Q, When
+from Gawulo.transactions import get_transaction_collector
+from .models import Order, OrderLineItem, OrderSearchToken
+
+logger = logging.getLogger(__name__)
+
+# Rank weight of a match on each indexed field
+FIELD_WEIGHTS = {'uid': 4, 'customer': 2, 'product': 1}
+
+MAX_TOKEN_LENGTH = 64
+MAX_QUERY_TERMS = 5
+MAX_CANDIDATES = 1000
+REINDEX_BATCH_SIZE = 500
+
+_WORD_RE = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    """Return the distinct lowercase words of a text, in order of appearance."""
+    if not text:
+        return []
+    return list(dict.fromkeys(word[:MAX_TOKEN_LENGTH] for word in _WORD_RE.findall(str(text).lower())))
+
+
+def _prefix_range(term):
+    """Return the (lower, upper) bounds of the tokens starting with term."""
+    return term, term[:-1] + chr(ord(term[-1]) + 1)
+
+
+def reindex_orders(order_ids):
+    """
+    Rebuild the search tokens of some orders.
+
+    Args:
+        order_ids: Ids of the orders to reindex; ids of deleted orders are ignored
+    """
+    order_ids = list(order_ids)
+    for start in range(0, len(order_ids), REINDEX_BATCH_SIZE):
+        batch = order_ids[start:start + REINDEX_BATCH_SIZE]
+        orders = Order.objects.filter(pk__in=batch).values(
+            'id', 'vendor_id', 'customer_id', 'created_at', 'order_uid', 'customer__display_name'
+        )
+        product_names = {}
+        for order_id, name in OrderLineItem.objects.filter(
+            order_id__in=batch, product_service__isnull=False
+        ).values_list('order_id', 'product_service__name'):
+            product_names.setdefault(order_id, []).append(name)
+
+        tokens = []
+        for order in orders:
+            texts = {
+                'uid': order['order_uid'],
+                'customer': order['customer__display_name'],
+                'product': ' '.join(product_names.get(order['id'], [])),
+            }
+            for field, text in texts.items():
+                tokens.extend(
+                    OrderSearchToken(
+                        order_id=order['id'], vendor_id=order['vendor_id'], customer_id=order['customer_id'],
+                        order_created_at=order['created_at'], field=field, token=token,
+                        weight=FIELD_WEIGHTS[field],
+                    )
+                    for token in tokenize(text)
+                )
+
+        with transaction.atomic():
+            OrderSearchToken.objects.filter(order_id__in=batch).delete()
+            OrderSearchToken.objects.bulk_create(tokens, batch_size=1000)
+
+
+class SearchIndexer:
+    """
+    Collects the orders changed during one transaction.
+
+    Called from transaction.on_commit to reindex each order once.
+    """
+
+    def __init__(self):
+        self.order_ids = set()
+
+    def __call__(self):
+        try:
+            reindex_orders(sorted(self.order_ids))
+        except Exception:
+            # The order change is committed; the next change or a rebuild fixes the index
+            logger.exception("Failed to reindex orders %s", sorted(self.order_ids))
+
+
+def mark_orders_for_reindex(order_ids):
+    """Reindex orders once the current transaction commits."""
+    order_ids = set(order_ids)
+    if not order_ids:
+        return
+
+    indexer = get_transaction_collector('order_search', SearchIndexer)
+    if indexer is None:
+        indexer = SearchIndexer()
+        indexer.order_ids |= order_ids
+        indexer()
+        return
+    indexer.order_ids |= order_ids
+
+
+def _term_filter(term):
+    lower, upper = _prefix_range(term)
+    return Q(token__gte=lower, token__lt=upper)
+
+
+def _plan(query, vendor_id=None, customer_id=None):
+    """
+    Return (terms, scoped tokens, rarest term, whether it is rare) for a query, or None.
+
+    The rarest term is found by counting each term's tokens up to MAX_CANDIDATES,
+    which reads at most that many index entries per term.
+    """
+    terms = tokenize(query)[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    tokens = OrderSearchToken.objects.all()
+    if vendor_id is not None:
+        tokens = tokens.filter(vendor_id=vendor_id)
+    if customer_id is not None:
+        tokens = tokens.filter(customer_id=customer_id)
+    counts = {term: tokens.filter(_term_filter(term))[:MAX_CANDIDATES + 1].count() for term in terms}
+    rarest = min(terms, key=counts.get)
+    return terms, tokens, rarest, counts[rarest] <= MAX_CANDIDATES
+
+
+def _ranked(terms, order_ids):
+    """Score the given orders against every term, keeping those matching all of them."""
+    any_term = Q()
+    term_scores = {}
+    for index, term in enumerate(terms):
+        lower, upper = _prefix_range(term)
+        any_term |= Q(token__gte=lower, token__lt=upper)
+        term_scores[f'term_{index}'] = Max(Case(
+            When(token=term, then=F('weight') * 2),
+            When(token__gte=lower, token__lt=upper, then=F('weight')),
+            default=0,
+            output_field=IntegerField(),
+        ))
+
+    score = sum(F(name) for name in term_scores)
+    # The candidates are already scoped; looking them up by order id reads only their own tokens
+    return OrderSearchToken.objects.filter(any_term, order_id__in=order_ids).values('order_id').annotate(
+        **term_scores, created=Max('order_created_at')
+    ).filter(
+        **{f'{name}__gt': 0 for name in term_scores}
+    ).annotate(score=score).order_by('-score', '-created', '-order_id').values('order_id', 'score')
+
+
+def _candidates(plan, vendor_id=None, customer_id=None):
+    """Return the ids of at most MAX_CANDIDATES orders that may match every term, newest first when capped."""
+    terms, tokens, rarest, rare = plan
+    if rare:
+        return set(tokens.filter(_term_filter(rarest)).values_list('order_id', flat=True))
+    # Every term is common: walk the newest orders, probing the index for each term
+    orders = Order.objects.filter(_exists_all(terms))
+    if vendor_id is not None:
+        orders = orders.filter(vendor_id=vendor_id)
+    if customer_id is not None:
+        orders = orders.filter(customer_id=customer_id)
+    return list(orders.order_by('-created_at', '-id').values_list('id', flat=True)[:MAX_CANDIDATES])
+
+
+def _exists_all(terms):
+    condition = Q()
+    for term in terms:
+        condition &= Q(Exists(OrderSearchToken.objects.filter(_term_filter(term), order_id=OuterRef('pk'))))
+    return condition
+
+
+def match_orders(query, vendor_id=None, customer_id=None):
+    """
+    Find and rank the orders matching every word of a query.
+
+    When every word is common, only the MAX_CANDIDATES most recent matching
+    orders are ranked, which bounds the cost of very common words.
+
+    Args:
+        query: Search text; only its first MAX_QUERY_TERMS words are used
+        vendor_id: Only search this vendor's orders
+        customer_id: Only search this customer's orders
+
+    Returns:
+        Queryset of dicts with order_id and score, best match first, or None if
+        the query has no words
+    """
+    plan = _plan(query, vendor_id, customer_id)
+    if plan is None:
+        return None
+    return _ranked(plan[0], _candidates(plan, vendor_id, customer_id))
+
+
+def search_condition(query, vendor_id=None, customer_id=None):
+    """
+    Return a Q restricting orders to those matching every word of a query, or None.
+
+    When the rarest word matches few orders their ids are looked up in the index
+    first. Otherwise each order is checked with one EXISTS probe per word, which
+    lets a date-ordered, paginated list stop as soon as it has a page.
+    """
+    plan = _plan(query, vendor_id, customer_id)
+    if plan is None:
+        return None
+    terms, _, _, rare = plan
+    if rare:
+        candidates = _candidates(plan, vendor_id, customer_id)
+        return Q(id__in=[match['order_id'] for match in _ranked(terms, candidates)])
+    return _exists_all(terms)
+
+
+def filter_orders_by_search(queryset, query, vendor_id=None, customer_id=None):
+    """Restrict an order queryset to the orders matching a search query."""
+    condition = search_condition(query, vendor_id=vendor_id, customer_id=customer_id)
+    return queryset if condition is None else queryset.filter(condition)
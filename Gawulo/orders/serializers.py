@@ -1,7 +1,11 @@
 from rest_framework import serializers
-from .models import Order, OrderLineItem, OrderStatusHistory, Review, RefundRequest
-from vendors.serializers import VendorSerializer, ProductServiceSerializer
-from vendors.models import ProductService
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils import timezone
+from decimal import Decimal
+from .models import Order, OrderSequence, OrderLineItem, OrderStatusHistory, Review, RefundRequest
+from vendors.serializers import VendorSerializer, ProductServiceSerializer, get_preview_image_url
+from vendors.models import Vendor, ProductService
 from auth_api.models import Customer
 from datetime import timedelta
 
@@ -63,14 +67,96 @@ class OrderSerializer(serializers.ModelSerializer):
             'id', 'order_uid', 'customer', 'customer_name', 'vendor',
             'total_amount', 'current_status', 'is_completed',
             'delivery_type', 'delivery_address', 'delivery_instructions',
-            'estimated_ready_time',
+            'estimated_ready_time', 'version',
             'created_at', 'updated_at', 'line_items',
             'status_history', 'review'
         ]
         read_only_fields = [
-            'id', 'order_uid', 'total_amount', 'created_at', 'updated_at',
+            'id', 'order_uid', 'total_amount', 'version', 'created_at', 'updated_at',
             'line_items', 'status_history', 'review'
         ]
+    
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load everything this serializer reads in a fixed number of queries."""
+        return queryset.select_related(
+            'vendor__user', 'customer', 'review__vendor', 'review__customer'
+        ).prefetch_related(
+            'vendor__images',
+            'vendor__products_services__images',
+            Prefetch('line_items', queryset=OrderLineItem.objects.select_related('product_service__vendor')),
+            'line_items__product_service__images',
+            Prefetch('status_history', queryset=OrderStatusHistory.objects.select_related('confirmed_by_user')),
+        )
+
+
+class OrderVendorSummarySerializer(serializers.ModelSerializer):
+    """Vendor identity shown on an order, without the vendor's menu."""
+    
+    class Meta:
+        model = Vendor
+        fields = ['id', 'name', 'category']
+        read_only_fields = fields
+
+
+class OrderProductSummarySerializer(serializers.ModelSerializer):
+    """Product/service shown on an order line, without its image gallery."""
+    preview_image = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ProductService
+        fields = ['id', 'name', 'description', 'current_price', 'preview_image', 'is_service']
+        read_only_fields = fields
+    
+    def get_preview_image(self, obj):
+        """Return the preview image URL or first image if no preview set."""
+        return get_preview_image_url(obj.preview_image_path, self.context.get('request'))
+
+
+class OrderLineItemSummarySerializer(serializers.ModelSerializer):
+    """Order line with a compact product representation."""
+    product_service = OrderProductSummarySerializer(read_only=True)
+    
+    class Meta:
+        model = OrderLineItem
+        fields = [
+            'id', 'product_service', 'quantity', 'unit_price_snapshot',
+            'discount_applied', 'line_total', 'quantity_fulfilled'
+        ]
+        read_only_fields = fields
+
+
+class OrderSummarySerializer(serializers.ModelSerializer):
+    """
+    Lightweight order representation for list endpoints.
+    
+    Same order fields as OrderSerializer, but the vendor is reduced to its identity
+    and line items to a compact product, so a page does not carry every vendor's
+    full menu. The review is left out; fetch the order detail for it.
+    """
+    vendor = OrderVendorSummarySerializer(read_only=True)
+    line_items = OrderLineItemSummarySerializer(many=True, read_only=True)
+    status_history = OrderStatusHistorySerializer(many=True, read_only=True)
+    customer_name = serializers.CharField(source='customer.display_name', read_only=True)
+    
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'order_uid', 'customer', 'customer_name', 'vendor',
+            'total_amount', 'current_status', 'is_completed',
+            'delivery_type', 'delivery_address', 'delivery_instructions',
+            'estimated_ready_time', 'version',
+            'created_at', 'updated_at', 'line_items', 'status_history'
+        ]
+        read_only_fields = fields
+    
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load everything this serializer reads in a fixed number of queries."""
+        return queryset.select_related('vendor', 'customer').prefetch_related(
+            Prefetch('line_items', queryset=OrderLineItem.objects.select_related('product_service')),
+            Prefetch('status_history', queryset=OrderStatusHistory.objects.select_related('confirmed_by_user')),
+        )
 
 
 class OrderCreateSerializer(serializers.ModelSerializer):
@@ -84,39 +170,83 @@ class OrderCreateSerializer(serializers.ModelSerializer):
             'vendor_id', 'line_items', 'delivery_type', 'delivery_address', 'delivery_instructions'
         ]
     
-    def create(self, validated_data):
-        """Create order with line items."""
-        line_items_data = validated_data.pop('line_items')
-        vendor_id = validated_data.pop('vendor_id', None)  # Optional, will be derived from line items
-        
-        from vendors.models import Vendor, ProductService
-        from auth_api.models import Customer
-        
-        # Validate that we have line items
+    @staticmethod
+    def get_product_service_ids(line_items_data):
+        """Return the product_service_id of every line item, validating that each is present."""
         if not line_items_data:
             raise serializers.ValidationError("At least one line item is required.")
         
-        # Derive vendor from the first line item's product_service
-        first_item_data = line_items_data[0].copy()
-        first_product_service_id = first_item_data.get('product_service_id')
-        if not first_product_service_id:
+        product_service_ids = [item_data.get('product_service_id') for item_data in line_items_data]
+        if not all(product_service_ids):
             raise serializers.ValidationError("product_service_id is required for all line items.")
+        return product_service_ids
+    
+    @staticmethod
+    def fetch_products(product_service_ids):
+        """Load the given products/services (with their vendor) in a single query."""
+        return ProductService.objects.select_related('vendor').in_bulk(set(product_service_ids))
+    
+    def get_customer(self, validated_data):
+        """
+        Return the ordering customer.
+        
+        It should be passed via serializer.save(customer=customer) from the view;
+        if not, it is derived (and created if needed) from the request user.
+        """
+        customer = validated_data.pop('customer', None)
+        if customer:
+            return customer
+        
+        request = self.context.get('request')
+        if not request or not request.user:
+            raise serializers.ValidationError("User must be authenticated to create an order.")
+        
+        # Try to get customer from the user
+        try:
+            return request.user.customer_profile
+        except Customer.DoesNotExist:
+            # If customer profile doesn't exist, create it
+            # Set display_name from user's first_name/last_name or username
+            display_name = None
+            if request.user.first_name or request.user.last_name:
+                display_name = f"{request.user.first_name} {request.user.last_name}".strip()
+            else:
+                display_name = request.user.username or request.user.email.split('@')[0]
+            return Customer.objects.create(user=request.user, display_name=display_name)
+    
+    def build_order(self, validated_data, products, customer):
+        """
+        Validate an order against pre-fetched products and build it without saving.
+        
+        Args:
+            validated_data: Validated order data (line_items, delivery fields, optional vendor_id)
+            products: Dict of ProductService instances keyed by id, vendor pre-selected
+            customer: Customer placing the order
+        
+        Returns:
+            tuple: (unsaved Order with total_amount set, list of unsaved OrderLineItem)
+        """
+        line_items_data = validated_data.pop('line_items')
+        vendor_id = validated_data.pop('vendor_id', None)  # Optional, will be derived from line items
+        
+        product_service_ids = self.get_product_service_ids(line_items_data)
+        missing_ids = sorted(set(product_service_ids) - set(products))
+        if missing_ids:
+            raise serializers.ValidationError(
+                f"Product/Service not found: {', '.join(str(pk) for pk in missing_ids)}."
+            )
         
-        first_product_service = ProductService.objects.get(id=first_product_service_id)
-        vendor = first_product_service.vendor
+        # Derive vendor from the first line item's product_service
+        vendor = products[product_service_ids[0]].vendor
         
-        # Get delivery_type from validated_data
-        delivery_type = validated_data.get('delivery_type', 'delivery')
+        # Ensure delivery_type is explicitly set (default to 'delivery' if not provided)
+        delivery_type = validated_data.pop('delivery_type', 'delivery')
         
         # Validate that all line items belong to the same vendor and are available for delivery_type
         total_preparation_minutes = 0
-        for item_data in line_items_data:
-            product_service_id = item_data.get('product_service_id')
-            if not product_service_id:
-                raise serializers.ValidationError("product_service_id is required for all line items.")
-            
-            product_service = ProductService.objects.get(id=product_service_id)
-            if product_service.vendor != vendor:
+        for product_service_id in product_service_ids:
+            product_service = products[product_service_id]
+            if product_service.vendor_id != vendor.id:
                 raise serializers.ValidationError(
                     f"All line items must belong to the same vendor. "
                     f"Item {product_service.name} belongs to {product_service.vendor.name}, "
@@ -145,53 +275,17 @@ class OrderCreateSerializer(serializers.ModelSerializer):
                 f"Provided vendor_id ({vendor_id}) does not match the vendor from line items ({vendor.id})."
             )
         
-        # Get customer - it should be passed via serializer.save(customer=customer) from the view
-        # If not in validated_data, get from request context
-        customer = validated_data.pop('customer', None)
-        if not customer:
-            request = self.context.get('request')
-            if not request or not request.user:
-                raise serializers.ValidationError("User must be authenticated to create an order.")
-            
-            # Try to get customer from the user
-            try:
-                customer = request.user.customer_profile
-            except Customer.DoesNotExist:
-                # If customer profile doesn't exist, create it
-                # Set display_name from user's first_name/last_name or username
-                display_name = None
-                if request.user.first_name or request.user.last_name:
-                    display_name = f"{request.user.first_name} {request.user.last_name}".strip()
-                else:
-                    display_name = request.user.username or request.user.email.split('@')[0]
-                customer = Customer.objects.create(user=request.user, display_name=display_name)
-        
         # Calculate estimated ready time if we have preparation time
         estimated_ready_time = None
         if total_preparation_minutes > 0:
-            from django.utils import timezone
             estimated_ready_time = timezone.now() + timedelta(minutes=total_preparation_minutes)
         
-        # Ensure delivery_type is explicitly set (default to 'delivery' if not provided)
-        delivery_type = validated_data.pop('delivery_type', 'delivery')
-        
-        # Create order
-        order = Order.objects.create(
-            vendor=vendor,
-            customer=customer,
-            total_amount=0,  # Will be calculated after line items
-            current_status='Confirmed',
-            estimated_ready_time=estimated_ready_time,
-            delivery_type=delivery_type,
-            **validated_data  # Include delivery_address, delivery_instructions if provided
-        )
-        
-        # Create order line items and calculate total
-        from decimal import Decimal
+        # Build line items and calculate the order total
         total_amount = Decimal('0.00')
+        line_items = []
         for item_data in line_items_data:
-            product_service_id = item_data.pop('product_service_id')
-            product_service = ProductService.objects.get(id=product_service_id)
+            item_data = dict(item_data)
+            product_service = products[item_data.pop('product_service_id')]
             
             # Calculate line total
             unit_price = product_service.current_price
@@ -200,27 +294,187 @@ class OrderCreateSerializer(serializers.ModelSerializer):
             line_total = (unit_price * quantity) - discount
             total_amount += line_total
             
-            OrderLineItem.objects.create(
-                order=order,
+            line_items.append(OrderLineItem(
                 product_service=product_service,
                 unit_price_snapshot=unit_price,
                 line_total=line_total,
                 **item_data
-            )
+            ))
+        
+        order = Order(
+            vendor=vendor,
+            customer=customer,
+            total_amount=total_amount,
+            current_status='Confirmed',
+            estimated_ready_time=estimated_ready_time,
+            delivery_type=delivery_type,
+            **validated_data  # Include delivery_address, delivery_instructions if provided
+        )
+        return order, line_items
+    
+    def create(self, validated_data):
+        """
+        Create order with line items.
+        
+        All products are fetched with a single in_bulk() lookup and line items are
+        written with one bulk_create(), so the query count does not grow with the
+        number of items in the cart. The order total is computed up front and
+        written once, and the response is rendered from the rows just written
+        rather than read back.
+        """
+        products = self.fetch_products(self.get_product_service_ids(validated_data.get('line_items')))
+        customer = self.get_customer(validated_data)
+        order, line_items = self.build_order(validated_data, products, customer)
+        
+        from .signals import line_items_bulk_created
+        # Nothing recovers from a failed insert, so a caller's transaction needs no savepoint
+        with transaction.atomic(savepoint=False):
+            order.save()
+            for line_item in line_items:
+                line_item.order = order
+            OrderLineItem.objects.bulk_create(line_items)
+            
+            # Bulk inserts do not fire post_save, so do its work explicitly
+            line_items_bulk_created(line_items)
         
-        # Update order total
-        order.total_amount = total_amount
-        order.save()
+        if all(line_item.pk is not None for line_item in line_items):
+            # Products come with their vendor from fetch_products; only their images are missing
+            product_services = {line_item.product_service_id: line_item.product_service for line_item in line_items}
+            prefetch_related_objects(list(product_services.values()), 'images')
+            cached_line_items = order.line_items.all()
+            cached_line_items._result_cache = sorted(line_items, key=lambda line_item: line_item.pk)
+            cached_line_items._prefetch_done = True
+            order._prefetched_objects_cache = {'line_items': cached_line_items}
+        else:
+            # Backends that cannot return ids from bulk inserts
+            prefetch_related_objects(
+                [order],
+                Prefetch(
+                    'line_items',
+                    queryset=OrderLineItem.objects.select_related('product_service__vendor').prefetch_related('product_service__images')
+                )
+            )
         
         return order
 
 
+class OrderBatchCreateSerializer(serializers.Serializer):
+    """
+    Serializer for submitting several orders in one request.
+    
+    Used by offline-capable clients replaying queued orders. Each entry is validated
+    independently with OrderCreateSerializer; products for the whole batch are fetched
+    with a single query and valid orders, their line items and status history rows
+    are inserted in bulk.
+    """
+    MAX_BATCH_SIZE = 100
+    
+    orders = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=MAX_BATCH_SIZE
+    )
+    
+    def get_customer(self, validated_data):
+        """Return the customer the batch is placed for (see OrderCreateSerializer.get_customer)."""
+        return OrderCreateSerializer(context=self.context).get_customer(validated_data)
+    
+    def create(self, validated_data):
+        """
+        Create all valid orders in the batch.
+        
+        Returns:
+            dict: 'results' with one entry per submitted order (in request order),
+            plus the list of created Order instances under 'orders'.
+        """
+        request = self.context.get('request')
+        customer = self.get_customer(validated_data)
+        results = [None] * len(validated_data['orders'])
+        
+        # Field-level validation of each order
+        pending = []
+        for index, order_data in enumerate(validated_data['orders']):
+            order_serializer = OrderCreateSerializer(data=order_data, context=self.context)
+            if order_serializer.is_valid():
+                pending.append((index, order_serializer))
+            else:
+                results[index] = {'index': index, 'status': 'error', 'errors': order_serializer.errors}
+        
+        # One product lookup for the whole batch
+        product_service_ids = [
+            item_data.get('product_service_id')
+            for _, order_serializer in pending
+            for item_data in order_serializer.validated_data.get('line_items', [])
+        ]
+        products = OrderCreateSerializer.fetch_products(pk for pk in product_service_ids if pk)
+        
+        built = []
+        for index, order_serializer in pending:
+            try:
+                order, line_items = order_serializer.build_order(
+                    dict(order_serializer.validated_data), products, customer
+                )
+            except serializers.ValidationError as e:
+                results[index] = {'index': index, 'status': 'error', 'errors': e.detail}
+                continue
+            built.append((index, order, line_items))
+        
+        orders = [order for _, order, _ in built]
+        if built:
+            with transaction.atomic():
+                for order, order_uid in zip(orders, OrderSequence.next_order_uids(len(orders))):
+                    order.order_uid = order_uid
+                Order.objects.bulk_create(orders)
+                
+                if any(order.pk is None for order in orders):
+                    # Backends that cannot return ids from bulk inserts
+                    ids = dict(Order.objects.filter(
+                        order_uid__in=[order.order_uid for order in orders]
+                    ).values_list('order_uid', 'id'))
+                    for order in orders:
+                        order.pk = ids[order.order_uid]
+                
+                line_items = []
+                for _, order, order_line_items in built:
+                    for line_item in order_line_items:
+                        line_item.order = order
+                        line_items.append(line_item)
+                OrderLineItem.objects.bulk_create(line_items)
+                
+                OrderStatusHistory.objects.bulk_create([
+                    OrderStatusHistory(order=order, status=order.current_status, confirmed_by_user=request.user)
+                    for order in orders
+                ])
+        
+        for index, order, _ in built:
+            results[index] = {
+                'index': index,
+                'status': 'created',
+                'order': {
+                    'id': order.id,
+                    'order_uid': order.order_uid,
+                    'vendor': order.vendor_id,
+                    'total_amount': str(order.total_amount),
+                    'current_status': order.current_status,
+                    'estimated_ready_time': order.estimated_ready_time,
+                    'created_at': order.created_at,
+                },
+            }
+        
+        return {'results': results, 'orders': orders}
+
+
 class OrderStatusUpdateSerializer(serializers.ModelSerializer):
     """Serializer for updating order status."""
+    version = serializers.IntegerField(
+        required=False,
+        help_text='Order version the client last saw; the update is rejected with 409 if it is stale'
+    )
     
     class Meta:
         model = Order
-        fields = ['current_status']
+        fields = ['current_status', 'version']
+        extra_kwargs = {'current_status': {'required': True}}
     
     def validate_current_status(self, value):
         """Validate status transition based on delivery type."""
@@ -0,0 +1,124 @@
+"""
+Order status transition service.
+
+Applies a status change as a compare-and-swap on (current_status, version), so two
+concurrent actions on the same order (e.g. a vendor advancing it while the customer
+cancels) cannot silently overwrite each other, and appends the status history row
+in the same round trip.
+"""
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Order, OrderStatusHistory
+from .signals import queue_order_broadcast
+from .stats import record_order_changed
+from .rollups import rollup_order_changed
+from .dashboard_cache import invalidate_dashboards
+
+
+class OrderStatusConflict(Exception):
+    """
+    Raised when the order changed between being read and being updated.
+
+    Carries the order's current status and version so the client can refresh.
+    """
+
+    def __init__(self, order_id, current_status=None, version=None):
+        self.order_id = order_id
+        self.current_status = current_status
+        self.version = version
+        super().__init__("The order was changed by someone else. Reload it and try again.")
+
+
+def _update_and_log(order, new_status, user, expected_status, expected_version, now):
+    """
+    Run the conditional UPDATE and the history INSERT.
+
+    Returns:
+        int or None: The new history row id, or None if the compare failed
+    """
+    is_completed = new_status in Order.COMPLETED_STATUSES
+
+    if connection.vendor == 'postgresql':
+        # Single statement: the INSERT only sees a row if the UPDATE matched
+        qn = connection.ops.quote_name
+        order_table = qn(Order._meta.db_table)
+        history_table = qn(OrderStatusHistory._meta.db_table)
+        timestamp = connection.ops.adapt_datetimefield_value(now)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"WITH updated AS ("
+                f"UPDATE {order_table} SET current_status = %s, is_completed = %s, "
+                f"version = version + 1, updated_at = %s "
+                f"WHERE id = %s AND current_status = %s AND version = %s RETURNING id"
+                f") INSERT INTO {history_table} (order_id, status, timestamp, confirmed_by_user_id) "
+                f"SELECT id, %s, %s, %s FROM updated RETURNING id",
+                [new_status, is_completed, timestamp, order.pk, expected_status, expected_version,
+                 new_status, timestamp, user.pk]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    updated = Order.objects.filter(
+        pk=order.pk, current_status=expected_status, version=expected_version
+    ).update(
+        current_status=new_status,
+        is_completed=is_completed,
+        version=F('version') + 1,
+        updated_at=now,
+    )
+    if not updated:
+        return None
+    return OrderStatusHistory.objects.create(
+        order_id=order.pk, status=new_status, timestamp=now, confirmed_by_user=user
+    ).pk
+
+
+def transition_order_status(order, new_status, user, expected_version=None):
+    """
+    Move an order to a new status if nobody changed it since it was read.
+
+    Transition rules are validated by the caller against the order as loaded; the
+    compare-and-swap guarantees they still hold when the row is written.
+
+    Args:
+        order: Order as loaded by the caller; updated in place on success
+        new_status: Status to move to
+        user: User confirming the change (recorded in the status history)
+        expected_version: Version the client last saw (defaults to order.version)
+
+    Returns:
+        OrderStatusHistory: The history row appended for the change
+
+    Raises:
+        OrderStatusConflict: If the order's status or version no longer match
+    """
+    expected_version = order.version if expected_version is None else expected_version
+    if expected_version != order.version:
+        raise OrderStatusConflict(order.pk, order.current_status, order.version)
+
+    now = timezone.now()
+    with transaction.atomic():
+        history_id = _update_and_log(order, new_status, user, order.current_status, expected_version, now)
+        if history_id is None:
+            current = Order.objects.filter(pk=order.pk).values('current_status', 'version').first() or {}
+            raise OrderStatusConflict(order.pk, current.get('current_status'), current.get('version'))
+
+        previous_status = order.current_status
+        order.current_status = new_status
+        order.is_completed = new_status in Order.COMPLETED_STATUSES
+        order.version = expected_version + 1
+        order.updated_at = now
+
+        # The UPDATE bypasses save(), so record the outbox event, stats and rollup changes explicitly
+        queue_order_broadcast(order, 'order_update')
+        record_order_changed(order, previous_status, order.total_amount)
+        rollup_order_changed(order, previous_status, order.delivery_type, order.total_amount)
+        invalidate_dashboards(order.vendor_id, order.customer_id)
+        order.reset_loaded_values()
+
+    history = OrderStatusHistory(
+        id=history_id, order=order, status=new_status, timestamp=now, confirmed_by_user=user
+    )
+    history._state.adding = False
+    return history
@@ -1,89 +1,295 @@
 """
 Django signals for broadcasting order updates via WebSocket.
+
+Order writes do not broadcast themselves. Each save records an OrderEventOutbox
+row holding the changed fields in the same transaction, and the
+dispatch_order_events worker sends it to the channel layer, so the HTTP write path
+never waits on Redis and rolled-back writes never reach clients. A per-transaction
+collector (Gawulo.transactions) keeps one outbox row per order. Status history rows are not announced
+separately: a status change is carried by the order's current_status delta.
 """
-from django.db.models.signals import post_save, pre_save
+import logging
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.utils import timezone
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from .models import Order, OrderStatusHistory
-from .serializers import OrderSerializer
+from Gawulo.transactions import get_transaction_collector
+from .models import Order, OrderEventOutbox, OrderLineItem, Review
+from .outbox import build_order_event, dispatch_pending_events
+from .stats import record_order_created, record_order_changed, invalidate_order_stats
+from .rollups import (
+    rollup_line_item_changed, rollup_line_items_created, rollup_order_changed, rollup_order_created,
+    rollup_order_deleted, rollup_orders_created,
+)
+from .dashboard_cache import invalidate_dashboards
+from .search import mark_orders_for_reindex, tokenize
 
+logger = logging.getLogger(__name__)
 
-@receiver(post_save, sender=OrderStatusHistory)
-def order_status_history_created(sender, instance, created, **kwargs):
-    """Broadcast order update when status history is created."""
-    if created:
-        order = instance.order
-        broadcast_order_update(order, 'order_update')
 
+class OrderEventCollector:
+    """
+    Records the outbox rows written during one transaction.
+
+    Rows are keyed by order id. A second save of the same order in the transaction
+    merges its changes into the existing row, and 'new_order' wins over
+    'order_update'. Called from transaction.on_commit to dispatch the new events
+    straight away in inline mode.
+    """
+
+    def __init__(self):
+        self.events = {}
+
+    def add(self, events):
+        """Write outbox rows, merging into any row already written for the same order."""
+        new_events = []
+        for event in events:
+            existing = self.events.get(event.order_id)
+            if existing is None:
+                self.events[event.order_id] = event
+                new_events.append(event)
+                continue
+
+            if event.event_type == 'new_order':
+                existing.event_type = 'new_order'
+            existing.changes = {**existing.changes, **event.changes}
+            existing.version = event.version
+            OrderEventOutbox.objects.filter(pk=existing.pk).update(
+                event_type=existing.event_type, changes=existing.changes, version=existing.version
+            )
+
+        if len(new_events) == 1:
+            new_events[0].save()
+        elif new_events:
+            OrderEventOutbox.objects.bulk_create(new_events)
+
+    def __call__(self):
+        """Finish the transaction (runs from transaction.on_commit)."""
+        if not self.events or not settings.ORDER_EVENTS_DISPATCH_INLINE:
+            return
 
-@receiver(pre_save, sender=Order)
-def order_status_changed(sender, instance, **kwargs):
-    """Detect and broadcast order status changes."""
-    if instance.pk:
         try:
-            old_order = Order.objects.get(pk=instance.pk)
-            if old_order.current_status != instance.current_status:
-                # Status changed, broadcast update
-                broadcast_order_update(instance, 'order_update')
-        except Order.DoesNotExist:
-            pass
-    else:
-        # New order created
-        pass
+            dispatch_pending_events(batch_size=len(self.events), order_ids=list(self.events))
+        except Exception:
+            # The events stay pending for the worker; the write has already been committed
+            logger.exception("Inline dispatch failed for orders %s", list(self.events))
+
+
+def queue_order_broadcasts(orders, message_type):
+    """
+    Record an event for each order in the outbox as part of the current transaction.
+
+    Outside of a transaction each call writes (and in inline mode dispatches) its
+    own events.
+    """
+    events = [build_order_event(order, message_type) for order in orders]
+
+    collector = get_transaction_collector('order_events', OrderEventCollector)
+    if collector is None:
+        collector = OrderEventCollector()
+        collector.add(events)
+        collector()
+        return
+    collector.add(events)
+
+
+def queue_order_broadcast(order, message_type):
+    """Record a single order event in the outbox."""
+    queue_order_broadcasts([order], message_type)
+
+
+def orders_bulk_created(orders):
+    """
+    Do what post_save does for new orders, for orders inserted with bulk_create.
+
+    Records their outbox events, stats and sales rollup changes (line items
+    included, so call it once they are inserted), and queues their dashboard and
+    search index refreshes.
+    """
+    queue_order_broadcasts(orders, 'new_order')
+    for order in orders:
+        record_order_created(order)
+        invalidate_dashboards(order.vendor_id, order.customer_id)
+    rollup_orders_created(orders)
+    mark_orders_for_reindex(order.pk for order in orders)
+
+
+def line_items_bulk_created(line_items):
+    """
+    Do what post_save does for new line items, for line items inserted with bulk_create.
+
+    Only for line items of orders created in the same transaction (the items are
+    assumed to be the first of their products in their order).
+    """
+    rollup_line_items_created(line_items)
+    for line_item in line_items:
+        invalidate_dashboards(line_item.order.vendor_id, line_item.order.customer_id)
+    mark_orders_for_reindex({line_item.order_id for line_item in line_items})
 
 
 @receiver(post_save, sender=Order)
 def order_created_or_updated(sender, instance, created, **kwargs):
     """Broadcast new order or order update."""
+    queue_order_broadcast(instance, 'new_order' if created else 'order_update')
+
+
+@receiver(post_save, sender=Order)
+def update_order_stats(sender, instance, created, **kwargs):
+    """Keep the cached order stats counters of the vendor and customer in step."""
+    if created:
+        record_order_created(instance)
+        return
+    loaded = instance.get_loaded_values()
+    if loaded is None or 'current_status' not in loaded or 'total_amount' not in loaded:
+        invalidate_order_stats(instance)
+    else:
+        record_order_changed(instance, loaded['current_status'], loaded['total_amount'])
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    """Drop the cached order stats counters of the vendor and customer."""
+    invalidate_order_stats(instance)
+
+
+# Order fields the sales rollups need to move an updated order between rows
+ROLLUP_ORDER_FIELDS = ('current_status', 'delivery_type', 'total_amount')
+
+
+@receiver(post_save, sender=Order)
+def order_sales_changed(sender, instance, created, **kwargs):
+    """Apply the order change to the vendor's sales rollup and refresh dashboards after commit."""
     if created:
-        broadcast_order_update(instance, 'new_order')
+        rollup_order_created(instance)
     else:
-        # Check if this is a significant update (not just status change which is handled above)
-        broadcast_order_update(instance, 'order_update')
+        loaded = instance.get_loaded_values() or {}
+        if all(name in loaded for name in ROLLUP_ORDER_FIELDS):
+            rollup_order_changed(instance, *(loaded[name] for name in ROLLUP_ORDER_FIELDS))
+        else:
+            logger.warning(
+                "Order %s was saved without its loaded %s; run rebuild_sales_rollups to repair its sales rollup",
+                instance.pk, ', '.join(ROLLUP_ORDER_FIELDS)
+            )
+    invalidate_dashboards(instance.vendor_id, instance.customer_id)
+
+
+@receiver(post_delete, sender=Order)
+def order_sales_deleted(sender, instance, **kwargs):
+    """Take a deleted order out of the vendor's sales rollup and refresh dashboards after commit."""
+    loaded = instance.get_loaded_values() or {}
+    rollup_order_deleted(instance, *(loaded.get(name) for name in ROLLUP_ORDER_FIELDS))
+    invalidate_dashboards(instance.vendor_id, instance.customer_id)
+
+
+def _get_line_item_order(line_item):
+    """Return the line item's order, loading only the fields rollups and dashboards read if it is not cached."""
+    if OrderLineItem.order.is_cached(line_item):
+        return line_item.order
+    return Order.objects.filter(pk=line_item.order_id).only(
+        'vendor_id', 'customer_id', 'created_at', *ROLLUP_ORDER_FIELDS
+    ).first()
+
+
+def _count_product_items(order_id, product_service_id):
+    return OrderLineItem.objects.filter(order_id=order_id, product_service_id=product_service_id).count()
+
+
+def _rollup_line_item_added(order, product_service_id, quantity, line_total):
+    """Count a line item's product, quantity and total in the rollup."""
+    first = product_service_id is not None and _count_product_items(order.pk, product_service_id) == 1
+    rollup_line_item_changed(order, product_service_id, quantity, line_total, order_count=1 if first else 0)
+
+
+def _rollup_line_item_removed(order, product_service_id, quantity, line_total):
+    """Take a line item's product, quantity and total out of the rollup."""
+    last = product_service_id is not None and _count_product_items(order.pk, product_service_id) == 0
+    rollup_line_item_changed(order, product_service_id, -quantity, -line_total, order_count=-1 if last else 0)
+
+
+@receiver(post_save, sender=OrderLineItem)
+def line_item_saved(sender, instance, created, **kwargs):
+    """Apply the line item change to the sales rollup; refresh dashboards and the search index after commit."""
+    order = _get_line_item_order(instance)
+    if order is not None:
+        loaded = instance.get_loaded_values()
+        if created:
+            _rollup_line_item_added(order, instance.product_service_id, instance.quantity, instance.line_total)
+        elif loaded is None or len(loaded) < len(OrderLineItem.tracked_fields):
+            logger.warning(
+                "Line item %s was saved without its loaded %s; run rebuild_sales_rollups to repair its sales rollup",
+                instance.pk, ', '.join(OrderLineItem.tracked_fields)
+            )
+        elif loaded['product_service_id'] != instance.product_service_id:
+            _rollup_line_item_removed(order, loaded['product_service_id'], loaded['quantity'], loaded['line_total'])
+            _rollup_line_item_added(order, instance.product_service_id, instance.quantity, instance.line_total)
+        elif loaded['quantity'] != instance.quantity or loaded['line_total'] != instance.line_total:
+            rollup_line_item_changed(
+                order, instance.product_service_id,
+                instance.quantity - loaded['quantity'], instance.line_total - loaded['line_total'],
+            )
+        invalidate_dashboards(order.vendor_id, order.customer_id)
+    mark_orders_for_reindex([instance.order_id])
+
+
+@receiver(post_delete, sender=OrderLineItem)
+def line_item_deleted(sender, instance, **kwargs):
+    """Take the line item out of the sales rollup; refresh dashboards and the search index after commit."""
+    order = _get_line_item_order(instance)
+    if order is not None:
+        loaded = instance.get_loaded_values() or {}
+        _rollup_line_item_removed(
+            order, *(loaded.get(name, getattr(instance, name)) for name in OrderLineItem.tracked_fields)
+        )
+        invalidate_dashboards(order.vendor_id, order.customer_id)
+    mark_orders_for_reindex([instance.order_id])
+
 
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    """Refresh the dashboards of the reviewed vendor and the reviewer after commit."""
+    invalidate_dashboards(instance.vendor_id, instance.customer_id)
 
-def broadcast_order_update(order, message_type):
-    """Broadcast order update to vendor and customer channel groups."""
-    channel_layer = get_channel_layer()
-    if not channel_layer:
+
+@receiver(post_save, sender='vendors.Vendor')
+@receiver(post_delete, sender='vendors.Vendor')
+def vendor_changed(sender, instance, **kwargs):
+    """Refresh the vendor's dashboard (name, rating) after commit."""
+    invalidate_dashboards(vendor_id=instance.pk)
+
+
+@receiver(post_save, sender='vendors.ProductService')
+@receiver(post_delete, sender='vendors.ProductService')
+def product_service_changed(sender, instance, **kwargs):
+    """Refresh the vendor's dashboard (product count and names) after commit."""
+    invalidate_dashboards(vendor_id=instance.vendor_id)
+
+
+@receiver(post_save, sender=Order)
+def index_new_order(sender, instance, created, **kwargs):
+    """Add a new order to the search index after commit."""
+    if created:
+        mark_orders_for_reindex([instance.pk])
+
+
+@receiver(post_save, sender='auth_api.Customer')
+def customer_name_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Reindex a customer's orders after commit when their display name changes."""
+    if created or (update_fields is not None and 'display_name' not in update_fields):
         return
-    
-    # Serialize order
-    serializer = OrderSerializer(order)
-    order_data = serializer.data
-    
-    # Get vendor and customer IDs
-    vendor_id = order.vendor.id
-    customer_id = order.customer.id
-    
-    # Prepare message
-    message = {
-        'type': message_type,
-        'order': order_data,
-        'timestamp': timezone.now().isoformat()
-    }
-    
-    # Broadcast to vendor channel
-    vendor_group_name = f'vendor_{vendor_id}_orders'
-    async_to_sync(channel_layer.group_send)(
-        vendor_group_name,
-        {
-            'type': message_type,
-            'order': order_data,
-            'timestamp': message['timestamp']
-        }
-    )
-    
-    # Broadcast to customer channel
-    customer_group_name = f'customer_{customer_id}_orders'
-    async_to_sync(channel_layer.group_send)(
-        customer_group_name,
-        {
-            'type': message_type,
-            'order': order_data,
-            'timestamp': message['timestamp']
-        }
-    )
+    loaded = instance.get_loaded_values() or {}
+    if 'display_name' in loaded and tokenize(loaded['display_name']) == tokenize(instance.display_name):
+        return
+    mark_orders_for_reindex(Order.objects.filter(customer_id=instance.pk).values_list('pk', flat=True))
 
+
+@receiver(post_save, sender='vendors.ProductService')
+def product_name_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Reindex the orders containing a product after commit when its name changes."""
+    if created or (update_fields is not None and 'name' not in update_fields):
+        return
+    loaded = instance.get_loaded_values() or {}
+    if 'name' in loaded and tokenize(loaded['name']) == tokenize(instance.name):
+        return
+    mark_orders_for_reindex(
+        OrderLineItem.objects.filter(product_service=instance).values_list('order_id', flat=True).distinct()
+    )
@@ -0,0 +1,248 @@
+"""
+Order statistics for customers and vendors.
+
+aggregate_order_figures() computes everything OrderStatsView returns with a single
+grouped aggregation. OrderStatsCounters keeps the same figures per customer and per
+vendor as cache counters that are adjusted after each committed order change, so
+repeated reads are served without touching the orders table. The counters are only
+kept when every worker shares the cache (settings.CACHE_IS_SHARED); otherwise a
+worker would serve counts missing the changes other workers applied, so every
+read runs the aggregation.
+
+"Recent" orders are those created in the last RECENT_ORDER_DAYS calendar days
+(today included, in the project time zone), counted in one bucket per day so the
+window can be maintained incrementally.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from .models import Order
+from .dashboard_cache import bump_generation
+
+RECENT_ORDER_DAYS = 7
+
+# Orders counted towards vendor revenue
+REVENUE_STATUSES = ('Delivered', 'PickedUp')
+
+
+def get_recent_days(today=None):
+    """Return the dates of the recent window, oldest first."""
+    today = today or timezone.localdate()
+    return [today - timedelta(days=offset) for offset in range(RECENT_ORDER_DAYS - 1, -1, -1)]
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _to_cents(amount):
+    return int((amount or Decimal('0')) * 100)
+
+
+def aggregate_order_figures(orders):
+    """
+    Compute order figures with one query.
+
+    Args:
+        orders: Order queryset to aggregate (e.g. one customer's orders)
+
+    Returns:
+        Dict with 'total', 'by_status', 'revenue_cents' and 'days' (date -> orders created)
+    """
+    days = get_recent_days()
+    aggregates = {'total': Count('id'), 'revenue': Sum('total_amount', filter=Q(current_status__in=REVENUE_STATUSES))}
+    for value, _ in Order.ORDER_STATUS:
+        aggregates[f'status_{value}'] = Count('id', filter=Q(current_status=value))
+    for day in days:
+        aggregates[f'day_{day.isoformat()}'] = Count(
+            'id', filter=Q(created_at__gte=_day_start(day), created_at__lt=_day_start(day + timedelta(days=1)))
+        )
+
+    row = orders.aggregate(**aggregates)
+    return {
+        'total': row['total'],
+        'by_status': {value: row[f'status_{value}'] for value, _ in Order.ORDER_STATUS},
+        'revenue_cents': _to_cents(row['revenue']),
+        'days': {day: row[f'day_{day.isoformat()}'] for day in days},
+    }
+
+
+def build_stats_payload(figures, include_revenue=False):
+    """Shape order figures as the OrderStatsView response."""
+    stats = {
+        'total_orders': figures['total'],
+        'by_status': figures['by_status'],
+        'recent_orders_count': sum(figures['days'].get(day, 0) for day in get_recent_days()),
+    }
+    if include_revenue:
+        stats['total_revenue'] = figures['revenue_cents'] / 100
+    return stats
+
+
+class OrderStatsCounters:
+    """
+    Cached order counters for one customer or vendor.
+
+    Counters are seeded from aggregate_order_figures() on the first read and then
+    adjusted with atomic cache increments. The whole set expires after
+    ORDER_STATS_COUNTER_TIMEOUT seconds and is reseeded, which also bounds drift
+    from an update racing with a reseed.
+    """
+
+    def __init__(self, role, actor_id):
+        self.role, self.actor_id = role, actor_id
+        self.prefix = f'orders:stats:{role}:{actor_id}:'
+
+    def key(self, name):
+        return self.prefix + name
+
+    def day_key(self, day):
+        return self.key(f'day:{day.isoformat()}')
+
+    @property
+    def required_names(self):
+        return ['total', 'revenue', *(f'status:{value}' for value, _ in Order.ORDER_STATUS)]
+
+    def read(self):
+        """Return the cached figures, or None if they are not (fully) cached."""
+        days = get_recent_days()
+        keys = [self.key('seeded'), *map(self.key, self.required_names), *map(self.day_key, days)]
+        values = cache.get_many(keys)
+
+        seeded_on = values.get(self.key('seeded'))
+        if seeded_on is None or any(self.key(name) not in values for name in self.required_names):
+            return None
+        # Buckets up to the seed date were written when seeding; later ones only exist once used
+        if any(day <= seeded_on and self.day_key(day) not in values for day in days):
+            return None
+
+        return {
+            'total': values[self.key('total')],
+            'by_status': {value: values[self.key(f'status:{value}')] for value, _ in Order.ORDER_STATUS},
+            'revenue_cents': values[self.key('revenue')],
+            'days': {day: values.get(self.day_key(day), 0) for day in days},
+        }
+
+    def seed(self, figures):
+        """Store freshly aggregated figures as the counters."""
+        timeout = settings.ORDER_STATS_COUNTER_TIMEOUT
+        values = {
+            self.key('total'): figures['total'],
+            self.key('revenue'): figures['revenue_cents'],
+        }
+        for value, count in figures['by_status'].items():
+            values[self.key(f'status:{value}')] = count
+        for day, count in figures['days'].items():
+            values[self.day_key(day)] = count
+        cache.set_many(values, timeout)
+        # Written last, so a reader never sees a marker without its counters
+        cache.set(self.key('seeded'), max(figures['days']), timeout)
+
+    def invalidate(self):
+        cache.delete(self.key('seeded'))
+        bump_generation(self.role, self.actor_id)
+
+    def apply(self, total=0, statuses=None, revenue_cents=0, created_on=None):
+        """
+        Adjust the counters, if they are cached.
+
+        Args:
+            total: Change in the number of orders
+            statuses: Dict of status -> change in count
+            revenue_cents: Change in revenue
+            created_on: Local date of a newly created order
+        """
+        if cache.get(self.key('seeded')) is None:
+            return
+        deltas = {'total': total, 'revenue': revenue_cents}
+        for value, delta in (statuses or {}).items():
+            deltas[f'status:{value}'] = delta
+        try:
+            for name, delta in deltas.items():
+                if delta:
+                    cache.incr(self.key(name), delta)
+            if created_on is not None:
+                cache.add(self.day_key(created_on), 0, settings.ORDER_STATS_COUNTER_TIMEOUT)
+                cache.incr(self.day_key(created_on))
+        except ValueError:
+            # A counter was evicted; reseed on the next read
+            self.invalidate()
+            return
+        # Cached dashboard payloads were built from the old counts
+        bump_generation(self.role, self.actor_id)
+
+
+def get_order_stats(role, actor_id, orders, include_revenue=False):
+    """
+    Return the OrderStatsView payload for a customer or vendor.
+
+    Served from OrderStatsCounters when cached; otherwise aggregated with one
+    query and used to seed the counters.
+    """
+    if not settings.CACHE_IS_SHARED:
+        return build_stats_payload(aggregate_order_figures(orders), include_revenue)
+    counters = OrderStatsCounters(role, actor_id)
+    figures = counters.read()
+    if figures is None:
+        figures = aggregate_order_figures(orders)
+        counters.seed(figures)
+    return build_stats_payload(figures, include_revenue)
+
+
+def _counters_for(order):
+    return (
+        OrderStatsCounters('vendor', order.vendor_id),
+        OrderStatsCounters('customer', order.customer_id),
+    )
+
+
+def record_order_created(order):
+    """Count a new order once the transaction creating it commits."""
+    if not settings.CACHE_IS_SHARED:
+        return
+    status = order.current_status
+    revenue = _to_cents(order.total_amount) if status in REVENUE_STATUSES else 0
+    created_on = timezone.localdate(order.created_at)
+
+    def apply():
+        for counters in _counters_for(order):
+            counters.apply(total=1, statuses={status: 1}, revenue_cents=revenue, created_on=created_on)
+
+    transaction.on_commit(apply)
+
+
+def record_order_changed(order, old_status, old_amount):
+    """Move an order between status counters (and adjust revenue) once the change commits."""
+    if not settings.CACHE_IS_SHARED:
+        return
+    new_status, new_amount = order.current_status, order.total_amount
+    revenue = 0
+    if old_status in REVENUE_STATUSES:
+        revenue -= _to_cents(old_amount)
+    if new_status in REVENUE_STATUSES:
+        revenue += _to_cents(new_amount)
+    statuses = {} if old_status == new_status else {old_status: -1, new_status: 1}
+    if not statuses and not revenue:
+        return
+
+    def apply():
+        for counters in _counters_for(order):
+            counters.apply(statuses=statuses, revenue_cents=revenue)
+
+    transaction.on_commit(apply)
+
+
+def invalidate_order_stats(order):
+    """Drop the cached counters of the order's vendor and customer once the change commits."""
+    if not settings.CACHE_IS_SHARED:
+        return
+
+    def invalidate():
+        for counters in _counters_for(order):
+            counters.invalidate()
+
+    transaction.on_commit(invalidate)
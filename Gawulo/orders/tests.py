@@ -1,3 +1,603 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+from auth_api.models import Customer
+from Gawulo.transactions import get_transaction_collector
+from vendors.models import ProductService, Vendor
+from .models import (
+    Order, OrderLineItem, OrderSearchToken, OrderStatusHistory, VendorDailySales, VendorProductDailySales,
+)
+from .rollups import rebuild_rollups, rollup_date
+from .search import match_orders, reindex_orders, tokenize
+from .serializers import OrderCreateSerializer
+from .services import OrderStatusConflict, transition_order_status
+from .stats import OrderStatsCounters, aggregate_order_figures, get_order_stats
 
-# Create your tests here.
+
+class OrderFixtures:
+    """A vendor with ten products and a customer ordering from it."""
+
+    @classmethod
+    def create_fixtures(cls):
+        vendor_user = User.objects.create_user('vendor', 'vendor@example.com', 'password')
+        cls.user = User.objects.create_user('customer', 'customer@example.com', 'password')
+        cls.vendor = Vendor.objects.create(user=vendor_user, name='Test Kitchen', category='food')
+        cls.customer = Customer.objects.create(user=cls.user, display_name='Test Customer')
+        cls.products = [
+            ProductService.objects.create(vendor=cls.vendor, name=f'Item {i}', current_price=Decimal('12.50'))
+            for i in range(10)
+        ]
+
+    def create_order(self, products, commit=True):
+        """Create an order through the API serializer, running its on-commit work unless commit is False."""
+        request = APIRequestFactory().post('/api/orders/create/')
+        request.user = self.user
+        serializer = OrderCreateSerializer(
+            data={'line_items': [{'product_service_id': product.pk, 'quantity': 2} for product in products]},
+            context={'request': request},
+        )
+        serializer.is_valid(raise_exception=True)
+        if not commit:
+            return serializer.save(customer=self.customer)
+        with self.committing():
+            return serializer.save(customer=self.customer)
+
+
+class OrderTestCase(OrderFixtures, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+
+    def committing(self):
+        return self.captureOnCommitCallbacks(execute=True)
+
+
+class OrderTransactionTestCase(OrderFixtures, TransactionTestCase):
+    """
+    For tests spanning several transactions.
+
+    Under TestCase every write shares the test's transaction, so work collected per
+    transaction (search reindexing, dashboard invalidation) would pile up in one
+    collector; here each write commits and runs its on-commit work as in production.
+    """
+
+    def setUp(self):
+        self.create_fixtures()
+
+    def committing(self):
+        return transaction.atomic()
+
+
+class OrderCreateQueryCountTests(OrderTestCase):
+    """Creating an order issues a fixed number of queries, however many line items it has."""
+
+    # Products, order uid, order, outbox row, line items, two daily and two product
+    # rollup writes, product images for the response. Work run on commit (outbox
+    # dispatch, search index) is not counted.
+    CREATE_QUERIES = 10
+
+    def test_query_count_does_not_grow_with_line_items(self):
+        # The first order of the day also inserts the vendor's daily sales row
+        self.create_order(self.products[:1], commit=False)
+
+        for count in (1, 5, 10):
+            with self.subTest(line_items=count), self.assertNumQueries(self.CREATE_QUERIES):
+                order = self.create_order(self.products[:count], commit=False)
+            self.assertEqual(order.line_items.count(), count)
+
+    def test_response_matches_the_stored_order(self):
+        order = self.create_order(self.products[:3])
+        data = OrderCreateSerializer(order).data
+        stored = OrderCreateSerializer(Order.objects.get(pk=order.pk)).data
+        self.assertEqual(data, stored)
+        self.assertEqual([item['product_service']['id'] for item in data['line_items']],
+                         [product.pk for product in self.products[:3]])
+
+
+class OrderBatchCreateTests(OrderTestCase):
+    """Each order of a batch succeeds or fails on its own."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post_batch(self, orders):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/orders/batch/', {'orders': orders}, format='json')
+
+    def test_invalid_orders_do_not_block_valid_ones(self):
+        other_vendor = Vendor.objects.create(
+            user=User.objects.create_user('other', 'other@example.com', 'password'), name='Other', category='food'
+        )
+        other_product = ProductService.objects.create(vendor=other_vendor, name='Other item', current_price=Decimal('5.00'))
+        response = self.post_batch([
+            {'line_items': [{'product_service_id': self.products[0].pk, 'quantity': 2}]},
+            {'line_items': []},
+            {'line_items': [{'product_service_id': 0, 'quantity': 1}]},
+            {'line_items': [
+                {'product_service_id': self.products[1].pk, 'quantity': 1},
+                {'product_service_id': other_product.pk, 'quantity': 1},
+            ]},
+            {'line_items': [
+                {'product_service_id': self.products[2].pk, 'quantity': 1},
+                {'product_service_id': self.products[3].pk, 'quantity': 3},
+            ]},
+        ])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created_count'], response.data['error_count']), (2, 3))
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['created', 'error', 'error', 'error', 'created'],
+        )
+        self.assertEqual([result['index'] for result in response.data['results']], [0, 1, 2, 3, 4])
+
+        created = [result['order'] for result in response.data['results'] if result['status'] == 'created']
+        orders = Order.objects.filter(pk__in=[order['id'] for order in created]).order_by('pk')
+        self.assertEqual([order.order_uid for order in orders], [order['order_uid'] for order in created])
+        self.assertEqual([order.total_amount for order in orders], [Decimal('25.00'), Decimal('50.00')])
+        self.assertEqual(OrderLineItem.objects.filter(order__in=orders).count(), 3)
+        self.assertEqual(OrderStatusHistory.objects.filter(order__in=orders).count(), 2)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_batch_without_valid_orders_is_rejected(self):
+        response = self.post_batch([{'line_items': []}, {'line_items': [{'product_service_id': 0}]}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created_count'], 0)
+        self.assertFalse(Order.objects.exists())
+
+
+class OrderCursorPaginationTests(OrderTestCase):
+    """Order lists page through a (created_at, id) cursor in either direction."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        orders = [self.create_order(self.products[:1]) for _ in range(5)]
+        # Three orders created in the same instant are told apart by id
+        moment = timezone.now() - timedelta(hours=1)
+        for offset, order in zip((0, 0, 0, 1, 2), orders):
+            Order.objects.filter(pk=order.pk).update(created_at=moment + timedelta(minutes=offset))
+        self.ids = [order.pk for order in orders]
+
+    def walk(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([order['id'] for order in response.data['results']])
+            url = response.data['next']
+        return pages, response.data['previous']
+
+    def test_pages_newest_first(self):
+        pages, previous = self.walk('/api/orders/my-orders/?page_size=2')
+
+        self.assertEqual(pages, [[self.ids[4], self.ids[3]], [self.ids[2], self.ids[1]], [self.ids[0]]])
+        # Walking back from the last page returns the same pages
+        response = self.client.get(previous)
+        self.assertEqual([order['id'] for order in response.data['results']], pages[1])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([order['id'] for order in response.data['results']], pages[0])
+        self.assertIsNone(response.data['previous'])
+
+    def test_pages_oldest_first(self):
+        pages, _ = self.walk('/api/orders/my-orders/?page_size=2&ordering=created_at')
+
+        self.assertEqual(pages, [self.ids[:2], self.ids[2:4], self.ids[4:]])
+
+    def test_ordering_outside_the_allow_list_is_rejected(self):
+        for ordering in ('total_amount', '-id', 'customer__user__password'):
+            with self.subTest(ordering=ordering):
+                response = self.client.get(f'/api/orders/my-orders/?ordering={ordering}')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('ordering', response.data)
+
+    def test_malformed_cursor_is_not_found(self):
+        self.assertEqual(self.client.get('/api/orders/my-orders/?cursor=not-a-cursor').status_code, 404)
+
+
+class OrderVersionTests(TestCase):
+    """Every save of an order is one UPDATE that gives it a version no other save has."""
+
+    @classmethod
+    def setUpTestData(cls):
+        vendor_user = User.objects.create_user('vendor', 'vendor@example.com', 'password')
+        customer_user = User.objects.create_user('customer', 'customer@example.com', 'password')
+        vendor = Vendor.objects.create(user=vendor_user, name='Test Kitchen', category='food')
+        customer = Customer.objects.create(user=customer_user, display_name='Test Customer')
+        cls.order = Order.objects.create(vendor=vendor, customer=customer, total_amount=Decimal('25.00'))
+
+    def assertVersionedSaves(self):
+        first, second = Order.objects.get(pk=self.order.pk), Order.objects.get(pk=self.order.pk)
+        with CaptureQueriesContext(connection) as queries:
+            first.save()
+        self.assertEqual(first.version, 2)
+        # Receivers write elsewhere (e.g. the sales rollups); the order row itself is written once
+        table = f'"{Order._meta.db_table}"'
+        order_queries = [query['sql'] for query in queries if query['sql'].split(' WHERE ')[0].count(table)]
+        self.assertEqual([sql.split()[0] for sql in order_queries], ['UPDATE'], order_queries)
+
+        # The second instance still holds version 1
+        second.save(update_fields=['delivery_instructions'])
+        self.assertEqual(second.version, 3)
+        self.assertEqual(Order.objects.values_list('version', flat=True).get(pk=self.order.pk), 3)
+
+    def test_update_returns_the_new_version(self):
+        self.assertVersionedSaves()
+
+    def test_update_without_returning_checks_the_loaded_version(self):
+        with mock.patch.object(connection.features, 'can_return_columns_from_insert', False):
+            self.assertVersionedSaves()
+
+
+class OrderStatusTransitionTests(OrderTestCase):
+    """A status change only applies to the version of the order it was made against."""
+
+    def setUp(self):
+        self.order = self.create_order(self.products[:2])
+        self.vendor_client = APIClient()
+        self.vendor_client.force_authenticate(self.vendor.user)
+
+    def update_status(self, current_status, version):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.vendor_client.patch(
+                f'/api/orders/{self.order.pk}/status/', {'current_status': current_status, 'version': version},
+                format='json',
+            )
+
+    def test_transition_bumps_the_version_and_logs_it(self):
+        response = self.update_status('Processing', 1)
+
+        self.assertEqual(response.status_code, 200)
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertEqual((order.current_status, order.version), ('Processing', 2))
+        self.assertEqual(list(order.status_history.values_list('status', flat=True)), ['Processing'])
+
+    def test_stale_version_is_a_conflict(self):
+        self.assertEqual(self.update_status('Processing', 1).status_code, 200)
+
+        response = self.update_status('Cancelled', 1)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual((response.data['current_status'], response.data['version']), ('Processing', 2))
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertEqual((order.current_status, order.version), ('Processing', 2))
+        self.assertEqual(order.status_history.count(), 1)
+
+    def test_concurrent_change_is_a_conflict(self):
+        first, second = Order.objects.get(pk=self.order.pk), Order.objects.get(pk=self.order.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_order_status(first, 'Processing', self.vendor.user)
+
+        # The second instance was read before the change and still claims version 1
+        with self.assertRaises(OrderStatusConflict) as conflict:
+            transition_order_status(second, 'Cancelled', self.user)
+        self.assertEqual((conflict.exception.current_status, conflict.exception.version), ('Processing', 2))
+        self.assertEqual(Order.objects.get(pk=self.order.pk).current_status, 'Processing')
+
+
+class Recorder(list):
+    """A collector that records each call."""
+
+    def __call__(self):
+        self.append('called')
+
+
+class TransactionCollectorTests(TestCase):
+    """Collectors are kept per savepoint, so a rolled-back block drops its own work only."""
+
+    def test_nested_block_gets_its_own_collector(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            outer = get_transaction_collector('test', Recorder)
+            with transaction.atomic():
+                inner = get_transaction_collector('test', Recorder)
+            self.assertIs(get_transaction_collector('test', Recorder), outer)
+
+        self.assertIsNot(inner, outer)
+        self.assertEqual(callbacks, [outer, inner])
+
+    def test_rolled_back_block_drops_its_collector(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            outer = get_transaction_collector('test', Recorder)
+            try:
+                with transaction.atomic():
+                    get_transaction_collector('test', Recorder)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            with transaction.atomic():
+                retried = get_transaction_collector('test', Recorder)
+
+        self.assertEqual(callbacks, [outer, retried])
+
+    def test_outside_a_transaction_returns_none(self):
+        with mock.patch.object(connection, 'in_atomic_block', False):
+            self.assertIsNone(get_transaction_collector('test', Recorder))
+
+
+class SalesRollupTests(OrderTestCase):
+    """The incrementally maintained sales rollups always match a rebuild from the orders."""
+
+    def rollup_rows(self):
+        return (
+            sorted(VendorDailySales.objects.values_list(
+                'vendor_id', 'date', 'delivery_type', 'status_bucket', 'order_count', 'revenue', 'item_count'
+            )),
+            sorted(VendorProductDailySales.objects.values_list(
+                'vendor_id', 'date', 'product_service_id', 'status_bucket', 'order_count', 'quantity', 'revenue'
+            )),
+        )
+
+    def assertRollupsMatchRebuild(self):
+        rows = self.rollup_rows()
+        day = rollup_date(timezone.now())
+        rebuild_rollups(day, day)
+        self.assertEqual(rows, self.rollup_rows())
+
+    def test_new_orders(self):
+        self.create_order(self.products[:3])
+        self.create_order(self.products[2:6])
+        self.assertRollupsMatchRebuild()
+
+    def test_status_change(self):
+        order = self.create_order(self.products[:3])
+        self.create_order(self.products[:1])
+        order = Order.objects.get(pk=order.pk)
+        order.current_status = 'Delivered'
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+        self.assertRollupsMatchRebuild()
+
+    def test_delete(self):
+        order = self.create_order(self.products[:3])
+        order.line_items.create(
+            product_service=self.products[0], quantity=1, unit_price_snapshot=Decimal('12.50'),
+            line_total=Decimal('12.50'),
+        )
+        self.create_order(self.products[:2])
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.get(pk=order.pk).delete()
+        self.assertRollupsMatchRebuild()
+
+    def test_savepoint_rollback(self):
+        order = self.create_order(self.products[:3])
+        with self.captureOnCommitCallbacks(execute=True):
+            # A change recorded before the savepoint, in the same transaction
+            self.create_order(self.products[:1], commit=False)
+            try:
+                with transaction.atomic():
+                    order = Order.objects.get(pk=order.pk)
+                    order.current_status = 'Cancelled'
+                    order.save()
+                    order.line_items.first().delete()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.create_order(self.products[1:2], commit=False)
+        self.assertEqual(Order.objects.get(pk=order.pk).current_status, 'Confirmed')
+        self.assertRollupsMatchRebuild()
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class OrderStatsCounterTests(OrderTestCase):
+    """The cached order stats counters always match a fresh aggregation of the orders."""
+
+    def setUp(self):
+        cache.clear()
+        self.orders = [self.create_order(self.products[:2]), self.create_order(self.products[2:5])]
+        self.seed()
+
+    def actors(self):
+        return {
+            ('customer', self.customer.pk): Order.objects.filter(customer_id=self.customer.pk),
+            ('vendor', self.vendor.pk): Order.objects.filter(vendor_id=self.vendor.pk),
+        }
+
+    def seed(self):
+        for (role, actor_id), orders in self.actors().items():
+            get_order_stats(role, actor_id, orders)
+
+    def assertCountersMatchAggregation(self, cached=True):
+        for (role, actor_id), orders in self.actors().items():
+            with self.subTest(role=role):
+                figures = OrderStatsCounters(role, actor_id).read()
+                if not cached and figures is None:
+                    continue
+                self.assertIsNotNone(figures)
+                self.assertEqual(figures, aggregate_order_figures(orders))
+
+    def set_status(self, order, current_status):
+        order = Order.objects.get(pk=order.pk)
+        order.current_status = current_status
+        order.save()
+
+    def test_new_order(self):
+        self.create_order(self.products[:1])
+        self.assertCountersMatchAggregation()
+
+    def test_status_change(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.set_status(self.orders[0], 'Delivered')
+        with self.captureOnCommitCallbacks(execute=True):
+            transition_order_status(Order.objects.get(pk=self.orders[1].pk), 'Cancelled', self.user)
+        self.assertCountersMatchAggregation()
+
+    def test_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.get(pk=self.orders[0].pk).delete()
+        self.assertCountersMatchAggregation(cached=False)
+        self.seed()
+        self.assertCountersMatchAggregation()
+
+    def test_savepoint_rollback(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.set_status(self.orders[1], 'Delivered')
+            try:
+                with transaction.atomic():
+                    self.set_status(self.orders[0], 'Delivered')
+                    self.create_order(self.products[:1], commit=False)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertCountersMatchAggregation()
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class DashboardCacheTests(OrderTransactionTestCase):
+    """Cached dashboard payloads always match the payloads computed without the cache."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.customer_client = APIClient()
+        self.customer_client.force_authenticate(self.user)
+        self.vendor_client = APIClient()
+        self.vendor_client.force_authenticate(self.vendor.user)
+        self.orders = [self.create_order(self.products[:2]), self.create_order(self.products[2:5])]
+        # Warm the caches, so a missed invalidation serves a stale payload
+        self.get_dashboards()
+
+    def get_dashboards(self):
+        responses = {
+            'customer order stats': self.customer_client.get('/api/orders/stats/'),
+            'vendor order stats': self.vendor_client.get('/api/orders/stats/'),
+            'vendor stats': self.vendor_client.get('/api/vendors/stats/'),
+        }
+        for response in responses.values():
+            self.assertEqual(response.status_code, 200)
+        return {name: response.data for name, response in responses.items()}
+
+    def assertDashboardsMatchRecompute(self):
+        cached = self.get_dashboards()
+        with override_settings(CACHE_IS_SHARED=False):
+            computed = self.get_dashboards()
+        for name, payload in computed.items():
+            with self.subTest(dashboard=name):
+                self.assertEqual(cached[name], payload)
+
+    def test_payloads_are_served_from_the_cache(self):
+        with self.assertNumQueries(0):
+            self.vendor_client.get('/api/orders/stats/')
+            self.customer_client.get('/api/orders/stats/')
+
+    def test_status_change(self):
+        order = Order.objects.get(pk=self.orders[0].pk)
+        order.current_status = 'Delivered'
+        order.save()
+        self.assertDashboardsMatchRecompute()
+
+    def test_delete(self):
+        Order.objects.get(pk=self.orders[0].pk).delete()
+        self.assertDashboardsMatchRecompute()
+
+    def test_line_item_and_product_changes(self):
+        with transaction.atomic():
+            line_item = self.orders[1].line_items.first()
+            line_item.quantity += 3
+            line_item.line_total += Decimal('37.50')
+            line_item.save()
+            ProductService.objects.create(vendor=self.vendor, name='Special', current_price=Decimal('40.00'))
+        self.assertDashboardsMatchRecompute()
+
+    def test_savepoint_rollback(self):
+        with transaction.atomic():
+            self.create_order(self.products[:1], commit=False)
+            try:
+                with transaction.atomic():
+                    order = Order.objects.get(pk=self.orders[1].pk)
+                    order.current_status = 'Delivered'
+                    order.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertDashboardsMatchRecompute()
+
+
+class OrderSearchTests(OrderTransactionTestCase):
+    """Indexed order search finds exactly the orders a scan of the orders would."""
+
+    NAMES = ('Chicken Curry', 'Beef Stew', 'Chicken Wings', 'Vegetable Curry', 'Chips')
+
+    def setUp(self):
+        super().setUp()
+        for product, name in zip(self.products, self.NAMES):
+            ProductService.objects.filter(pk=product.pk).update(name=name)
+        other_user = User.objects.create_user('other', 'other@example.com', 'password')
+        self.other_customer = Customer.objects.create(user=other_user, display_name='Thandi Curry')
+        self.orders = [
+            self.create_order(self.products[:2]),
+            self.create_order(self.products[2:5]),
+            self.create_order([self.products[3]]),
+        ]
+        order = self.create_order([self.products[1], self.products[4]])
+        # Moved without signals, so reindexed by hand
+        Order.objects.filter(pk=order.pk).update(customer=self.other_customer)
+        reindex_orders([order.pk])
+        self.orders.append(order)
+
+    def scan(self, query, customer_id=None):
+        """Return the ids of the orders whose words start with every word of the query."""
+        terms = tokenize(query)[:5]
+        matches = set()
+        orders = Order.objects.select_related('customer').prefetch_related('line_items__product_service')
+        if customer_id is not None:
+            orders = orders.filter(customer_id=customer_id)
+        for order in orders:
+            words = tokenize(order.order_uid) + tokenize(order.customer.display_name) + [
+                word for line_item in order.line_items.all() for word in tokenize(line_item.product_service.name)
+            ]
+            if all(any(word.startswith(term) for word in words) for term in terms):
+                matches.add(order.pk)
+        return matches
+
+    def assertMatchesScan(self, queries, customer_id=None):
+        for query in queries:
+            with self.subTest(query=query, customer_id=customer_id):
+                matches = match_orders(query, customer_id=customer_id)
+                self.assertEqual({match['order_id'] for match in matches}, self.scan(query, customer_id))
+
+    def test_results_match_a_scan(self):
+        queries = ('curry', 'chick', 'CHICKEN curry', 'ch', 'test', 'thandi', 'stew wings', 'pizza',
+                   self.orders[1].order_uid, self.orders[1].order_uid.split('-')[0])
+        self.assertMatchesScan(queries)
+        self.assertMatchesScan(queries, customer_id=self.customer.pk)
+
+    def test_ranked_by_field_weight(self):
+        matches = list(match_orders('curry'))
+        # The customer name outweighs a product name
+        self.assertEqual(matches[0]['order_id'], self.orders[3].pk)
+        self.assertEqual(match_orders(self.orders[2].order_uid)[0]['order_id'], self.orders[2].pk)
+
+    def test_index_follows_renames(self):
+        product = ProductService.objects.get(pk=self.products[1].pk)
+        product.name = 'Lamb Stew'
+        product.save()
+        customer = Customer.objects.get(pk=self.other_customer.pk)
+        customer.display_name = 'Thandi Mokoena'
+        customer.save()
+
+        self.assertMatchesScan(('lamb', 'beef', 'curry', 'mokoena', 'thandi stew'))
+
+    def test_index_follows_line_item_changes(self):
+        self.orders[0].line_items.get(product_service=self.products[0]).delete()
+        self.orders[2].line_items.create(
+            product_service=self.products[0], quantity=1, unit_price_snapshot=Decimal('12.50'),
+            line_total=Decimal('12.50'),
+        )
+
+        self.assertMatchesScan(('chicken curry', 'vegetable', 'beef'))
+
+    def test_deleted_order_leaves_the_index(self):
+        Order.objects.get(pk=self.orders[0].pk).delete()
+
+        self.assertFalse(OrderSearchToken.objects.filter(order_id=self.orders[0].pk).exists())
+        self.assertMatchesScan(('beef', 'chicken'))
@@ -4,15 +4,25 @@ from rest_framework.views import APIView
 from rest_framework import serializers
 from django.shortcuts import get_object_or_404
 from django.http import Http404
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
 from datetime import datetime, timedelta
 from .models import Order, OrderLineItem, OrderStatusHistory, Review, RefundRequest
 from auth_api.models import Customer
+from auth_api.actors import get_actor
+from .pagination import OrderCursorPagination
+from .services import transition_order_status, OrderStatusConflict
+from .search import match_orders, filter_orders_by_search, search_condition
+from .stats import aggregate_order_figures, build_stats_payload, get_order_stats
+from .dashboard_cache import get_cached_payload, get_cache_metrics, reset_cache_metrics
 from .serializers import (
     OrderSerializer, 
+    OrderSummarySerializer,
     OrderLineItemSerializer, 
     OrderCreateSerializer,
+    OrderBatchCreateSerializer,
     OrderStatusUpdateSerializer,
     OrderEstimatedTimeUpdateSerializer,
     ReviewSerializer,
@@ -21,13 +31,37 @@ from .serializers import (
 )
 
 
+def get_visible_orders(request):
+    """Return the orders the caller may see: all for staff, else their vendor or customer orders."""
+    actor = get_actor(request)
+    if actor.is_staff:
+        return Order.objects.all()
+    if actor.is_vendor:
+        return Order.objects.filter(vendor_id=actor.vendor_id)
+    if actor.is_customer:
+        return Order.objects.filter(customer_id=actor.customer_id)
+    return Order.objects.none()
+
+
+class OrderSearchFilter(BaseFilterBackend):
+    """Filter by the ``search`` parameter using the order search index, plus vendor name."""
+    
+    def filter_queryset(self, request, queryset, view):
+        search = request.query_params.get('search', '').strip()
+        if not search:
+            return queryset
+        condition = search_condition(search)
+        by_vendor = models.Q(vendor__name__icontains=search)
+        return queryset.filter(by_vendor if condition is None else condition | by_vendor)
+
+
 class OrderListView(generics.ListAPIView):
     """List all orders (admin only)."""
-    queryset = Order.objects.all()
-    serializer_class = OrderSerializer
+    queryset = OrderSummarySerializer.setup_eager_loading(Order.objects.all())
+    serializer_class = OrderSummarySerializer
     permission_classes = [permissions.IsAdminUser]
+    filter_backends = [DjangoFilterBackend, OrderSearchFilter, OrderingFilter]
     filterset_fields = ['current_status', 'is_completed', 'vendor']
-    search_fields = ['order_uid', 'customer__display_name', 'vendor__name']
     ordering_fields = ['created_at', 'total_amount', 'current_status']
 
 
@@ -39,27 +73,8 @@ class OrderDetailView(generics.RetrieveAPIView):
     lookup_field = 'pk'
     
     def get_queryset(self):
-        """Filter orders based on user role."""
-        user = self.request.user
-        if user.is_staff:
-            return Order.objects.all()
-        else:
-            # Check if user is a vendor
-            try:
-                vendor = user.vendor_profile
-                return Order.objects.filter(vendor=vendor)
-            except:
-                from vendors.models import Vendor
-                try:
-                    vendor = Vendor.objects.get(user=user)
-                    return Order.objects.filter(vendor=vendor)
-                except Vendor.DoesNotExist:
-                    # Not a vendor, check if customer
-                    try:
-                        customer = Customer.objects.get(user=user)
-                        return Order.objects.filter(customer=customer)
-                    except Customer.DoesNotExist:
-                        return Order.objects.none()
+        """Return the user's orders with everything OrderSerializer reads preloaded."""
+        return OrderSerializer.setup_eager_loading(get_visible_orders(self.request))
 
 
 class OrderCreateView(generics.CreateAPIView):
@@ -68,22 +83,54 @@ class OrderCreateView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def perform_create(self, serializer):
-        """Create order with customer and calculate totals."""
+        """Create order, line items and initial status history in one transaction."""
         # Get or create customer profile
         customer, _ = Customer.objects.get_or_create(user=self.request.user)
-        order = serializer.save(customer=customer)
         
-        # Calculate order totals from line items (after they're created by serializer)
-        total_amount = sum(item.line_total for item in order.line_items.all())
-        order.total_amount = total_amount
-        order.save()
+        with transaction.atomic():
+            # Totals are calculated by the serializer while building line items
+            order = serializer.save(customer=customer)
+            
+            # Create status history entry
+            OrderStatusHistory.objects.create(
+                order=order,
+                status=order.current_status,
+                confirmed_by_user=self.request.user
+            )
+
+
+class OrderBatchCreateView(APIView):
+    """
+    Create several orders in one request.
+    
+    Intended for offline-capable clients that come back online with queued orders.
+    Each order is validated independently and the response carries one result per
+    submitted order, in request order.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        """Create a batch of orders for the authenticated customer."""
+        serializer = OrderBatchCreateSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        
+        # Get or create customer profile
+        customer, _ = Customer.objects.get_or_create(user=request.user)
         
-        # Create status history entry
-        OrderStatusHistory.objects.create(
-            order=order,
-            status=order.current_status,
-            confirmed_by_user=self.request.user
-        )
+        from .signals import orders_bulk_created
+        with transaction.atomic():
+            batch = serializer.save(customer=customer)
+            
+            # Bulk inserts do not fire post_save, so do its work explicitly
+            orders_bulk_created(batch['orders'])
+        
+        results = batch['results']
+        created_count = sum(1 for result in results if result['status'] == 'created')
+        return Response({
+            'results': results,
+            'created_count': created_count,
+            'error_count': len(results) - created_count,
+        }, status=status.HTTP_201_CREATED if created_count else status.HTTP_400_BAD_REQUEST)
 
 
 class OrderStatusUpdateView(generics.UpdateAPIView):
@@ -95,108 +142,90 @@ class OrderStatusUpdateView(generics.UpdateAPIView):
     
     def get_queryset(self):
         """Filter orders based on user role."""
-        user = self.request.user
-        if user.is_staff:
-            return Order.objects.all()
-        else:
-            # Check if user is a vendor
-            try:
-                vendor = user.vendor_profile
-                return Order.objects.filter(vendor=vendor)
-            except:
-                from vendors.models import Vendor
-                try:
-                    vendor = Vendor.objects.get(user=user)
-                    return Order.objects.filter(vendor=vendor)
-                except Vendor.DoesNotExist:
-                    # Not a vendor, check if customer
-                    try:
-                        customer = Customer.objects.get(user=user)
-                        return Order.objects.filter(customer=customer)
-                    except Customer.DoesNotExist:
-                        return Order.objects.none()
+        return get_visible_orders(self.request)
     
-    def perform_update(self, serializer):
-        """Update order status and create history entry."""
-        old_status = self.get_object().current_status
-        order = serializer.save()
+    def update(self, request, *args, **kwargs):
+        """Apply the status change as a compare-and-swap and append the history entry."""
+        order = self.get_object()
+        serializer = self.get_serializer(order, data=request.data)
+        serializer.is_valid(raise_exception=True)
         
-        # Create status history entry
-        OrderStatusHistory.objects.create(
-            order=order,
-            status=order.current_status,
-            confirmed_by_user=self.request.user
-        )
+        try:
+            transition_order_status(
+                order,
+                serializer.validated_data['current_status'],
+                request.user,
+                expected_version=serializer.validated_data.get('version')
+            )
+        except OrderStatusConflict as e:
+            return Response({
+                'error': str(e),
+                'current_status': e.current_status,
+                'version': e.version
+            }, status=status.HTTP_409_CONFLICT)
+        
+        return Response(serializer.data)
 
 
 class MyOrdersView(generics.ListAPIView):
     """Get orders for the current customer."""
-    serializer_class = OrderSerializer
+    serializer_class = OrderSummarySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OrderCursorPagination  # Also validates the ordering parameter
+    filter_backends = [DjangoFilterBackend]
     filterset_fields = ['current_status', 'is_completed']
-    ordering_fields = ['created_at', 'total_amount']
     
     def get_queryset(self):
-        try:
-            customer = Customer.objects.get(user=self.request.user)
-            queryset = Order.objects.filter(customer=customer)
-            
-            # Filter by status if provided
-            status_filter = self.request.query_params.get('status', None)
-            if status_filter:
-                queryset = queryset.filter(current_status=status_filter)
-            
-            # Filter by date range if provided
-            date_from = self.request.query_params.get('date_from', None)
-            date_to = self.request.query_params.get('date_to', None)
-            if date_from:
-                try:
-                    date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-                    queryset = queryset.filter(created_at__gte=date_from_obj)
-                except ValueError:
-                    pass
-            if date_to:
-                try:
-                    date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-                    # Add one day to include the entire end date
-                    date_to_obj = date_to_obj + timedelta(days=1)
-                    queryset = queryset.filter(created_at__lt=date_to_obj)
-                except ValueError:
-                    pass
-            
-            # Search by order UID if provided
-            search = self.request.query_params.get('search', None)
-            if search:
-                queryset = queryset.filter(order_uid__icontains=search)
-            
-            # Ordering
-            ordering = self.request.query_params.get('ordering', '-created_at')
-            if ordering:
-                queryset = queryset.order_by(ordering)
-            
-            return queryset
-        except Customer.DoesNotExist:
+        actor = get_actor(self.request)
+        if not actor.is_customer:
             return Order.objects.none()
+        
+        queryset = OrderSummarySerializer.setup_eager_loading(Order.objects.filter(customer_id=actor.customer_id))
+        
+        # Filter by status if provided
+        status_filter = self.request.query_params.get('status', None)
+        if status_filter:
+            queryset = queryset.filter(current_status=status_filter)
+        
+        # Filter by date range if provided
+        date_from = self.request.query_params.get('date_from', None)
+        date_to = self.request.query_params.get('date_to', None)
+        if date_from:
+            try:
+                date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
+                queryset = queryset.filter(created_at__gte=date_from_obj)
+            except ValueError:
+                pass
+        if date_to:
+            try:
+                date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
+                # Add one day to include the entire end date
+                date_to_obj = date_to_obj + timedelta(days=1)
+                queryset = queryset.filter(created_at__lt=date_to_obj)
+            except ValueError:
+                pass
+        
+        # Search by order UID or product name if provided
+        search = self.request.query_params.get('search', None)
+        if search:
+            queryset = filter_orders_by_search(queryset, search, customer_id=actor.customer_id)
+        
+        return queryset
 
 
 class VendorOrdersView(generics.ListAPIView):
     """Get orders for the current vendor."""
-    serializer_class = OrderSerializer
+    serializer_class = OrderSummarySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OrderCursorPagination  # Also validates the ordering parameter
+    filter_backends = [DjangoFilterBackend]
     filterset_fields = ['current_status', 'is_completed']
-    ordering_fields = ['created_at', 'total_amount']
     
     def get_queryset(self):
-        try:
-            vendor = self.request.user.vendor_profile
-            queryset = Order.objects.filter(vendor=vendor)
-        except:
-            from vendors.models import Vendor
-            try:
-                vendor = Vendor.objects.get(user=self.request.user)
-                queryset = Order.objects.filter(vendor=vendor)
-            except Vendor.DoesNotExist:
-                return Order.objects.none()
+        actor = get_actor(self.request)
+        if not actor.is_vendor:
+            return Order.objects.none()
+        queryset = OrderSummarySerializer.setup_eager_loading(Order.objects.filter(vendor_id=actor.vendor_id))
         
         # Filter by status if provided
         status_filter = self.request.query_params.get('status', None)
@@ -221,18 +250,10 @@ class VendorOrdersView(generics.ListAPIView):
             except ValueError:
                 pass
         
-        # Search by order UID or customer name if provided
+        # Search by order UID, customer name or product name if provided
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(
-                models.Q(order_uid__icontains=search) |
-                models.Q(customer__display_name__icontains=search)
-            )
-        
-        # Ordering
-        ordering = self.request.query_params.get('ordering', '-created_at')
-        if ordering:
-            queryset = queryset.order_by(ordering)
+            queryset = filter_orders_by_search(queryset, search, vendor_id=actor.vendor_id)
         
         return queryset
 
@@ -244,11 +265,10 @@ class MyReviewsView(generics.ListAPIView):
     
     def get_queryset(self):
         """Return all reviews for the authenticated customer."""
-        try:
-            customer = Customer.objects.get(user=self.request.user)
-            return Review.objects.filter(customer=customer).select_related('order', 'vendor', 'customer').order_by('-created_at')
-        except Customer.DoesNotExist:
+        actor = get_actor(self.request)
+        if not actor.is_customer:
             return Review.objects.none()
+        return Review.objects.filter(customer_id=actor.customer_id).select_related('order', 'vendor', 'customer').order_by('-created_at')
 
 
 class ReviewCreateView(generics.CreateAPIView):
@@ -272,19 +292,18 @@ class ReviewCreateView(generics.CreateAPIView):
             )
         
         # Get customer profile
-        try:
-            customer = Customer.objects.get(user=self.request.user)
-        except Customer.DoesNotExist:
+        actor = get_actor(self.request)
+        if not actor.is_customer:
             raise serializers.ValidationError("Customer profile not found.")
         
         # Verify order belongs to customer
-        if order.customer != customer:
+        if order.customer_id != actor.customer_id:
             raise serializers.ValidationError("Order does not belong to this customer.")
         
         serializer.save(
             order=order,
-            vendor=order.vendor,
-            customer=customer
+            vendor_id=order.vendor_id,
+            customer_id=actor.customer_id
         )
 
 
@@ -304,31 +323,12 @@ class OrderCancelView(APIView):
         """Cancel an order."""
         order = get_object_or_404(Order, pk=pk)
         user = request.user
+        actor = get_actor(request)
         
         # Check permissions
-        is_customer = False
-        is_vendor = False
-        is_admin = user.is_staff
-        
-        try:
-            customer = Customer.objects.get(user=user)
-            if order.customer == customer:
-                is_customer = True
-        except Customer.DoesNotExist:
-            pass
-        
-        try:
-            from vendors.models import Vendor
-            vendor = Vendor.objects.get(user=user)
-            if order.vendor == vendor:
-                is_vendor = True
-        except:
-            try:
-                vendor = user.vendor_profile
-                if order.vendor == vendor:
-                    is_vendor = True
-            except:
-                pass
+        is_customer = actor.is_customer and order.customer_id == actor.customer_id
+        is_vendor = actor.is_vendor and order.vendor_id == actor.vendor_id
+        is_admin = actor.is_staff
         
         if not (is_customer or is_vendor or is_admin):
             return Response(
@@ -350,16 +350,28 @@ class OrderCancelView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Cancel the order
-        order.current_status = 'Cancelled'
-        order.save()
+        # Optional optimistic-concurrency check against the version the client saw
+        expected_version = request.data.get('version')
+        if expected_version not in (None, ''):
+            try:
+                expected_version = int(expected_version)
+            except (TypeError, ValueError):
+                return Response(
+                    {'error': 'version must be an integer.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            expected_version = None
         
-        # Create status history entry
-        OrderStatusHistory.objects.create(
-            order=order,
-            status='Cancelled',
-            confirmed_by_user=user
-        )
+        # Cancel the order unless it changed since it was checked above
+        try:
+            transition_order_status(order, 'Cancelled', user, expected_version=expected_version)
+        except OrderStatusConflict as e:
+            return Response({
+                'error': str(e),
+                'current_status': e.current_status,
+                'version': e.version
+            }, status=status.HTTP_409_CONFLICT)
         
         serializer = OrderSerializer(order)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -374,21 +386,57 @@ class OrderEstimatedTimeUpdateView(generics.UpdateAPIView):
     
     def get_queryset(self):
         """Filter orders based on user role - only vendors can update estimated time."""
-        user = self.request.user
-        if user.is_staff:
+        actor = get_actor(self.request)
+        if actor.is_staff:
             return Order.objects.all()
+        if actor.is_vendor:
+            return Order.objects.filter(vendor_id=actor.vendor_id)
+        return Order.objects.none()
+
+
+class OrderSearchView(APIView):
+    """Ranked search over the caller's orders (all orders for staff)."""
+    permission_classes = [permissions.IsAuthenticated]
+    max_results = 100
+    
+    def get(self, request):
+        """
+        Return the orders matching every word of ``q``, best match first.
+        
+        Words match as prefixes of the words of the order number, customer name
+        and product names.
+        """
+        query = request.query_params.get('q') or request.query_params.get('order_number', '')
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), self.max_results)
+        except ValueError:
+            return Response({'error': 'limit must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        actor = get_actor(request)
+        if actor.is_staff:
+            matches = match_orders(query)
+        elif actor.is_vendor:
+            matches = match_orders(query, vendor_id=actor.vendor_id)
+        elif actor.is_customer:
+            matches = match_orders(query, customer_id=actor.customer_id)
         else:
-            # Check if user is a vendor
-            try:
-                vendor = user.vendor_profile
-                return Order.objects.filter(vendor=vendor)
-            except:
-                from vendors.models import Vendor
-                try:
-                    vendor = Vendor.objects.get(user=user)
-                    return Order.objects.filter(vendor=vendor)
-                except Vendor.DoesNotExist:
-                    return Order.objects.none()
+            matches = None
+        if matches is None:
+            return Response({'results': []}, status=status.HTTP_200_OK)
+        
+        status_filter = request.query_params.get('status')
+        if status_filter:
+            matches = matches.filter(order__current_status=status_filter)
+        ranked = list(matches[:limit])
+        orders = OrderSummarySerializer.setup_eager_loading(
+            Order.objects.filter(id__in=[match['order_id'] for match in ranked])
+        ).in_bulk()
+        results = []
+        for match in ranked:
+            order = orders.get(match['order_id'])
+            if order is not None:
+                results.append({**OrderSummarySerializer(order).data, 'score': match['score']})
+        return Response({'results': results}, status=status.HTTP_200_OK)
 
 
 class OrderStatsView(APIView):
@@ -397,69 +445,40 @@ class OrderStatsView(APIView):
     
     def get(self, request):
         """Get order statistics."""
-        user = request.user
-        
-        # Determine if user is customer or vendor
-        is_customer = False
-        is_vendor = False
-        
-        try:
-            customer = Customer.objects.get(user=user)
-            is_customer = True
-            orders = Order.objects.filter(customer=customer)
-        except Customer.DoesNotExist:
-            pass
-        
-        if not is_customer:
-            try:
-                from vendors.models import Vendor
-                vendor = Vendor.objects.get(user=user)
-                is_vendor = True
-                orders = Order.objects.filter(vendor=vendor)
-            except:
-                try:
-                    vendor = user.vendor_profile
-                    is_vendor = True
-                    orders = Order.objects.filter(vendor=vendor)
-                except:
-                    orders = Order.objects.none()
-        
-        # Calculate statistics
-        total_orders = orders.count()
-        by_status = {}
-        for status_choice in Order.ORDER_STATUS:
-            status_value = status_choice[0]
-            count = orders.filter(current_status=status_value).count()
-            by_status[status_value] = count
-        
-        # Calculate total revenue (for vendors) - include both delivered and picked up orders
-        total_revenue = None
-        if is_vendor:
-            from django.db.models import Sum
-            total_revenue = float(orders.filter(
-                current_status__in=['Delivered', 'PickedUp']
-            ).aggregate(
-                total=Sum('total_amount')
-            )['total'] or 0)
-        
-        # Recent orders (last 7 days)
-        from django.utils import timezone
-        from datetime import timedelta
-        recent_date = timezone.now() - timedelta(days=7)
-        recent_orders_count = orders.filter(created_at__gte=recent_date).count()
-        
-        stats = {
-            'total_orders': total_orders,
-            'by_status': by_status,
-            'recent_orders_count': recent_orders_count,
-        }
-        
-        if total_revenue is not None:
-            stats['total_revenue'] = total_revenue
+        actor = get_actor(request)
+        
+        # The recent orders window moves with the local date
+        today = timezone.localdate().isoformat()
+        
+        # Customer stats take precedence for users with both profiles
+        if actor.is_customer:
+            stats = get_cached_payload('order_stats', 'customer', actor.customer_id, lambda: get_order_stats(
+                'customer', actor.customer_id, Order.objects.filter(customer_id=actor.customer_id)
+            ), variant=today)
+        elif actor.is_vendor:
+            stats = get_cached_payload('order_stats', 'vendor', actor.vendor_id, lambda: get_order_stats(
+                'vendor', actor.vendor_id, Order.objects.filter(vendor_id=actor.vendor_id), include_revenue=True
+            ), variant=today)
+        else:
+            stats = build_stats_payload(aggregate_order_figures(Order.objects.none()))
         
         return Response(stats, status=status.HTTP_200_OK)
 
 
+class DashboardCacheMetricsView(APIView):
+    """Hit and miss counts of the cached dashboard payloads (admin only)."""
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        """Return the hits, misses and hit rate of each dashboard."""
+        return Response(get_cache_metrics(), status=status.HTTP_200_OK)
+    
+    def delete(self, request):
+        """Reset the counts."""
+        reset_cache_metrics()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class RefundRequestCreateView(generics.CreateAPIView):
     """Create a refund request for an order."""
     serializer_class = RefundRequestCreateSerializer
@@ -467,12 +486,11 @@ class RefundRequestCreateView(generics.CreateAPIView):
     
     def perform_create(self, serializer):
         """Create refund request for the authenticated customer."""
-        try:
-            customer = Customer.objects.get(user=self.request.user)
-        except Customer.DoesNotExist:
+        actor = get_actor(self.request)
+        if not actor.is_customer:
             raise serializers.ValidationError("User does not have a customer profile.")
         
-        serializer.save(requested_by=customer)
+        serializer.save(requested_by_id=actor.customer_id)
 
 
 class RefundRequestListView(generics.ListAPIView):
@@ -482,30 +500,19 @@ class RefundRequestListView(generics.ListAPIView):
     
     def get_queryset(self):
         """Filter refund requests based on user role."""
-        user = self.request.user
+        actor = get_actor(self.request)
+        refund_requests = RefundRequest.objects.select_related('order', 'requested_by', 'processed_by')
         
-        if user.is_staff:
+        if actor.is_staff:
             # Admins can see all refund requests
-            return RefundRequest.objects.all().select_related('order', 'requested_by', 'processed_by')
-        
-        # Check if user is a vendor
-        try:
-            vendor = user.vendor_profile
+            return refund_requests.all()
+        if actor.is_vendor:
             # Vendors can see refund requests for their orders
-            return RefundRequest.objects.filter(order__vendor=vendor).select_related('order', 'requested_by', 'processed_by')
-        except:
-            from vendors.models import Vendor
-            try:
-                vendor = Vendor.objects.get(user=user)
-                return RefundRequest.objects.filter(order__vendor=vendor).select_related('order', 'requested_by', 'processed_by')
-            except Vendor.DoesNotExist:
-                # Check if user is a customer
-                try:
-                    customer = Customer.objects.get(user=user)
-                    # Customers can see their own refund requests
-                    return RefundRequest.objects.filter(requested_by=customer).select_related('order', 'requested_by', 'processed_by')
-                except Customer.DoesNotExist:
-                    return RefundRequest.objects.none()
+            return refund_requests.filter(order__vendor_id=actor.vendor_id)
+        if actor.is_customer:
+            # Customers can see their own refund requests
+            return refund_requests.filter(requested_by_id=actor.customer_id)
+        return RefundRequest.objects.none()
 
 
 class RefundRequestApproveView(generics.UpdateAPIView):
@@ -517,22 +524,13 @@ class RefundRequestApproveView(generics.UpdateAPIView):
     
     def get_queryset(self):
         """Filter refund requests based on user role - only pending requests."""
-        user = self.request.user
+        actor = get_actor(self.request)
         
-        if user.is_staff:
+        if actor.is_staff:
             return RefundRequest.objects.filter(status='pending')
-        
-        # Check if user is a vendor
-        try:
-            vendor = user.vendor_profile
-            return RefundRequest.objects.filter(order__vendor=vendor, status='pending')
-        except:
-            from vendors.models import Vendor
-            try:
-                vendor = Vendor.objects.get(user=user)
-                return RefundRequest.objects.filter(order__vendor=vendor, status='pending')
-            except Vendor.DoesNotExist:
-                return RefundRequest.objects.none()
+        if actor.is_vendor:
+            return RefundRequest.objects.filter(order__vendor_id=actor.vendor_id, status='pending')
+        return RefundRequest.objects.none()
     
     def get_object(self):
         """Get refund request with better error handling."""
@@ -574,23 +572,24 @@ class RefundRequestApproveView(generics.UpdateAPIView):
         if refund_request.order.current_status == 'Refunded':
             raise serializers.ValidationError("This order has already been refunded.")
         
-        # Update refund request
-        refund_request.status = 'approved'
-        refund_request.processed_by = self.request.user
-        refund_request.processed_at = timezone.now()
-        refund_request.save()
-        
-        # Update order status to Refunded
-        order = refund_request.order
-        order.current_status = 'Refunded'
-        order.save()
-        
-        # Create status history entry
-        OrderStatusHistory.objects.create(
-            order=order,
-            status='Refunded',
-            confirmed_by_user=self.request.user
-        )
+        with transaction.atomic():
+            # Update refund request
+            refund_request.status = 'approved'
+            refund_request.processed_by = self.request.user
+            refund_request.processed_at = timezone.now()
+            refund_request.save()
+            
+            # Update order status to Refunded
+            order = refund_request.order
+            order.current_status = 'Refunded'
+            order.save()
+            
+            # Create status history entry
+            OrderStatusHistory.objects.create(
+                order=order,
+                status='Refunded',
+                confirmed_by_user=self.request.user
+            )
 
 
 class RefundRequestDenyView(generics.UpdateAPIView):
@@ -602,22 +601,13 @@ class RefundRequestDenyView(generics.UpdateAPIView):
     
     def get_queryset(self):
         """Filter refund requests based on user role - only pending requests."""
-        user = self.request.user
+        actor = get_actor(self.request)
         
-        if user.is_staff:
+        if actor.is_staff:
             return RefundRequest.objects.filter(status='pending')
-        
-        # Check if user is a vendor
-        try:
-            vendor = user.vendor_profile
-            return RefundRequest.objects.filter(order__vendor=vendor, status='pending')
-        except:
-            from vendors.models import Vendor
-            try:
-                vendor = Vendor.objects.get(user=user)
-                return RefundRequest.objects.filter(order__vendor=vendor, status='pending')
-            except Vendor.DoesNotExist:
-                return RefundRequest.objects.none()
+        if actor.is_vendor:
+            return RefundRequest.objects.filter(order__vendor_id=actor.vendor_id, status='pending')
+        return RefundRequest.objects.none()
     
     def get_object(self):
         """Get refund request with better error handling."""
@@ -7,6 +7,7 @@ and offline payment capabilities.
 
 from django.db import models
 from django.contrib.auth.models import User
+from Gawulo.mixins import ImmutableFieldsMixin
 from django.core.validators import MinValueValidator
 from orders.models import Order
 import uuid
@@ -157,7 +158,7 @@ class OfflinePayment(models.Model):
         return f"Offline Payment {self.local_id} - R{self.amount}"
 
 
-class PaymentTransaction(models.Model):
+class PaymentTransaction(ImmutableFieldsMixin, models.Model):
     """
     Payment transaction records for order payments.
     
@@ -185,14 +186,6 @@ class PaymentTransaction(models.Model):
     
     def __str__(self):
         return f"Payment {self.transaction_uid or self.id} - {self.gateway_name} - {self.amount_settled} {self.currency}"
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            # Preserve original created_at when updating
-            original = PaymentTransaction.objects.get(pk=self.pk)
-            self.created_at = original.created_at
-        super().save(*args, **kwargs)
 
 
 class Refund(models.Model):
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class TrackingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tracking'
+    
+    def ready(self):
+        """Import signals when app is ready."""
+        import tracking.signals  # noqa
@@ -0,0 +1,19 @@
+"""
+Django signals keeping the in-memory delivery zone indexes current.
+
+Saving or deleting a zone makes this process re-read the zone version once the
+transaction commits, so its ZoneIndex is rebuilt before its next lookup; other
+processes notice the change within ZONE_VERSION_TTL seconds.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import DeliveryZone
+from .zones import bump_zone_version
+
+
+@receiver(post_save, sender=DeliveryZone)
+@receiver(post_delete, sender=DeliveryZone)
+def delivery_zone_changed(sender, instance, **kwargs):
+    """Invalidate the zone indexes after commit."""
+    transaction.on_commit(bump_zone_version)
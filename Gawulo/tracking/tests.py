@@ -1,3 +1,136 @@
+import math
+import random
+from decimal import Decimal
 from django.test import TestCase
+from rest_framework.test import APIClient
+from vendors.geo import EARTH_RADIUS_KM
+from . import zones
+from .models import DeliveryZone
+from .zones import resolve_points
 
-# Create your tests here.
+
+def haversine(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+class DeliveryZoneResolverTests(TestCase):
+    """The in-memory zone index resolves points as a Haversine check of every zone would."""
+
+    CENTRE = (-26.2041, 28.0473)
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(11)
+        for index in range(40):
+            DeliveryZone.objects.create(
+                name=f'Zone {index}',
+                center_latitude=Decimal(f'{cls.CENTRE[0] + rng.uniform(-0.3, 0.3):.6f}'),
+                center_longitude=Decimal(f'{cls.CENTRE[1] + rng.uniform(-0.3, 0.3):.6f}'),
+                # Some zones share a radius, so the id breaks the tie
+                radius_km=Decimal(rng.choice(['2.00', '5.00', '5.00', '12.50', '20.00'])),
+                delivery_fee=Decimal(rng.randint(10, 60)),
+                estimated_delivery_time=rng.randint(20, 90),
+                is_active=rng.random() > 0.15,
+            )
+        cls.points = [
+            (cls.CENTRE[0] + rng.uniform(-0.5, 0.5), cls.CENTRE[1] + rng.uniform(-0.5, 0.5)) for _ in range(500)
+        ]
+
+    def setUp(self):
+        zones._index = None
+        zones.bump_zone_version()
+
+    def scan(self, latitude, longitude):
+        """Return the active zones containing a point, most specific first."""
+        containing = []
+        for zone in DeliveryZone.objects.filter(is_active=True):
+            distance = haversine(latitude, longitude, float(zone.center_latitude), float(zone.center_longitude))
+            if distance <= float(zone.radius_km):
+                containing.append((zone.radius_km, zone.pk, zone))
+        return [zone for _, _, zone in sorted(containing)]
+
+    def near_a_boundary(self, latitude, longitude):
+        # The index tests containment to well under a metre of the Haversine distance
+        return any(
+            abs(haversine(latitude, longitude, float(zone.center_latitude), float(zone.center_longitude))
+                - float(zone.radius_km)) < 0.001
+            for zone in DeliveryZone.objects.all()
+        )
+
+    def assertResolvesAsScan(self, points):
+        for (latitude, longitude), resolution in zip(points, resolve_points(points)):
+            if self.near_a_boundary(latitude, longitude):
+                continue
+            with self.subTest(point=(latitude, longitude)):
+                expected = self.scan(latitude, longitude)
+                if not expected:
+                    self.assertIsNone(resolution)
+                    continue
+                zone = expected[0]
+                self.assertEqual(resolution, {
+                    'zone_id': zone.pk,
+                    'zone_name': zone.name,
+                    'delivery_fee': zone.delivery_fee,
+                    'estimated_delivery_time': zone.estimated_delivery_time,
+                    'zone_ids': [zone.pk for zone in expected],
+                })
+
+    def test_points_resolve_as_a_scan(self):
+        self.assertResolvesAsScan(self.points)
+        resolutions = resolve_points(self.points)
+        self.assertTrue(any(resolution is None for resolution in resolutions))
+        self.assertTrue(any(resolution and len(resolution['zone_ids']) > 1 for resolution in resolutions))
+
+    def test_batches_larger_than_one_matrix_chunk(self):
+        original = zones.MAX_MATRIX_SIZE
+        zones.MAX_MATRIX_SIZE = 200
+        self.addCleanup(setattr, zones, 'MAX_MATRIX_SIZE', original)
+        self.assertResolvesAsScan(self.points[:100])
+
+    def test_index_follows_zone_changes(self):
+        zone = DeliveryZone.objects.filter(is_active=True).order_by('radius_km', 'pk').first()
+        point = (float(zone.center_latitude), float(zone.center_longitude))
+        self.assertEqual(resolve_points([point])[0]['zone_id'], zone.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            smaller = DeliveryZone.objects.create(
+                name='Inner', center_latitude=zone.center_latitude, center_longitude=zone.center_longitude,
+                radius_km=Decimal('0.50'), delivery_fee=Decimal('5.00'),
+            )
+        self.assertEqual(resolve_points([point])[0]['zone_id'], smaller.pk)
+
+        smaller.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            smaller.save()
+        self.assertEqual(resolve_points([point])[0]['zone_id'], zone.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DeliveryZone.objects.filter(is_active=True).delete()
+        self.assertIsNone(resolve_points([point])[0])
+
+    def test_index_is_reused_until_the_zones_change(self):
+        resolve_points(self.points[:1])
+        with self.assertNumQueries(0):
+            resolve_points(self.points)
+
+    def test_resolve_endpoint(self):
+        client = APIClient()
+        latitude, longitude = self.points[0]
+        expected = resolve_points([self.points[0]])[0]
+
+        response = client.get('/api/tracking/zones/resolve/', {'lat': latitude, 'lng': longitude})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['zone'] and response.data['zone']['zone_id'], expected and expected['zone_id'])
+
+        response = client.post('/api/tracking/zones/resolve/', {'points': self.points[:50]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result and result['zone_id'] for result in response.data['results']],
+            [resolution and resolution['zone_id'] for resolution in resolve_points(self.points[:50])],
+        )
+
+        for params in ({'lat': 91, 'lng': 0}, {'lat': 'north', 'lng': 0}, {'lat': 'nan', 'lng': 0}, {'lng': 0}):
+            with self.subTest(params=params):
+                self.assertEqual(client.get('/api/tracking/zones/resolve/', params).status_code, 400)
@@ -4,6 +4,5 @@ from . import views
 app_name = 'tracking'
 
 urlpatterns = [
-    # Placeholder for tracking endpoints
-    # path('', views.TrackingListView.as_view(), name='tracking-list'),
+    path('zones/resolve/', views.DeliveryZoneResolveView.as_view(), name='delivery-zone-resolve'),
 ]
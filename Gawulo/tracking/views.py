@@ -1,3 +1,66 @@
-from django.shortcuts import render
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+import numpy as np
+from .zones import resolve_points
 
-# Create your views here.
+
+COORDINATES_ERROR = 'Latitudes must be between -90 and 90 and longitudes between -180 and 180.'
+
+
+def _valid_coordinates(points):
+    """Check that an (n, 2) array of (lat, lng) points only holds finite, in-range coordinates."""
+    return bool(
+        np.isfinite(points).all()
+        and (np.abs(points[:, 0]) <= 90).all()
+        and (np.abs(points[:, 1]) <= 180).all()
+    )
+
+
+def _serialize_resolution(resolution):
+    if resolution is None:
+        return None
+    return {**resolution, 'delivery_fee': str(resolution['delivery_fee'])}
+
+
+class DeliveryZoneResolveView(APIView):
+    """Resolve points to their delivery zone, fee and estimated delivery time."""
+    permission_classes = [permissions.AllowAny]
+    max_points = 5000
+    
+    def get(self, request):
+        """Resolve the single point ``lat``, ``lng``; ``zone`` is null outside every zone."""
+        try:
+            point = (float(request.query_params['lat']), float(request.query_params['lng']))
+        except KeyError:
+            return Response({'error': 'lat and lng are required.'}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({'error': 'lat and lng must be numbers.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not _valid_coordinates(np.array([point])):
+            return Response({'error': COORDINATES_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'zone': _serialize_resolution(resolve_points([point])[0])}, status=status.HTTP_200_OK)
+    
+    def post(self, request):
+        """
+        Resolve a batch of points given as ``{"points": [[lat, lng], ...]}``.
+        
+        Returns one entry per point, in order; null for points outside every zone.
+        """
+        points = request.data.get('points') if isinstance(request.data, dict) else None
+        if not isinstance(points, list) or not points:
+            return Response({'error': 'points must be a non-empty list of [lat, lng] pairs.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(points) > self.max_points:
+            return Response({'error': f'At most {self.max_points} points can be resolved at once.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            points = np.array(points, dtype=float)
+        except (TypeError, ValueError):
+            points = None
+        if points is None or points.ndim != 2 or points.shape[1] != 2:
+            return Response({'error': 'points must be a non-empty list of [lat, lng] pairs.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not _valid_coordinates(points):
+            return Response({'error': COORDINATES_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+        results = [_serialize_resolution(resolution) for resolution in resolve_points(points)]
+        return Response({'results': results}, status=status.HTTP_200_OK)
@@ -0,0 +1,168 @@
+"""
+In-memory delivery zone resolver.
+
+Each process keeps a ZoneIndex: the active DeliveryZone centres, radii, fees and
+delivery times in NumPy arrays. Centres and points are unit vectors, and a point
+is within a zone exactly when its dot product with the centre is at least the
+cosine of the zone's angular radius (the same test as the Haversine distance,
+to well under a metre), so matching a batch of points against every zone is a
+single matrix product (in chunks, to bound memory). A batch of thousands of
+geocoded addresses costs no query and no Python loop over zones.
+
+A point resolves to its most specific zone: the containing zone with the
+smallest radius, then the lowest id. Zones are sorted that way when the index
+is built, so the first matching column of each row is the answer.
+
+The index is rebuilt when the zones change. The zones' version is read from the
+database - their count, highest id and latest updated_at - at most once every
+ZONE_VERSION_TTL seconds per process, so a change made by any process reaches
+every index within that time. Saving or deleting a zone makes the process that
+did it re-read the version straight away once the transaction commits (see
+tracking.signals). Queryset .update() calls must also set updated_at.
+"""
+import threading
+import time
+import numpy as np
+from django.db.models import Count, Max
+from vendors.geo import EARTH_RADIUS_KM, unit_vectors
+from .models import DeliveryZone
+
+# Seconds a process trusts the zone version it last read from the database
+ZONE_VERSION_TTL = 5
+# Largest points x zones matrix computed at once
+MAX_MATRIX_SIZE = 1000000
+
+_lock = threading.Lock()
+_index = None
+_version = None
+_version_read_at = 0.0
+
+
+class ZoneIndex:
+    """
+    Immutable snapshot of the active delivery zones.
+
+    Args:
+        zones: DeliveryZone instances
+        version: Version stamp the snapshot was built for
+    """
+
+    def __init__(self, zones, version=None):
+        zones = sorted(zones, key=lambda zone: (zone.radius_km, zone.pk))
+        self.version = version
+        self.ids = np.array([zone.pk for zone in zones], dtype=np.int64)
+        self.names = [zone.name for zone in zones]
+        self.fees = [zone.delivery_fee for zone in zones]
+        self.centres = unit_vectors(
+            np.array([zone.center_latitude for zone in zones], dtype=float),
+            np.array([zone.center_longitude for zone in zones], dtype=float),
+        ).reshape(-1, 3)
+        radii = np.array([zone.radius_km for zone in zones], dtype=float)
+        self.thresholds = np.cos(np.minimum(radii / EARTH_RADIUS_KM, np.pi))
+        self.delivery_times = np.array([zone.estimated_delivery_time for zone in zones], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def match(self, latitudes, longitudes):
+        """
+        Match points against every zone.
+
+        Args:
+            latitudes: Array of point latitudes in degrees
+            longitudes: Array of point longitudes in degrees
+
+        Returns:
+            Tuple of (array of the position of each point's most specific zone,
+            -1 when no zone contains it; points x zones boolean containment matrix)
+        """
+        points = unit_vectors(latitudes, longitudes).reshape(-1, 3)
+        inside = np.zeros((len(points), len(self)), dtype=bool)
+        chunk = max(MAX_MATRIX_SIZE // max(len(self), 1), 1)
+        for start in range(0, len(points), chunk):
+            rows = slice(start, start + chunk)
+            inside[rows] = points[rows] @ self.centres.T >= self.thresholds
+        best = np.where(inside.any(axis=1), inside.argmax(axis=1), -1) if len(self) else np.full(len(inside), -1)
+        return best, inside
+
+    def resolve(self, latitudes, longitudes):
+        """
+        Resolve points to their delivery zone.
+
+        Returns:
+            One entry per point: None when no zone contains it, else a dict with
+            zone_id, zone_name, delivery_fee, estimated_delivery_time and
+            zone_ids (every containing zone, most specific first)
+        """
+        best, inside = self.match(latitudes, longitudes)
+        # Matches in (point, zone position) order; each point's slice starts with its most specific zone
+        point_rows, zone_positions = np.nonzero(inside)
+        matched_ids = self.ids[zone_positions].tolist()
+        bounds = np.searchsorted(point_rows, np.arange(len(best) + 1)).tolist()
+        ids, delivery_times = self.ids.tolist(), self.delivery_times.tolist()
+        results = []
+        for point, position in enumerate(best.tolist()):
+            if position < 0:
+                results.append(None)
+                continue
+            results.append({
+                'zone_id': ids[position],
+                'zone_name': self.names[position],
+                'delivery_fee': self.fees[position],
+                'estimated_delivery_time': delivery_times[position],
+                'zone_ids': matched_ids[bounds[point]:bounds[point + 1]],
+            })
+        return results
+
+
+def get_zone_version():
+    """
+    Return the current version of the delivery zones.
+
+    The version is (zone count, highest id, latest updated_at), which changes
+    whenever a zone is created, deleted or saved; it is re-read from the
+    database once ZONE_VERSION_TTL seconds have passed.
+    """
+    global _version, _version_read_at
+    now = time.monotonic()
+    version = _version
+    if version is None or now - _version_read_at >= ZONE_VERSION_TTL:
+        row = DeliveryZone.objects.aggregate(count=Count('id'), last_id=Max('id'), last_updated=Max('updated_at'))
+        version = _version = (row['count'], row['last_id'], row['last_updated'])
+        _version_read_at = now
+    return version
+
+
+def bump_zone_version():
+    """Make this process re-read the zone version before its next lookup."""
+    global _version
+    _version = None
+
+
+def get_zone_index():
+    """Return this process's zone index, rebuilding it if the zones changed."""
+    global _index
+    version = get_zone_version()
+    index = _index
+    if index is None or index.version != version:
+        with _lock:
+            index = _index
+            if index is None or index.version != version:
+                index = _index = ZoneIndex(DeliveryZone.objects.filter(is_active=True), version)
+    return index
+
+
+def resolve_points(points):
+    """
+    Resolve (latitude, longitude) points to their delivery zone in one vectorized call.
+
+    Returns:
+        One entry per point, as for ZoneIndex.resolve()
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    return get_zone_index().resolve(points[:, 0], points[:, 1])
+
+
+def resolve_point(latitude, longitude):
+    """Return the delivery zone of a point as for ZoneIndex.resolve(), or None."""
+    return resolve_points([(latitude, longitude)])[0]
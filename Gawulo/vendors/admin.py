@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Vendor, ProductService, VendorDocument
+from .models import Vendor, ProductService, VendorDocument, ProductSearchToken, ProductSearchTerm
 
 
 @admin.register(Vendor)
@@ -7,11 +7,14 @@ class VendorAdmin(admin.ModelAdmin):
     list_display = ['name', 'user', 'category', 'is_verified', 'average_rating', 'review_count', 'created_at']
     list_filter = ['category', 'is_verified', 'created_at']
     search_fields = ['name', 'user__username', 'user__email']
-    readonly_fields = ['id', 'created_at', 'updated_at']
+    readonly_fields = ['id', 'geohash', 'created_at', 'updated_at']
     fieldsets = (
         ('Basic Information', {
             'fields': ('id', 'user', 'name', 'category', 'profile_description')
         }),
+        ('Location', {
+            'fields': ('latitude', 'longitude', 'geohash', 'delivery_radius_km')
+        }),
         ('Status & Ratings', {
             'fields': ('is_verified', 'average_rating', 'review_count')
         }),
@@ -60,3 +63,16 @@ class VendorDocumentAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(ProductSearchToken)
+class ProductSearchTokenAdmin(admin.ModelAdmin):
+    list_display = ['product_service', 'token', 'frequency', 'document_length']
+    search_fields = ['token', 'product_service__name']
+    raw_id_fields = ['product_service']
+
+
+@admin.register(ProductSearchTerm)
+class ProductSearchTermAdmin(admin.ModelAdmin):
+    list_display = ['term', 'document_count']
+    search_fields = ['term']
@@ -0,0 +1,134 @@
+"""
+Location-based vendor discovery.
+
+Answers "which verified vendors are within X km of this point" and "which
+verified vendors deliver to this point" (the point is within the vendor's
+delivery_radius_km), nearest or best rated first.
+
+A query runs in two passes:
+
+1. Prefilter, on geohash indexes (see vendors.geo):
+   - within X km: the bounding box of the search circle is covered with a few
+     geohash cells, and only vendors whose geohash falls in one of those index
+     ranges and whose coordinates fall in the box are read;
+   - delivers: each vendor's delivery area is stored as the geohash cells
+     covering it (VendorDeliveryCell), so only vendors with a cell that is a
+     prefix of the point's geohash are read - one IN lookup whatever the radii.
+2. Exact pass: the Haversine distances of all candidates are computed in one
+   NumPy call, the candidates outside the circle (or outside their own delivery
+   radius) are dropped and the rest are sorted with np.lexsort.
+
+Candidates are read as (id, latitude, longitude, rating, delivery radius)
+floats; no vendor row is loaded until the page of results is known.
+"""
+import numpy as np
+from django.db.models import FloatField, Q
+from django.db.models.functions import Cast
+from .geo import GEOHASH_PRECISION, bounding_box, covering_cells, encode_geohash, geohash_range, haversine_km
+from .models import Vendor, VendorDeliveryCell
+
+# Largest search radius accepted for "within X km" queries
+MAX_SEARCH_RADIUS_KM = 100
+SORT_ORDERS = ('distance', 'rating')
+
+
+def delivery_area_cells(latitude, longitude, radius_km):
+    """Return the geohash cells covering a delivery area."""
+    return covering_cells(*bounding_box(latitude, longitude, float(radius_km)))
+
+
+def rebuild_delivery_cells(vendors):
+    """
+    Rewrite the delivery cells of some vendors from their location and delivery radius.
+
+    Args:
+        vendors: Vendor instances; those without a location or radius get no cells
+    """
+    vendors = list(vendors)
+    cells = [
+        VendorDeliveryCell(vendor_id=vendor.pk, cell=cell)
+        for vendor in vendors
+        if vendor.latitude is not None and vendor.longitude is not None and vendor.delivery_radius_km is not None
+        for cell in delivery_area_cells(vendor.latitude, vendor.longitude, vendor.delivery_radius_km)
+    ]
+    VendorDeliveryCell.objects.filter(vendor_id__in=[vendor.pk for vendor in vendors]).delete()
+    VendorDeliveryCell.objects.bulk_create(cells, batch_size=1000)
+
+
+def _candidates(latitude, longitude, radius_km=None, delivers=False, category=None):
+    """Return the prefiltered verified vendors as arrays of ids, coordinates, ratings and delivery radii."""
+    vendors = Vendor.objects.filter(is_verified=True, deleted_at__isnull=True)
+    if delivers:
+        point = encode_geohash(latitude, longitude)
+        prefixes = [point[:length] for length in range(GEOHASH_PRECISION + 1)]
+        vendors = vendors.filter(
+            pk__in=VendorDeliveryCell.objects.filter(cell__in=prefixes).values('vendor_id')
+        )
+    if radius_km is not None:
+        min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+        in_box = Q(latitude__gte=min_lat, latitude__lte=max_lat, longitude__gte=min_lng, longitude__lte=max_lng)
+        if not delivers:
+            in_cells = Q()
+            for cell in covering_cells(min_lat, max_lat, min_lng, max_lng):
+                lower, upper = geohash_range(cell)
+                in_cells |= Q(geohash__gte=lower, geohash__lt=upper)
+            in_box &= in_cells
+        vendors = vendors.filter(in_box)
+    if category:
+        vendors = vendors.filter(category__iexact=category)
+
+    # Floats rather than Decimals: converting thousands of Decimals would dominate the query
+    rows = vendors.values_list(
+        'id',
+        Cast('latitude', FloatField()),
+        Cast('longitude', FloatField()),
+        Cast('average_rating', FloatField()),
+        Cast('delivery_radius_km', FloatField()),
+    )
+    array = np.array(list(rows), dtype=float).reshape(-1, 5)
+    # Vendors without a delivery radius deliver nowhere
+    return array[:, 0].astype(np.int64), array[:, 1], array[:, 2], array[:, 3], np.nan_to_num(array[:, 4], nan=-1.0)
+
+
+def find_vendors(latitude, longitude, radius_km=None, delivers=False, category=None, sort='distance',
+                 limit=20, offset=0):
+    """
+    Find verified vendors near a point.
+
+    Args:
+        latitude: Latitude of the point in degrees
+        longitude: Longitude of the point in degrees
+        radius_km: Only vendors at most this far away (up to MAX_SEARCH_RADIUS_KM)
+        delivers: Only vendors whose delivery radius covers the point
+        category: Only vendors of this category
+        sort: 'distance' (nearest first, then best rated) or 'rating' (best
+            rated first, then nearest)
+        limit: Maximum number of results
+        offset: Number of results to skip
+
+    Returns:
+        Tuple of (number of matching vendors, list of (vendor id, distance in km))
+    """
+    if radius_km is None and not delivers:
+        raise ValueError('Give a radius, ask for vendors delivering to the point, or both.')
+    if radius_km is not None:
+        radius_km = min(float(radius_km), MAX_SEARCH_RADIUS_KM)
+
+    ids, latitudes, longitudes, ratings, delivery_radii = _candidates(
+        latitude, longitude, radius_km, delivers, category
+    )
+    distances = haversine_km(latitude, longitude, latitudes, longitudes)
+    keep = np.ones(len(ids), dtype=bool)
+    if radius_km is not None:
+        keep &= distances <= radius_km
+    if delivers:
+        keep &= distances <= delivery_radii
+    ids, distances, ratings = ids[keep], distances[keep], ratings[keep]
+
+    # lexsort sorts by the last key first
+    if sort == 'rating':
+        order = np.lexsort((ids, distances, -ratings))
+    else:
+        order = np.lexsort((ids, -ratings, distances))
+    page = order[offset:offset + limit]
+    return len(ids), [(int(ids[i]), float(distances[i])) for i in page]
@@ -0,0 +1,132 @@
+"""
+Geographic helpers: geohashes, bounding boxes and vectorized distances.
+
+A geohash interleaves longitude and latitude bits and writes them in base 32,
+so points sharing a prefix lie in the same cell and the points of a cell form
+one range of an ordinary string index. covering_cells() returns the few cells
+covering a bounding box, which turns "near this point" into a handful of index
+range scans on any database.
+
+Distances are great-circle (Haversine) distances in kilometres, computed with
+NumPy over whole arrays of coordinates at once.
+"""
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+# Stored precision: cells of about 4.8m x 4.8m
+GEOHASH_PRECISION = 9
+# A bounding box is covered by at most this many cells; fewer, larger cells are used for large boxes
+MAX_COVERING_CELLS = 16
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Return the geohash of a point."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+    chars = []
+    bits, bit_count, even = 0, 0, True
+    while len(chars) < precision:
+        value, bounds = (longitude, lng_range) if even else (latitude, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        if value >= middle:
+            bits = (bits << 1) | 1
+            bounds[0] = middle
+        else:
+            bits <<= 1
+            bounds[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Return the (latitude, longitude) size in degrees of the geohash cells of a precision."""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Return the (min_lat, max_lat, min_lng, max_lng) box containing a circle.
+
+    Near a pole or across the antimeridian the box spans every longitude.
+    """
+    latitude, longitude = float(latitude), float(longitude)
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+    delta_lng = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(latitude))))
+    min_lng, max_lng = longitude - delta_lng, longitude + delta_lng
+    if min_lng < -180 or max_lng > 180:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, min_lng, max_lng
+
+
+def covering_cells(min_lat, max_lat, min_lng, max_lng, max_cells=MAX_COVERING_CELLS):
+    """
+    Return geohash prefixes whose cells together cover a bounding box.
+
+    Uses the finest precision needing at most max_cells cells.
+    """
+    cells = ['']
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        lat_size, lng_size = cell_size(precision)
+        lat_rows = range(math.floor((min_lat + 90) / lat_size), math.floor((min(max_lat, 89.999999) + 90) / lat_size) + 1)
+        lng_cols = range(math.floor((min_lng + 180) / lng_size), math.floor((min(max_lng, 179.999999) + 180) / lng_size) + 1)
+        if len(lat_rows) * len(lng_cols) > max_cells:
+            break
+        # Each cell is named by the geohash of its centre
+        cells = [
+            encode_geohash((row + 0.5) * lat_size - 90, (col + 0.5) * lng_size - 180, precision)
+            for row in lat_rows for col in lng_cols
+        ]
+    return cells
+
+
+def geohash_range(prefix):
+    """Return the (lower, upper) bounds of the geohashes starting with prefix."""
+    if not prefix:
+        return '', '~'
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """
+    Return the distances in km from one point to arrays of points.
+
+    Args:
+        latitude: Latitude of the origin in degrees
+        longitude: Longitude of the origin in degrees
+        latitudes: Array of latitudes in degrees
+        longitudes: Array of longitudes in degrees (same shape as latitudes)
+
+    Returns:
+        Float array of distances
+    """
+    lat1, lng1 = math.radians(float(latitude)), math.radians(float(longitude))
+    lat2 = np.radians(np.asarray(latitudes, dtype=float))
+    lng2 = np.radians(np.asarray(longitudes, dtype=float))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def unit_vectors(latitudes, longitudes):
+    """
+    Return the points as unit vectors from the Earth's centre, one row per point.
+
+    A point p is within great-circle distance d of c exactly when
+    p . c >= cos(d / EARTH_RADIUS_KM), so containment in many circles becomes
+    one matrix product.
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lng = np.radians(np.asarray(longitudes, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)], axis=-1)
@@ -0,0 +1,55 @@
+"""
+Django management command that backfills the stored preview image paths.
+
+Resolves preview_image_path for every vendor and product/service from its images
+and legacy image field, in batches of increasing id, and writes only the rows
+whose stored path differs. The migration adding the column fills it in and the
+image views keep it current; run it to repair the stored paths. Safe to re-run.
+"""
+
+from django.core.management.base import BaseCommand
+
+from vendors.models import Vendor, ProductService, resolve_preview_image_path
+
+
+class Command(BaseCommand):
+    help = 'Backfill preview_image_path on vendors and products/services'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of rows resolved per batch',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        for model in (Vendor, ProductService):
+            updated, total = self.backfill(model, batch_size)
+            self.stdout.write(self.style.SUCCESS(
+                f'Updated {updated} of {total} {model._meta.verbose_name_plural}'
+            ))
+
+    def backfill(self, model, batch_size):
+        """Resolve and store the preview paths of every row of a model, including soft-deleted ones."""
+        rows = model.objects.order_by('pk').prefetch_related('images')
+        updated = 0
+        total = 0
+        last_id = 0
+        while True:
+            batch = list(rows.filter(pk__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            changed = []
+            for obj in batch:
+                # images are ordered by display_order, created_at
+                path = resolve_preview_image_path(obj.images.all(), getattr(obj, obj.preview_fallback_field))
+                if path != obj.preview_image_path:
+                    obj.preview_image_path = path
+                    changed.append(obj)
+            model.objects.bulk_update(changed, ['preview_image_path'])
+            updated += len(changed)
+            total += len(batch)
+            last_id = batch[-1].pk
+        return updated, total
@@ -0,0 +1,157 @@
+"""
+Django management command that benchmarks the product search index.
+
+Generates a synthetic catalogue (1M products by default) inside a transaction
+that is always rolled back, indexes it into the chosen backends, then times a mix
+of queries: common and rare words, several words, prefixes, typos and filters.
+Query latency should follow the number of matches rather than the catalogue size.
+"""
+
+import random
+import statistics
+import time
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.test.utils import CaptureQueriesContext
+
+from vendors import search
+from vendors.models import Vendor, ProductService
+from vendors.search import BACKENDS, reindex_products
+
+# A few common words plus a long tail, so word frequencies are skewed as in real menus
+COMMON_WORDS = (
+    'chicken', 'beef', 'burger', 'chips', 'pap', 'wors', 'bunny', 'chow', 'kota', 'vetkoek',
+    'coffee', 'latte', 'tea', 'juice', 'cake', 'pie', 'wrap', 'salad', 'rice', 'stew',
+    'haircut', 'braids', 'nails', 'repair', 'wash', 'delivery', 'spicy', 'grilled', 'fried', 'fresh',
+)
+CATEGORIES = ('food', 'drinks', 'bakery', 'beauty', 'repairs', 'groceries')
+
+QUERIES = (
+    ('common word', 'chicken', {}),
+    ('rare word', None, {}),
+    ('two words', 'grilled chicken', {}),
+    ('prefix', 'chick', {}),
+    ('typo', 'chikcen', {}),
+    ('filtered', 'chicken', {'available_for': 'delivery', 'max_price': Decimal('50'), 'verified': True}),
+    ('category', 'fresh', {'category': 'bakery'}),
+)
+
+
+class Rollback(Exception):
+    """Raised to discard the generated data."""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark product search on a synthetic catalogue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=1000000,
+            help='Number of products to generate',
+        )
+        parser.add_argument(
+            '--vendors',
+            type=int,
+            default=2000,
+            help='Number of vendors to spread the products over',
+        )
+        parser.add_argument(
+            '--backend',
+            action='append',
+            dest='backends',
+            choices=sorted(BACKENDS),
+            help='Backend to benchmark (can be repeated; default: every backend usable on this database)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed runs per query (the median is reported)',
+        )
+
+    def handle(self, *args, **options):
+        backends = options['backends'] or [
+            name for name in sorted(BACKENDS) if name != 'fts5' or connection.vendor == 'sqlite'
+        ]
+        try:
+            with transaction.atomic():
+                rare_word = self._generate(options['products'], options['vendors'])
+                for name in backends:
+                    self._run(name, BACKENDS[name](), rare_word, options['repeat'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Generated data rolled back')
+        finally:
+            search._backend = None
+
+    def _generate(self, product_count, vendor_count):
+        self.stdout.write(f'Generating {product_count} products for {vendor_count} vendors...')
+        started = time.perf_counter()
+        rng = random.Random(42)
+        suffix = f'{int(time.time())}{rng.randint(0, 9999)}'
+        tail = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(4, 9))) for _ in range(20000)]
+
+        def word():
+            # Common words for a third of the text, the rest from a Zipf-like long tail
+            if rng.random() < 0.3:
+                return rng.choice(COMMON_WORDS)
+            return tail[min(int(rng.paretovariate(1.2)), len(tail)) - 1]
+
+        def words(count):
+            return ' '.join(word() for _ in range(count))
+
+        users = User.objects.bulk_create([
+            User(username=f'bench_search_{suffix}_{i}', email=f'bench_search_{suffix}_{i}@example.com')
+            for i in range(vendor_count)
+        ])
+        vendors = Vendor.objects.bulk_create([
+            Vendor(user=user, name=words(2).title(), category=rng.choice(CATEGORIES), is_verified=rng.random() < 0.7)
+            for user in users
+        ])
+        if vendors[0].pk is None:
+            # Backends that do not return ids from bulk inserts
+            vendors = list(Vendor.objects.filter(user__in=users))
+
+        batch_size = 5000
+        for start in range(0, product_count, batch_size):
+            ProductService.objects.bulk_create([
+                ProductService(
+                    vendor=rng.choice(vendors),
+                    name=words(rng.randint(2, 4)).title(),
+                    description=words(rng.randint(8, 20)),
+                    current_price=Decimal(rng.randint(500, 50000)) / 100,
+                    available_for=rng.choice(('delivery', 'pickup', 'both')),
+                )
+                for _ in range(start, min(start + batch_size, product_count))
+            ])
+        self.stdout.write(f'Generated in {time.perf_counter() - started:.1f}s')
+        return tail[50]
+
+    def _run(self, name, backend, rare_word, repeat):
+        # Bulk inserts skip the signals that maintain the index
+        self.stdout.write(f'Indexing with {type(backend).__name__}...')
+        started = time.perf_counter()
+        product_ids = list(ProductService.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(product_ids), 5000):
+            reindex_products(product_ids[start:start + 5000], backend=backend)
+        self.stdout.write(f'Indexed in {time.perf_counter() - started:.1f}s')
+
+        search._backend = backend
+        self.stdout.write(f"{'query':>12}  {'matches':>8}  {'queries':>7}  {'median ms':>9}  {'min ms':>7}")
+        for label, query, filters in QUERIES:
+            query = query or rare_word
+            search.search_products(query, filters)  # warm up
+            timings = []
+            for _ in range(repeat):
+                reset_queries()
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    total, _ = search.search_products(query, filters)
+                    timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'{label:>12}  {total:>8}  {len(queries):>7}  {statistics.median(timings):>9.1f}  {min(timings):>7.1f}'
+            )
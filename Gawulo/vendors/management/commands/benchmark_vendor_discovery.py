@@ -0,0 +1,141 @@
+"""
+Django management command that benchmarks location-based vendor discovery.
+
+Generates vendors clustered around a few cities (50k by default) inside a
+transaction that is always rolled back, then runs random queries near those
+cities and reports the candidates read by the geohash prefilters, the matches and
+the p50/p95/p99 latency of each kind of query.
+"""
+
+import random
+import time
+from decimal import Decimal
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from vendors import discovery
+from vendors.discovery import rebuild_delivery_cells
+from vendors.geo import encode_geohash
+from vendors.models import Vendor
+
+# (latitude, longitude, weight) of the cities the vendors cluster around
+CITIES = (
+    (-26.2041, 28.0473, 5),   # Johannesburg
+    (-25.7479, 28.2293, 3),   # Pretoria
+    (-33.9249, 18.4241, 3),   # Cape Town
+    (-29.8587, 31.0218, 2),   # Durban
+    (-33.9608, 25.6022, 1),   # Gqeberha
+)
+CATEGORIES = ('food', 'drinks', 'bakery', 'beauty', 'repairs', 'groceries')
+
+QUERIES = (
+    ('within 2km', {'radius_km': 2}),
+    ('within 10km', {'radius_km': 10}),
+    ('within 50km', {'radius_km': 50}),
+    ('delivers', {'delivers': True}),
+    ('delivers+cat', {'delivers': True, 'category': 'food'}),
+    ('10km rating', {'radius_km': 10, 'sort': 'rating'}),
+)
+
+
+class Rollback(Exception):
+    """Raised to discard the generated data."""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark location-based vendor discovery on synthetic vendors'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--vendors',
+            type=int,
+            default=50000,
+            help='Number of vendors to generate',
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=500,
+            help='Random queries per kind of query',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._generate(options['vendors'])
+                self._run(options['queries'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Generated data rolled back')
+
+    def _point(self, rng, spread_km):
+        latitude, longitude, _ = rng.choices(CITIES, weights=[city[2] for city in CITIES])[0]
+        # Roughly 111km per degree
+        return (
+            latitude + rng.gauss(0, spread_km / 111),
+            longitude + rng.gauss(0, spread_km / 111 / np.cos(np.radians(latitude))),
+        )
+
+    def _generate(self, vendor_count):
+        self.stdout.write(f'Generating {vendor_count} vendors...')
+        started = time.perf_counter()
+        rng = random.Random(42)
+        suffix = f'{int(time.time())}{rng.randint(0, 9999)}'
+        users = User.objects.bulk_create([
+            User(username=f'bench_geo_{suffix}_{i}', email=f'bench_geo_{suffix}_{i}@example.com')
+            for i in range(vendor_count)
+        ], batch_size=5000)
+
+        vendors = []
+        for i, user in enumerate(users):
+            latitude, longitude = self._point(rng, 15)
+            latitude, longitude = Decimal(f'{latitude:.6f}'), Decimal(f'{longitude:.6f}')
+            vendors.append(Vendor(
+                user=user, name=f'Vendor {i}', category=rng.choice(CATEGORIES),
+                is_verified=rng.random() < 0.8, average_rating=Decimal(rng.randint(0, 50)) / 10,
+                latitude=latitude, longitude=longitude,
+                # bulk_create skips save(), which maintains the geohash
+                geohash=encode_geohash(latitude, longitude),
+                delivery_radius_km=Decimal(rng.randint(1, 15)) if rng.random() < 0.7 else None,
+            ))
+        vendors = Vendor.objects.bulk_create(vendors, batch_size=5000)
+        if vendors[0].pk is None:
+            # Backends that do not return ids from bulk inserts
+            vendors = list(Vendor.objects.filter(user__in=users))
+        # bulk_create skips the signal that maintains the delivery cells
+        rebuild_delivery_cells(vendors)
+        self.stdout.write(f'Generated in {time.perf_counter() - started:.1f}s')
+
+    def _run(self, query_count):
+        rng = random.Random(7)
+        points = [self._point(rng, 20) for _ in range(query_count)]
+        self.stdout.write(
+            f"{'query':>12}  {'candidates':>10}  {'matches':>8}  {'p50 ms':>7}  {'p95 ms':>7}  {'p99 ms':>7}"
+        )
+        candidates_of = discovery._candidates
+        for label, kwargs in QUERIES:
+            candidates, matches, timings = [], [], []
+
+            def counting_candidates(*args, **kw):
+                arrays = candidates_of(*args, **kw)
+                candidates.append(len(arrays[0]))
+                return arrays
+
+            discovery._candidates = counting_candidates
+            try:
+                discovery.find_vendors(*points[0], **kwargs)  # warm up
+                candidates.clear()
+                for latitude, longitude in points:
+                    started = time.perf_counter()
+                    total, _ = discovery.find_vendors(latitude, longitude, **kwargs)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    matches.append(total)
+            finally:
+                discovery._candidates = candidates_of
+            p50, p95, p99 = np.percentile(timings, [50, 95, 99])
+            self.stdout.write(
+                f'{label:>12}  {np.mean(candidates):>10.0f}  {np.mean(matches):>8.0f}  '
+                f'{p50:>7.1f}  {p95:>7.1f}  {p99:>7.1f}'
+            )
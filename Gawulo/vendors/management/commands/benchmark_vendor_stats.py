@@ -0,0 +1,157 @@
+"""
+Django management command that benchmarks the vendor dashboard statistics.
+
+Generates a vendor with a large synthetic order history inside a transaction that
+is always rolled back, then times compute_vendor_stats() for several trend window
+lengths. Query count and latency should stay flat as the window grows.
+"""
+
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from auth_api.models import Customer
+from orders.models import Order, OrderLineItem
+from orders.rollups import rebuild_rollups, rollup_date
+from vendors.models import Vendor, ProductService
+from vendors.stats import compute_vendor_stats
+
+
+class Rollback(Exception):
+    """Raised to discard the generated data."""
+
+
+@contextmanager
+def explicit_created_at(*models):
+    """Let bulk_create keep the created_at values set on the instances."""
+    fields = [model._meta.get_field('created_at') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Benchmark vendor dashboard statistics on a synthetic order history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--orders',
+            type=int,
+            default=100000,
+            help='Number of orders to generate for the benchmark vendor',
+        )
+        parser.add_argument(
+            '--history-days',
+            type=int,
+            default=365,
+            help='Spread the generated orders over this many days',
+        )
+        parser.add_argument(
+            '--trend-days',
+            type=str,
+            default='7,30,90,365',
+            help='Comma-separated trend window lengths to time',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed runs per window length (the median is reported)',
+        )
+
+    def handle(self, *args, **options):
+        trend_days = [int(days) for days in options['trend_days'].split(',')]
+        try:
+            with transaction.atomic():
+                vendor = self._generate(options['orders'], options['history_days'])
+                self._run(vendor, trend_days, options['repeat'])
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Generated data rolled back')
+
+    def _generate(self, order_count, history_days):
+        self.stdout.write(f'Generating {order_count} orders over {history_days} days...')
+        started = time.perf_counter()
+        rng = random.Random(42)
+        suffix = f'{int(time.time())}{rng.randint(0, 9999)}'
+
+        vendor_user = User.objects.create_user(f'bench_vendor_{suffix}', f'bench_vendor_{suffix}@example.com')
+        vendor = Vendor.objects.create(user=vendor_user, name='Benchmark Vendor', category='food')
+        products = ProductService.objects.bulk_create([
+            ProductService(vendor=vendor, name=f'Product {i}', current_price=Decimal('25.00'))
+            for i in range(50)
+        ])
+        customer_users = User.objects.bulk_create([
+            User(username=f'bench_customer_{suffix}_{i}', email=f'bench_customer_{suffix}_{i}@example.com')
+            for i in range(500)
+        ])
+        customers = Customer.objects.bulk_create([
+            Customer(user=user, display_name=user.username) for user in customer_users
+        ])
+
+        now = timezone.now()
+        statuses = [value for value, _ in Order.ORDER_STATUS]
+        batch_size = 5000
+        with explicit_created_at(Order, OrderLineItem):
+            for start in range(0, order_count, batch_size):
+                orders = Order.objects.bulk_create([
+                    Order(
+                        order_uid=f'B{suffix}-{i}',
+                        vendor=vendor,
+                        customer=rng.choice(customers),
+                        total_amount=Decimal(rng.randint(1000, 50000)) / 100,
+                        current_status=rng.choice(statuses),
+                        is_completed=False,
+                        delivery_type=rng.choice(('delivery', 'pickup')),
+                        created_at=now - timedelta(seconds=rng.randint(0, history_days * 86400)),
+                    )
+                    for i in range(start, min(start + batch_size, order_count))
+                ])
+                if orders[0].pk is None:
+                    # Backends that do not return ids from bulk inserts
+                    orders = list(Order.objects.filter(order_uid__in=[order.order_uid for order in orders]))
+                OrderLineItem.objects.bulk_create([
+                    OrderLineItem(
+                        order=order,
+                        product_service=product,
+                        quantity=2,
+                        unit_price_snapshot=product.current_price,
+                        discount_applied=Decimal('0'),
+                        line_total=product.current_price * 2,
+                        created_at=order.created_at,
+                    )
+                    for order in orders
+                    for product in [rng.choice(products)]
+                ])
+
+        # Bulk inserts skip the signals that maintain the sales rollups
+        rebuild_rollups(rollup_date(now - timedelta(days=history_days)), rollup_date(now), vendor_ids=[vendor.id])
+
+        self.stdout.write(f'Generated in {time.perf_counter() - started:.1f}s')
+        return vendor
+
+    def _run(self, vendor, trend_days, repeat):
+        self.stdout.write(f"{'trend days':>10}  {'queries':>7}  {'median ms':>9}  {'min ms':>7}")
+        for days in trend_days:
+            compute_vendor_stats(vendor, trend_days=days)  # warm up
+            timings = []
+            for _ in range(repeat):
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    compute_vendor_stats(vendor, trend_days=days)
+                    timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f'{days:>10}  {len(queries):>7}  {statistics.median(timings):>9.1f}  {min(timings):>7.1f}'
+            )
@@ -0,0 +1,57 @@
+"""
+Django management command that rebuilds the product search index.
+
+Reindexes products in batches of increasing id into the configured backend (or
+the one given with --backend). The migration adding the search tables indexes
+the existing products and the index is maintained as products change; run it
+after switching backends or to repair the index.
+"""
+
+from django.core.management.base import BaseCommand
+
+from vendors.models import ProductService
+from vendors.search import BACKENDS, get_search_backend, reindex_products
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of products reindexed per batch',
+        )
+        parser.add_argument(
+            '--backend',
+            choices=sorted(BACKENDS),
+            help='Rebuild this backend\'s index instead of the configured one',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Drop every index entry first (search returns nothing until the rebuild finishes)',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(options['batch_size'], 1)
+        backend = BACKENDS[options['backend']]() if options['backend'] else get_search_backend()
+        if options['clear']:
+            backend.clear()
+
+        products = ProductService.objects.filter(deleted_at__isnull=True).order_by('pk')
+        total = 0
+        last_id = 0
+        while True:
+            batch = list(products.filter(pk__gt=last_id).values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                break
+            reindex_products(batch, backend=backend)
+            total += len(batch)
+            last_id = batch[-1]
+            self.stdout.write(f'Reindexed {total} product(s)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt the {type(backend).__name__} index for {total} product(s)'
+        ))
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.20 on 2026-10-16 20:42
+
+from django.db import migrations, models
+
+
+def backfill_preview_image_paths(apps, schema_editor):
+    """
+    Store the preview path of the existing vendors and products/services.
+
+    As vendors.models.resolve_preview_image_path: the preview image, else the first
+    image in display order, else the legacy single image field.
+    """
+    for model_name, image_model_name, owner_field, fallback_field in (
+        ('Vendor', 'VendorImage', 'vendor_id', 'profile_image'),
+        ('ProductService', 'ProductImage', 'product_service_id', 'image'),
+    ):
+        model = apps.get_model('vendors', model_name)
+        image_model = apps.get_model('vendors', image_model_name)
+        paths = {}
+        for owner_id, path in image_model.objects.order_by(
+            '-is_preview', 'display_order', 'created_at'
+        ).values_list(owner_field, 'image').iterator():
+            paths.setdefault(owner_id, path)
+        for pk, fallback in model.objects.exclude(**{fallback_field: ''}).values_list('pk', fallback_field).iterator():
+            paths.setdefault(pk, fallback)
+        model.objects.bulk_update(
+            [model(pk=pk, preview_image_path=path) for pk, path in paths.items() if path],
+            ['preview_image_path'], batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0004_productservice_available_for_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productservice',
+            name='preview_image_path',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='preview_image_path',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.RunPython(backfill_preview_image_paths, migrations.RunPython.noop),
+    ]
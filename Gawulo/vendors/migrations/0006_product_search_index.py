@@ -0,0 +1,106 @@
+# Generated by Django 4.2.20 on 2026-10-16 20:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_fts_tables(apps, schema_editor):
+    """Create the FTS5 product search table on SQLite (see vendors.search.SQLiteFTS5Backend)."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE vendors_product_search_fts USING fts5("
+        "name, vendor_name, category, description, tokenize='unicode61', prefix='2 3')"
+    )
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE vendors_product_search_vocab USING fts5vocab(vendors_product_search_fts, 'row')"
+    )
+
+
+def drop_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS vendors_product_search_vocab")
+    schema_editor.execute("DROP TABLE IF EXISTS vendors_product_search_fts")
+
+
+def backfill_product_search_index(apps, schema_editor):
+    """
+    Index the existing products with the configured backend, as rebuild_product_search_index does.
+
+    The documents are read through the historical models and written by the
+    backend to the tables created above. A new database has no products to index.
+    """
+    from vendors.search import REINDEX_BATCH_SIZE, get_search_backend, tokenize
+
+    ProductService = apps.get_model('vendors', 'ProductService')
+    products = ProductService.objects.filter(deleted_at__isnull=True).order_by('pk').values(
+        'id', 'name', 'description', 'vendor__name', 'vendor__category'
+    )
+    if not products.exists():
+        return
+    backend = get_search_backend()
+    last_id = 0
+    while True:
+        batch = list(products.filter(pk__gt=last_id)[:REINDEX_BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1]['id']
+        backend.index([row['id'] for row in batch], {
+            row['id']: {
+                'name': tokenize(row['name']),
+                'vendor_name': tokenize(row['vendor__name']),
+                'category': tokenize(row['vendor__category']),
+                'description': tokenize(row['description']),
+            }
+            for row in batch
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0005_preview_image_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('product_service', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='vendors.productservice')),
+                ('length', models.FloatField(help_text='Field-weighted number of words')),
+            ],
+            options={
+                'verbose_name': 'Product Search Document',
+                'verbose_name_plural': 'Product Search Documents',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSearchTerm',
+            fields=[
+                ('term', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('document_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Product Search Term',
+                'verbose_name_plural': 'Product Search Terms',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSearchToken',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('token', models.CharField(max_length=64)),
+                ('frequency', models.FloatField(help_text='Field-weighted number of occurrences')),
+                ('document_length', models.FloatField()),
+                ('product_service', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='vendors.productservice')),
+            ],
+            options={
+                'verbose_name': 'Product Search Token',
+                'verbose_name_plural': 'Product Search Tokens',
+                'indexes': [models.Index(fields=['token', 'product_service'], name='vendors_pro_token_a9cde2_idx'), models.Index(fields=['product_service'], name='vendors_pro_product_d1c500_idx')],
+            },
+        ),
+        migrations.RunPython(create_fts_tables, drop_fts_tables),
+        migrations.RunPython(backfill_product_search_index, migrations.RunPython.noop),
+    ]
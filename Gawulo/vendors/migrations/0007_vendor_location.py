@@ -0,0 +1,52 @@
+# Generated by Django 4.2.20 on 2026-10-16 21:10
+
+from decimal import Decimal
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0006_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendor',
+            name='delivery_radius_km',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='How far from its location the vendor delivers', max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(Decimal('0')), django.core.validators.MaxValueValidator(Decimal('50'))]),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='latitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, validators=[django.core.validators.MinValueValidator(Decimal('-90')), django.core.validators.MaxValueValidator(Decimal('90'))]),
+        ),
+        migrations.AddField(
+            model_name='vendor',
+            name='longitude',
+            field=models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, validators=[django.core.validators.MinValueValidator(Decimal('-180')), django.core.validators.MaxValueValidator(Decimal('180'))]),
+        ),
+        migrations.CreateModel(
+            name='VendorDeliveryCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell', models.CharField(max_length=12)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delivery_cells', to='vendors.vendor')),
+            ],
+            options={
+                'verbose_name': 'Vendor Delivery Cell',
+                'verbose_name_plural': 'Vendor Delivery Cells',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='vendordeliverycell',
+            constraint=models.UniqueConstraint(fields=('cell', 'vendor'), name='unique_delivery_cell_per_vendor'),
+        ),
+    ]
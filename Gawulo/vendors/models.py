@@ -6,12 +6,53 @@ Defines models for vendor profiles, products/services, and vendor documents.
 
 from django.db import models
 from django.contrib.auth.models import User
+from Gawulo.mixins import ImmutableFieldsMixin, LoadedFieldsMixin
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
+from .geo import encode_geohash
 
+# Upper bound of Vendor.delivery_radius_km
+MAX_DELIVERY_RADIUS_KM = 50
 
-class Vendor(models.Model):
+
+def resolve_preview_image_path(images, fallback=None):
+    """
+    Return the storage path of the preview image, else the first image, else the fallback file.
+    
+    Args:
+        images: The object's VendorImage/ProductImage rows in display order
+        fallback: Legacy single image field (profile_image/image)
+    
+    Returns:
+        Storage path, or '' when there is no image at all
+    """
+    images = list(images)
+    image = next((img for img in images if img.is_preview), images[0] if images else None)
+    file = image.image if image else fallback
+    return file.name if file else ''
+
+
+class PreviewImageMixin:
+    """
+    Keeps preview_image_path in sync with the object's images.
+    
+    Subclasses set preview_fallback_field to their legacy single image field.
+    """
+    preview_fallback_field = None
+    
+    def refresh_preview_image(self):
+        """Recompute preview_image_path from the images and store it if it changed."""
+        image = self.images.order_by('-is_preview', 'display_order', 'created_at').first()
+        path = resolve_preview_image_path([image] if image else [], getattr(self, self.preview_fallback_field))
+        if path != self.preview_image_path:
+            type(self).objects.filter(pk=self.pk).update(preview_image_path=path)
+            self.preview_image_path = path
+        return path
+
+
+class Vendor(PreviewImageMixin, LoadedFieldsMixin, ImmutableFieldsMixin, models.Model):
     """
     Vendor profile model for vendors in the platform.
     
@@ -24,6 +65,8 @@ class Vendor(models.Model):
     category = models.CharField(max_length=100)
     profile_description = models.TextField(null=True, blank=True)
     profile_image = models.ImageField(upload_to='vendor_profiles/', null=True, blank=True)
+    # Storage path of the resolved preview image, maintained by refresh_preview_image()
+    preview_image_path = models.CharField(max_length=100, blank=True, default='')
     is_verified = models.BooleanField(default=False)
     average_rating = models.DecimalField(
         max_digits=2, 
@@ -32,6 +75,30 @@ class Vendor(models.Model):
         validators=[MinValueValidator(0.0), MaxValueValidator(5.0)]
     )
     review_count = models.IntegerField(default=0)
+    latitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(Decimal('-90')), MaxValueValidator(Decimal('90'))]
+    )
+    longitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(Decimal('-180')), MaxValueValidator(Decimal('180'))]
+    )
+    delivery_radius_km = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(Decimal('0')), MaxValueValidator(Decimal(MAX_DELIVERY_RADIUS_KM))],
+        help_text='How far from its location the vendor delivers'
+    )
+    # Geohash of (latitude, longitude), maintained by save(); indexed for discovery
+    geohash = models.CharField(max_length=12, blank=True, default='', db_index=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True, editable=False)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
     deleted_at = models.DateTimeField(null=True, blank=True)
@@ -41,9 +108,22 @@ class Vendor(models.Model):
         verbose_name_plural = 'Vendors'
         ordering = ['-created_at']
     
+    preview_fallback_field = 'profile_image'
+    # Compared on save to reindex the vendor's products and rewrite its delivery cells
+    tracked_fields = ('name', 'category', 'latitude', 'longitude', 'delivery_radius_km')
+    
     def __str__(self):
         return f"{self.name} ({self.category})"
     
+    def save(self, *args, **kwargs):
+        """Save the vendor, keeping the geohash in step with its location."""
+        has_location = self.latitude is not None and self.longitude is not None
+        self.geohash = encode_geohash(self.latitude, self.longitude) if has_location else ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+    
     def soft_delete(self):
         """Perform soft delete by setting deleted_at timestamp."""
         if not self.deleted_at:
@@ -60,17 +140,9 @@ class Vendor(models.Model):
     def is_deleted(self):
         """Check if vendor is soft-deleted."""
         return self.deleted_at is not None
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            # Preserve original created_at when updating
-            original = Vendor.objects.get(pk=self.pk)
-            self.created_at = original.created_at
-        super().save(*args, **kwargs)
 
 
-class ProductService(models.Model):
+class ProductService(PreviewImageMixin, LoadedFieldsMixin, ImmutableFieldsMixin, models.Model):
     """
     Product or service model for vendor offerings.
     
@@ -90,6 +162,8 @@ class ProductService(models.Model):
     description = models.TextField(null=True, blank=True)
     current_price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.ImageField(upload_to='product_images/', null=True, blank=True)
+    # Storage path of the resolved preview image, maintained by refresh_preview_image()
+    preview_image_path = models.CharField(max_length=100, blank=True, default='')
     is_service = models.BooleanField(null=True, blank=True)
     estimated_preparation_time_minutes = models.IntegerField(
         null=True,
@@ -111,6 +185,10 @@ class ProductService(models.Model):
         verbose_name_plural = 'Products/Services'
         ordering = ['-created_at']
     
+    preview_fallback_field = 'image'
+    # Compared on save to reindex the orders containing the product
+    tracked_fields = ('name',)
+    
     def __str__(self):
         item_type = "Service" if self.is_service else "Product"
         return f"{self.name} ({item_type}) - {self.vendor.name}"
@@ -131,14 +209,6 @@ class ProductService(models.Model):
     def is_deleted(self):
         """Check if product/service is soft-deleted."""
         return self.deleted_at is not None
-    
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            # Preserve original created_at when updating
-            original = ProductService.objects.get(pk=self.pk)
-            self.created_at = original.created_at
-        super().save(*args, **kwargs)
 
 
 class ProductImage(models.Model):
@@ -181,6 +251,7 @@ class ProductImage(models.Model):
         # Set this as preview
         self.is_preview = True
         self.save()
+        self.product_service.refresh_preview_image()
 
 
 class VendorImage(models.Model):
@@ -223,9 +294,10 @@ class VendorImage(models.Model):
         # Set this as preview
         self.is_preview = True
         self.save()
+        self.vendor.refresh_preview_image()
 
 
-class VendorDocument(models.Model):
+class VendorDocument(ImmutableFieldsMixin, models.Model):
     """
     Document storage model for vendor-related documents.
     
@@ -256,11 +328,99 @@ class VendorDocument(models.Model):
     
     def __str__(self):
         return f"{self.file_name} - {self.vendor.name}"
+
+
+class VendorDeliveryCell(models.Model):
+    """
+    A geohash cell of a vendor's delivery area.
     
-    def save(self, *args, **kwargs):
-        """Prevent modification of created_at on existing records."""
-        if self.pk:
-            # Preserve original created_at when updating
-            original = VendorDocument.objects.get(pk=self.pk)
-            self.created_at = original.created_at
-        super().save(*args, **kwargs)
+    The cells together cover the bounding box of the circle of
+    delivery_radius_km around the vendor's location, so "who delivers to this
+    point" looks up the few cells containing the point. Rewritten by
+    vendors.signals when the location or radius changes.
+    """
+    
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='delivery_cells')
+    cell = models.CharField(max_length=12)
+    
+    class Meta:
+        verbose_name = 'Vendor Delivery Cell'
+        verbose_name_plural = 'Vendor Delivery Cells'
+        constraints = [
+            models.UniqueConstraint(fields=['cell', 'vendor'], name='unique_delivery_cell_per_vendor')
+        ]
+    
+    def __str__(self):
+        return f"{self.vendor_id} - {self.cell}"
+
+
+class ProductSearchDocument(models.Model):
+    """
+    A product/service held in the portable product search index.
+    
+    Stores the document's field-weighted length for BM25 length normalisation.
+    Maintained by vendors.search (DatabaseSearchBackend).
+    """
+    
+    # Not cascaded: the reindex after a delete removes the row and its vocabulary counts
+    product_service = models.OneToOneField(
+        ProductService, on_delete=models.DO_NOTHING, db_constraint=False, primary_key=True, related_name='+'
+    )
+    length = models.FloatField(help_text='Field-weighted number of words')
+    
+    class Meta:
+        verbose_name = 'Product Search Document'
+        verbose_name_plural = 'Product Search Documents'
+    
+    def __str__(self):
+        return f"{self.product_service_id} ({self.length:g} words)"
+
+
+class ProductSearchToken(models.Model):
+    """
+    Posting of the portable product search index.
+    
+    One row per distinct word of a product's name, description, vendor name and
+    vendor category, with the word's field-weighted frequency and the document
+    length copied in so a term's BM25 contribution is computed from its own
+    postings. A query word is a range scan on (token, product_service).
+    """
+    
+    id = models.BigAutoField(primary_key=True)
+    # Not cascaded, see ProductSearchDocument
+    product_service = models.ForeignKey(
+        ProductService, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+', db_index=False
+    )
+    token = models.CharField(max_length=64)
+    frequency = models.FloatField(help_text='Field-weighted number of occurrences')
+    document_length = models.FloatField()
+    
+    class Meta:
+        verbose_name = 'Product Search Token'
+        verbose_name_plural = 'Product Search Tokens'
+        indexes = [
+            models.Index(fields=['token', 'product_service']),
+            models.Index(fields=['product_service']),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_service_id}: {self.token}"
+
+
+class ProductSearchTerm(models.Model):
+    """
+    Vocabulary of the portable product search index.
+    
+    Number of documents containing each word, for BM25 inverse document frequency
+    and typo-tolerant matching.
+    """
+    
+    term = models.CharField(max_length=64, primary_key=True)
+    document_count = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Product Search Term'
+        verbose_name_plural = 'Product Search Terms'
+    
+    def __str__(self):
+        return f"{self.term} ({self.document_count})"
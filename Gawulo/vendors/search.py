@@ -0,0 +1,515 @@
+"""
+Ranked product and service search.
+
+Each product/service is indexed as a document of four fields: its name and
+description and its vendor's name and category. A query matches the documents
+containing every one of its words, a word matching the indexed words it is a
+prefix of. A word of MIN_TYPO_LENGTH letters or more that is not a prefix of any
+indexed word is matched instead against the indexed words starting with the same
+letter that are within one edit of it (two edits from LONG_TYPO_LENGTH letters).
+Matches are ranked by BM25 over the field-weighted document, so a match on the
+name counts most. Results can be filtered on availability, price, vendor,
+vendor category and verified vendors; soft-deleted products and vendors never
+match.
+
+The index is kept by a backend chosen with the PRODUCT_SEARCH_BACKEND setting:
+SQLiteFTS5Backend stores it in an FTS5 virtual table (SQLite only) and
+DatabaseSearchBackend in the ProductSearchDocument, ProductSearchToken and
+ProductSearchTerm tables, which works on every database. Both index the words
+produced by tokenize(), so they match the same documents. Any class with the
+same methods can be configured by dotted path.
+
+A product is reindexed once the transaction saving, soft-deleting or deleting it
+commits, and all of a vendor's products once a change to the vendor's name or
+category commits.
+"""
+import logging
+import math
+import re
+import unicodedata
+from collections import Counter
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Avg, Case, Count, F, FloatField, IntegerField, Max, Q, Sum, Value, When, Window
+from django.db.models.functions import Length
+from django.utils.module_loading import import_string
+from Gawulo.transactions import get_transaction_collector
+from .models import ProductSearchDocument, ProductSearchTerm, ProductSearchToken, ProductService, Vendor
+
+logger = logging.getLogger(__name__)
+
+# Indexed fields and the weight of a word found in each
+FIELD_WEIGHTS = {'name': 4.0, 'vendor_name': 2.0, 'category': 1.0, 'description': 1.0}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Rank of a prefix match ("chick" in "chicken") and of a typo match, relative to the exact word
+PREFIX_FACTOR = 0.8
+TYPO_FACTOR = 0.5
+
+MAX_TOKEN_LENGTH = 64
+MAX_QUERY_TERMS = 8
+MIN_TYPO_LENGTH = 4
+LONG_TYPO_LENGTH = 8
+MAX_TYPO_EXPANSIONS = 10
+REINDEX_BATCH_SIZE = 500
+IN_CHUNK_SIZE = 500
+
+# Document count and average length used by DatabaseSearchBackend drift slowly
+CORPUS_STATS_TIMEOUT = 600
+CORPUS_STATS_KEY = 'product_search:corpus_stats'
+
+_WORD_RE = re.compile(r'[^\W_]+')
+
+
+def normalize(text):
+    """Lowercase a text and strip its accents."""
+    decomposed = unicodedata.normalize('NFKD', str(text).lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    """Return the normalised words of a text in order, repeats included."""
+    if not text:
+        return []
+    return [word[:MAX_TOKEN_LENGTH] for word in _WORD_RE.findall(normalize(text))]
+
+
+def edit_distance(a, b, limit):
+    """
+    Return the edit distance between two words, counting a swap of adjacent letters as one edit.
+
+    Stops early once the distance is known to exceed `limit` and returns limit + 1.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before_previous, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def _prefix_range(term):
+    """Return the (lower, upper) bounds of the words starting with term."""
+    return term, term[:-1] + chr(ord(term[-1]) + 1)
+
+
+def _chunks(values, size=IN_CHUNK_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class DatabaseSearchBackend:
+    """
+    Product search index in ordinary tables, for any database.
+
+    ProductSearchToken holds one posting per (product, word) with the word's
+    field-weighted frequency and the document length, ProductSearchTerm the number
+    of documents per word and ProductSearchDocument each document's length. A
+    query word is a range scan of the postings on (token, product_service); the
+    BM25 score is summed per product in SQL.
+    """
+
+    def index(self, product_ids, documents):
+        """
+        Replace the index entries of some products.
+
+        Args:
+            product_ids: Ids of the products to reindex
+            documents: Dict of product id -> {field: words} for the products that should be indexed
+        """
+        with transaction.atomic():
+            old_terms = Counter()
+            for chunk in _chunks(product_ids):
+                old_terms.update(ProductSearchToken.objects.filter(
+                    product_service_id__in=chunk
+                ).values_list('token', flat=True))
+                ProductSearchToken.objects.filter(product_service_id__in=chunk).delete()
+                ProductSearchDocument.objects.filter(product_service_id__in=chunk).delete()
+
+            new_documents = []
+            postings = []
+            new_terms = Counter()
+            for product_id, fields in documents.items():
+                frequencies = Counter()
+                for field, words in fields.items():
+                    for word in words:
+                        frequencies[word] += FIELD_WEIGHTS[field]
+                if not frequencies:
+                    continue
+                length = sum(frequencies.values())
+                new_documents.append(ProductSearchDocument(product_service_id=product_id, length=length))
+                postings.extend(
+                    ProductSearchToken(product_service_id=product_id, token=token, frequency=frequency, document_length=length)
+                    for token, frequency in frequencies.items()
+                )
+                new_terms.update(frequencies.keys())
+
+            ProductSearchDocument.objects.bulk_create(new_documents, batch_size=1000)
+            ProductSearchToken.objects.bulk_create(postings, batch_size=1000)
+            self._update_terms(new_terms, old_terms)
+
+    def _update_terms(self, new_terms, old_terms):
+        """Apply the change in document counts per word, one UPDATE per distinct change."""
+        changes = {}
+        for term in new_terms.keys() | old_terms.keys():
+            change = new_terms[term] - old_terms[term]
+            if change:
+                changes.setdefault(change, []).append(term)
+
+        added = [term for change, terms in changes.items() if change > 0 for term in terms]
+        ProductSearchTerm.objects.bulk_create(
+            [ProductSearchTerm(term=term) for term in added], ignore_conflicts=True, batch_size=1000
+        )
+        for change, terms in changes.items():
+            for chunk in _chunks(terms):
+                ProductSearchTerm.objects.filter(term__in=chunk).update(document_count=F('document_count') + change)
+        removed = [term for change, terms in changes.items() if change < 0 for term in terms]
+        for chunk in _chunks(removed):
+            ProductSearchTerm.objects.filter(term__in=chunk, document_count__lte=0).delete()
+
+    def clear(self):
+        """Drop every index entry."""
+        ProductSearchToken.objects.all().delete()
+        ProductSearchDocument.objects.all().delete()
+        ProductSearchTerm.objects.all().delete()
+        cache.delete(CORPUS_STATS_KEY)
+
+    def terms_in_range(self, lower, upper, min_length=None, max_length=None, limit=None):
+        """Return (word, document count) pairs of the indexed words in [lower, upper)."""
+        terms = ProductSearchTerm.objects.filter(term__gte=lower, term__lt=upper)
+        if min_length is not None or max_length is not None:
+            terms = terms.annotate(length=Length('term'))
+            if min_length is not None:
+                terms = terms.filter(length__gte=min_length)
+            if max_length is not None:
+                terms = terms.filter(length__lte=max_length)
+        terms = terms.order_by('term').values_list('term', 'document_count')
+        return list(terms[:limit] if limit else terms)
+
+    def _corpus_stats(self):
+        """Return (number of documents, average document length)."""
+        stats = cache.get(CORPUS_STATS_KEY)
+        if stats is None:
+            totals = ProductSearchDocument.objects.aggregate(count=Count('pk'), average=Avg('length'))
+            stats = (totals['count'], totals['average'] or 1.0)
+            cache.set(CORPUS_STATS_KEY, stats, CORPUS_STATS_TIMEOUT)
+        return stats
+
+    def _idf(self, word, typos, document_count):
+        lower, upper = _prefix_range(word)
+        matching = ProductSearchTerm.objects.filter(
+            Q(term__gte=lower, term__lt=upper) | Q(term__in=typos)
+        ).aggregate(total=Sum('document_count'))['total'] or 0
+        matching = min(matching, document_count)
+        return math.log(1 + (document_count - matching + 0.5) / (matching + 0.5))
+
+    def _filter_condition(self, filters):
+        condition = Q(product_service__deleted_at__isnull=True, product_service__vendor__deleted_at__isnull=True)
+        if filters.get('available_for'):
+            condition &= Q(product_service__available_for__in=[filters['available_for'], 'both'])
+        if filters.get('min_price') is not None:
+            condition &= Q(product_service__current_price__gte=filters['min_price'])
+        if filters.get('max_price') is not None:
+            condition &= Q(product_service__current_price__lte=filters['max_price'])
+        if filters.get('vendor_id') is not None:
+            condition &= Q(product_service__vendor_id=filters['vendor_id'])
+        if filters.get('category'):
+            condition &= Q(product_service__vendor__category=filters['category'])
+        if filters.get('verified'):
+            condition &= Q(product_service__vendor__is_verified=True)
+        return condition
+
+    def search(self, terms, filters, limit, offset):
+        """
+        Rank the products matching every term.
+
+        Returns:
+            Tuple of (number of matches, list of (product id, score) for the page)
+        """
+        document_count, average_length = self._corpus_stats()
+        any_term = Q()
+        weights = []
+        matched = {}
+        for index, (word, typos) in enumerate(terms):
+            lower, upper = _prefix_range(word)
+            prefix = Q(token__gte=lower, token__lt=upper)
+            match = prefix | Q(token__in=typos) if typos else prefix
+            idf = self._idf(word, typos, document_count)
+            weights += [When(token=word, then=Value(idf)), When(prefix, then=Value(idf * PREFIX_FACTOR))]
+            if typos:
+                weights.append(When(token__in=typos, then=Value(idf * TYPO_FACTOR)))
+            any_term |= match
+            matched[f'term_{index}'] = Max(Case(When(match, then=Value(1)), default=Value(0), output_field=IntegerField()))
+
+        frequency = F('frequency')
+        saturation = frequency * (BM25_K1 + 1) / (
+            frequency + BM25_K1 * (1 - BM25_B) + F('document_length') * (BM25_K1 * BM25_B / average_length)
+        )
+        score = Sum(Case(*weights, default=Value(0.0), output_field=FloatField()) * saturation, output_field=FloatField())
+
+        rows = ProductSearchToken.objects.filter(any_term, self._filter_condition(filters)).values(
+            'product_service_id'
+        ).annotate(**matched).filter(**{name: 1 for name in matched}).annotate(score=score)
+        # The number of matches comes with the page, so the matches are only ranked once
+        page = list(rows.annotate(total=Window(Count('product_service_id'))).order_by(
+            '-score', 'product_service_id'
+        )[offset:offset + limit])
+        total = page[0]['total'] if page else (rows.count() if offset else 0)
+        return total, [(row['product_service_id'], row['score']) for row in page]
+
+
+class SQLiteFTS5Backend:
+    """
+    Product search index in an SQLite FTS5 virtual table.
+
+    The table (created by the vendors migrations on SQLite) has one row per
+    product, keyed by product id, with a column of normalised words per field;
+    ranking uses FTS5's built-in bm25() with FIELD_WEIGHTS as column weights.
+    """
+
+    table = 'vendors_product_search_fts'
+    vocabulary_table = 'vendors_product_search_vocab'
+
+    def __init__(self):
+        if connection.vendor != 'sqlite':
+            raise RuntimeError('SQLiteFTS5Backend needs an SQLite database; use DatabaseSearchBackend.')
+
+    def index(self, product_ids, documents):
+        """Replace the index rows of some products (see DatabaseSearchBackend.index)."""
+        columns = ', '.join(FIELD_WEIGHTS)
+        placeholders = ', '.join(['%s'] * (len(FIELD_WEIGHTS) + 1))
+        rows = [
+            (product_id, *(' '.join(fields.get(field, ())) for field in FIELD_WEIGHTS))
+            for product_id, fields in documents.items()
+        ]
+        with transaction.atomic(), connection.cursor() as cursor:
+            for chunk in _chunks(product_ids):
+                cursor.execute(
+                    f"DELETE FROM {self.table} WHERE rowid IN ({', '.join(['%s'] * len(chunk))})", chunk
+                )
+            if rows:
+                cursor.executemany(f"INSERT INTO {self.table} (rowid, {columns}) VALUES ({placeholders})", rows)
+
+    def clear(self):
+        """Drop every index row."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+
+    def terms_in_range(self, lower, upper, min_length=None, max_length=None, limit=None):
+        """Return (word, document count) pairs of the indexed words in [lower, upper)."""
+        sql = f"SELECT term, doc FROM {self.vocabulary_table} WHERE term >= %s AND term < %s"
+        params = [lower, upper]
+        if min_length is not None:
+            sql += " AND length(term) >= %s"
+            params.append(min_length)
+        if max_length is not None:
+            sql += " AND length(term) <= %s"
+            params.append(max_length)
+        sql += " ORDER BY term"
+        if limit:
+            sql += " LIMIT %s"
+            params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def _filter_sql(self, filters):
+        sql = " AND p.deleted_at IS NULL AND v.deleted_at IS NULL"
+        params = []
+        if filters.get('available_for'):
+            sql += " AND p.available_for IN (%s, 'both')"
+            params.append(filters['available_for'])
+        if filters.get('min_price') is not None:
+            sql += " AND p.current_price >= %s"
+            params.append(filters['min_price'])
+        if filters.get('max_price') is not None:
+            sql += " AND p.current_price <= %s"
+            params.append(filters['max_price'])
+        if filters.get('vendor_id') is not None:
+            sql += " AND p.vendor_id = %s"
+            params.append(filters['vendor_id'])
+        if filters.get('category'):
+            sql += " AND v.category = %s"
+            params.append(filters['category'])
+        if filters.get('verified'):
+            sql += " AND v.is_verified"
+        return sql, params
+
+    def search(self, terms, filters, limit, offset):
+        """Rank the products matching every term (see DatabaseSearchBackend.search)."""
+        # Words only hold letters and digits, so they can be quoted as they are
+        match = ' AND '.join(
+            '(' + ' OR '.join([f'"{word}"*', *(f'"{typo}"' for typo in typos)]) + ')'
+            for word, typos in terms
+        )
+        filter_sql, filter_params = self._filter_sql(filters)
+        weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS.values())
+        # FTS5 needs the table's own name (not an alias) on the left of MATCH and in bm25()
+        table = self.table
+        source = (
+            f"FROM {table}"
+            f" JOIN {ProductService._meta.db_table} AS p ON p.id = {table}.rowid"
+            f" JOIN {Vendor._meta.db_table} AS v ON v.id = p.vendor_id"
+            f" WHERE {table} MATCH %s{filter_sql}"
+        )
+        params = [match, *filter_params]
+        with connection.cursor() as cursor:
+            # bm25() cannot be combined with a window function, so the matches are counted separately
+            cursor.execute(f"SELECT COUNT(*) {source}", params)
+            total = cursor.fetchone()[0]
+            cursor.execute(
+                f"SELECT {table}.rowid, -bm25({table}, {weights}) AS score {source}"
+                f" ORDER BY score DESC, {table}.rowid LIMIT %s OFFSET %s",
+                [*params, limit, offset],
+            )
+            return total, [(product_id, score) for product_id, score in cursor.fetchall()]
+
+
+BACKENDS = {
+    'fts5': SQLiteFTS5Backend,
+    'database': DatabaseSearchBackend,
+}
+
+_backend = None
+
+
+def get_search_backend():
+    """Return the configured search backend (built on first use)."""
+    global _backend
+    if _backend is None:
+        name = settings.PRODUCT_SEARCH_BACKEND
+        if name == 'auto':
+            name = 'fts5' if connection.vendor == 'sqlite' else 'database'
+        backend_class = BACKENDS[name] if name in BACKENDS else import_string(name)
+        _backend = backend_class()
+    return _backend
+
+
+def product_documents(product_ids):
+    """Return {product id: {field: words}} for the products among product_ids that are not soft-deleted."""
+    rows = ProductService.objects.filter(pk__in=product_ids, deleted_at__isnull=True).values(
+        'id', 'name', 'description', 'vendor__name', 'vendor__category'
+    )
+    return {
+        row['id']: {
+            'name': tokenize(row['name']),
+            'vendor_name': tokenize(row['vendor__name']),
+            'category': tokenize(row['vendor__category']),
+            'description': tokenize(row['description']),
+        }
+        for row in rows
+    }
+
+
+def reindex_products(product_ids, backend=None):
+    """
+    Rebuild the index entries of some products.
+
+    Args:
+        product_ids: Ids of the products to reindex; soft-deleted and deleted
+            products are removed from the index
+        backend: Backend to write to, the configured one by default
+    """
+    backend = backend or get_search_backend()
+    product_ids = sorted(set(product_ids))
+    for batch in _chunks(product_ids, REINDEX_BATCH_SIZE):
+        with transaction.atomic():
+            # Serialize reindexing of the same products so their delete/insert pairs cannot interleave
+            list(ProductService.objects.select_for_update().filter(pk__in=batch).values_list('pk', flat=True))
+            backend.index(batch, product_documents(batch))
+
+
+class ProductIndexer:
+    """
+    Collects the products changed during one transaction.
+
+    Called from transaction.on_commit to reindex each product once.
+    """
+
+    def __init__(self):
+        self.product_ids = set()
+
+    def __call__(self):
+        try:
+            reindex_products(self.product_ids)
+        except Exception:
+            # The product change is committed; the next change or a rebuild fixes the index
+            logger.exception("Failed to reindex products %s", sorted(self.product_ids))
+
+
+def mark_products_for_reindex(product_ids):
+    """Reindex products once the current transaction commits."""
+    product_ids = set(product_ids)
+    if not product_ids:
+        return
+
+    indexer = get_transaction_collector('product_search', ProductIndexer)
+    if indexer is None:
+        indexer = ProductIndexer()
+        indexer.product_ids |= product_ids
+        indexer()
+        return
+    indexer.product_ids |= product_ids
+
+
+def _typo_candidates(word, backend):
+    """Return the indexed words starting with word's first letter within the allowed edits, closest first."""
+    limit = 2 if len(word) >= LONG_TYPO_LENGTH else 1
+    candidates = []
+    for term, document_count in backend.terms_in_range(
+        *_prefix_range(word[0]), min_length=len(word) - limit, max_length=len(word) + limit
+    ):
+        distance = edit_distance(word, term, limit)
+        if distance <= limit:
+            candidates.append((distance, -document_count, term))
+    return tuple(term for _, _, term in sorted(candidates)[:MAX_TYPO_EXPANSIONS])
+
+
+def parse_query(query, backend):
+    """
+    Return the words of a query, each paired with the indexed words it matches as a typo.
+
+    Only words that are not a prefix of any indexed word get typo matches.
+    """
+    terms = []
+    for word in list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]:
+        typos = ()
+        if len(word) >= MIN_TYPO_LENGTH and not backend.terms_in_range(*_prefix_range(word), limit=1):
+            typos = _typo_candidates(word, backend)
+        terms.append((word, typos))
+    return terms
+
+
+def search_products(query, filters=None, limit=20, offset=0):
+    """
+    Find and rank the products and services matching every word of a query.
+
+    Args:
+        query: Search text; only its first MAX_QUERY_TERMS words are used
+        filters: Optional dict with available_for ('delivery' or 'pickup', which
+            also matches products available for both), min_price, max_price,
+            vendor_id, category (vendor category) and verified (only verified vendors)
+        limit: Maximum number of results
+        offset: Number of results to skip
+
+    Returns:
+        Tuple of (number of matches, list of (product id, score) best first), or
+        None if the query has no words
+    """
+    backend = get_search_backend()
+    terms = parse_query(query, backend)
+    if not terms:
+        return None
+    return backend.search(terms, filters or {}, limit, offset)
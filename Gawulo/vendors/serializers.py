@@ -1,8 +1,23 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
 from .models import Vendor, ProductService, ProductImage, VendorImage
 
 
+def get_preview_image_url(path, request=None):
+    """
+    Return the URL of a stored preview image path (see preview_image_path), or None.
+    
+    Reads no rows: the preview is resolved when images change, not when serializing.
+    """
+    if not path:
+        return None
+    url = default_storage.url(path)
+    if request:
+        return request.build_absolute_uri(url)
+    return url
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for User model."""
     
@@ -57,25 +72,7 @@ class ProductServiceSerializer(serializers.ModelSerializer):
     
     def get_preview_image(self, obj):
         """Return the preview image URL or first image if no preview set."""
-        preview = obj.images.filter(is_preview=True).first()
-        if preview:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(preview.image.url)
-            return preview.image.url
-        # Fallback to first image or legacy image field
-        first_image = obj.images.first()
-        if first_image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(first_image.image.url)
-            return first_image.image.url
-        if obj.image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.image.url)
-            return obj.image.url
-        return None
+        return get_preview_image_url(obj.preview_image_path, self.context.get('request'))
 
 
 class VendorSerializer(serializers.ModelSerializer):
@@ -90,6 +87,7 @@ class VendorSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'name', 'category', 'profile_description',
             'profile_image', 'images', 'preview_image', 'is_verified', 'average_rating', 'review_count',
+            'latitude', 'longitude', 'delivery_radius_km',
             'created_at', 'updated_at', 'products_services'
         ]
         read_only_fields = [
@@ -99,25 +97,36 @@ class VendorSerializer(serializers.ModelSerializer):
     
     def get_preview_image(self, obj):
         """Return the preview image URL or first image if no preview set."""
-        preview = obj.images.filter(is_preview=True).first()
-        if preview:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(preview.image.url)
-            return preview.image.url
-        # Fallback to first image or legacy profile_image field
-        first_image = obj.images.first()
-        if first_image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(first_image.image.url)
-            return first_image.image.url
-        if obj.profile_image:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.profile_image.url)
-            return obj.profile_image.url
-        return None
+        return get_preview_image_url(obj.preview_image_path, self.context.get('request'))
+    
+    def validate(self, data):
+        """Require latitude and longitude to be set (or cleared) together."""
+        latitude = data.get('latitude', getattr(self.instance, 'latitude', None))
+        longitude = data.get('longitude', getattr(self.instance, 'longitude', None))
+        if (latitude is None) != (longitude is None):
+            raise serializers.ValidationError("latitude and longitude must be given together.")
+        return data
+
+
+class VendorCardSerializer(serializers.ModelSerializer):
+    """
+    Compact vendor representation for directory listings.
+    
+    Leaves out the user, images and menu, and reads the preview image from
+    preview_image_path, so a page of vendors is a single query.
+    """
+    preview_image = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Vendor
+        fields = [
+            'id', 'name', 'category', 'profile_description', 'average_rating', 'review_count', 'preview_image'
+        ]
+        read_only_fields = fields
+    
+    def get_preview_image(self, obj):
+        """Return the preview image URL or first image if no preview set."""
+        return get_preview_image_url(obj.preview_image_path, self.context.get('request'))
 
 
 class VendorRegistrationSerializer(serializers.ModelSerializer):
@@ -0,0 +1,115 @@
+"""
+Django signals keeping the product search and vendor delivery indexes current.
+
+Products are reindexed once the transaction saving, soft-deleting or deleting
+them commits; a vendor's products are reindexed when the vendor's name or
+category (both indexed with each product) changes. A vendor's delivery cells
+are rewritten when its location or delivery radius changes.
+
+Any change to a vendor, its user, images, products or product images also
+moves the vendor's conditional GET version stamp ('vendor:<id>').
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from auth_api.actors import resolve_actor
+from Gawulo.conditional import mark_changed
+from .discovery import rebuild_delivery_cells
+from .models import ProductImage, ProductService, Vendor, VendorImage
+from .search import mark_products_for_reindex
+
+# Vendor fields indexed with each of its products
+INDEXED_FIELDS = ('name', 'category')
+DELIVERY_AREA_FIELDS = ('latitude', 'longitude', 'delivery_radius_km')
+
+# User fields shown in the vendor responses
+SHOWN_USER_FIELDS = ('username', 'email', 'first_name', 'last_name')
+
+
+@receiver(post_save, sender=ProductService)
+@receiver(post_delete, sender=ProductService)
+def product_service_changed(sender, instance, **kwargs):
+    """Reindex a product after commit."""
+    mark_products_for_reindex([instance.pk])
+
+
+@receiver(post_save, sender=Vendor)
+def vendor_search_fields_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Reindex a vendor's products after commit when its name or category changes."""
+    if created or (update_fields is not None and not set(update_fields) & set(INDEXED_FIELDS)):
+        return
+    loaded = instance.get_loaded_values() or {}
+    if all(name in loaded and loaded[name] == getattr(instance, name) for name in INDEXED_FIELDS):
+        return
+    mark_products_for_reindex(
+        ProductService.objects.filter(vendor_id=instance.pk, deleted_at__isnull=True).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=Vendor)
+def vendor_delivery_area_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Rewrite a vendor's delivery cells when its location or delivery radius changes."""
+    if created and instance.delivery_radius_km is None:
+        return
+    if not created:
+        if update_fields is not None and not set(update_fields) & set(DELIVERY_AREA_FIELDS):
+            return
+        loaded = instance.get_loaded_values() or {}
+        if all(name in loaded and loaded[name] == getattr(instance, name) for name in DELIVERY_AREA_FIELDS):
+            return
+    rebuild_delivery_cells([instance])
+
+
+@receiver(post_save, sender=Vendor)
+@receiver(post_delete, sender=Vendor)
+def vendor_changed(sender, instance, **kwargs):
+    """Invalidate the vendor's cached responses after commit."""
+    mark_changed(f'vendor:{instance.pk}')
+
+
+@receiver(post_save, sender=ProductService)
+@receiver(post_delete, sender=ProductService)
+@receiver(post_save, sender=VendorImage)
+@receiver(post_delete, sender=VendorImage)
+def vendor_content_changed(sender, instance, **kwargs):
+    """Invalidate the cached responses of the product's or image's vendor after commit."""
+    mark_changed(f'vendor:{instance.vendor_id}')
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def product_image_changed(sender, instance, **kwargs):
+    """Invalidate the cached responses of the image's vendor after commit."""
+    if ProductImage.product_service.is_cached(instance):
+        vendor_id = instance.product_service.vendor_id
+    else:
+        vendor_id = ProductService.objects.filter(
+            pk=instance.product_service_id
+        ).values_list('vendor_id', flat=True).first()
+    if vendor_id is not None:
+        mark_changed(f'vendor:{vendor_id}')
+
+
+@receiver(post_init, sender=User)
+def remember_shown_user_fields(sender, instance, **kwargs):
+    """Remember the user fields the vendor responses show, as loaded, so post_save can tell whether they changed."""
+    instance._shown_fields = tuple(instance.__dict__.get(name) for name in SHOWN_USER_FIELDS)
+
+
+@receiver(post_save, sender=User)
+def vendor_user_changed(sender, instance, created, update_fields=None, **kwargs):
+    """Invalidate the cached responses of the user's vendor, which show the user, after commit."""
+    shown_fields = tuple(instance.__dict__.get(name) for name in SHOWN_USER_FIELDS)
+    loaded_fields, instance._shown_fields = getattr(instance, '_shown_fields', None), shown_fields
+    if created:
+        # A new user has no vendor yet
+        return
+    if update_fields is not None and not set(update_fields) & set(SHOWN_USER_FIELDS):
+        # e.g. logins and password changes
+        return
+    if loaded_fields == shown_fields:
+        return
+    # The caller's actor is cached (or carried by a stateless token), so this rarely queries
+    vendor_id = resolve_actor(instance).vendor_id
+    if vendor_id is not None:
+        mark_changed(f'vendor:{vendor_id}')
@@ -0,0 +1,197 @@
+"""
+Vendor dashboard statistics.
+
+compute_vendor_stats() builds the VendorStatsView payload from a fixed number of
+grouped aggregations. Revenue, delivery/pickup split, daily trends and product
+rankings are read from the VendorDailySales and VendorProductDailySales rollups
+(see orders.rollups), so their cost depends on the number of days rather than the
+number of orders. The status breakdown, hourly pattern and customer figures still
+aggregate the vendor's orders, one query each.
+
+Day boundaries are UTC midnights, matching the rollup days; the hourly pattern
+uses the project time zone.
+"""
+from datetime import timedelta, timezone as dt_timezone
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractHour
+from django.utils import timezone
+from orders.models import Order, VendorDailySales
+from orders.rollups import get_product_sales
+from .models import ProductService
+
+# Orders counted as revenue
+COMPLETED_STATUSES = ('Delivered', 'PickedUp')
+COMPLETED_BUCKET = 'completed'
+
+TREND_DAYS = 30
+
+
+def _float(value):
+    return float(value or 0.0)
+
+
+def get_order_summary(vendor, vendor_orders, today):
+    """
+    Return the summary figures of a vendor.
+
+    Revenue and delivery figures come from one aggregation over the rollup rows;
+    the status breakdown and customer count from one aggregation over the orders.
+    """
+    completed = Q(status_bucket=COMPLETED_BUCKET)
+    rollup = VendorDailySales.objects.filter(vendor=vendor).aggregate(
+        total_orders=Sum('order_count'),
+        completed_orders=Sum('order_count', filter=completed),
+        today_revenue=Sum('revenue', filter=completed & Q(date__gte=today)),
+        week_revenue=Sum('revenue', filter=completed & Q(date__gte=today - timedelta(days=7))),
+        month_revenue=Sum('revenue', filter=completed & Q(date__gte=today - timedelta(days=30))),
+        total_revenue=Sum('revenue', filter=completed),
+        delivery_count=Sum('order_count', filter=completed & Q(delivery_type='delivery')),
+        pickup_count=Sum('order_count', filter=completed & Q(delivery_type='pickup')),
+        delivery_revenue=Sum('revenue', filter=completed & Q(delivery_type='delivery')),
+        pickup_revenue=Sum('revenue', filter=completed & Q(delivery_type='pickup')),
+    )
+    completed_orders = rollup.pop('completed_orders') or 0
+    summary = {name: value or 0 for name, value in rollup.items()}
+    summary['avg_order_value'] = summary['total_revenue'] / completed_orders if completed_orders else 0
+
+    aggregates = {'total_customers': Count('customer', distinct=True)}
+    for value, _ in Order.ORDER_STATUS:
+        aggregates[f'status_{value}'] = Count('id', filter=Q(current_status=value))
+    summary.update(vendor_orders.aggregate(**aggregates))
+    return summary
+
+
+def get_daily_trends(vendor, today, days=TREND_DAYS):
+    """
+    Return (revenue_trends, order_volume_trends) for the last `days` days, oldest first.
+
+    Volume counts every order created that day; revenue and average order value
+    only count completed orders.
+    """
+    first_day = today - timedelta(days=days - 1)
+    completed = Q(status_bucket=COMPLETED_BUCKET)
+    rows = VendorDailySales.objects.filter(vendor=vendor, date__gte=first_day, date__lte=today).values('date').annotate(
+        count=Sum('order_count'),
+        completed_count=Sum('order_count', filter=completed),
+        revenue=Sum('revenue', filter=completed),
+    ).order_by()
+    by_day = {row['date']: row for row in rows}
+
+    revenue_trends = []
+    order_volume_trends = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        row = by_day.get(day, {})
+        revenue = row.get('revenue') or 0
+        completed_count = row.get('completed_count') or 0
+        revenue_trends.append({'date': day.isoformat(), 'revenue': float(revenue)})
+        order_volume_trends.append({
+            'date': day.isoformat(),
+            'count': row.get('count') or 0,
+            'avg_order_value': float(revenue / completed_count) if completed_count else 0.0,
+        })
+    return revenue_trends, order_volume_trends
+
+
+def get_hourly_pattern(vendor_orders):
+    """Return completed orders per hour of day (project time zone)."""
+    counts = dict(
+        vendor_orders.filter(current_status__in=COMPLETED_STATUSES).annotate(
+            hour=ExtractHour('created_at')
+        ).values('hour').annotate(count=Count('id')).values_list('hour', 'count')
+    )
+    return [{'hour': hour, 'count': counts.get(hour, 0)} for hour in range(24)]
+
+
+def get_top_customers(vendor_orders, limit=5):
+    """Return the vendor's customers with the most orders."""
+    top_customers = vendor_orders.values(
+        'customer__id',
+        'customer__user__first_name',
+        'customer__user__last_name',
+        'customer__user__email'
+    ).annotate(
+        order_count=Count('id'),
+        total_spent=Sum('total_amount')
+    ).order_by('-order_count')[:limit]
+    return [
+        {
+            'customer_id': customer['customer__id'],
+            'name': f"{customer['customer__user__first_name'] or ''} {customer['customer__user__last_name'] or ''}".strip() or customer['customer__user__email'],
+            'order_count': customer['order_count'],
+            'total_spent': _float(customer['total_spent']),
+        }
+        for customer in top_customers
+    ]
+
+
+def compute_vendor_stats(vendor, trend_days=TREND_DAYS):
+    """
+    Build the VendorStatsView payload for a vendor.
+
+    Args:
+        vendor: Vendor instance
+        trend_days: Length of the daily trend window
+
+    Returns:
+        Dict with the dashboard statistics
+    """
+    today = timezone.now().astimezone(dt_timezone.utc).date()
+    vendor_orders = Order.objects.filter(vendor=vendor)
+    summary = get_order_summary(vendor, vendor_orders, today)
+    revenue_trends, order_volume_trends = get_daily_trends(vendor, today, trend_days)
+
+    popular_products = get_product_sales(vendor.id, status_buckets=[COMPLETED_BUCKET], order_by='-order_count', limit=5)
+    product_revenue = get_product_sales(vendor.id, status_buckets=[COMPLETED_BUCKET], order_by='-revenue', limit=10)
+
+    repeat_customers = vendor_orders.values('customer').annotate(
+        order_count=Count('id')
+    ).filter(order_count__gte=2).count()
+
+    return {
+        'vendor_id': vendor.id,
+        'vendor_name': vendor.name,
+        'products_count': ProductService.objects.filter(vendor=vendor, deleted_at__isnull=True).count(),
+        'total_orders': summary['total_orders'],
+        'average_rating': float(vendor.average_rating),
+        'review_count': vendor.review_count,
+        'today_revenue': _float(summary['today_revenue']),
+        'week_revenue': _float(summary['week_revenue']),
+        'month_revenue': _float(summary['month_revenue']),
+        'total_revenue': _float(summary['total_revenue']),  # All-time total revenue
+        'status_breakdown': {value: summary[f'status_{value}'] for value, _ in Order.ORDER_STATUS},
+        'popular_products': [
+            {
+                'product_service__id': item['product_service_id'],
+                'product_service__name': item['product_service__name'],
+                'order_count': item['order_count'],
+                'total_quantity': item['quantity'],
+            }
+            for item in popular_products
+        ],
+        'revenue_trends': revenue_trends[:7],  # Keep 7-day for backward compatibility
+        'revenue_trends_30d': revenue_trends,
+        'order_volume_trends': order_volume_trends,
+        'product_revenue': [
+            {
+                'product_id': item['product_service_id'],
+                'product_name': item['product_service__name'] or 'Unknown Product',
+                'revenue': _float(item['revenue']),
+                'order_count': item['order_count'],
+            }
+            for item in product_revenue
+        ],
+        'customer_insights': {
+            'total_customers': summary['total_customers'],
+            'repeat_customers': repeat_customers,
+            'avg_order_value': _float(summary['avg_order_value']),
+            'top_customers': get_top_customers(vendor_orders),
+        },
+        'hourly_order_pattern': get_hourly_pattern(vendor_orders),
+        'delivery_vs_pickup': {
+            'delivery_count': summary['delivery_count'],
+            'pickup_count': summary['pickup_count'],
+            'delivery_revenue': _float(summary['delivery_revenue']),
+            'pickup_revenue': _float(summary['pickup_revenue']),
+        },
+    }
@@ -1,3 +1,205 @@
-from django.test import TestCase
+import math
+import random
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from . import search
+from .discovery import find_vendors
+from .geo import EARTH_RADIUS_KM
+from .models import ProductService, Vendor
+from .search import DatabaseSearchBackend, SQLiteFTS5Backend, reindex_products, search_products, tokenize
 
-# Create your tests here.
+
+class ProductSearchTests(TransactionTestCase):
+    """
+    Both search backends find exactly the products a scan of the catalogue would.
+
+    A TransactionTestCase, so each write commits and reindexes as in production.
+    """
+
+    PRODUCTS = {
+        'Mama Kitchen': [
+            ('Chicken Curry', 'Slow cooked with rice', '45.00', 'both'),
+            ('Beef Stew', 'Served with pap and chakalaka', '55.00', 'delivery'),
+            ('Vegetable Curry', None, '35.00', 'pickup'),
+        ],
+        'Curry House': [
+            ('Butter Chicken', 'Creamy tomato sauce', '65.00', 'both'),
+            ('Chips', 'Salted', '15.00', 'both'),
+        ],
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.vendors = {}
+        for index, (vendor_name, products) in enumerate(self.PRODUCTS.items()):
+            user = User.objects.create_user(f'vendor{index}', f'vendor{index}@example.com', 'password')
+            vendor = self.vendors[vendor_name] = Vendor.objects.create(
+                user=user, name=vendor_name, category='food', is_verified=index == 0
+            )
+            for name, description, price, available_for in products:
+                ProductService.objects.create(
+                    vendor=vendor, name=name, description=description, current_price=Decimal(price),
+                    available_for=available_for,
+                )
+
+    def backends(self):
+        """Run the block once per backend, with that backend configured and holding a full index."""
+        for backend in (DatabaseSearchBackend(), SQLiteFTS5Backend()):
+            with self.subTest(backend=type(backend).__name__), mock.patch.object(search, '_backend', backend):
+                cache.clear()
+                backend.clear()
+                reindex_products(ProductService.objects.values_list('pk', flat=True))
+                yield backend
+
+    def scan(self, query, filters=None):
+        """Return the ids of the live products whose words start with every word of the query."""
+        filters = filters or {}
+        terms = list(dict.fromkeys(tokenize(query)))[:search.MAX_QUERY_TERMS]
+        products = ProductService.objects.select_related('vendor').filter(
+            deleted_at__isnull=True, vendor__deleted_at__isnull=True
+        )
+        if filters.get('available_for'):
+            products = products.filter(available_for__in=[filters['available_for'], 'both'])
+        if filters.get('max_price') is not None:
+            products = products.filter(current_price__lte=filters['max_price'])
+        if filters.get('verified'):
+            products = products.filter(vendor__is_verified=True)
+        matches = set()
+        for product in products:
+            words = [
+                word for text in (product.name, product.description, product.vendor.name, product.vendor.category)
+                for word in tokenize(text)
+            ]
+            if all(any(word.startswith(term) for word in words) for term in terms):
+                matches.add(product.pk)
+        return matches
+
+    def assertMatchesScan(self, queries, filters=None):
+        for query in queries:
+            with self.subTest(query=query, filters=filters):
+                total, results = search_products(query, filters, limit=100)
+                self.assertEqual({product_id for product_id, _ in results}, self.scan(query, filters))
+                self.assertEqual(total, len(results))
+
+    def test_results_match_a_scan(self):
+        # No query word is a typo: each is a prefix of an indexed word or too short for typo matching
+        queries = ('curry', 'chicken', 'CHICK', 'curry house', 'food', 'rice', 'pap beef', 'kitchen chips', 'zzz')
+        for _ in self.backends():
+            self.assertMatchesScan(queries)
+            self.assertMatchesScan(queries, {'available_for': 'delivery'})
+            self.assertMatchesScan(queries, {'max_price': '50.00', 'verified': True})
+
+    def test_name_match_ranks_above_vendor_match(self):
+        for _ in self.backends():
+            _, results = search_products('curry')
+            names = [ProductService.objects.get(pk=product_id).name for product_id, _ in results]
+            self.assertEqual(sorted(names[:2]), ['Chicken Curry', 'Vegetable Curry'])
+            self.assertEqual(sorted(names[2:]), ['Butter Chicken', 'Chips'])
+
+    def test_typos_match_close_words(self):
+        for _ in self.backends():
+            for query, names in (('chiken curry', {'Chicken Curry', 'Butter Chicken'}), ('vegtable', {'Vegetable Curry'})):
+                with self.subTest(query=query):
+                    _, results = search_products(query)
+                    matched = ProductService.objects.filter(pk__in=[product_id for product_id, _ in results])
+                    self.assertEqual(set(matched.values_list('name', flat=True)), names)
+
+    def test_index_follows_changes(self):
+        for _ in self.backends():
+            product = ProductService.objects.get(name='Chips')
+            product.name = 'Chicken Livers'
+            product.save()
+            ProductService.objects.get(name='Beef Stew').soft_delete()
+            vendor = Vendor.objects.get(pk=self.vendors['Curry House'].pk)
+            vendor.name = 'Spice Route'
+            vendor.save()
+
+            self.assertMatchesScan(('chicken', 'chips', 'beef', 'curry house', 'spice', 'livers'))
+
+            product.name = 'Chips'
+            product.save()
+            ProductService.objects.get(name='Beef Stew').restore()
+            vendor.name = 'Curry House'
+            vendor.save()
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(1.0, a)))
+
+
+class VendorDiscoveryTests(TestCase):
+    """Indexed vendor discovery returns what a Haversine scan of every vendor would."""
+
+    CENTRE = (-26.2041, 28.0473)
+    POINTS = [CENTRE, (-26.1, 28.2), (-26.45, 27.8), (-25.9, 28.5)]
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(7)
+        for index in range(120):
+            user = User.objects.create_user(f'vendor{index}')
+            Vendor.objects.create(
+                user=user, name=f'Vendor {index}', category=rng.choice(['food', 'groceries']),
+                is_verified=rng.random() > 0.1,
+                average_rating=Decimal(rng.randint(0, 50)) / 10,
+                latitude=Decimal(f'{cls.CENTRE[0] + rng.uniform(-0.6, 0.6):.6f}'),
+                longitude=Decimal(f'{cls.CENTRE[1] + rng.uniform(-0.6, 0.6):.6f}'),
+                delivery_radius_km=None if rng.random() < 0.1 else Decimal(f'{rng.uniform(1, 40):.2f}'),
+                deleted_at=timezone.now() if rng.random() < 0.05 else None,
+            )
+
+    def scan(self, latitude, longitude, radius_km=None, delivers=False, category=None, sort='distance'):
+        """Return (vendor id, distance) of the matching vendors, in result order, from every vendor."""
+        matches = []
+        for vendor in Vendor.objects.filter(is_verified=True, deleted_at__isnull=True):
+            distance = haversine(latitude, longitude, float(vendor.latitude), float(vendor.longitude))
+            if radius_km is not None and distance > radius_km:
+                continue
+            if delivers and (vendor.delivery_radius_km is None or distance > float(vendor.delivery_radius_km)):
+                continue
+            if category and vendor.category != category:
+                continue
+            rating = float(vendor.average_rating)
+            matches.append(((-rating, distance) if sort == 'rating' else (distance, -rating), vendor.pk, distance))
+        return [(vendor_id, distance) for _, vendor_id, distance in sorted(matches)]
+
+    def assertMatchesScan(self, **query):
+        for latitude, longitude in self.POINTS:
+            with self.subTest(point=(latitude, longitude), **query):
+                expected = self.scan(latitude, longitude, **query)
+                total, results = find_vendors(latitude, longitude, limit=1000, **query)
+                self.assertEqual(total, len(expected))
+                self.assertEqual([vendor_id for vendor_id, _ in results], [vendor_id for vendor_id, _ in expected])
+                for (_, distance), (_, expected_distance) in zip(results, expected):
+                    self.assertAlmostEqual(distance, expected_distance, places=6)
+
+    def test_within_radius(self):
+        for radius_km in (2, 10, 25, 60):
+            self.assertMatchesScan(radius_km=radius_km)
+        self.assertMatchesScan(radius_km=30, category='food', sort='rating')
+
+    def test_delivers_to_point(self):
+        self.assertMatchesScan(delivers=True)
+        self.assertMatchesScan(delivers=True, sort='rating')
+        self.assertMatchesScan(delivers=True, radius_km=15, category='groceries')
+
+    def test_vendor_move_updates_delivery_area(self):
+        vendor = Vendor.objects.filter(is_verified=True, deleted_at__isnull=True).first()
+        vendor.latitude, vendor.longitude = Decimal('-26.204100'), Decimal('28.047300')
+        vendor.delivery_radius_km = Decimal('0.50')
+        vendor.save()
+
+        self.assertMatchesScan(delivers=True)
+        self.assertIn(vendor.pk, [vendor_id for vendor_id, _ in find_vendors(*self.CENTRE, delivers=True, limit=1000)[1]])
+
+    def test_page(self):
+        total, page = find_vendors(*self.CENTRE, radius_km=40, limit=5, offset=5)
+        expected = self.scan(*self.CENTRE, radius_km=40)
+        self.assertEqual(total, len(expected))
+        self.assertEqual([vendor_id for vendor_id, _ in page], [vendor_id for vendor_id, _ in expected[5:10]])
@@ -6,10 +6,12 @@ app_name = 'vendors'
 urlpatterns = [
     path('', views.VendorListView.as_view(), name='vendor-list'),
     path('<int:pk>/', views.VendorDetailView.as_view(), name='vendor-detail'),
+    path('nearby/', views.VendorNearbyView.as_view(), name='vendor-nearby'),
     path('register/', views.VendorRegistrationView.as_view(), name='vendor-register'),
     path('<int:pk>/products-services/', views.VendorProductsServicesView.as_view(), name='vendor-products-services'),
     path('<int:pk>/reviews/', views.VendorReviewsView.as_view(), name='vendor-reviews'),
     path('products-services/', views.ProductServiceListView.as_view(), name='product-service-list'),
+    path('products-services/search/', views.ProductSearchView.as_view(), name='product-service-search'),
     path('products-services/<int:pk>/', views.ProductServiceDetailView.as_view(), name='product-service-detail'),
     path('products-services/create/', views.ProductServiceCreateView.as_view(), name='product-service-create'),
     path('products-services/<int:pk>/update/', views.ProductServiceUpdateView.as_view(), name='product-service-update'),
@@ -26,4 +28,6 @@ urlpatterns = [
     path('products-services/<int:pk>/images/upload/', views.ProductImageUploadView.as_view(), name='product-images-upload'),
     path('products-services/images/<int:pk>/', views.ProductImageUpdateView.as_view(), name='product-image-update'),
     path('stats/', views.VendorStatsView.as_view(), name='vendor-stats'),
+    path('stats/daily-sales/', views.VendorDailySalesView.as_view(), name='vendor-daily-sales'),
+    path('stats/product-sales/', views.VendorProductSalesView.as_view(), name='vendor-product-sales'),
 ]
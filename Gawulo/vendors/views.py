@@ -1,16 +1,27 @@
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.db.models import Case, IntegerField, Prefetch, Value, When
+from django_filters.rest_framework import DjangoFilterBackend
+from decimal import Decimal, InvalidOperation
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
-from datetime import timedelta
 import logging
+from datetime import date, timedelta
+from django.utils import timezone
 from .models import Vendor, ProductService, ProductImage, VendorImage
 from orders.models import Review
-
-logger = logging.getLogger(__name__)
+from auth_api.actors import get_actor
+from .stats import compute_vendor_stats
+from .search import search_products
+from .discovery import MAX_SEARCH_RADIUS_KM, SORT_ORDERS, find_vendors
+from Gawulo.conditional import ConditionalGetMixin
+from orders.dashboard_cache import get_cached_payload
+from orders.rollups import STATUS_BUCKETS, DEFAULT_STATUS_BUCKET, get_daily_sales, get_product_sales, rollup_date
 from .serializers import (
     VendorSerializer, 
+    VendorCardSerializer,
     ProductServiceSerializer,
     VendorRegistrationSerializer,
     ProductImageSerializer,
@@ -18,23 +29,119 @@ from .serializers import (
 )
 import os
 
+logger = logging.getLogger(__name__)
+
 
 class VendorListView(generics.ListAPIView):
-    """List all active vendors."""
+    """
+    List all active vendors.
+    
+    Vendors are returned as compact cards. ``?expand=products_services`` returns
+    the full vendor representation with each vendor's menu instead, prefetched in
+    bulk for the whole page.
+    """
     queryset = Vendor.objects.filter(is_verified=True, deleted_at__isnull=True)
-    serializer_class = VendorSerializer
+    serializer_class = VendorCardSerializer
     permission_classes = [permissions.AllowAny]
     filterset_fields = ['category', 'is_verified']
     search_fields = ['name', 'profile_description']
     ordering_fields = ['average_rating', 'review_count', 'created_at']
+    expandable_fields = ('products_services',)
+    
+    def get_expand(self):
+        """Return the requested expansions, rejecting unknown ones."""
+        expand = {
+            name.strip() for name in self.request.query_params.get('expand', '').split(',') if name.strip()
+        }
+        unknown = expand.difference(self.expandable_fields)
+        if unknown:
+            raise ValidationError({
+                'expand': f"Unsupported expansion(s): {', '.join(sorted(unknown))}. "
+                          f"Allowed values: {', '.join(self.expandable_fields)}."
+            })
+        return expand
+    
+    def get_serializer_class(self):
+        if 'products_services' in self.get_expand():
+            return VendorSerializer
+        return VendorCardSerializer
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if 'products_services' in self.get_expand():
+            return queryset.select_related('user').prefetch_related(
+                'images',
+                Prefetch('products_services', queryset=ProductService.objects.prefetch_related('images')),
+            )
+        return queryset
+
+
+class VendorNearbyView(APIView):
+    """Verified vendors near a point, or delivering to it."""
+    permission_classes = [permissions.AllowAny]
+    max_results = 100
+    
+    def get(self, request):
+        """
+        Return the verified vendors within ``radius`` km of (``lat``, ``lng``)
+        and/or, with ``delivers=true``, those whose delivery radius covers it.
+        
+        Results are vendor cards with their ``distance_km``, nearest first
+        (``sort=rating``: best rated first).
+        """
+        params = request.query_params
+        try:
+            latitude, longitude = float(params['lat']), float(params['lng'])
+            radius = float(params['radius']) if params.get('radius') else None
+            limit = min(max(int(params.get('limit', 20)), 1), self.max_results)
+            offset = max(int(params.get('offset', 0)), 0)
+        except KeyError:
+            return Response({'error': 'lat and lng are required.'}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response(
+                {'error': 'lat, lng, radius, limit and offset must be numbers.'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return Response({'error': 'lat or lng is out of range.'}, status=status.HTTP_400_BAD_REQUEST)
+        if radius is not None and not 0 < radius <= MAX_SEARCH_RADIUS_KM:
+            return Response(
+                {'error': f'radius must be between 0 and {MAX_SEARCH_RADIUS_KM} km.'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        delivers = params.get('delivers', '').lower() in ('1', 'true', 'yes')
+        if radius is None and not delivers:
+            return Response({'error': 'Give a radius, delivers=true, or both.'}, status=status.HTTP_400_BAD_REQUEST)
+        sort = params.get('sort', 'distance')
+        if sort not in SORT_ORDERS:
+            return Response(
+                {'error': f"sort must be one of: {', '.join(SORT_ORDERS)}."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        total, matches = find_vendors(
+            latitude, longitude, radius_km=radius, delivers=delivers, category=params.get('category'),
+            sort=sort, limit=limit, offset=offset,
+        )
+        vendors = Vendor.objects.in_bulk([vendor_id for vendor_id, _ in matches])
+        results = []
+        for vendor_id, distance in matches:
+            vendor = vendors.get(vendor_id)
+            if vendor is not None:
+                data = VendorCardSerializer(vendor, context={'request': request}).data
+                results.append({**data, 'distance_km': round(distance, 3)})
+        return Response({'count': total, 'results': results}, status=status.HTTP_200_OK)
 
 
-class VendorDetailView(generics.RetrieveAPIView):
+class VendorDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     """Get detailed information about a specific vendor."""
-    queryset = Vendor.objects.filter(deleted_at__isnull=True)
+    queryset = Vendor.objects.filter(deleted_at__isnull=True).select_related('user').prefetch_related(
+        'images',
+        Prefetch('products_services', queryset=ProductService.objects.prefetch_related('images')),
+    )
     serializer_class = VendorSerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = 'pk'
+    
+    def get_version_scopes(self):
+        return [f"vendor:{self.kwargs['pk']}"]
 
 
 class VendorRegistrationView(generics.CreateAPIView):
@@ -43,14 +150,19 @@ class VendorRegistrationView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
-class VendorProductsServicesView(generics.ListAPIView):
+class VendorProductsServicesView(ConditionalGetMixin, generics.ListAPIView):
     """Get products/services for a specific vendor."""
     serializer_class = ProductServiceSerializer
     permission_classes = [permissions.AllowAny]
     
+    def get_version_scopes(self):
+        return [f"vendor:{self.kwargs['pk']}"]
+    
     def get_queryset(self):
         vendor = get_object_or_404(Vendor, pk=self.kwargs['pk'], deleted_at__isnull=True)
-        return ProductService.objects.filter(vendor=vendor, deleted_at__isnull=True)
+        return ProductService.objects.filter(
+            vendor=vendor, deleted_at__isnull=True
+        ).select_related('vendor').prefetch_related('images')
 
 
 class VendorReviewsView(generics.ListCreateAPIView):
@@ -73,22 +185,128 @@ class VendorReviewsView(generics.ListCreateAPIView):
         serializer.save(vendor=vendor, customer=customer)
 
 
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    Filter by the ``search`` parameter using the product search index, best match first.
+    
+    Only the max_results best matches are kept; an explicit ``ordering`` replaces
+    the rank order.
+    """
+    max_results = 1000
+    
+    def filter_queryset(self, request, queryset, view):
+        search = request.query_params.get('search', '').strip()
+        if not search:
+            return queryset
+        filters = {}
+        if str(request.query_params.get('vendor', '')).isdigit():
+            # Rank within the vendor so its matches are not crowded out by other vendors'
+            filters['vendor_id'] = int(request.query_params['vendor'])
+        matches = search_products(search, filters, limit=self.max_results)
+        if matches is None:
+            return queryset
+        product_ids = [product_id for product_id, _ in matches[1]]
+        if not product_ids:
+            return queryset.none()
+        rank = Case(
+            *(When(pk=product_id, then=Value(position)) for position, product_id in enumerate(product_ids)),
+            output_field=IntegerField(),
+        )
+        return queryset.filter(pk__in=product_ids).order_by(rank)
+
+
 class ProductServiceListView(generics.ListAPIView):
     """List all available products/services."""
-    queryset = ProductService.objects.filter(deleted_at__isnull=True)
+    queryset = ProductService.objects.filter(deleted_at__isnull=True).select_related('vendor').prefetch_related('images')
     serializer_class = ProductServiceSerializer
     permission_classes = [permissions.AllowAny]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, OrderingFilter]
     filterset_fields = ['vendor', 'is_service']
-    search_fields = ['name', 'description']
     ordering_fields = ['current_price', 'name', 'created_at']
 
 
-class ProductServiceDetailView(generics.RetrieveAPIView):
+class ProductServiceDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     """Get detailed information about a specific product/service."""
     queryset = ProductService.objects.filter(deleted_at__isnull=True)
     serializer_class = ProductServiceSerializer
     permission_classes = [permissions.AllowAny]
     lookup_field = 'pk'
+    
+    def get_version_scopes(self):
+        """A product is versioned with its vendor, whose name it also shows."""
+        vendor_id = self.get_queryset().filter(pk=self.kwargs['pk']).values_list('vendor_id', flat=True).first()
+        return None if vendor_id is None else [f'vendor:{vendor_id}']
+
+
+def parse_search_filters(request):
+    """
+    Read the filters of a product search query.
+    
+    Returns:
+        Tuple of (filters dict for search_products, error message or None)
+    """
+    params = request.query_params
+    filters = {}
+    available_for = params.get('available_for')
+    if available_for:
+        if available_for not in ('delivery', 'pickup'):
+            return None, "available_for must be 'delivery' or 'pickup'."
+        filters['available_for'] = available_for
+    for name in ('min_price', 'max_price'):
+        if params.get(name):
+            try:
+                filters[name] = Decimal(params[name])
+            except InvalidOperation:
+                return None, f"{name} must be a number."
+    if params.get('vendor'):
+        if not params['vendor'].isdigit():
+            return None, "vendor must be a vendor id."
+        filters['vendor_id'] = int(params['vendor'])
+    if params.get('category'):
+        filters['category'] = params['category']
+    if params.get('verified', '').lower() in ('1', 'true', 'yes'):
+        filters['verified'] = True
+    return filters, None
+
+
+class ProductSearchView(APIView):
+    """Ranked full-text search over products and services."""
+    permission_classes = [permissions.AllowAny]
+    max_results = 100
+    
+    def get(self, request):
+        """
+        Return the products/services matching every word of ``q``, best match first.
+        
+        Words match as prefixes of the words of the product name and description
+        and of the vendor's name and category, with typo tolerance for words that
+        match nothing.
+        """
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), self.max_results)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            return Response({'error': 'limit and offset must be numbers.'}, status=status.HTTP_400_BAD_REQUEST)
+        filters, error = parse_search_filters(request)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+        
+        matches = search_products(query, filters, limit=limit, offset=offset)
+        if matches is None:
+            return Response({'count': 0, 'results': []}, status=status.HTTP_200_OK)
+        
+        total, ranked = matches
+        products = ProductService.objects.filter(
+            id__in=[product_id for product_id, _ in ranked]
+        ).select_related('vendor').prefetch_related('images').in_bulk()
+        results = []
+        for product_id, score in ranked:
+            product = products.get(product_id)
+            if product is not None:
+                data = ProductServiceSerializer(product, context={'request': request}).data
+                results.append({**data, 'score': round(score, 4)})
+        return Response({'count': total, 'results': results}, status=status.HTTP_200_OK)
 
 
 class ProductServiceCreateView(generics.CreateAPIView):
@@ -104,7 +322,9 @@ class ProductServiceCreateView(generics.CreateAPIView):
         except (Vendor.DoesNotExist, AttributeError):
             # OneToOneField raises RelatedObjectDoesNotExist which inherits from AttributeError
             raise permissions.PermissionDenied("User does not have a vendor profile.")
-        serializer.save(vendor=vendor)
+        product = serializer.save(vendor=vendor)
+        # The legacy image field may have been set
+        product.refresh_preview_image()
 
 
 class ProductServiceUpdateView(generics.UpdateAPIView):
@@ -124,7 +344,9 @@ class ProductServiceUpdateView(generics.UpdateAPIView):
     
     def perform_update(self, serializer):
         """Update product/service."""
-        serializer.save()
+        product = serializer.save()
+        # The legacy image field may have changed
+        product.refresh_preview_image()
 
 
 class ProductServiceDeleteView(generics.DestroyAPIView):
@@ -174,7 +396,9 @@ class MyVendorProductsServicesView(generics.ListAPIView):
         except (Vendor.DoesNotExist, AttributeError):
             # OneToOneField raises RelatedObjectDoesNotExist which inherits from AttributeError
             return ProductService.objects.none()
-        return ProductService.objects.filter(vendor=vendor, deleted_at__isnull=True)
+        return ProductService.objects.filter(
+            vendor=vendor, deleted_at__isnull=True
+        ).select_related('vendor').prefetch_related('images')
 
 
 class VendorProfileUpdateView(generics.UpdateAPIView):
@@ -193,7 +417,9 @@ class VendorProfileUpdateView(generics.UpdateAPIView):
     def perform_update(self, serializer):
         """Update vendor profile."""
         # Don't allow updating read-only fields
-        serializer.save()
+        vendor = serializer.save()
+        # The legacy profile_image field may have changed
+        vendor.refresh_preview_image()
 
 
 class VendorStatsView(APIView):
@@ -202,413 +428,144 @@ class VendorStatsView(APIView):
     
     def get(self, request):
         """Return vendor statistics."""
-        # Use both logger and print to ensure we see output
-        print("=" * 60)
-        print("VendorStatsView.get() called - Calculating revenue and popular products")
-        print("=" * 60)
-        logger.info("=" * 60)
-        logger.info("VendorStatsView.get() called - Calculating revenue and popular products")
-        logger.info("=" * 60)
+        actor = get_actor(request)
+        
+        def compute():
+            vendor = Vendor.objects.filter(pk=actor.vendor_id).first()
+            if vendor is None:
+                return None
+            stats = compute_vendor_stats(vendor)
+            logger.debug(
+                "Vendor %s stats: %s orders, total revenue %s",
+                vendor.id, stats['total_orders'], stats['total_revenue']
+            )
+            return stats
         
-        try:
-            vendor = request.user.vendor_profile
-            print(f"Vendor found: {vendor.id} - {vendor.name}")
-            logger.info(f"Vendor found: {vendor.id} - {vendor.name}")
-        except (Vendor.DoesNotExist, AttributeError):
-            # OneToOneField raises RelatedObjectDoesNotExist which inherits from AttributeError
-            print("User does not have a vendor profile")
-            logger.info("User does not have a vendor profile")
+        # Revenue windows and trends move with the (UTC) date
+        stats = get_cached_payload(
+            'vendor_stats', 'vendor', actor.vendor_id, compute, variant=rollup_date(timezone.now()).isoformat()
+        ) if actor.is_vendor else None
+        if stats is None:
             return Response(
                 {"error": "User does not have a vendor profile."},
                 status=status.HTTP_403_FORBIDDEN
             )
-        
-        # Get products/services count
-        products_count = ProductService.objects.filter(
-            vendor=vendor, 
-            deleted_at__isnull=True
-        ).count()
-        
-        # Get orders data
-        from orders.models import Order
-        vendor_orders = Order.objects.filter(vendor=vendor)
-        total_orders = vendor_orders.count()
-        print(f"Total orders for vendor: {total_orders}")
-        logger.info(f"Total orders for vendor: {total_orders}")
-        
-        # Calculate today's revenue (include both delivered and picked up orders)
-        # Count orders that are completed regardless of delivery type
-        today_start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_orders = vendor_orders.filter(
-            created_at__gte=today_start,
-            current_status__in=['Delivered', 'PickedUp']
-        )
-        today_revenue = sum(order.total_amount for order in today_orders)
-        
-        # Debug: Check what orders are being counted
-        print(f"Today's revenue calculation (status in ['Delivered', 'PickedUp']):")
-        print(f"  Today orders count: {today_orders.count()}")
-        logger.info(f"Today's revenue calculation (status in ['Delivered', 'PickedUp']):")
-        logger.info(f"  Today orders count: {today_orders.count()}")
-        for order in today_orders:
-            print(f"    Order {order.order_uid}: status={order.current_status}, amount={order.total_amount}, is_completed={order.is_completed}")
-            logger.info(f"    Order {order.order_uid}: status={order.current_status}, amount={order.total_amount}, is_completed={order.is_completed}")
-        print(f"  Today revenue: {today_revenue}")
-        logger.info(f"  Today revenue: {today_revenue}")
-        
-        # Calculate weekly revenue (include both delivered and picked up orders)
-        week_start = today_start - timedelta(days=7)
-        week_orders = vendor_orders.filter(
-            created_at__gte=week_start,
-            current_status__in=['Delivered', 'PickedUp']
-        )
-        week_revenue = sum(order.total_amount for order in week_orders)
-        print(f"Week revenue (status in ['Delivered', 'PickedUp']): {week_revenue} from {week_orders.count()} orders")
-        logger.info(f"Week revenue (status in ['Delivered', 'PickedUp']): {week_revenue} from {week_orders.count()} orders")
-        
-        # Calculate monthly revenue (include both delivered and picked up orders)
-        month_start = today_start - timedelta(days=30)
-        month_orders = vendor_orders.filter(
-            created_at__gte=month_start,
-            current_status__in=['Delivered', 'PickedUp']
-        )
-        month_revenue = sum(order.total_amount for order in month_orders)
-        print(f"Month revenue (status in ['Delivered', 'PickedUp']): {month_revenue} from {month_orders.count()} orders")
-        logger.info(f"Month revenue (status in ['Delivered', 'PickedUp']): {month_revenue} from {month_orders.count()} orders")
-        
-        # Calculate total revenue (all time) - include both delivered and picked up orders
-        all_completed_orders = vendor_orders.filter(
-            current_status__in=['Delivered', 'PickedUp']
-        )
-        total_revenue = sum(order.total_amount for order in all_completed_orders)
-        print(f"Total revenue (status in ['Delivered', 'PickedUp']): {total_revenue} from {all_completed_orders.count()} orders")
-        logger.info(f"Total revenue (status in ['Delivered', 'PickedUp']): {total_revenue} from {all_completed_orders.count()} orders")
-        
-        # Debug: Log order counts and amounts for troubleshooting
-        delivered_orders = vendor_orders.filter(current_status='Delivered')
-        pickedup_orders = vendor_orders.filter(current_status='PickedUp')
-        delivered_count = delivered_orders.count()
-        pickedup_count = pickedup_orders.count()
-        delivered_revenue = sum(order.total_amount for order in delivered_orders)
-        pickedup_revenue = sum(order.total_amount for order in pickedup_orders)
-        print("=" * 60)
-        print("REVENUE BREAKDOWN:")
-        print(f"  Delivered: {delivered_count} orders, Revenue: {delivered_revenue}")
-        print(f"  PickedUp: {pickedup_count} orders, Revenue: {pickedup_revenue}")
-        print(f"  Total Completed: {all_completed_orders.count()} orders, Total Revenue: {total_revenue}")
-        print("=" * 60)
-        logger.info("=" * 60)
-        logger.info("REVENUE BREAKDOWN:")
-        logger.info(f"  Delivered: {delivered_count} orders, Revenue: {delivered_revenue}")
-        logger.info(f"  PickedUp: {pickedup_count} orders, Revenue: {pickedup_revenue}")
-        logger.info(f"  Total Completed: {all_completed_orders.count()} orders, Total Revenue: {total_revenue}")
-        logger.info("=" * 60)
-        
-        # Order status breakdown
-        status_breakdown = {}
-        for status_choice in Order.ORDER_STATUS:
-            status_key = status_choice[0]
-            status_breakdown[status_key] = vendor_orders.filter(
-                current_status=status_key
-            ).count()
-        
-        # Popular products (top 5 by order count) - include both delivered and picked up orders
-        from orders.models import OrderLineItem
-        from django.db.models import Count, Sum, Avg
-        
-        # Debug: Check what orders exist with each status
-        all_delivered = vendor_orders.filter(current_status='Delivered')
-        all_pickedup = vendor_orders.filter(current_status='PickedUp')
-        print("=" * 60)
-        print("POPULAR PRODUCTS CALCULATION:")
-        print(f"  Total Delivered orders: {all_delivered.count()}")
-        print(f"  Total PickedUp orders: {all_pickedup.count()}")
-        print(f"  Delivered order IDs: {list(all_delivered.values_list('id', flat=True))}")
-        print(f"  PickedUp order IDs: {list(all_pickedup.values_list('id', flat=True))}")
-        logger.info("=" * 60)
-        logger.info("POPULAR PRODUCTS CALCULATION:")
-        logger.info(f"  Total Delivered orders: {all_delivered.count()}")
-        logger.info(f"  Total PickedUp orders: {all_pickedup.count()}")
-        logger.info(f"  Delivered order IDs: {list(all_delivered.values_list('id', flat=True))}")
-        logger.info(f"  PickedUp order IDs: {list(all_pickedup.values_list('id', flat=True))}")
-        
-        # Filter for completed orders (both delivered and picked up) - use direct filter on status
-        print("Querying OrderLineItem with filter: order__vendor=vendor, order__current_status__in=['Delivered', 'PickedUp']")
-        logger.info("Querying OrderLineItem with filter: order__vendor=vendor, order__current_status__in=['Delivered', 'PickedUp']")
-        popular_products = OrderLineItem.objects.filter(
-            order__vendor=vendor,
-            order__current_status__in=['Delivered', 'PickedUp']
-        ).values(
-            'product_service__id',
-            'product_service__name'
-        ).annotate(
-            order_count=Count('order', distinct=True),
-            total_quantity=Sum('quantity')
-        ).order_by('-order_count')[:5]
-        
-        # Debug: Check which orders are in the popular products query
-        line_items_in_query = OrderLineItem.objects.filter(
-            order__vendor=vendor,
-            order__current_status__in=['Delivered', 'PickedUp']
+        return Response(stats, status=status.HTTP_200_OK)
+
+
+def parse_sales_range(request, default_days=30):
+    """
+    Read the start/end dates (YYYY-MM-DD, UTC) of a sales rollup query.
+
+    Returns:
+        Tuple of (start, end, error message or None)
+    """
+    try:
+        end = date.fromisoformat(request.query_params['end']) if 'end' in request.query_params else rollup_date(timezone.now())
+        start = date.fromisoformat(request.query_params['start']) if 'start' in request.query_params else end - timedelta(days=default_days - 1)
+    except ValueError:
+        return None, None, "Dates must be in YYYY-MM-DD format."
+    if start > end:
+        return None, None, "start must not be after end."
+    return start, end, None
+
+
+def parse_status_buckets(request):
+    """Read the comma separated status buckets of a sales rollup query."""
+    value = request.query_params.get('status')
+    if not value:
+        return None, None
+    buckets = [bucket.strip() for bucket in value.split(',') if bucket.strip()]
+    valid = {DEFAULT_STATUS_BUCKET, *STATUS_BUCKETS.values()}
+    unknown = [bucket for bucket in buckets if bucket not in valid]
+    if unknown:
+        return None, f"Unknown status bucket(s): {', '.join(unknown)}. Use {', '.join(sorted(valid))}."
+    return buckets, None
+
+
+class VendorDailySalesView(APIView):
+    """Daily sales of the authenticated vendor over a date range."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        """Return one row per day with sales, read from the daily sales rollup."""
+        actor = get_actor(request)
+        if not actor.is_vendor:
+            return Response(
+                {"error": "User does not have a vendor profile."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        start, end, error = parse_sales_range(request)
+        buckets, bucket_error = parse_status_buckets(request)
+        delivery_type = request.query_params.get('delivery_type')
+        if delivery_type and delivery_type not in ('delivery', 'pickup'):
+            error = "delivery_type must be 'delivery' or 'pickup'."
+        error = error or bucket_error
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = get_daily_sales(actor.vendor_id, start, end, delivery_type=delivery_type, status_buckets=buckets)
+        return Response({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'days': [
+                {
+                    'date': row['date'].isoformat(),
+                    'order_count': row['order_count'],
+                    'revenue': float(row['revenue']),
+                    'item_count': row['item_count'],
+                }
+                for row in rows
+            ],
+        }, status=status.HTTP_200_OK)
+
+
+class VendorProductSalesView(APIView):
+    """Per-product sales of the authenticated vendor over a date range."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        """Return products ranked by revenue (or quantity), read from the product sales rollup."""
+        actor = get_actor(request)
+        if not actor.is_vendor:
+            return Response(
+                {"error": "User does not have a vendor profile."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        start, end, error = parse_sales_range(request)
+        buckets, bucket_error = parse_status_buckets(request)
+        order_by = {'revenue': '-revenue', 'quantity': '-quantity', 'orders': '-order_count'}.get(
+            request.query_params.get('order_by', 'revenue')
         )
-        print(f"  Line items in query: {line_items_in_query.count()}")
-        logger.info(f"  Line items in query: {line_items_in_query.count()}")
-        for item in line_items_in_query[:10]:  # Show first 10
-            print(f"    Line item: order_id={item.order.id}, order_uid={item.order.order_uid}, order_status={item.order.current_status}, product={item.product_service.name if item.product_service else 'None'}")
-            logger.info(f"    Line item: order_id={item.order.id}, order_uid={item.order.order_uid}, order_status={item.order.current_status}, product={item.product_service.name if item.product_service else 'None'}")
-        
-        # Debug: Log popular products for troubleshooting
-        print(f"  Popular products count: {popular_products.count()}")
-        logger.info(f"  Popular products count: {popular_products.count()}")
-        for product in popular_products:
-            print(f"    Product: {product['product_service__name']}, Orders: {product['order_count']}, Quantity: {product['total_quantity']}")
-            logger.info(f"    Product: {product['product_service__name']}, Orders: {product['order_count']}, Quantity: {product['total_quantity']}")
-        print("=" * 60)
-        logger.info("=" * 60)
-        
-        # TEST: Verify we reach this point
-        print("*** AFTER POPULAR PRODUCTS - CODE IS EXECUTING ***")
-        logger.info("*** AFTER POPULAR PRODUCTS - CODE IS EXECUTING ***")
-        import sys
-        sys.stdout.flush()
-        
-        # Revenue trends (last 30 days) - only completed orders for revenue
-        print(">>> STARTING 30-DAY REVENUE TRENDS CALCULATION")
-        logger.info(">>> STARTING 30-DAY REVENUE TRENDS CALCULATION")
-        sys.stdout.flush()
-        revenue_trends_30d = []
-        order_volume_trends = []
+        if order_by is None:
+            error = "order_by must be 'revenue', 'quantity' or 'orders'."
         try:
-            for i in range(30):
-                day_start = today_start - timedelta(days=29-i)  # Start from 29 days ago, go to today
-                day_end = day_start + timedelta(days=1)
-                
-                # For revenue: only count completed orders (Delivered/PickedUp)
-                day_completed_orders = vendor_orders.filter(
-                    created_at__gte=day_start,
-                    created_at__lt=day_end,
-                    current_status__in=['Delivered', 'PickedUp']
-                )
-                day_revenue = sum(order.total_amount for order in day_completed_orders)
-                
-                # For order volume: count ALL orders created that day (not just completed)
-                day_all_orders = vendor_orders.filter(
-                    created_at__gte=day_start,
-                    created_at__lt=day_end
-                )
-                day_order_count = day_all_orders.count()
-                
-                # Calculate average order value from completed orders only
-                avg_order_value = float(day_revenue / day_completed_orders.count()) if day_completed_orders.count() > 0 else 0.0
-                
-                revenue_trends_30d.append({
-                    'date': day_start.date().isoformat(),
-                    'revenue': float(day_revenue)
-                })
-                order_volume_trends.append({
-                    'date': day_start.date().isoformat(),
-                    'count': day_order_count,
-                    'avg_order_value': avg_order_value
-                })
-        except Exception as e:
-            print(f"ERROR in 30-day trends loop: {e}")
-            logger.error(f"ERROR in 30-day trends loop: {e}", exc_info=True)
-            import traceback
-            traceback.print_exc()
-        
-        # Debug: Log 30-day trends
-        print("=" * 60)
-        print("30-DAY AGGREGATES:")
-        print(f"  Revenue trends count: {len(revenue_trends_30d)}")
-        print(f"  Order volume trends count: {len(order_volume_trends)}")
-        if revenue_trends_30d:
-            print(f"  Sample revenue data: {revenue_trends_30d[:3]}")
-        if order_volume_trends:
-            print(f"  Sample volume data: {order_volume_trends[:3]}")
-        print("=" * 60)
-        logger.info("=" * 60)
-        logger.info("30-DAY AGGREGATES:")
-        logger.info(f"  Revenue trends count: {len(revenue_trends_30d)}")
-        logger.info(f"  Order volume trends count: {len(order_volume_trends)}")
-        if revenue_trends_30d:
-            logger.info(f"  Sample revenue data: {revenue_trends_30d[:3]}")
-        if order_volume_trends:
-            logger.info(f"  Sample volume data: {order_volume_trends[:3]}")
-        logger.info("=" * 60)
-        
-        # Product revenue (top products by revenue) - use same approach as popular products
-        print(">>> STARTING PRODUCT REVENUE CALCULATION")
-        logger.info(">>> STARTING PRODUCT REVENUE CALCULATION")
-        sys.stdout.flush()
-        print("=" * 60)
-        print("PRODUCT REVENUE CALCULATION:")
-        logger.info("=" * 60)
-        logger.info("PRODUCT REVENUE CALCULATION:")
-        
-        product_revenue = []  # Initialize as empty list in case of error
-        try:
-            # Use the exact same query structure as popular_products but aggregate by revenue
-            product_revenue = OrderLineItem.objects.filter(
-                order__vendor=vendor,
-                order__current_status__in=['Delivered', 'PickedUp']
-            ).values(
-                'product_service__id',
-                'product_service__name'
-            ).annotate(
-                revenue=Sum('line_total'),
-                order_count=Count('order', distinct=True)
-            ).filter(
-                product_service__id__isnull=False
-            ).order_by('-revenue')[:10]  # Top 10 products by revenue
-            
-            print(f"  Product revenue query count: {product_revenue.count()}")
-            logger.info(f"  Product revenue query count: {product_revenue.count()}")
-            sys.stdout.flush()
-            
-            # Debug: Log each product
-            for product in product_revenue:
-                revenue_value = float(product['revenue'] or 0.0)
-                print(f"    Product: {product['product_service__name']}, Revenue: {revenue_value}, Orders: {product['order_count']}")
-                logger.info(f"    Product: {product['product_service__name']}, Revenue: {revenue_value}, Orders: {product['order_count']}")
-        except Exception as e:
-            print(f"ERROR in product revenue calculation: {e}")
-            logger.error(f"ERROR in product revenue calculation: {e}", exc_info=True)
-            import traceback
-            traceback.print_exc()
-            product_revenue = []  # Ensure it's defined even on error
-        
-        print("=" * 60)
-        logger.info("=" * 60)
-        sys.stdout.flush()
-        
-        # Customer insights
-        from auth_api.models import Customer
-        from django.db.models import Avg, Count, Q
-        
-        # Get all unique customers who have ordered from this vendor
-        unique_customers = vendor_orders.values('customer').distinct().count()
-        
-        # Get customers with 2+ orders (repeat customers)
-        customer_order_counts = vendor_orders.values('customer').annotate(
-            order_count=Count('id')
-        ).filter(order_count__gte=2)
-        repeat_customers_count = customer_order_counts.count()
-        
-        # Calculate average order value
-        completed_orders = vendor_orders.filter(current_status__in=['Delivered', 'PickedUp'])
-        avg_order_value = float(completed_orders.aggregate(Avg('total_amount'))['total_amount__avg'] or 0.0)
-        
-        # Top customers by order count
-        top_customers = vendor_orders.values(
-            'customer__id',
-            'customer__user__first_name',
-            'customer__user__last_name',
-            'customer__user__email'
-        ).annotate(
-            order_count=Count('id'),
-            total_spent=Sum('total_amount')
-        ).order_by('-order_count')[:5]
-        
-        # Format top customers
-        top_customers_list = []
-        for customer in top_customers:
-            top_customers_list.append({
-                'customer_id': customer['customer__id'],
-                'name': f"{customer['customer__user__first_name'] or ''} {customer['customer__user__last_name'] or ''}".strip() or customer['customer__user__email'],
-                'order_count': customer['order_count'],
-                'total_spent': float(customer['total_spent'] or 0.0)
-            })
-        
-        # Hourly order pattern (orders by hour of day)
-        hourly_order_pattern = []
-        for hour in range(24):
-            hour_orders = vendor_orders.filter(
-                created_at__hour=hour,
-                current_status__in=['Delivered', 'PickedUp']
-            ).count()
-            hourly_order_pattern.append({
-                'hour': hour,
-                'count': hour_orders
-            })
-        
-        # Delivery vs Pickup breakdown
-        delivery_orders = vendor_orders.filter(
-            delivery_type='delivery',
-            current_status__in=['Delivered', 'PickedUp']
-        )
-        pickup_orders = vendor_orders.filter(
-            delivery_type='pickup',
-            current_status__in=['Delivered', 'PickedUp']
-        )
-        
-        delivery_vs_pickup = {
-            'delivery_count': delivery_orders.count(),
-            'pickup_count': pickup_orders.count(),
-            'delivery_revenue': float(sum(order.total_amount for order in delivery_orders)),
-            'pickup_revenue': float(sum(order.total_amount for order in pickup_orders))
-        }
-        
-        stats = {
-            'vendor_id': vendor.id,
-            'vendor_name': vendor.name,
-            'products_count': products_count,
-            'total_orders': total_orders,
-            'average_rating': float(vendor.average_rating),
-            'review_count': vendor.review_count,
-            'today_revenue': float(today_revenue),
-            'week_revenue': float(week_revenue),
-            'month_revenue': float(month_revenue),
-            'total_revenue': float(total_revenue),  # All-time total revenue
-            'status_breakdown': status_breakdown,
-            'popular_products': list(popular_products),
-            'revenue_trends': revenue_trends_30d[:7],  # Keep 7-day for backward compatibility
-            'revenue_trends_30d': revenue_trends_30d,
-            'order_volume_trends': order_volume_trends,
-            'product_revenue': [
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            error = "limit must be a positive number."
+        error = error or bucket_error
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = get_product_sales(actor.vendor_id, start, end, status_buckets=buckets, order_by=order_by, limit=limit)
+        return Response({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'products': [
                 {
-                    'product_id': item.get('product_service__id') or item.get('product_service_id'),
-                    'product_name': item.get('product_service__name') or 'Unknown Product',
-                    'revenue': float(item.get('revenue') or 0.0),
-                    'order_count': item.get('order_count', 0)
+                    'product_id': row['product_service_id'],
+                    'product_name': row['product_service__name'],
+                    'order_count': row['order_count'],
+                    'quantity': row['quantity'],
+                    'revenue': float(row['revenue']),
                 }
-                for item in list(product_revenue)  # Convert to list to ensure evaluation
+                for row in rows
             ],
-            'customer_insights': {
-                'total_customers': unique_customers,
-                'repeat_customers': repeat_customers_count,
-                'avg_order_value': avg_order_value,
-                'top_customers': top_customers_list
-            },
-            'hourly_order_pattern': hourly_order_pattern,
-            'delivery_vs_pickup': delivery_vs_pickup,
-        }
-        
-        print("=" * 60)
-        print("FINAL STATS BEING RETURNED TO FRONTEND:")
-        print(f"  today_revenue: {stats['today_revenue']}")
-        print(f"  week_revenue: {stats['week_revenue']}")
-        print(f"  month_revenue: {stats['month_revenue']}")
-        print(f"  total_revenue: {stats['total_revenue']}")
-        print(f"  popular_products count: {len(stats['popular_products'])}")
-        print(f"  product_revenue count: {len(stats.get('product_revenue', []))}")
-        if stats.get('product_revenue'):
-            for pr in stats['product_revenue']:
-                print(f"    Product: {pr.get('product_name')}, Revenue: {pr.get('revenue')}, Orders: {pr.get('order_count')}")
-        print("=" * 60)
-        logger.info("=" * 60)
-        logger.info("FINAL STATS BEING RETURNED TO FRONTEND:")
-        logger.info(f"  today_revenue: {stats['today_revenue']}")
-        logger.info(f"  week_revenue: {stats['week_revenue']}")
-        logger.info(f"  month_revenue: {stats['month_revenue']}")
-        logger.info(f"  total_revenue: {stats['total_revenue']}")
-        logger.info(f"  popular_products count: {len(stats['popular_products'])}")
-        logger.info(f"  product_revenue count: {len(stats.get('product_revenue', []))}")
-        if stats.get('product_revenue'):
-            for pr in stats['product_revenue']:
-                logger.info(f"    Product: {pr.get('product_name')}, Revenue: {pr.get('revenue')}, Orders: {pr.get('order_count')}")
-        logger.info("=" * 60)
-        
-        return Response(stats, status=status.HTTP_200_OK)
+        }, status=status.HTTP_200_OK)
 
 
 class VendorProfileImageUploadView(APIView):
@@ -657,6 +614,7 @@ class VendorProfileImageUploadView(APIView):
             # Save new image
             vendor.profile_image = uploaded_file
             vendor.save()
+            vendor.refresh_preview_image()
             
             # Return updated vendor data
             serializer = VendorSerializer(vendor, context={'request': request})
@@ -685,6 +643,7 @@ class VendorProfileImageUploadView(APIView):
                 vendor.profile_image.delete(save=False)
                 vendor.profile_image = None
                 vendor.save()
+                vendor.refresh_preview_image()
             
             serializer = VendorSerializer(vendor, context={'request': request})
             return Response(
@@ -759,6 +718,7 @@ class ProductServiceImageUploadView(APIView):
             # Save new image
             product.image = uploaded_file
             product.save()
+            product.refresh_preview_image()
             
             # Return updated product data
             serializer = ProductServiceSerializer(product, context={'request': request})
@@ -802,6 +762,7 @@ class ProductServiceImageUploadView(APIView):
                 product.image.delete(save=False)
                 product.image = None
                 product.save()
+                product.refresh_preview_image()
             
             serializer = ProductServiceSerializer(product, context={'request': request})
             return Response(
@@ -928,6 +889,8 @@ class ProductImageUploadView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        product.refresh_preview_image()
+        
         # Return uploaded images
         serializer = ProductImageSerializer(uploaded_images, many=True, context={'request': request})
         return Response(
@@ -949,7 +912,8 @@ class ProductImageUpdateView(generics.RetrieveUpdateDestroyAPIView):
         except (Vendor.DoesNotExist, AttributeError):
             return ProductImage.objects.none()
         
-        return ProductImage.objects.filter(product_service__vendor=vendor)
+        # The product is read when saving and deleting the image
+        return ProductImage.objects.filter(product_service__vendor=vendor).select_related('product_service')
     
     def perform_update(self, serializer):
         """Update image, handling preview selection."""
@@ -969,6 +933,8 @@ class ProductImageUpdateView(generics.RetrieveUpdateDestroyAPIView):
         
         # Now save the instance with the updated is_preview value
         instance = serializer.save()
+        # Preview selection or display order may have changed
+        instance.product_service.refresh_preview_image()
         
         return instance
     
@@ -977,6 +943,7 @@ class ProductImageUpdateView(generics.RetrieveUpdateDestroyAPIView):
         if instance.image:
             instance.image.delete(save=False)
         instance.delete()
+        instance.product_service.refresh_preview_image()
 
 
 class VendorImageListView(generics.ListAPIView):
@@ -1067,6 +1034,8 @@ class VendorImageUploadView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        vendor.refresh_preview_image()
+        
         # Return uploaded images
         serializer = VendorImageSerializer(uploaded_images, many=True, context={'request': request})
         return Response(
@@ -1108,6 +1077,8 @@ class VendorImageUpdateView(generics.RetrieveUpdateDestroyAPIView):
         
         # Now save the instance with the updated is_preview value
         instance = serializer.save()
+        # Preview selection or display order may have changed
+        instance.vendor.refresh_preview_image()
         
         return instance
     
@@ -1115,4 +1086,5 @@ class VendorImageUpdateView(generics.RetrieveUpdateDestroyAPIView):
         """Delete image file and record."""
         if instance.image:
             instance.image.delete(save=False)
-        instance.delete()
\ No newline at end of file
+        instance.delete()
+        instance.vendor.refresh_preview_image()
\ No newline at end of file
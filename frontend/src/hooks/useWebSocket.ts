@@ -50,50 +50,58 @@ export const useOrderUpdates = (options: UseOrderUpdatesOptions): UseOrderUpdate
     return localStorage.getItem('accessToken');
   }, []);
 
-  // Update React Query cache when order update is received
+  // Update React Query cache when order update is received.
+  // Events carry only the changed fields and the order version; when the cached
+  // copy is older than base_version the full order is requested as a snapshot.
   const handleOrderUpdate = useCallback((message: WebSocketMessage) => {
-    if (message.order) {
-      const order = message.order as Order;
+    const queryKey = userType === 'vendor' ? 'vendor-orders' : 'my-orders';
+
+    // Replace the order in every cached list (one per filter set)
+    const applyOrder = (order: Order) => {
       setLastUpdate(order);
+      queryClient.setQueriesData<Order[] | undefined>(queryKey, (oldData) => {
+        if (!oldData) return oldData;
+        const existingIndex = oldData.findIndex(o => o.id === order.id);
+        if (existingIndex < 0) return oldData;
+        const newData = [...oldData];
+        newData[existingIndex] = order;
+        return newData;
+      });
+    };
 
-      // Update the orders list in React Query cache
-      if (userType === 'vendor') {
-        // Update vendor orders query
-        queryClient.setQueryData(['vendor-orders'], (oldData: Order[] | undefined) => {
-          if (!oldData) return [order];
-          
-          const existingIndex = oldData.findIndex(o => o.id === order.id);
-          if (existingIndex >= 0) {
-            // Update existing order
-            const newData = [...oldData];
-            newData[existingIndex] = order;
-            return newData;
-          } else {
-            // Add new order (for new_order messages)
-            return [order, ...oldData];
-          }
-        });
-      } else {
-        // Update customer orders query
-        queryClient.setQueryData(['my-orders'], (oldData: Order[] | undefined) => {
-          if (!oldData) return [order];
-          
-          const existingIndex = oldData.findIndex(o => o.id === order.id);
-          if (existingIndex >= 0) {
-            // Update existing order
-            const newData = [...oldData];
-            newData[existingIndex] = order;
-            return newData;
-          } else {
-            // Add new order (for new_order messages)
-            return [order, ...oldData];
-          }
-        });
-      }
+    if (message.type === 'order_snapshot' && message.order) {
+      applyOrder(message.order);
+      return;
+    }
+
+    if ((message.type !== 'order_update' && message.type !== 'new_order') || message.order_id === undefined) {
+      return;
+    }
+
+    const cached = queryClient.getQueriesData<Order[] | undefined>(queryKey)
+      .map(([, data]) => data?.find(o => o.id === message.order_id))
+      .find((order): order is Order => !!order);
+
+    if (!cached) {
+      // Not in any loaded list (e.g. a new order): refetch so filters and ordering apply
+      queryClient.invalidateQueries(queryKey);
+      return;
+    }
+
+    const cachedVersion = cached.version ?? 0;
+    if (cachedVersion >= (message.version ?? 0)) {
+      return; // Already up to date
+    }
+    if (cachedVersion < (message.base_version ?? 0)) {
+      wsServiceRef.current?.send({ type: 'snapshot', order_id: message.order_id, version: cachedVersion });
+      return;
+    }
+
+    applyOrder({ ...cached, ...message.changes, version: message.version } as Order);
 
-      // Also invalidate queries to ensure fresh data
-      const queryKey = userType === 'vendor' ? ['vendor-orders'] : ['my-orders'];
-      queryClient.invalidateQueries(queryKey, { exact: false });
+    // A status change can move the order in or out of a filtered list
+    if (message.changes && 'current_status' in message.changes) {
+      queryClient.invalidateQueries(queryKey);
     }
   }, [userType, queryClient]);
 
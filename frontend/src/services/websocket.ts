@@ -3,11 +3,15 @@
  */
 import { Order } from '../types/index';
 
-export type WebSocketMessageType = 'order_update' | 'new_order' | 'pong' | 'error';
+export type WebSocketMessageType = 'order_update' | 'new_order' | 'order_snapshot' | 'order_current' | 'pong' | 'error';
 
 export interface WebSocketMessage {
   type: WebSocketMessageType;
-  order?: Order;
+  order?: Order;           // Full order, only on order_snapshot
+  order_id?: number;
+  version?: number;        // Order version after the change
+  base_version?: number;   // Version the changes apply to
+  changes?: Partial<Order>;
   timestamp?: string;
   error?: string;
 }
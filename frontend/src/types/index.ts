@@ -273,6 +273,7 @@ export interface Order {
   delivery_instructions?: string;
   estimated_ready_time?: string;
   is_completed: boolean;
+  version?: number;
   created_at: string;
   updated_at: string;
   line_items?: OrderLineItem[];